@@ -5,6 +5,7 @@ from .models import (
     Encounter,
     Condition,
     Observation,
+    ObservationColumns,
     MedicationOrder,
     ImmunizationRecord,
     CarePlanSummary,
@@ -37,6 +38,7 @@ __all__ = [
     "Encounter",
     "Condition",
     "Observation",
+    "ObservationColumns",
     "MedicationOrder",
     "ImmunizationRecord",
     "CarePlanSummary",
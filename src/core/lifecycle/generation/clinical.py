@@ -1,8 +1,11 @@
 """Lifecycle clinical generation helpers extracted from synthetic_patient_generator."""
 from __future__ import annotations
 
+import bisect
 import calendar
+import csv
 import difflib
+import json
 import random
 import re
 import string
@@ -11,10 +14,12 @@ from collections import Counter, defaultdict
 from collections.abc import Mapping, Sequence
 from datetime import date, datetime, timedelta
 from functools import lru_cache
-from typing import Any, Dict, List, Optional, Set, Tuple
-from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple, Union
+from dataclasses import dataclass, field
 from types import MappingProxyType
 
+import numpy as np
 from faker import Faker
 
 from ..constants import (
@@ -25,6 +30,7 @@ from ..constants import (
     ENCOUNTER_TYPES,
     MAX_PATIENT_AGE,
 )
+from .sampling import AliasTable
 from ...terminology_catalogs import (
     CONDITIONS as CONDITION_TERMS,
     MEDICATIONS as FALLBACK_MEDICATION_TERMS,
@@ -3267,11 +3273,16 @@ FAMILY_HISTORY_PROFILES = [
 ]
 
 
-def _family_history_probability(profile: Dict[str, Any], patient: Dict[str, Any]) -> float:
-    """Estimate likelihood of a documented family history entry for this profile."""
+def _family_history_base_probability(
+    profile: Dict[str, Any],
+    age: int,
+    gender: str,
+    smoking: Optional[str],
+    alcohol: Optional[str],
+) -> float:
+    """Profile probability before the deprivation adjustment and clamping."""
 
     probability = float(profile.get("base_rate", 0.1) or 0.1)
-    age = int(patient.get("age", 0) or 0)
     onset_mean = profile.get("onset_mean", 50) or 50
     onset_sd = profile.get("onset_sd", 10) or 10
 
@@ -3280,20 +3291,30 @@ def _family_history_probability(profile: Dict[str, Any], patient: Dict[str, Any]
     elif age <= max(0, onset_mean - max(15, onset_sd * 2)):
         probability *= 0.75
 
-    gender = (patient.get("gender") or "").lower()
     sex_bias = profile.get("sex_bias")
     if sex_bias == "female":
         probability *= 1.25 if gender.startswith("f") else 0.7
     elif sex_bias == "male":
         probability *= 1.25 if gender.startswith("m") else 0.7
 
-    smoking = patient.get("smoking_status")
-    alcohol = patient.get("alcohol_use")
     category = profile.get("category", "")
     if smoking == "Current" and category in {"cardiometabolic", "cardiovascular", "respiratory"}:
         probability *= 1.1
     if alcohol == "Heavy" and category in {"cardiometabolic", "cardiovascular"}:
         probability *= 1.05
+    return probability
+
+
+def _family_history_probability(profile: Dict[str, Any], patient: Dict[str, Any]) -> float:
+    """Estimate likelihood of a documented family history entry for this profile."""
+
+    probability = _family_history_base_probability(
+        profile,
+        int(patient.get("age", 0) or 0),
+        (patient.get("gender") or "").lower(),
+        patient.get("smoking_status"),
+        patient.get("alcohol_use"),
+    )
 
     deprivation_index = patient.get("community_deprivation_index")
     if deprivation_index is not None:
@@ -3302,21 +3323,6 @@ def _family_history_probability(profile: Dict[str, Any], patient: Dict[str, Any]
     return max(0.01, min(probability, 0.9))
 
 
-def _choose_family_relation(relations: Dict[str, float]) -> Optional[str]:
-    if not relations:
-        return None
-    total = sum(relations.values())
-    if total <= 0:
-        return random.choice(list(relations.keys()))
-    threshold = random.uniform(0, total)
-    cumulative = 0.0
-    for relation, weight in relations.items():
-        cumulative += weight
-        if cumulative >= threshold:
-            return relation
-    return next(iter(relations))
-
-
 def _sample_family_history_onset(profile: Dict[str, Any]) -> Optional[int]:
     mean = profile.get("onset_mean")
     sd = profile.get("onset_sd") or 6
@@ -3377,6 +3383,237 @@ def _build_family_history_entry(
     return entry
 
 
+@dataclass(frozen=True)
+class _RelationTable:
+    relations: Tuple[str, ...]
+    cumulative: Tuple[float, ...]
+
+    @classmethod
+    def build(cls, weights: Mapping[str, float]) -> "_RelationTable":
+        cumulative: List[float] = []
+        total = 0.0
+        for weight in weights.values():
+            total += weight
+            cumulative.append(total)
+        return cls(tuple(weights), tuple(cumulative))
+
+    def pick(self, threshold: float) -> str:
+        index = bisect.bisect_left(self.cumulative, threshold)
+        return self.relations[index] if index < len(self.relations) else self.relations[0]
+
+    def draw(self, unit: Optional[float] = None) -> Optional[str]:
+        """Weighted relation pick; ``unit`` replaces the stdlib draw with a [0, 1) value."""
+
+        if not self.relations:
+            return None
+        total = self.cumulative[-1]
+        if total <= 0:
+            return random.choice(list(self.relations))
+        return self.pick(random.uniform(0, total) if unit is None else unit * total)
+
+
+@dataclass(frozen=True)
+class _CompiledFamilyProfile:
+    profile: Dict[str, Any]
+    condition: str
+    catalog_entry: Optional[Dict[str, Any]]
+    relations: _RelationTable
+    alternates: Dict[str, _RelationTable]
+    risk_modifiers: Dict[str, float]
+
+    def risk_modifier(self, relation: str) -> float:
+        modifier = self.risk_modifiers.get(relation)
+        if modifier is None:
+            modifier = float(self.profile.get("risk_boost", 0.05) or 0.05) * FAMILY_RELATIONSHIP_FACTORS.get(
+                relation, 0.85
+            )
+        return modifier
+
+
+class FamilyHistoryTables:
+    """``FAMILY_HISTORY_PROFILES`` compiled for repeated sampling.
+
+    Catalog resolution, relation cumulative weights and per-relation risk
+    modifiers are computed once. Profile probabilities are cached per
+    demographic stratum (age band between the profiles' onset thresholds,
+    sex, current smoking, heavy alcohol use); only the continuous deprivation
+    adjustment is applied per patient.
+    """
+
+    def __init__(self, profiles: Sequence[Dict[str, Any]]) -> None:
+        compiled = []
+        breakpoints = set()
+        for profile in profiles:
+            condition, catalog_entry = _resolve_condition_catalog_entry(profile.get("condition", ""))
+            weights = profile.get("relations", {})
+            risk_boost = float(profile.get("risk_boost", 0.05) or 0.05)
+            compiled.append(
+                _CompiledFamilyProfile(
+                    profile=profile,
+                    condition=condition,
+                    catalog_entry=catalog_entry,
+                    relations=_RelationTable.build(weights),
+                    alternates={
+                        relation: _RelationTable.build({rel: w for rel, w in weights.items() if rel != relation})
+                        for relation in weights
+                    },
+                    risk_modifiers={
+                        relation: risk_boost * FAMILY_RELATIONSHIP_FACTORS.get(relation, 0.85)
+                        for relation in weights
+                    },
+                )
+            )
+            onset_mean = profile.get("onset_mean", 50) or 50
+            onset_sd = profile.get("onset_sd", 10) or 10
+            breakpoints.add(onset_mean)
+            breakpoints.add(max(0, onset_mean - max(15, onset_sd * 2)) + 1)
+        self.profiles: Tuple[_CompiledFamilyProfile, ...] = tuple(compiled)
+        self.age_breakpoints: Tuple[int, ...] = tuple(sorted(breakpoints))
+        self._strata: Dict[Tuple[int, str, bool, bool], np.ndarray] = {}
+        self._resolved: Dict[str, Tuple[str, Optional[Dict[str, Any]]]] = {
+            item.profile.get("condition", ""): (item.condition, item.catalog_entry) for item in compiled
+        }
+
+    def resolve(self, condition_name: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        if condition_name not in self._resolved:
+            self._resolved[condition_name] = _resolve_condition_catalog_entry(condition_name)
+        return self._resolved[condition_name]
+
+    def _stratum(self, patient: Dict[str, Any]) -> np.ndarray:
+        age = int(patient.get("age", 0) or 0)
+        gender = (patient.get("gender") or "").lower()
+        sex = "f" if gender.startswith("f") else "m" if gender.startswith("m") else ""
+        band = bisect.bisect_right(self.age_breakpoints, age)
+        key = (band, sex, patient.get("smoking_status") == "Current", patient.get("alcohol_use") == "Heavy")
+        table = self._strata.get(key)
+        if table is None:
+            representative_age = self.age_breakpoints[band - 1] if band else self.age_breakpoints[0] - 1
+            table = np.array(
+                [
+                    _family_history_base_probability(
+                        item.profile,
+                        representative_age,
+                        sex,
+                        "Current" if key[2] else None,
+                        "Heavy" if key[3] else None,
+                    )
+                    for item in self.profiles
+                ]
+            )
+            self._strata[key] = table
+        return table
+
+    def probabilities(self, patient: Dict[str, Any]) -> np.ndarray:
+        """Per-profile probabilities for ``patient``, matching ``_family_history_probability``."""
+
+        probabilities = self._stratum(patient)
+        deprivation_index = patient.get("community_deprivation_index")
+        if deprivation_index is not None:
+            probabilities = probabilities * (1 + min(max(float(deprivation_index), 0.0), 1.0) * 0.05)
+        return np.clip(probabilities, 0.01, 0.9)
+
+
+@lru_cache(maxsize=1)
+def get_family_history_tables() -> FamilyHistoryTables:
+    return FamilyHistoryTables(FAMILY_HISTORY_PROFILES)
+
+
+class _FamilyHistoryAccumulator:
+    """Collects one patient's family history entries and condition adjustments."""
+
+    def __init__(self, patient: Dict[str, Any], tables: FamilyHistoryTables) -> None:
+        self.patient = patient
+        self.tables = tables
+        self.entries: List[Dict[str, Any]] = []
+        self.adjustments: Dict[str, float] = {}
+        self._conditions: Set[str] = set()
+
+    def _add(self, entry: Dict[str, Any], normalized_condition: str, risk_modifier: float) -> None:
+        self.entries.append(entry)
+        self._conditions.add(_normalize_condition_display(entry.get("condition_display", "")))
+        existing_boost = self.adjustments.get(normalized_condition, 0.0)
+        self.adjustments[normalized_condition] = round(min(existing_boost + risk_modifier, 0.3), 4)
+
+    def has_condition(self, normalized_condition: str) -> bool:
+        return normalized_condition in self._conditions
+
+    def record(
+        self,
+        compiled: _CompiledFamilyProfile,
+        relation: str,
+        source: str,
+        onset_age: Optional[int],
+    ) -> Optional[Dict[str, Any]]:
+        risk_modifier = compiled.risk_modifier(relation)
+        entry = _build_family_history_entry(
+            self.patient,
+            compiled.profile,
+            relation,
+            RELATION_ROLE_CODES.get(relation, ""),
+            onset_age,
+            risk_modifier,
+            compiled.condition,
+            compiled.catalog_entry,
+            source=source,
+        )
+        if any(
+            existing.get("condition_code") == entry.get("condition_code") and existing.get("relation") == relation
+            for existing in self.entries
+        ):
+            return None
+        self._add(entry, compiled.condition, risk_modifier)
+        return entry
+
+    def add_forced(self, order: Sequence[int], probabilities: Sequence[float], min_fam: int) -> None:
+        for index in sorted(order, key=lambda idx: probabilities[idx], reverse=True):
+            if len(self.entries) >= min_fam:
+                break
+            compiled = self.tables.profiles[index]
+            if self.has_condition(compiled.condition):
+                continue
+            relation = compiled.relations.draw() or "Mother"
+            self.record(compiled, relation, "forced", _sample_family_history_onset(compiled.profile))
+
+    def add_genetic_markers(self, max_fam: int) -> None:
+        for marker in self.patient.get("genetic_markers", []):
+            if len(self.entries) >= max_fam:
+                break
+            marker_name = marker.get("name") if isinstance(marker, dict) else str(marker)
+            marker_config = GENETIC_RISK_FACTORS.get(marker_name, {})
+            for condition in marker_config.get("family_history_conditions", []):
+                if len(self.entries) >= max_fam:
+                    break
+                normalized_condition, catalog_entry = self.tables.resolve(condition)
+                if self.has_condition(normalized_condition):
+                    continue
+                relation = random.choice(["Mother", "Father", "Sibling"])
+                risk_modifier = 0.1 * FAMILY_RELATIONSHIP_FACTORS.get(relation, 0.85)
+                profile_stub = {
+                    "condition": condition,
+                    "category": catalog_entry.get("category") if catalog_entry else None,
+                    "risk_boost": risk_modifier,
+                    "notes": f"Genetic risk marker {marker_name}",
+                }
+                entry = _build_family_history_entry(
+                    self.patient,
+                    profile_stub,
+                    relation,
+                    RELATION_ROLE_CODES.get(relation, ""),
+                    _sample_family_history_onset({"onset_mean": self.patient.get("age", 40), "onset_sd": 6}),
+                    risk_modifier,
+                    normalized_condition,
+                    catalog_entry,
+                    source="genetic_marker",
+                )
+                entry["genetic_marker"] = marker_name
+                self._add(entry, normalized_condition, risk_modifier)
+
+    def finish(self) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+        self.patient["family_history_entries"] = self.entries
+        self.patient["family_history_adjustments"] = self.adjustments
+        return self.entries, self.adjustments
+
+
 fake = Faker()
 
 
@@ -3419,12 +3656,7 @@ def _collect_allergy_terms(allergies: Optional[List[Dict[str, Any]]]) -> Set[str
     return terms
 
 
-def _series_applicable(
-    series: Dict[str, Any],
-    age_months: int,
-    condition_categories: Set[str],
-    condition_names: Set[str],
-) -> bool:
+def _series_age_applicable(series: Dict[str, Any], age_months: int) -> bool:
     if age_months < series.get("min_age_months", 0):
         return False
     max_age = series.get("max_age_months")
@@ -3437,6 +3669,17 @@ def _series_applicable(
         and age_months > catch_up_end
     ):
         return False
+    return True
+
+
+def _series_applicable(
+    series: Dict[str, Any],
+    age_months: int,
+    condition_categories: Set[str],
+    condition_names: Set[str],
+) -> bool:
+    if not _series_age_applicable(series, age_months):
+        return False
     required_conditions = series.get("required_conditions")
     if required_conditions and not set(required_conditions).intersection(condition_names):
         return False
@@ -3467,11 +3710,105 @@ def _add_months(base_date: date, months: int) -> date:
     return date(year, month, day)
 
 
+def _parse_related_conditions(value: Any) -> Set[str]:
+    if not value:
+        return set()
+    if isinstance(value, str):
+        tokens = [token.strip().strip('"').lower() for token in value.split(',') if token.strip()]
+        return set(tokens)
+    if isinstance(value, list):
+        return {str(token).strip().lower() for token in value if token}
+    return set()
+
+
+class EncounterTimeline(Sequence):
+    """Per-patient encounter index shared by the date-based event generators.
+
+    Built once after ``generate_encounters``. It behaves as a read-only
+    sequence of the original encounters and adds:
+
+    * ``nearest(target_date)`` - bisect lookup returning the same encounter a
+      linear scan would (smallest day delta, earliest list position on ties),
+    * ``get(encounter_id)`` - id to encounter map,
+    * ``for_condition(name)`` - inverted index over ``related_conditions``,
+    * ``dates`` - each encounter ``date`` string mapped to its parsed ``date``.
+    """
+
+    def __init__(self, encounters: Sequence[Dict[str, Any]]) -> None:
+        self.encounters: List[Dict[str, Any]] = list(encounters)
+        self.by_id: Dict[str, Dict[str, Any]] = {}
+        self._related: List[Set[str]] = []
+        self._by_condition: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.dates: Dict[str, date] = {}
+        first_index_by_day: Dict[int, int] = {}
+        for idx, encounter in enumerate(self.encounters):
+            encounter_id = encounter.get("encounter_id")
+            if encounter_id is not None:
+                self.by_id.setdefault(encounter_id, encounter)
+            related = _parse_related_conditions(encounter.get("related_conditions"))
+            self._related.append(related)
+            for name in related:
+                self._by_condition[name].append(encounter)
+            raw_date = encounter.get("date")
+            encounter_date = _safe_parse_date(raw_date)
+            if encounter_date:
+                first_index_by_day.setdefault(encounter_date.toordinal(), idx)
+                if isinstance(raw_date, str):
+                    self.dates.setdefault(raw_date, encounter_date)
+        self._days: List[int] = sorted(first_index_by_day)
+        self._first_index: List[int] = [first_index_by_day[day] for day in self._days]
+
+    @classmethod
+    def of(cls, encounters: Optional[Sequence[Dict[str, Any]]]) -> "EncounterTimeline":
+        if isinstance(encounters, cls):
+            return encounters
+        return cls(encounters or [])
+
+    def __len__(self) -> int:
+        return len(self.encounters)
+
+    def __getitem__(self, index):
+        return self.encounters[index]
+
+    def __iter__(self):
+        return iter(self.encounters)
+
+    def get(self, encounter_id: Any) -> Optional[Dict[str, Any]]:
+        return self.by_id.get(encounter_id)
+
+    def nearest(self, target_date: Optional[date]) -> Optional[Dict[str, Any]]:
+        if not self._days or target_date is None:
+            return None
+        target = target_date.toordinal()
+        position = bisect.bisect_left(self._days, target)
+        best: Optional[Tuple[int, int]] = None
+        for candidate in (position - 1, position):
+            if 0 <= candidate < len(self._days):
+                key = (abs(self._days[candidate] - target), self._first_index[candidate])
+                if best is None or key < best:
+                    best = key
+        return self.encounters[best[1]] if best else None
+
+    def for_condition(self, condition_name: str) -> List[Dict[str, Any]]:
+        """Encounters whose ``related_conditions`` mention ``condition_name``."""
+
+        if condition_name:
+            return list(self._by_condition.get(condition_name.lower(), ()))
+        return [
+            encounter
+            for encounter, related in zip(self.encounters, self._related)
+            if not related or "" in related
+        ]
+
+
 def _select_encounter_for_date(
-    encounters: List[Dict[str, Any]], target_date: Optional[date]
+    encounters: Sequence[Dict[str, Any]], target_date: Optional[date]
 ) -> Optional[Dict[str, Any]]:
     if not encounters or target_date is None:
         return None
+    if isinstance(encounters, EncounterTimeline):
+        return encounters.nearest(target_date)
+    # A one-off lookup on a plain list: scanning is cheaper than building a timeline.
     best_match: Optional[Dict[str, Any]] = None
     smallest_delta: Optional[int] = None
     for encounter in encounters:
@@ -3649,6 +3986,180 @@ def _determine_recurrent_date(
     return candidate
 
 
+@dataclass(frozen=True)
+class CompiledImmunizationSeries:
+    """A schedule definition with its eligibility filters and allergy mask resolved."""
+
+    definition: Dict[str, Any]
+    contraindication_mask: int
+    required_conditions: FrozenSet[str]
+    target_categories: FrozenSet[str]
+    doses: Tuple[Dict[str, Any], ...] = ()
+    series_total: int = 0
+
+    def admits(self, allergy_mask: int, condition_names: Set[str], condition_categories: Set[str]) -> bool:
+        if self.contraindication_mask & allergy_mask:
+            return False
+        if self.required_conditions and not self.required_conditions.intersection(condition_names):
+            return False
+        if self.target_categories and not self.target_categories.intersection(condition_categories):
+            return False
+        return True
+
+
+class ImmunizationSchedule:
+    """Age-indexed view of the series and recurrent immunization definitions.
+
+    Every age threshold that changes which series or doses apply (minimum and
+    maximum ages, catch-up windows, dose grace periods, two-dose cutoffs and
+    the catch-up flag) becomes a breakpoint. Each interval between breakpoints
+    stores the applicable series with their prepared doses, so a patient lookup
+    is a single ``bisect`` on age in months. Contraindications are compiled to
+    a bitmask over the allergy tokens the definitions mention.
+    """
+
+    def __init__(
+        self,
+        series_definitions: Sequence[Dict[str, Any]],
+        recurrent_definitions: Sequence[Dict[str, Any]],
+    ) -> None:
+        tokens = sorted(
+            {
+                item.lower()
+                for definition in list(series_definitions) + list(recurrent_definitions)
+                for item in definition.get("contraindications") or []
+            }
+        )
+        self.contraindication_tokens: Tuple[str, ...] = tuple(tokens)
+        self._token_bits = {token: 1 << idx for idx, token in enumerate(tokens)}
+
+        breakpoints = {0}
+        for series in series_definitions:
+            breakpoints.add(series.get("min_age_months", 0))
+            if series.get("max_age_months") is not None and series.get("series_type") != "adult":
+                breakpoints.add(series["max_age_months"] + 1)
+            if series.get("catch_up_end_months") is not None and series.get("series_type") == "childhood":
+                breakpoints.add(series["catch_up_end_months"] + 1)
+            if series.get("two_dose_cutoff_months") is not None:
+                breakpoints.add(series["two_dose_cutoff_months"])
+            for config in series.get("doses", []):
+                target_age = config.get("age_months", series.get("min_age_months", 0))
+                breakpoints.add(target_age - config.get("grace_months", 1))
+                breakpoints.add(target_age + 13)
+        for definition in recurrent_definitions:
+            breakpoints.add(definition.get("min_age_months", 0))
+        self.breakpoints: Tuple[int, ...] = tuple(sorted(age for age in breakpoints if age >= 0))
+
+        self.series_by_band: Tuple[Tuple[CompiledImmunizationSeries, ...], ...] = tuple(
+            self._compile_series_band(series_definitions, age) for age in self.breakpoints
+        )
+        self.recurrent_by_band: Tuple[Tuple[CompiledImmunizationSeries, ...], ...] = tuple(
+            tuple(
+                self._compile(definition)
+                for definition in recurrent_definitions
+                if age >= definition.get("min_age_months", 0)
+            )
+            for age in self.breakpoints
+        )
+
+    def _compile(self, definition: Dict[str, Any], **extra: Any) -> CompiledImmunizationSeries:
+        mask = 0
+        for item in definition.get("contraindications") or []:
+            mask |= self._token_bits[item.lower()]
+        return CompiledImmunizationSeries(
+            definition=definition,
+            contraindication_mask=mask,
+            required_conditions=frozenset(definition.get("required_conditions") or ()),
+            target_categories=frozenset(definition.get("target_categories") or ()),
+            **extra,
+        )
+
+    def _compile_series_band(
+        self, series_definitions: Sequence[Dict[str, Any]], age_months: int
+    ) -> Tuple[CompiledImmunizationSeries, ...]:
+        compiled = []
+        for series in series_definitions:
+            if not _series_age_applicable(series, age_months):
+                continue
+            doses, series_total = _prepare_series_doses(series, age_months)
+            if doses:
+                compiled.append(self._compile(series, doses=tuple(doses), series_total=series_total))
+        return tuple(compiled)
+
+    def band_index(self, age_months: int) -> int:
+        return max(bisect.bisect_right(self.breakpoints, age_months) - 1, 0)
+
+    def series_for_age(self, age_months: int) -> Tuple[CompiledImmunizationSeries, ...]:
+        return self.series_by_band[self.band_index(age_months)]
+
+    def recurrent_for_age(self, age_months: int) -> Tuple[CompiledImmunizationSeries, ...]:
+        return self.recurrent_by_band[self.band_index(age_months)]
+
+    def allergy_mask(self, allergies: Optional[List[Dict[str, Any]]]) -> int:
+        """Map allergy substances and categories onto the contraindication bitset."""
+
+        terms = _collect_allergy_terms(allergies)
+        mask = 0
+        if terms:
+            for token, bit in self._token_bits.items():
+                if any(token in term for term in terms):
+                    mask |= bit
+        return mask
+
+
+@lru_cache(maxsize=1)
+def get_immunization_schedule() -> ImmunizationSchedule:
+    return ImmunizationSchedule(IMMUNIZATION_SERIES_DEFINITIONS, IMMUNIZATION_RECURRENT_DEFINITIONS)
+
+
+def _condition_filters(conditions: Optional[List[Dict[str, Any]]]) -> Tuple[Set[str], Set[str]]:
+    condition_names = {cond["name"] for cond in conditions or []}
+    condition_categories = {
+        cond.get("condition_category")
+        for cond in conditions or []
+        if cond.get("condition_category")
+    }
+    return condition_names, condition_categories
+
+
+def _administer_series_dose(
+    patient: Dict[str, Any],
+    encounters: List[Dict[str, Any]],
+    compiled: CompiledImmunizationSeries,
+    dose: Dict[str, Any],
+    birthdate: Optional[date],
+    today: date,
+    age_months: int,
+    history: List[Dict[str, Any]],
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]], date]:
+    series = compiled.definition
+    administration_date = _resolve_target_date(series, dose, birthdate, today, history, age_months)
+    encounter = _select_encounter_for_date(encounters, administration_date)
+    record = _build_immunization_record(
+        patient,
+        encounter,
+        series,
+        dose,
+        administration_date,
+        compiled.series_total,
+        history,
+    )
+    history.append(record)
+    return record, encounter, administration_date
+
+
+def _titer_followup(
+    patient: Dict[str, Any],
+    compiled: CompiledImmunizationSeries,
+    record: Dict[str, Any],
+    encounter: Optional[Dict[str, Any]],
+    administration_date: date,
+    today: date,
+) -> Dict[str, Any]:
+    observation_date = min(administration_date + timedelta(days=60), today)
+    return _build_titer_observation(patient, encounter, record, compiled.definition["titer"], observation_date)
+
+
 def _generate_series_immunizations(
     patient: Dict[str, Any],
     encounters: List[Dict[str, Any]],
@@ -3661,55 +4172,77 @@ def _generate_series_immunizations(
 ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
     immunizations: List[Dict[str, Any]] = []
     followup_observations: List[Dict[str, Any]] = []
-    allergy_terms = _collect_allergy_terms(allergies)
-    condition_names = {cond["name"] for cond in conditions or []}
-    condition_categories = {
-        cond.get("condition_category")
-        for cond in conditions or []
-        if cond.get("condition_category")
-    }
-
-    for series in IMMUNIZATION_SERIES_DEFINITIONS:
-        if not _series_applicable(series, age_months, condition_categories, condition_names):
-            continue
-        if _has_contraindication(series, allergy_terms):
-            continue
+    schedule = get_immunization_schedule()
+    allergy_mask = schedule.allergy_mask(allergies)
+    condition_names, condition_categories = _condition_filters(conditions)
 
-        doses, series_total = _prepare_series_doses(series, age_months)
-        if not doses:
+    for compiled in schedule.series_for_age(age_months):
+        if not compiled.admits(allergy_mask, condition_names, condition_categories):
             continue
-
-        history = series_history.setdefault(series["series_id"], [])
-        for dose in doses:
-            if any(record["dose_number"] == dose["dose_number"] for record in history):
+        history = series_history.setdefault(compiled.definition["series_id"], [])
+        given = {record["dose_number"] for record in history}
+        for dose in compiled.doses:
+            if dose["dose_number"] in given:
                 continue
             if random.random() > dose.get("coverage", 0.9):
                 continue
 
-            administration_date = _resolve_target_date(series, dose, birthdate, today, history, age_months)
-            encounter = _select_encounter_for_date(encounters, administration_date)
-            record = _build_immunization_record(
-                patient,
-                encounter,
-                series,
-                dose,
-                administration_date,
-                series_total,
-                history,
+            record, encounter, administration_date = _administer_series_dose(
+                patient, encounters, compiled, dose, birthdate, today, age_months, history
             )
-            history.append(record)
+            given.add(dose["dose_number"])
             immunizations.append(record)
 
-            titer_config = series.get("titer")
+            titer_config = compiled.definition.get("titer")
             if titer_config and random.random() < titer_config.get("probability", 0.0):
-                observation_date = min(administration_date + timedelta(days=60), today)
                 followup_observations.append(
-                    _build_titer_observation(patient, encounter, record, titer_config, observation_date)
+                    _titer_followup(patient, compiled, record, encounter, administration_date, today)
                 )
 
     return immunizations, followup_observations
 
 
+def _recurrent_due(
+    compiled: CompiledImmunizationSeries, history: List[Dict[str, Any]], today: date
+) -> bool:
+    definition = compiled.definition
+    if history and definition.get("interval_years"):
+        last_date = _safe_parse_date(history[-1].get("date"))
+        if last_date and (today - last_date).days < definition["interval_years"] * 365:
+            return False
+    return True
+
+
+def _administer_recurrent_dose(
+    patient: Dict[str, Any],
+    encounters: List[Dict[str, Any]],
+    compiled: CompiledImmunizationSeries,
+    birthdate: Optional[date],
+    today: date,
+    history: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    definition = compiled.definition
+    administration_date = _determine_recurrent_date(definition, birthdate, today)
+    encounter = _select_encounter_for_date(encounters, administration_date)
+    dose = {
+        "dose_number": len(history) + 1,
+        "coverage": definition.get("coverage", 0.7),
+        "route": definition.get("route"),
+        "is_catch_up": False,
+    }
+    record = _build_immunization_record(
+        patient,
+        encounter,
+        definition,
+        dose,
+        administration_date,
+        1,
+        history,
+    )
+    history.append(record)
+    return record
+
+
 def _generate_recurrent_immunizations(
     patient: Dict[str, Any],
     encounters: List[Dict[str, Any]],
@@ -3721,61 +4254,23 @@ def _generate_recurrent_immunizations(
     series_history: Dict[str, List[Dict[str, Any]]],
 ) -> List[Dict[str, Any]]:
     immunizations: List[Dict[str, Any]] = []
-    allergy_terms = _collect_allergy_terms(allergies)
-    condition_categories = {
-        cond.get("condition_category")
-        for cond in conditions or []
-        if cond.get("condition_category")
-    }
+    schedule = get_immunization_schedule()
+    allergy_mask = schedule.allergy_mask(allergies)
+    condition_names, condition_categories = _condition_filters(conditions)
 
-    for definition in IMMUNIZATION_RECURRENT_DEFINITIONS:
-        if age_months < definition.get("min_age_months", 0):
-            continue
-        if definition.get("target_categories") and not definition["target_categories"].intersection(condition_categories):
+    for compiled in schedule.recurrent_for_age(age_months):
+        if not compiled.admits(allergy_mask, condition_names, condition_categories):
             continue
-        if _has_contraindication(definition, allergy_terms):
+        history = series_history.setdefault(compiled.definition["series_id"], [])
+        if not _recurrent_due(compiled, history, today):
             continue
-
-        history = series_history.setdefault(definition["series_id"], [])
-        if history and definition.get("interval_years"):
-            last_date = _safe_parse_date(history[-1].get("date"))
-            if last_date and (today - last_date).days < definition["interval_years"] * 365:
-                continue
-
-        coverage = definition.get("coverage", 0.7)
-        if random.random() > coverage:
+        if random.random() > compiled.definition.get("coverage", 0.7):
             continue
-
-        administration_date = _determine_recurrent_date(definition, birthdate, today)
-        encounter = _select_encounter_for_date(encounters, administration_date)
-        dose = {
-            "dose_number": len(history) + 1,
-            "coverage": coverage,
-            "route": definition.get("route"),
-            "is_catch_up": False,
-        }
-        record = _build_immunization_record(
-            patient,
-            encounter,
-            definition,
-            dose,
-            administration_date,
-            1,
-            history,
+        immunizations.append(
+            _administer_recurrent_dose(patient, encounters, compiled, birthdate, today, history)
         )
-        history.append(record)
-        immunizations.append(record)
 
     return immunizations
-def weighted_choice(choices):
-    total = sum(w for c, w in choices)
-    r = random.uniform(0, total)
-    upto = 0
-    for c, w in choices:
-        if upto + w >= r:
-            return c
-        upto += w
-    return choices[-1][0]
 
 # Condition prevalence by age, gender, race, SDOH
 CONDITION_PREVALENCE = {
@@ -4003,6 +4498,151 @@ def assign_precision_markers(patient: Dict[str, Any], conditions: List[Dict[str,
     patient["precision_markers"] = markers
     return markers
 
+class _DatedRecords:
+    """Records sorted by date; ``nearest`` mirrors a ``(|delta|, date)`` stable sort."""
+
+    __slots__ = ("dates", "records")
+
+    def __init__(self, pairs: List[Tuple[date, Dict[str, Any]]]) -> None:
+        pairs.sort(key=lambda item: item[0])
+        self.dates = [item[0] for item in pairs]
+        self.records = [item[1] for item in pairs]
+
+    def nearest(self, target: date) -> Optional[Tuple[date, Dict[str, Any]]]:
+        if not self.dates:
+            return None
+        position = bisect.bisect_left(self.dates, target)
+        best = position if position < len(self.dates) else None
+        if position > 0:
+            left = bisect.bisect_left(self.dates, self.dates[position - 1])
+            if best is None or (target - self.dates[left]) <= (self.dates[best] - target):
+                best = left
+        return self.dates[best], self.records[best]
+
+
+def _index_dated(records: Sequence[Dict[str, Any]], key_fn) -> Dict[str, _DatedRecords]:
+    grouped: Dict[str, List[Tuple[date, Dict[str, Any]]]] = defaultdict(list)
+    for record in records:
+        key = key_fn(record)
+        record_date = _safe_parse_date(record.get("date")) if key else None
+        if record_date is not None:
+            grouped[key].append((record_date, record))
+    return {key: _DatedRecords(pairs) for key, pairs in grouped.items()}
+
+
+def _index_lowered(records: Sequence[Dict[str, Any]], key_fn) -> Dict[str, List[Dict[str, Any]]]:
+    grouped: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for record in records:
+        key = key_fn(record)
+        if key:
+            grouped[key.lower()].append(record)
+    return grouped
+
+
+@dataclass
+class CarePlanIndex:
+    """Per-patient lookups consumed by ``generate_care_plans``, built in one pass per record type."""
+
+    timeline: EncounterTimeline
+    conditions_by_name: Dict[str, List[Dict[str, Any]]]
+    observations_by_panel: Dict[str, _DatedRecords]
+    observations_by_type: Dict[str, _DatedRecords]
+    procedures_by_name: Dict[str, _DatedRecords]
+    medications_by_name: Dict[str, List[Dict[str, Any]]]
+    medications_by_class: Dict[str, List[Dict[str, Any]]]
+    immunizations_by_name: Dict[str, List[Dict[str, Any]]]
+
+    @classmethod
+    def build(
+        cls,
+        encounters: Sequence[Dict[str, Any]],
+        conditions: Sequence[Dict[str, Any]],
+        medications: Sequence[Dict[str, Any]] = (),
+        procedures: Sequence[Dict[str, Any]] = (),
+        observations: Sequence[Dict[str, Any]] = (),
+        immunizations: Sequence[Dict[str, Any]] = (),
+    ) -> "CarePlanIndex":
+        conditions_by_name: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for condition in conditions:
+            if condition.get("name"):
+                conditions_by_name[condition["name"]].append(condition)
+        return cls(
+            timeline=EncounterTimeline.of(encounters),
+            conditions_by_name=conditions_by_name,
+            observations_by_panel=_index_dated(observations, lambda ob: ob.get("panel")),
+            observations_by_type=_index_dated(observations, lambda ob: ob.get("type") or ob.get("name")),
+            procedures_by_name=_index_dated(procedures, lambda proc: proc.get("name")),
+            medications_by_name=_index_lowered(medications, lambda med: med.get("name") or med.get("medication")),
+            medications_by_class=_index_lowered(medications, lambda med: med.get("therapeutic_class")),
+            immunizations_by_name=_index_lowered(immunizations, lambda rec: rec.get("vaccine") or rec.get("name")),
+        )
+
+
+@dataclass(frozen=True)
+class _CompiledCareStage:
+    stage: Dict[str, Any]
+    interval_days: int
+    window_days: int
+    encounter_types: Tuple[str, ...]
+    panels: Tuple[str, ...]
+    observation_types: Tuple[str, ...]
+    procedures: Tuple[str, ...]
+    medications: Tuple[str, ...]
+    therapeutic_classes: Tuple[str, ...]
+    immunizations: Tuple[str, ...]
+    care_team: FrozenSet[str]
+
+
+@lru_cache(maxsize=None)
+def _compiled_care_pathway(condition_name: str) -> Optional[Tuple[FrozenSet[str], Tuple[_CompiledCareStage, ...]]]:
+    normalized_condition_name = _normalize_condition_display(condition_name)
+    canonical_name = SPECIALTY_CARE_PATHWAY_SYNONYMS.get(normalized_condition_name)
+    pathway_template = None
+    if canonical_name:
+        pathway_template = SPECIALTY_CARE_PATHWAYS.get(canonical_name)
+    if pathway_template is None:
+        pathway_template = SPECIALTY_CARE_PATHWAYS.get(condition_name) or SPECIALTY_CARE_PATHWAYS.get(
+            normalized_condition_name
+        )
+    if not pathway_template:
+        return None
+    stages = tuple(
+        _CompiledCareStage(
+            stage=stage,
+            interval_days=int(stage.get("expected_interval_days", stage.get("offset_days", 30))),
+            window_days=stage.get("window_days", 45),
+            encounter_types=tuple(stage.get("encounter_types", [])),
+            panels=tuple(stage.get("required_panels", [])) + tuple(stage.get("required_observation_panels", [])),
+            observation_types=tuple(stage.get("required_observation_types", [])),
+            procedures=tuple(stage.get("required_procedures", [])),
+            medications=tuple(stage.get("required_medications", [])),
+            therapeutic_classes=tuple(stage.get("required_therapeutic_classes", [])),
+            immunizations=tuple(stage.get("required_immunizations", [])),
+            care_team=frozenset(stage.get("care_team", [])),
+        )
+        for stage in pathway_template.get("pathway", [])
+    )
+    return frozenset(pathway_template.get("care_team", [])), stages
+
+
+def flatten_care_plan_fields(plan: Dict[str, Any]) -> Dict[str, Any]:
+    """Render list-valued care plan fields as the strings written to the care_plans table."""
+
+    activities = plan.get("activities")
+    if isinstance(activities, list):
+        if all(isinstance(item, str) for item in activities):
+            plan["activities"] = ", ".join(activities)
+        else:
+            plan["activities"] = json.dumps(activities)
+    roles = plan.get("responsible_roles")
+    if isinstance(roles, list):
+        plan["responsible_roles"] = ", ".join(str(role) for role in roles)
+    linked = plan.get("linked_encounters")
+    if isinstance(linked, list):
+        plan["linked_encounters"] = ", ".join(str(item) for item in linked if item)
+    return plan
+
+
 def generate_care_plans(
     patient: Dict[str, Any],
     conditions: List[Dict[str, Any]],
@@ -4011,107 +4651,52 @@ def generate_care_plans(
     procedures: Optional[List[Dict[str, Any]]] = None,
     observations: Optional[List[Dict[str, Any]]] = None,
     immunizations: Optional[List[Dict[str, Any]]] = None,
+    *,
+    index: Optional[CarePlanIndex] = None,
+    export_shape: bool = False,
 ) -> List[Dict[str, Any]]:
-    """Create specialty care pathway milestones with status tracking and activities."""
+    """Create specialty care pathway milestones with status tracking and activities.
 
-    meds = list(medications) if medications is not None else list(patient.get("medications", []))
-    procs = list(procedures) if procedures is not None else list(patient.get("procedures", []))
-    obs = list(observations) if observations is not None else list(patient.get("observations", []))
-    imm = list(immunizations) if immunizations is not None else list(patient.get("immunizations", []))
+    ``index`` lets callers that already hold a :class:`CarePlanIndex` skip the
+    per-call indexing. With ``export_shape`` the list-valued fields are emitted
+    as the strings written to the care_plans table.
+    """
+
+    if index is None:
+        index = CarePlanIndex.build(
+            encounters,
+            conditions,
+            medications if medications is not None else patient.get("medications", []),
+            procedures if procedures is not None else patient.get("procedures", []),
+            observations if observations is not None else patient.get("observations", []),
+            immunizations if immunizations is not None else patient.get("immunizations", []),
+        )
 
     today = datetime.now().date()
     care_plans: List[Dict[str, Any]] = []
     status_counter: Counter[str] = Counter()
 
-    def _parse_related_conditions(value: Any) -> Set[str]:
-        if not value:
-            return set()
-        if isinstance(value, str):
-            tokens = [token.strip().strip('"').lower() for token in value.split(',') if token.strip()]
-            return set(tokens)
-        if isinstance(value, list):
-            return {str(token).strip().lower() for token in value if token}
-        return set()
-
-    def _collect_by_key(records: List[Dict[str, Any]], key: str) -> Dict[str, List[Dict[str, Any]]]:
-        lookup: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
-        for record in records:
-            value = record.get(key)
-            if value:
-                lookup[str(value).lower()].append(record)
-        return lookup
-
-    def _collect_encounters_for_condition(condition_name: str) -> List[Dict[str, Any]]:
-        name_lower = condition_name.lower()
-        matches = []
-        for encounter in encounters:
-            related = _parse_related_conditions(encounter.get("related_conditions"))
-            if not related and condition_name:
-                continue
-            if not related or name_lower in related:
-                matches.append(encounter)
-        return matches
-
-    observations_by_panel = defaultdict(list)
-    observations_by_type = defaultdict(list)
-    for ob in obs:
-        panel = ob.get("panel")
-        if panel:
-            observations_by_panel[panel].append(ob)
-        ob_type = ob.get("type") or ob.get("name")
-        if ob_type:
-            observations_by_type[ob_type].append(ob)
-
-    procedures_by_name = defaultdict(list)
-    for proc in procs:
-        name = proc.get("name")
-        if name:
-            procedures_by_name[name].append(proc)
-
-    medications_by_name = defaultdict(list)
-    medications_by_class = defaultdict(list)
-    for med in meds:
-        name = med.get("name") or med.get("medication")
-        if name:
-            medications_by_name[name.lower()].append(med)
-        therapeutic_class = (med.get("therapeutic_class") or "").lower()
-        if therapeutic_class:
-            medications_by_class[therapeutic_class].append(med)
-
-    immunizations_by_name = defaultdict(list)
-    for record in imm:
-        vaccine = record.get("vaccine") or record.get("name")
-        if vaccine:
-            immunizations_by_name[vaccine.lower()].append(record)
-
-    condition_names = {c.get("name") for c in conditions if c.get("name")}
-
-    for condition_name in sorted(condition_names):
-        normalized_condition_name = _normalize_condition_display(condition_name)
-        canonical_name = SPECIALTY_CARE_PATHWAY_SYNONYMS.get(normalized_condition_name)
-        pathway_template = None
-        if canonical_name:
-            pathway_template = SPECIALTY_CARE_PATHWAYS.get(canonical_name)
-        if pathway_template is None:
-            pathway_template = SPECIALTY_CARE_PATHWAYS.get(condition_name) or SPECIALTY_CARE_PATHWAYS.get(
-                normalized_condition_name
-            )
-        if not pathway_template:
+    for condition_name in sorted(index.conditions_by_name):
+        compiled = _compiled_care_pathway(condition_name)
+        if compiled is None:
             continue
+        default_care_team, stages = compiled
 
-        condition_records = [c for c in conditions if c.get("name") == condition_name]
-        condition_id = condition_records[0].get("condition_id") if condition_records else None
-        condition_category = condition_records[0].get("condition_category") if condition_records else None
+        condition_records = index.conditions_by_name[condition_name]
+        condition_id = condition_records[0].get("condition_id")
+        condition_category = condition_records[0].get("condition_category")
         onset_dates = [
-            _safe_parse_date(record.get("onset_date"))
-            for record in condition_records
-            if _safe_parse_date(record.get("onset_date")) is not None
+            onset
+            for onset in (_safe_parse_date(record.get("onset_date")) for record in condition_records)
+            if onset is not None
         ]
-        condition_encounters = _collect_encounters_for_condition(condition_name)
+        condition_encounters = index.timeline.for_condition(condition_name)
+        encounters_by_type = _index_dated(condition_encounters, lambda enc: enc.get("type"))
+
         encounter_dates = [
-            _safe_parse_date(encounter.get("date"))
-            for encounter in condition_encounters
-            if _safe_parse_date(encounter.get("date")) is not None
+            enc_date
+            for enc_date in (_safe_parse_date(enc.get("date")) for enc in condition_encounters)
+            if enc_date is not None
         ]
 
         if onset_dates:
@@ -4122,23 +4707,11 @@ def generate_care_plans(
             anchor_date = today - timedelta(days=30)
 
         previous_anchor = anchor_date
-        default_care_team = set(pathway_template.get("care_team", []))
-
-        # Pre-compute encounter lookups for efficiency
-        encounters_by_type = defaultdict(list)
-        for encounter in condition_encounters:
-            enc_type = encounter.get("type")
-            enc_date = _safe_parse_date(encounter.get("date"))
-            if enc_type and enc_date:
-                encounters_by_type[enc_type].append((enc_date, encounter))
-
-        for encounter_list in encounters_by_type.values():
-            encounter_list.sort(key=lambda item: item[0])
-
-        for stage in pathway_template.get("pathway", []):
-            interval_days = stage.get("expected_interval_days", stage.get("offset_days", 30))
-            scheduled_date = previous_anchor + timedelta(days=int(interval_days))
-            window_days = stage.get("window_days", 45)
+
+        for compiled_stage in stages:
+            stage = compiled_stage.stage
+            scheduled_date = previous_anchor + timedelta(days=compiled_stage.interval_days)
+            window_days = compiled_stage.window_days
             due_date = scheduled_date + timedelta(days=int(window_days))
 
             activities: List[Dict[str, Any]] = []
@@ -4169,47 +4742,40 @@ def generate_care_plans(
                     entry["actual_date"] = actual.isoformat()
                 activities.append(entry)
 
-            def _choose_encounter(encounter_types: List[str]) -> Optional[Dict[str, Any]]:
-                candidates: List[Tuple[int, Tuple[date, Dict[str, Any]]]] = []
-                for enc_type in encounter_types:
-                    for enc_date, enc in encounters_by_type.get(enc_type, []):
-                        delta = abs((enc_date - scheduled_date).days)
-                        candidates.append((delta, (enc_date, enc)))
-                if not candidates:
-                    return None
-                candidates.sort(key=lambda item: (item[0], item[1][0]))
-                return candidates[0][1]
-
             # Encounter requirement
-            encounter_types = stage.get("encounter_types", [])
-            matched_encounter: Optional[Tuple[date, Dict[str, Any]]] = None
-            if encounter_types:
+            if compiled_stage.encounter_types:
                 total_requirements += 1
-                matched_encounter = _choose_encounter(encounter_types)
+                matched_encounter: Optional[Tuple[date, Dict[str, Any]]] = None
+                best_delta: Optional[Tuple[int, date]] = None
+                for enc_type in compiled_stage.encounter_types:
+                    records = encounters_by_type.get(enc_type)
+                    candidate = records.nearest(scheduled_date) if records else None
+                    if candidate is None:
+                        continue
+                    delta = (abs((candidate[0] - scheduled_date).days), candidate[0])
+                    if best_delta is None or delta < best_delta:
+                        matched_encounter, best_delta = candidate, delta
                 encounter_completed = matched_encounter is not None and matched_encounter[0] <= today
                 if encounter_completed:
                     completed_requirements += 1
                     actual_event_dates.append(matched_encounter[0])
                 _register_activity(
                     "encounter",
-                    ", ".join(encounter_types),
+                    ", ".join(compiled_stage.encounter_types),
                     is_completed=encounter_completed,
                     reference=matched_encounter[1].get("encounter_id") if matched_encounter else None,
                     planned=scheduled_date,
                     actual=matched_encounter[0] if matched_encounter and encounter_completed else None,
                 )
 
-            def _handle_panel(panel_name: str) -> bool:
-                candidates = observations_by_panel.get(panel_name, [])
-                candidates = [
-                    ( _safe_parse_date(ob.get("date")), ob )
-                    for ob in candidates
-                    if _safe_parse_date(ob.get("date")) is not None
-                ]
-                if not candidates:
-                    return False
-                candidates.sort(key=lambda item: (abs((item[0] - scheduled_date).days), item[0]))
-                chosen_date, chosen_ob = candidates[0]
+            # Observation panels only record an activity when a result exists
+            for panel_name in compiled_stage.panels:
+                total_requirements += 1
+                records = index.observations_by_panel.get(panel_name)
+                chosen = records.nearest(scheduled_date) if records else None
+                if chosen is None:
+                    continue
+                chosen_date, chosen_ob = chosen
                 completed = chosen_date <= today
                 _register_activity(
                     "observation",
@@ -4220,142 +4786,74 @@ def generate_care_plans(
                     actual=chosen_date if completed else None,
                 )
                 if completed:
-                    actual_event_dates.append(chosen_date)
-                return completed
-
-            # Observation panels
-            for panel_name in stage.get("required_panels", []):
-                total_requirements += 1
-                if _handle_panel(panel_name):
                     completed_requirements += 1
+                    actual_event_dates.append(chosen_date)
 
-            for panel_name in stage.get("required_observation_panels", []):
-                total_requirements += 1
-                if _handle_panel(panel_name):
-                    completed_requirements += 1
-
-            # Observation types
-            for obs_type in stage.get("required_observation_types", []):
-                total_requirements += 1
-                candidates = observations_by_type.get(obs_type, [])
-                candidates = [
-                    (_safe_parse_date(item.get("date")), item)
-                    for item in candidates
-                    if _safe_parse_date(item.get("date")) is not None
-                ]
-                if candidates:
-                    candidates.sort(key=lambda item: (abs((item[0] - scheduled_date).days), item[0]))
-                    chosen_date, chosen_ob = candidates[0]
-                    completed = chosen_date <= today
-                    if completed:
-                        completed_requirements += 1
-                        actual_event_dates.append(chosen_date)
-                    _register_activity(
-                        "observation",
-                        obs_type,
-                        is_completed=completed,
-                        reference=chosen_ob.get("observation_id"),
-                        planned=scheduled_date,
-                        actual=chosen_date if completed else None,
-                    )
-                else:
-                    _register_activity("observation", obs_type, planned=scheduled_date)
-
-            # Procedures
-            for proc_name in stage.get("required_procedures", []):
-                total_requirements += 1
-                candidates = procedures_by_name.get(proc_name, [])
-                candidates = [
-                    (_safe_parse_date(item.get("date")), item)
-                    for item in candidates
-                    if _safe_parse_date(item.get("date")) is not None
-                ]
-                if candidates:
-                    candidates.sort(key=lambda item: (abs((item[0] - scheduled_date).days), item[0]))
-                    chosen_date, chosen_proc = candidates[0]
+            # Observation types and procedures
+            for activity_type, names, lookup, id_field in (
+                ("observation", compiled_stage.observation_types, index.observations_by_type, "observation_id"),
+                ("procedure", compiled_stage.procedures, index.procedures_by_name, "procedure_id"),
+            ):
+                for name in names:
+                    total_requirements += 1
+                    records = lookup.get(name)
+                    chosen = records.nearest(scheduled_date) if records else None
+                    if chosen is None:
+                        _register_activity(activity_type, name, planned=scheduled_date)
+                        continue
+                    chosen_date, chosen_record = chosen
                     completed = chosen_date <= today
                     if completed:
                         completed_requirements += 1
                         actual_event_dates.append(chosen_date)
                     _register_activity(
-                        "procedure",
-                        proc_name,
-                        display=chosen_proc.get("name", proc_name),
+                        activity_type,
+                        name,
+                        display=chosen_record.get("name", name) if activity_type == "procedure" else None,
                         is_completed=completed,
-                        reference=chosen_proc.get("procedure_id"),
+                        reference=chosen_record.get(id_field),
                         planned=scheduled_date,
                         actual=chosen_date if completed else None,
                     )
-                else:
-                    _register_activity("procedure", proc_name, planned=scheduled_date)
-
-            # Medications by name
-            for med_name in stage.get("required_medications", []):
-                total_requirements += 1
-                matches = medications_by_name.get(med_name.lower(), [])
-                if matches:
-                    med = matches[0]
-                    start_date = _safe_parse_date(med.get("start_date")) or scheduled_date
-                    completed = start_date <= today
-                    if completed:
-                        completed_requirements += 1
-                        actual_event_dates.append(start_date)
-                    _register_activity(
-                        "medication",
-                        med_name,
-                        display=med.get("name", med_name),
-                        is_completed=completed,
-                        reference=med.get("medication_id"),
-                        planned=scheduled_date,
-                        actual=start_date if completed else None,
-                    )
-                else:
-                    _register_activity("medication", med_name, planned=scheduled_date)
-
-            # Medications by therapeutic class
-            for med_class in stage.get("required_therapeutic_classes", []):
-                total_requirements += 1
-                matches = medications_by_class.get(med_class.lower(), [])
-                if matches:
-                    med = matches[0]
-                    start_date = _safe_parse_date(med.get("start_date")) or scheduled_date
-                    completed = start_date <= today
-                    if completed:
-                        completed_requirements += 1
-                        actual_event_dates.append(start_date)
-                    _register_activity(
-                        "medication_class",
-                        med_class,
-                        display=med_class,
-                        is_completed=completed,
-                        reference=med.get("medication_id"),
-                        planned=scheduled_date,
-                        actual=start_date if completed else None,
-                    )
-                else:
-                    _register_activity("medication_class", med_class, planned=scheduled_date)
 
-            # Immunizations
-            for vaccine_name in stage.get("required_immunizations", []):
-                total_requirements += 1
-                matches = immunizations_by_name.get(vaccine_name.lower(), [])
-                if matches:
+            # Medications by name or therapeutic class, then immunizations
+            for activity_type, names, lookup, date_field, id_field in (
+                ("medication", compiled_stage.medications, index.medications_by_name, "start_date", "medication_id"),
+                (
+                    "medication_class",
+                    compiled_stage.therapeutic_classes,
+                    index.medications_by_class,
+                    "start_date",
+                    "medication_id",
+                ),
+                ("immunization", compiled_stage.immunizations, index.immunizations_by_name, "date", "immunization_id"),
+            ):
+                for name in names:
+                    total_requirements += 1
+                    matches = lookup.get(name.lower())
+                    if not matches:
+                        _register_activity(activity_type, name, planned=scheduled_date)
+                        continue
                     event = matches[0]
-                    event_date = _safe_parse_date(event.get("date")) or scheduled_date
+                    event_date = _safe_parse_date(event.get(date_field)) or scheduled_date
                     completed = event_date <= today
                     if completed:
                         completed_requirements += 1
                         actual_event_dates.append(event_date)
+                    display = None
+                    if activity_type == "medication":
+                        display = event.get("name", name)
+                    elif activity_type == "medication_class":
+                        display = name
                     _register_activity(
-                        "immunization",
-                        vaccine_name,
+                        activity_type,
+                        name,
+                        display=display,
                         is_completed=completed,
-                        reference=event.get("immunization_id"),
+                        reference=event.get(id_field),
                         planned=scheduled_date,
                         actual=event_date if completed else None,
                     )
-                else:
-                    _register_activity("immunization", vaccine_name, planned=scheduled_date)
 
             progress = (
                 round(completed_requirements / total_requirements, 2)
@@ -4375,8 +4873,7 @@ def generate_care_plans(
 
             status_counter[status] += 1
 
-            care_team_members = set(default_care_team)
-            care_team_members.update(stage.get("care_team", []))
+            care_team_members = sorted(member for member in default_care_team | compiled_stage.care_team if member)
 
             metric_status = "met" if total_requirements and completed_requirements == total_requirements else "not_met"
             linked_encounters = [
@@ -4385,34 +4882,33 @@ def generate_care_plans(
                 if act["type"] == "encounter" and act.get("status") == "completed" and act.get("reference")
             ]
 
-            care_plans.append(
-                {
-                    "care_plan_id": str(uuid.uuid4()),
-                    "patient_id": patient["patient_id"],
-                    "condition": condition_name,
-                    "condition_id": condition_id,
-                    "condition_category": condition_category,
-                    "pathway_stage": stage.get("stage"),
-                    "scheduled_date": scheduled_date.isoformat(),
-                    "due_date": due_date.isoformat(),
-                    "actual_date": actual_date.isoformat() if actual_date else None,
-                    "status": status,
-                    "progress": progress,
-                    "completed_requirements": completed_requirements,
-                    "total_requirements": total_requirements,
-                    "quality_metric": stage.get("quality_metric"),
-                    "metric_status": metric_status,
-                    "priority": stage.get("priority", "routine"),
-                    "care_team": ",".join(sorted(member for member in care_team_members if member)),
-                    "responsible_roles": list(sorted(member for member in care_team_members if member)),
-                    "activities": activities,
-                    "notes": stage.get("notes", ""),
-                    "linked_encounters": linked_encounters,
-                    "planned_duration_days": window_days,
-                    "target_metric": stage.get("quality_metric", ""),
-                    "goal": stage.get("quality_metric", ""),
-                }
-            )
+            plan = {
+                "care_plan_id": str(uuid.uuid4()),
+                "patient_id": patient["patient_id"],
+                "condition": condition_name,
+                "condition_id": condition_id,
+                "condition_category": condition_category,
+                "pathway_stage": stage.get("stage"),
+                "scheduled_date": scheduled_date.isoformat(),
+                "due_date": due_date.isoformat(),
+                "actual_date": actual_date.isoformat() if actual_date else None,
+                "status": status,
+                "progress": progress,
+                "completed_requirements": completed_requirements,
+                "total_requirements": total_requirements,
+                "quality_metric": stage.get("quality_metric"),
+                "metric_status": metric_status,
+                "priority": stage.get("priority", "routine"),
+                "care_team": ",".join(care_team_members),
+                "responsible_roles": care_team_members,
+                "activities": activities,
+                "notes": stage.get("notes", ""),
+                "linked_encounters": linked_encounters,
+                "planned_duration_days": window_days,
+                "target_metric": stage.get("quality_metric", ""),
+                "goal": stage.get("quality_metric", ""),
+            }
+            care_plans.append(flatten_care_plan_fields(plan) if export_shape else plan)
 
             previous_anchor = actual_date or scheduled_date
 
@@ -4824,11 +5320,6 @@ def parse_distribution(dist_str, valid_keys, value_type="str", default_dist=None
         raise ValueError(f"Distribution must sum to 1.0, got {total}")
     return dist
 
-def sample_from_dist(dist):
-    keys = list(dist.keys())
-    weights = list(dist.values())
-    return random.choices(keys, weights=weights, k=1)[0]
-
 def generate_patient(_):
     """Generate patient using enhanced PatientRecord class"""
     birthdate = fake.date_of_birth(minimum_age=0, maximum_age=MAX_PATIENT_AGE)
@@ -5275,236 +5766,488 @@ def get_patient_contraindications(patient):
     
     return contraindications
 
+CHRONIC_MEDICATION_INDICATIONS = frozenset({"Hypertension", "Diabetes", "Heart Disease", "Depression", "Anxiety"})
+
+
+@dataclass(frozen=True)
+class MedicationTemplate:
+    """Catalog and profile fields of a medication, resolved once per medication name."""
+
+    name: str
+    rxnorm_code: Optional[str]
+    ndc_code: Optional[str]
+    therapeutic_class: str
+    route: str
+    monitoring_panels: Tuple[str, ...]
+    extras: Tuple[Tuple[str, Any], ...]
+    duration_days: Optional[int]
+
+    @classmethod
+    def build(cls, medication_name: str) -> "MedicationTemplate":
+        resolved_name, med_entry = resolve_medication_entry(medication_name)
+        profile = get_medication_profile(resolved_name)
+        if profile is None and med_entry:
+            profile = get_medication_profile(med_entry.get("display"))
+
+        therapeutic_class = med_entry.get("therapeutic_class") if med_entry else ""
+        if profile and not therapeutic_class:
+            therapeutic_class = profile.therapeutic_class
+
+        monitoring_panels: Set[str] = set(profile.monitoring_panels if profile else [])
+        monitoring_panels.update(MEDICATION_MONITORING_MAP.get(therapeutic_class, []))
+
+        duration_days = profile.duration_days if profile else None
+        extras: List[Tuple[str, Any]] = []
+        if profile and profile.default_dose is not None:
+            extras.append(("dose", profile.default_dose))
+        if profile and profile.dose_unit:
+            extras.append(("dose_unit", profile.dose_unit))
+        if profile and profile.frequency:
+            extras.append(("frequency", profile.frequency))
+        if duration_days is not None:
+            extras.append(("duration_days", duration_days))
+
+        return cls(
+            name=resolved_name,
+            rxnorm_code=med_entry.get("rxnorm_code") if med_entry else None,
+            ndc_code=med_entry.get("ndc") if med_entry else None,
+            therapeutic_class=therapeutic_class,
+            route=profile.route if profile else THERAPEUTIC_CLASS_ROUTE_MAP.get(therapeutic_class, "oral"),
+            monitoring_panels=tuple(sorted(monitoring_panels)),
+            extras=tuple(extras),
+            duration_days=duration_days,
+        )
+
+    def instantiate(
+        self,
+        patient: Dict[str, Any],
+        indication: str,
+        encounters: List[Dict[str, Any]],
+        therapy_category: str,
+    ) -> Dict[str, Any]:
+        enc = random.choice(encounters) if encounters else None
+        start_date = enc["date"] if enc else patient["birthdate"]
+        start_date_obj = datetime.strptime(start_date, "%Y-%m-%d").date() if isinstance(start_date, str) else start_date
+
+        today = datetime.now().date()
+        if start_date_obj > today:
+            start_date_obj = today
+
+        end_date: Optional[str] = None
+        if self.duration_days and self.duration_days > 0:
+            end_date = min(start_date_obj + timedelta(days=self.duration_days), today).isoformat()
+        elif indication not in CHRONIC_MEDICATION_INDICATIONS and random.random() < 0.8:
+            end_date = fake.date_between(start_date=start_date_obj, end_date=today).isoformat()
+
+        record = {
+            "medication_id": str(uuid.uuid4()),
+            "patient_id": patient["patient_id"],
+            "encounter_id": enc["encounter_id"] if enc else None,
+            "name": self.name,
+            "indication": indication,
+            "therapy_category": therapy_category,
+            "start_date": start_date_obj.isoformat(),
+            "end_date": end_date,
+            "rxnorm_code": self.rxnorm_code,
+            "ndc_code": self.ndc_code,
+            "therapeutic_class": self.therapeutic_class,
+            "route": self.route,
+            "monitoring_panels": list(self.monitoring_panels),
+            "status": "active" if not end_date else "completed",
+        }
+        record.update(self.extras)
+        return record
+
+
+@lru_cache(maxsize=None)
+def get_medication_template(medication_name: str) -> MedicationTemplate:
+    return MedicationTemplate.build(medication_name)
+
+
+@dataclass(frozen=True)
+class TreatmentCandidate:
+    name: str
+    contraindication_mask: int
+    template: MedicationTemplate
+
+
+@dataclass
+class TreatmentStep:
+    """One guideline medication category; at most one candidate is prescribed from it.
+
+    ``probability`` gates the step on a uniform draw, ``pick_first`` takes the
+    first safe candidate without a draw and ``fallback`` runs when no candidate
+    is safe. Safe candidate tuples are cached per contraindication mask, so the
+    step is mutable rather than frozen.
+    """
+
+    label: str
+    candidates: Tuple[TreatmentCandidate, ...]
+    probability: float = 1.0
+    pick_first: bool = False
+    fallback: Optional["TreatmentStep"] = None
+    _safe: Dict[int, Tuple[TreatmentCandidate, ...]] = field(default_factory=dict, compare=False, repr=False)
+
+    def safe_candidates(self, mask: int) -> Tuple[TreatmentCandidate, ...]:
+        safe = self._safe.get(mask)
+        if safe is None:
+            safe = tuple(candidate for candidate in self.candidates if not candidate.contraindication_mask & mask)
+            self._safe[mask] = safe
+        return safe
+
+    def select(self, mask: int) -> Optional[Tuple[TreatmentCandidate, str]]:
+        safe = self.safe_candidates(mask)
+        if not safe:
+            return self.fallback.select(mask) if self.fallback else None
+        return (safe[0] if self.pick_first else random.choice(safe)), self.label
+
+
+@dataclass(frozen=True)
+class TreatmentPlan:
+    guideline: str
+    steps: Tuple[TreatmentStep, ...]
+    cap: Optional[int] = None
+
+
+TREATMENT_CAP_EXEMPT_CATEGORIES = frozenset({"supportive", "emergency"})
+
+
+class TreatmentIndex:
+    """``CONDITION_MEDICATIONS`` compiled into per-guideline prescribing plans.
+
+    Every guideline medication is resolved to a :class:`MedicationTemplate` and
+    tagged with a bitmask over the contraindications in
+    ``MEDICATION_CONTRAINDICATIONS``, so picking a safe medication is a mask
+    test per candidate. Condition → guideline resolution is cached per
+    (condition name, category).
+    """
+
+    def __init__(self) -> None:
+        vocabulary = sorted({item for values in MEDICATION_CONTRAINDICATIONS.values() for item in values})
+        self.contraindication_bits: Dict[str, int] = {name: 1 << bit for bit, name in enumerate(vocabulary)}
+        self._medication_masks: Dict[str, int] = {}
+        self._guidelines: Dict[Tuple[str, str], Optional[str]] = {}
+        self.plans: Dict[str, TreatmentPlan] = {
+            key: self._compile_plan(key, guidelines) for key, guidelines in CONDITION_MEDICATIONS.items()
+        }
+
+    def contraindication_mask(self, contraindications: Iterable[str]) -> int:
+        mask = 0
+        for name in contraindications:
+            mask |= self.contraindication_bits.get(name, 0)
+        return mask
+
+    def medication_mask(self, medication_name: str) -> int:
+        mask = self._medication_masks.get(medication_name)
+        if mask is None:
+            contraindications = MEDICATION_CONTRAINDICATIONS.get(medication_name, [])
+            if not contraindications and "_" in medication_name:
+                contraindications = MEDICATION_CONTRAINDICATIONS.get(medication_name.replace("_", " "), [])
+            mask = self.contraindication_mask(contraindications)
+            self._medication_masks[medication_name] = mask
+        return mask
+
+    def guideline_for(self, condition: Dict[str, Any]) -> Optional[str]:
+        name = condition.get("name") or condition.get("condition") or ""
+        category = (condition.get("condition_category") or condition.get("category") or "").lower()
+        key = (name, category)
+        if key not in self._guidelines:
+            self._guidelines[key] = _resolve_treatment_guideline(condition)
+        return self._guidelines[key]
+
+    def plan_for(self, condition: Dict[str, Any]) -> Optional[TreatmentPlan]:
+        guideline = self.guideline_for(condition)
+        return self.plans.get(guideline) if guideline else None
+
+    def _step(self, guidelines: Dict[str, List[str]], category: str, **options: Any) -> TreatmentStep:
+        options.setdefault("label", category)
+        candidates = tuple(
+            TreatmentCandidate(name, self.medication_mask(name), get_medication_template(name))
+            for name in guidelines.get(category, [])
+        )
+        return TreatmentStep(candidates=candidates, **options)
+
+    def _compile_plan(self, key: str, guidelines: Dict[str, List[str]]) -> TreatmentPlan:
+        ordered = {
+            "Hypertension": ("first_line", "second_line", "combinations"),
+            "Heart Disease": ("statins", "antiplatelet", "ace_inhibitors"),
+            "Stroke": ("antiplatelet", "anticoagulants", "statins"),
+            "Depression": ("ssri", "snri", "atypical"),
+            "Anxiety": ("ssri", "benzodiazepines", "other"),
+        }
+        if key in ordered:
+            steps = tuple(self._step(guidelines, category) for category in ordered[key])
+            return TreatmentPlan(key, steps, cap=3 if key == "Hypertension" else None)
+        if key == "Diabetes":
+            # Metformin first unless contraindicated, in which case a second-line agent replaces it.
+            metformin = TreatmentCandidate("Metformin", self.medication_mask("Metformin"), get_medication_template("Metformin"))
+            first_line = TreatmentStep(
+                "first_line",
+                (metformin,),
+                pick_first=True,
+                fallback=self._step(guidelines, "second_line"),
+            )
+            return TreatmentPlan(
+                key,
+                (first_line, self._step(guidelines, "second_line"), self._step(guidelines, "insulin")),
+            )
+        if key in {"Flu", "COVID-19"}:
+            # Antivirals only for the ~30% presenting early enough; supportive care always.
+            return TreatmentPlan(
+                key,
+                (
+                    self._step(guidelines, "antivirals", label="antiviral", probability=0.3),
+                    self._step(guidelines, "supportive"),
+                ),
+            )
+        return TreatmentPlan(key, tuple(self._step(guidelines, category) for category in guidelines), cap=3)
+
+
+@lru_cache(maxsize=1)
+def get_treatment_index() -> TreatmentIndex:
+    return TreatmentIndex()
+
+
 def prescribe_evidence_based_medication(patient, condition, encounters, contraindications):
     """Generate clinically appropriate medication prescriptions"""
-    age = patient.get("age", 0)
-    condition_name = condition.get("name") or ""
-    guideline_key = _resolve_treatment_guideline(condition)
-    if not guideline_key:
-        return []
-    treatment_guidelines = CONDITION_MEDICATIONS.get(guideline_key, {})
-    if not treatment_guidelines:
+    index = get_treatment_index()
+    plan = index.plan_for(condition)
+    if plan is None or not plan.steps:
         return []
-    
-    medications = []
-    
-    # Select appropriate medication category based on condition
-    def _append_medication(med_name: str, category_label: str) -> None:
-        if not med_name:
-            return
-        med_record = create_medication_record(patient, condition, encounters, med_name, category_label)
-        existing = {med["name"] for med in medications}
-        if med_record["name"] in existing:
-            return
-        medications.append(med_record)
-
-    if guideline_key == "Hypertension":
-        for category_label in ("first_line", "second_line", "combinations"):
-            med_list = treatment_guidelines.get(category_label, [])
-            if not med_list:
-                continue
-            selected_med = select_safe_medication(med_list, contraindications)
-            if selected_med:
-                _append_medication(selected_med, category_label)
-            if len(medications) >= 3:
-                break
-        return medications
 
-    if guideline_key == "Heart Disease":
-        for category_label in ("statins", "antiplatelet", "ace_inhibitors"):
-            med_list = treatment_guidelines.get(category_label, [])
-            if not med_list:
-                continue
-            selected_med = select_safe_medication(med_list, contraindications)
-            if selected_med:
-                _append_medication(selected_med, category_label)
-        return medications
-
-    if guideline_key == "Stroke":
-        for category_label in ("antiplatelet", "anticoagulants", "statins"):
-            med_list = treatment_guidelines.get(category_label, [])
-            if not med_list:
-                continue
-            selected_med = select_safe_medication(med_list, contraindications)
-            if selected_med:
-                _append_medication(selected_med, category_label)
-        return medications
-    
-    if guideline_key == "Diabetes":
-        # Always start with Metformin if no contraindications
-        metformin_safe = not any(contra in contraindications for contra in MEDICATION_CONTRAINDICATIONS.get("Metformin", []))
-        if metformin_safe:
-            _append_medication("Metformin", "first_line")
-        else:
-            # Use second-line if Metformin contraindicated
-            selected_med = select_safe_medication(treatment_guidelines["second_line"], contraindications)
-            if selected_med:
-                _append_medication(selected_med, "second_line")
-        for category_label in ("second_line", "insulin"):
-            med_list = treatment_guidelines.get(category_label, [])
-            if not med_list:
-                continue
-            selected_med = select_safe_medication(med_list, contraindications)
-            if selected_med:
-                _append_medication(selected_med, category_label)
-        return medications
-    
-    if guideline_key == "Depression":
-        for category_label in ("ssri", "snri", "atypical"):
-            med_list = treatment_guidelines.get(category_label, [])
-            if not med_list:
-                continue
-            selected_med = select_safe_medication(med_list, contraindications)
-            if selected_med:
-                _append_medication(selected_med, category_label)
-        return medications
-
-    if guideline_key == "Anxiety":
-        # Start with SSRI (safer than benzodiazepines)
-        if "ssri" in treatment_guidelines:
-            selected_med = select_safe_medication(treatment_guidelines["ssri"], contraindications)
-            if selected_med:
-                _append_medication(selected_med, "ssri")
-        for category_label in ("benzodiazepines", "other"):
-            med_list = treatment_guidelines.get(category_label, [])
-            if not med_list:
-                continue
-            selected_med = select_safe_medication(med_list, contraindications)
-            if selected_med:
-                _append_medication(selected_med, category_label)
-        return medications
-    
-    if guideline_key in {"Flu", "COVID-19"}:
-        # Only prescribe antivirals if within appropriate timeframe, otherwise supportive care
-        if random.random() < 0.3:  # 30% get antivirals (early presentation)
-            if "antivirals" in treatment_guidelines:
-                selected_med = select_safe_medication(treatment_guidelines["antivirals"], contraindications)
-                if selected_med:
-                    _append_medication(selected_med, "antiviral")
-        
-        # Add supportive care
-        if "supportive" in treatment_guidelines:
-            selected_med = select_safe_medication(treatment_guidelines["supportive"], contraindications)
-            if selected_med:
-                _append_medication(selected_med, "supportive")
-        return medications
-    
-    # For other conditions, allow multiple categories (primary + supportive)
-    for category, med_list in treatment_guidelines.items():
-        if not med_list:
+    mask = index.contraindication_mask(contraindications)
+    medications = []
+    prescribed: Set[str] = set()
+    for step in plan.steps:
+        if step.probability < 1.0 and random.random() >= step.probability:
             continue
-        selected_med = select_safe_medication(med_list, contraindications)
-        if not selected_med:
+        if not step.candidates:
             continue
-        _append_medication(selected_med, category)
-        if category in {"supportive", "emergency"}:
+        selection = step.select(mask)
+        if selection is None:
             continue
-        if len(medications) >= 3:
+        candidate, label = selection
+        med_record = candidate.template.instantiate(patient, condition["name"], encounters, label)
+        if med_record["name"] not in prescribed:
+            medications.append(med_record)
+            prescribed.add(med_record["name"])
+        if plan.cap is not None and label not in TREATMENT_CAP_EXEMPT_CATEGORIES and len(medications) >= plan.cap:
             break
 
     return medications
 
 def select_safe_medication(medication_list, contraindications):
     """Select a medication that doesn't have contraindications"""
-    safe_medications = []
-
-    for med in medication_list:
-        med_contraindications = MEDICATION_CONTRAINDICATIONS.get(med, [])
-        if not med_contraindications and "_" in med:
-            med_contraindications = MEDICATION_CONTRAINDICATIONS.get(med.replace("_", " "), [])
-        is_safe = not any(contra in contraindications for contra in med_contraindications)
-        if is_safe:
-            safe_medications.append(med)
-
+    index = get_treatment_index()
+    mask = index.contraindication_mask(contraindications)
+    safe_medications = [med for med in medication_list if not index.medication_mask(med) & mask]
     return random.choice(safe_medications) if safe_medications else None
 
 def create_medication_record(patient, condition, encounters, medication_name, therapy_category):
     """Create a standardized medication record"""
-    enc = random.choice(encounters) if encounters else None
-    start_date = enc["date"] if enc else patient["birthdate"]
+    return get_medication_template(medication_name).instantiate(
+        patient, condition["name"], encounters, therapy_category
+    )
 
-    if isinstance(start_date, str):
-        start_date_obj = datetime.strptime(start_date, "%Y-%m-%d").date()
-    else:
-        start_date_obj = start_date
+@dataclass(frozen=True)
+class CompiledAllergen:
+    """Allergen profile with its severity alias table and summary prefixes resolved."""
+
+    profile: AllergenProfile
+    severity_table: AliasTable
+    summaries: Mapping[str, str]
+
+    @classmethod
+    def build(cls, profile: AllergenProfile) -> "CompiledAllergen":
+        summaries = {
+            severity["display"]: f"risk: {profile.risk_level} | severity: {severity['display'].lower()}"
+            for severity in ALLERGY_SEVERITIES
+        }
+        return cls(profile, AliasTable(ALLERGY_SEVERITIES, profile.severity_weights), MappingProxyType(summaries))
 
-    today = datetime.now().date()
-    if start_date_obj > today:
-        start_date_obj = today
-    start_date_iso = start_date_obj.isoformat()
-    
-    resolved_name, med_entry = resolve_medication_entry(medication_name)
-    profile = get_medication_profile(resolved_name)
-    if profile is None and med_entry:
-        profile = get_medication_profile(med_entry.get("display"))
-
-    therapeutic_class = med_entry.get("therapeutic_class") if med_entry else ""
-    if profile and not therapeutic_class:
-        therapeutic_class = profile.therapeutic_class
-
-    default_dose = profile.default_dose if profile else None
-    dose_unit = profile.dose_unit if profile else ""
-    route = profile.route if profile else THERAPEUTIC_CLASS_ROUTE_MAP.get(therapeutic_class, "oral")
-    frequency = profile.frequency if profile else ""
-    duration_days = profile.duration_days if profile else None
-
-    monitoring_panels: Set[str] = set(profile.monitoring_panels if profile else [])
-    monitoring_panels.update(MEDICATION_MONITORING_MAP.get(therapeutic_class, []))
-
-    end_date: Optional[str] = None
-    if duration_days and duration_days > 0:
-        end_dt = start_date_obj + timedelta(days=duration_days)
-        if end_dt > today:
-            end_dt = today
-        end_date = end_dt.isoformat()
-    else:
-        chronic_conditions = ["Hypertension", "Diabetes", "Heart Disease", "Depression", "Anxiety"]
-        if condition["name"] in chronic_conditions:
-            end_date = None
-        else:
-            if random.random() < 0.8:
-                end_date_date = fake.date_between(start_date=start_date_obj, end_date=today)
-                end_date = end_date_date.isoformat()
+    def sample_severity(self) -> Dict[str, Any]:
+        return self.severity_table.draw()
 
-    record = {
-        "medication_id": str(uuid.uuid4()),
-        "patient_id": patient["patient_id"],
-        "encounter_id": enc["encounter_id"] if enc else None,
-        "name": resolved_name,
-        "indication": condition["name"],
-        "therapy_category": therapy_category,
-        "start_date": start_date_iso,
-        "end_date": end_date,
-        "rxnorm_code": med_entry.get("rxnorm_code") if med_entry else med_entry.get("rxnorm") if med_entry else None,
-        "ndc_code": med_entry.get("ndc") if med_entry else med_entry.get("ndc_code") if med_entry else None,
-        "therapeutic_class": therapeutic_class,
-        "route": route,
-        "monitoring_panels": sorted(monitoring_panels),
-        "status": "active" if not end_date else "completed",
-    }
 
-    if default_dose is not None:
-        record["dose"] = default_dose
-    if dose_unit:
-        record["dose_unit"] = dose_unit
-    if frequency:
-        record["frequency"] = frequency
-    if duration_days is not None:
-        record["duration_days"] = duration_days
+@dataclass(frozen=True)
+class AllergyFollowupAction:
+    """A ``FOLLOWUP_ACTION_LIBRARY`` entry with catalog lookups already done.
+
+    ``fields`` holds every patient-independent column of the output record;
+    :meth:`instantiate` only adds ids, the encounter, dates and (for
+    observations) the sampled value.
+    """
+
+    key: str
+    kind: str
+    fields: Mapping[str, Any]
+    test_name: str = ""
+    lab_config: Optional[Mapping[str, Any]] = None
+
+    @property
+    def bucket(self) -> str:
+        return {"medication": "medications", "observation": "observations"}.get(self.kind, "procedures")
+
+    @classmethod
+    def build(cls, key: str) -> Optional["AllergyFollowupAction"]:
+        action = FOLLOWUP_ACTION_LIBRARY.get(key)
+        if not action:
+            return None
+        action_type = action.get("type")
+        if action_type == "medication":
+            fields = {
+                "name": action["name"],
+                "indication": action.get("indication", "allergy_management"),
+                "therapy_category": action.get("therapy_category", "supportive"),
+            }
+            return cls(key, "medication", MappingProxyType(fields))
+        if action_type == "observation":
+            test_name = action["test"]
+            test_config = LAB_TEST_CATALOG.get(test_name)
+            if not test_config:
+                return None
+            config = dict(test_config)
+            config.setdefault("name", test_name)
+            fields = {
+                "type": test_name,
+                "loinc_code": config.get("loinc", ""),
+                "units": config.get("units", ""),
+                "panel": action.get("panel", "Allergy_IgE"),
+            }
+            return cls(key, "observation", MappingProxyType(fields), test_name=test_name, lab_config=config)
+        if action_type == "procedure":
+            fields = {
+                "name": action["name"],
+                "cpt_code": action.get("cpt", ""),
+                "specialty": action.get("specialty", "Allergy_Immunology"),
+                "category": action.get("category", "diagnostic"),
+                "complexity": action.get("complexity", "moderate"),
+                "indication": "allergy_management",
+            }
+            return cls(key, "procedure", MappingProxyType(fields))
+        return None
 
-    return record
+    def instantiate(self, patient: Dict[str, Any], encounters: List[Dict[str, Any]]) -> Dict[str, Any]:
+        if self.kind == "medication":
+            # Dates follow the non-chronic "Allergy" indication; the record reports the action's own.
+            record = create_medication_record(
+                patient,
+                {"name": "Allergy"},
+                encounters,
+                self.fields["name"],
+                self.fields["therapy_category"],
+            )
+            record["indication"] = self.fields["indication"]
+            return record
+        enc = random.choice(encounters) if encounters else None
+        encounter_id = enc["encounter_id"] if enc else None
+        date_value = enc["date"] if enc else patient.get("birthdate")
+        if self.kind == "observation":
+            age = patient.get("age", 40)
+            gender = patient.get("gender", "")
+            config = self.lab_config
+            value = generate_lab_value(self.test_name, age, gender, config)
+            status = "normal"
+            if is_critical_value(value, config):
+                status = "critical"
+            elif not is_normal_value(value, config, age, gender):
+                status = "abnormal"
+            return {
+                "observation_id": str(uuid.uuid4()),
+                "patient_id": patient["patient_id"],
+                "encounter_id": encounter_id,
+                "type": self.fields["type"],
+                "loinc_code": self.fields["loinc_code"],
+                "value": str(round(float(value), 3)),
+                "value_numeric": float(value),
+                "units": self.fields["units"],
+                "reference_range": get_reference_range_string(config, age, gender),
+                "status": status,
+                "date": date_value,
+                "panel": self.fields["panel"],
+            }
+        return {
+            "procedure_id": str(uuid.uuid4()),
+            "patient_id": patient["patient_id"],
+            "encounter_id": encounter_id,
+            **self.fields,
+            "date": date_value,
+            "outcome": "completed",
+        }
 
-def _sample_allergy_severity(weights: Tuple[float, float, float]) -> Dict[str, Any]:
-    try:
-        return random.choices(ALLERGY_SEVERITIES, weights=weights, k=1)[0]
-    except Exception:
-        return random.choice(ALLERGY_SEVERITIES)
+
+@dataclass(frozen=True)
+class AllergyFollowupTemplate:
+    """Resolved follow-up actions and summary text for one (allergen, category, severity)."""
+
+    actions: Tuple[AllergyFollowupAction, ...]
+    summary: str
+
+
+class AllergyEngine:
+    """Allergen sampling tables and follow-up templates compiled from the allergen profiles.
+
+    Severity weights are stored as alias tables and follow-up plans are merged
+    and resolved once per (allergen, category, severity), so each generated
+    allergy costs a fixed number of draws and dict lookups.
+    """
+
+    def __init__(self, profiles: Sequence[AllergenProfile]) -> None:
+        self.allergens: Tuple[CompiledAllergen, ...] = tuple(CompiledAllergen.build(profile) for profile in profiles)
+        self._actions: Dict[str, Optional[AllergyFollowupAction]] = {}
+        self._templates: Dict[Tuple[str, str, str], AllergyFollowupTemplate] = {}
+
+    def sample(self) -> Optional[CompiledAllergen]:
+        return random.choice(self.allergens) if self.allergens else None
+
+    def action(self, key: str) -> Optional[AllergyFollowupAction]:
+        if key not in self._actions:
+            self._actions[key] = AllergyFollowupAction.build(key)
+        return self._actions[key]
+
+    def followup_template(self, allergy: Dict[str, Any]) -> AllergyFollowupTemplate:
+        severity = (allergy.get("severity") or "mild").lower()
+        substance_key = (allergy.get("substance") or "").lower()
+        profile = get_allergen_profile(substance_key)
+        category = (profile.category if profile else allergy.get("category") or "environment").lower()
+        key = (substance_key if profile else "", category, severity)
+        template = self._templates.get(key)
+        if template is None:
+            template = self._build_template(profile, category, severity)
+            self._templates[key] = template
+        return template
+
+    def _build_template(
+        self,
+        profile: Optional[AllergenProfile],
+        category: str,
+        severity: str,
+    ) -> AllergyFollowupTemplate:
+        action_sets: Dict[str, Set[str]] = {"medications": set(), "tests": set(), "procedures": set()}
+        _merge_followup_plan_sets(action_sets, GLOBAL_SEVERITY_FOLLOWUPS.get(severity))
+        _merge_followup_plan_sets(action_sets, CATEGORY_FOLLOWUPS.get(category, {}).get(severity))
+        if profile:
+            _merge_followup_plan_sets(action_sets, profile.followups.get(severity))
+
+        actions: List[AllergyFollowupAction] = []
+        summary_parts: List[str] = []
+        for group in ("medications", "tests", "procedures"):
+            keys = sorted(action_sets[group])
+            if keys:
+                summary_parts.append(f"{group}:" + ",".join(keys))
+            actions.extend(action for action in map(self.action, keys) if action is not None)
+        return AllergyFollowupTemplate(tuple(actions), " | ".join(summary_parts))
+
+
+@lru_cache(maxsize=1)
+def get_allergy_engine() -> AllergyEngine:
+    return AllergyEngine(ALLERGEN_PROFILE_LIST)
 
 
 def generate_allergies(patient, min_all=0, max_all=2):
     n = random.randint(min_all, max_all)
-    profile_pool = ALLERGEN_PROFILE_LIST
-    if not profile_pool or n <= 0:
+    engine = get_allergy_engine()
+    if not engine.allergens or n <= 0:
         return []
 
     allergies = []
@@ -5518,9 +6261,10 @@ def generate_allergies(patient, min_all=0, max_all=2):
             birth_dt = None
 
     for _ in range(n):
-        profile = random.choice(profile_pool)
+        allergen = engine.sample()
+        profile = allergen.profile
         reaction = random.choice(ALLERGY_REACTIONS)
-        severity_entry = _sample_allergy_severity(profile.severity_weights)
+        severity_entry = allergen.sample_severity()
 
         recorded_date = None
         if birth_dt:
@@ -5545,74 +6289,11 @@ def generate_allergies(patient, min_all=0, max_all=2):
             "risk_level": profile.risk_level,
             "registry_source": profile.source,
             "recorded_date": recorded_date,
-            "followup_summary": f"risk: {profile.risk_level} | severity: {severity_entry['display'].lower()}",
+            "followup_summary": allergen.summaries[severity_entry["display"]],
         })
 
     return allergies
 
-def _create_allergy_observation(
-    patient: Dict[str, Any],
-    encounters: List[Dict[str, Any]],
-    test_name: str,
-    panel_name: str,
-) -> Optional[Dict[str, Any]]:
-    test_config = LAB_TEST_CATALOG.get(test_name)
-    if not test_config:
-        return None
-    config = dict(test_config)
-    config.setdefault("name", test_name)
-    enc = random.choice(encounters) if encounters else None
-    date_value = enc["date"] if enc else patient.get("birthdate")
-    age = patient.get("age", 40)
-    gender = patient.get("gender", "")
-    value = generate_lab_value(test_name, age, gender, config)
-    status = "normal"
-    if is_critical_value(value, config):
-        status = "critical"
-    elif not is_normal_value(value, config, age, gender):
-        status = "abnormal"
-    return {
-        "observation_id": str(uuid.uuid4()),
-        "patient_id": patient["patient_id"],
-        "encounter_id": enc["encounter_id"] if enc else None,
-        "type": test_name,
-        "loinc_code": config.get("loinc", ""),
-        "value": str(round(float(value), 3)),
-        "value_numeric": float(value),
-        "units": config.get("units", ""),
-        "reference_range": get_reference_range_string(config, age, gender),
-        "status": status,
-        "date": date_value,
-        "panel": panel_name,
-    }
-
-
-def _create_allergy_procedure(
-    patient: Dict[str, Any],
-    encounters: List[Dict[str, Any]],
-    name: str,
-    cpt_code: str,
-    *,
-    specialty: str = "Allergy_Immunology",
-    category: str = "diagnostic",
-    complexity: str = "moderate",
-) -> Dict[str, Any]:
-    enc = random.choice(encounters) if encounters else None
-    date_value = enc["date"] if enc else patient.get("birthdate")
-    return {
-        "procedure_id": str(uuid.uuid4()),
-        "patient_id": patient["patient_id"],
-        "encounter_id": enc["encounter_id"] if enc else None,
-        "name": name,
-        "cpt_code": cpt_code,
-        "specialty": specialty,
-        "category": category,
-        "complexity": complexity,
-        "indication": "allergy_management",
-        "date": date_value,
-        "outcome": "completed",
-    }
-
 
 def _merge_followup_plan_sets(action_sets: Dict[str, Set[str]], plan: Optional[AllergyFollowupPlan]) -> None:
     if not plan:
@@ -5622,59 +6303,6 @@ def _merge_followup_plan_sets(action_sets: Dict[str, Set[str]], plan: Optional[A
     action_sets["procedures"].update(plan.procedures)
 
 
-def _apply_followup_action(
-    patient: Dict[str, Any],
-    encounters: List[Dict[str, Any]],
-    action_key: str,
-    followups: Dict[str, List[Dict[str, Any]]],
-    added: Dict[str, Set[str]],
-) -> None:
-    action = FOLLOWUP_ACTION_LIBRARY.get(action_key)
-    if not action:
-        return
-
-    action_type = action.get("type")
-    if action_type == "medication":
-        if action_key in added["medications"]:
-            return
-        medication_record = create_medication_record(
-            patient,
-            {"name": "Allergy"},
-            encounters,
-            action["name"],
-            action.get("therapy_category", "supportive"),
-        )
-        medication_record["indication"] = action.get("indication", "allergy_management")
-        followups["medications"].append(medication_record)
-        added["medications"].add(action_key)
-    elif action_type == "observation":
-        if action_key in added["observations"]:
-            return
-        observation = _create_allergy_observation(
-            patient,
-            encounters,
-            action["test"],
-            action.get("panel", "Allergy_IgE"),
-        )
-        if observation:
-            followups["observations"].append(observation)
-            added["observations"].add(action_key)
-    elif action_type == "procedure":
-        if action_key in added["procedures"]:
-            return
-        procedure = _create_allergy_procedure(
-            patient,
-            encounters,
-            action["name"],
-            action.get("cpt", ""),
-            specialty=action.get("specialty", "Allergy_Immunology"),
-            category=action.get("category", "diagnostic"),
-            complexity=action.get("complexity", "moderate"),
-        )
-        followups["procedures"].append(procedure)
-        added["procedures"].add(action_key)
-
-
 def plan_allergy_followups(
     patient: Dict[str, Any],
     encounters: List[Dict[str, Any]],
@@ -5684,49 +6312,20 @@ def plan_allergy_followups(
     if not allergies:
         return followups
 
-    added_actions = {
-        "medications": set(),
-        "procedures": set(),
-        "observations": set(),
-    }
+    engine = get_allergy_engine()
+    added_actions: Set[str] = set()
 
     for allergy in allergies:
-        severity = (allergy.get("severity") or "mild").lower()
-        substance_key = (allergy.get("substance") or "").lower()
-        profile = get_allergen_profile(substance_key)
-        category = (profile.category if profile else allergy.get("category") or "environment").lower()
-
-        action_sets = {
-            "medications": set(),
-            "tests": set(),
-            "procedures": set(),
-        }
-
-        _merge_followup_plan_sets(action_sets, GLOBAL_SEVERITY_FOLLOWUPS.get(severity))
-        category_plans = CATEGORY_FOLLOWUPS.get(category, {})
-        _merge_followup_plan_sets(action_sets, category_plans.get(severity))
-        if profile:
-            _merge_followup_plan_sets(action_sets, profile.followups.get(severity))
-
-        for medication_action in action_sets["medications"]:
-            _apply_followup_action(patient, encounters, medication_action, followups, added_actions)
-        for test_action in action_sets["tests"]:
-            _apply_followup_action(patient, encounters, test_action, followups, added_actions)
-        for procedure_action in action_sets["procedures"]:
-            _apply_followup_action(patient, encounters, procedure_action, followups, added_actions)
+        template = engine.followup_template(allergy)
+        for action in template.actions:
+            if action.key in added_actions:
+                continue
+            followups[action.bucket].append(action.instantiate(patient, encounters))
+            added_actions.add(action.key)
 
-        summary_parts: List[str] = []
-        if action_sets["medications"]:
-            summary_parts.append("medications:" + ",".join(sorted(action_sets["medications"])))
-        if action_sets["tests"]:
-            summary_parts.append("tests:" + ",".join(sorted(action_sets["tests"])))
-        if action_sets["procedures"]:
-            summary_parts.append("procedures:" + ",".join(sorted(action_sets["procedures"])))
-        if summary_parts:
+        if template.summary:
             base_summary = allergy.get("followup_summary")
-            if base_summary:
-                summary_parts.insert(0, base_summary)
-            allergy["followup_summary"] = " | ".join(summary_parts)
+            allergy["followup_summary"] = f"{base_summary} | {template.summary}" if base_summary else template.summary
 
     return followups
 
@@ -5927,6 +6526,7 @@ def generate_immunizations(
 ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
     # min_imm and max_imm retained for backward compatibility but handled implicitly
     age_months, birthdate, today = _patient_age_context(patient)
+    encounters = EncounterTimeline.of(encounters)
     series_history: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
 
     series_immunizations, followup_observations = _generate_series_immunizations(
@@ -5955,6 +6555,94 @@ def generate_immunizations(
     immunizations.sort(key=lambda record: record.get("date", ""))
     return immunizations, followup_observations
 
+def generate_immunizations_batch(
+    patients: Sequence[Dict[str, Any]],
+    encounters_by_patient: Mapping[str, List[Dict[str, Any]]],
+    allergies_by_patient: Optional[Mapping[str, List[Dict[str, Any]]]] = None,
+    conditions_by_patient: Optional[Mapping[str, List[Dict[str, Any]]]] = None,
+) -> Dict[str, Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+    """Assign immunizations to a cohort, grouping patients by schedule age band.
+
+    Coverage and titer draws for every patient in a band are taken in one
+    NumPy call per series; the result maps ``patient_id`` to the same
+    ``(immunizations, followup_observations)`` pair as ``generate_immunizations``.
+    """
+
+    schedule = get_immunization_schedule()
+    allergies_by_patient = allergies_by_patient or {}
+    conditions_by_patient = conditions_by_patient or {}
+    rng = np.random.default_rng(random.getrandbits(64))
+
+    cohorts: Dict[int, List[Tuple[Dict[str, Any], int, Optional[date], date]]] = defaultdict(list)
+    for patient in patients:
+        age_months, birthdate, today = _patient_age_context(patient)
+        cohorts[schedule.band_index(age_months)].append((patient, age_months, birthdate, today))
+
+    results: Dict[str, Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]] = {
+        patient["patient_id"]: ([], []) for patient in patients
+    }
+    timelines = {
+        patient["patient_id"]: EncounterTimeline.of(encounters_by_patient.get(patient["patient_id"]))
+        for patient in patients
+    }
+    for band, members in cohorts.items():
+        contexts = []
+        for patient, age_months, birthdate, today in members:
+            patient_id = patient["patient_id"]
+            contexts.append(
+                (
+                    schedule.allergy_mask(allergies_by_patient.get(patient_id)),
+                    _condition_filters(conditions_by_patient.get(patient_id)),
+                    defaultdict(list),
+                )
+            )
+
+        for compiled in schedule.series_by_band[band]:
+            coverage = np.array([dose.get("coverage", 0.9) for dose in compiled.doses])
+            administered = rng.random((len(members), len(compiled.doses))) <= coverage
+            titer_config = compiled.definition.get("titer")
+            titer_hits = rng.random((len(members), len(compiled.doses))) < (
+                titer_config.get("probability", 0.0) if titer_config else 0.0
+            )
+            for row, ((patient, age_months, birthdate, today), (mask, filters, history_by_series)) in enumerate(
+                zip(members, contexts)
+            ):
+                if not compiled.admits(mask, *filters):
+                    continue
+                history = history_by_series[compiled.definition["series_id"]]
+                immunizations, followups = results[patient["patient_id"]]
+                encounters = timelines[patient["patient_id"]]
+                for column, dose in enumerate(compiled.doses):
+                    if not administered[row, column]:
+                        continue
+                    record, encounter, administration_date = _administer_series_dose(
+                        patient, encounters, compiled, dose, birthdate, today, age_months, history
+                    )
+                    immunizations.append(record)
+                    if titer_hits[row, column]:
+                        followups.append(
+                            _titer_followup(patient, compiled, record, encounter, administration_date, today)
+                        )
+
+        for compiled in schedule.recurrent_by_band[band]:
+            administered = rng.random(len(members)) <= compiled.definition.get("coverage", 0.7)
+            for row, ((patient, _, birthdate, today), (mask, filters, history_by_series)) in enumerate(
+                zip(members, contexts)
+            ):
+                if not administered[row] or not compiled.admits(mask, *filters):
+                    continue
+                history = history_by_series[compiled.definition["series_id"]]
+                if not _recurrent_due(compiled, history, today):
+                    continue
+                encounters = timelines[patient["patient_id"]]
+                results[patient["patient_id"]][0].append(
+                    _administer_recurrent_dose(patient, encounters, compiled, birthdate, today, history)
+                )
+
+    for immunizations, _ in results.values():
+        immunizations.sort(key=lambda record: record.get("date", ""))
+    return results
+
 # PHASE 2: Enhanced observation generation with comprehensive lab panels
 def generate_observations(patient, encounters, conditions=None, medications=None, min_obs=1, max_obs=8):
     observations = []
@@ -6065,39 +6753,99 @@ def determine_lab_panels(patient, conditions, medications=None):
 
 def generate_lab_panel(patient, encounters, panel_name, age, gender):
     """Generate all tests in a specific lab panel"""
-    panel_data = COMPREHENSIVE_LAB_PANELS.get(panel_name, {})
-    tests = panel_data.get("tests", [])
-    observations = []
-    
-    for test in tests:
-        test_name = test["name"]
-        value = generate_lab_value(test_name, age, gender, test)
-        value_numeric = value
+    compiled = get_lab_panel_engine().compile(panel_name, age, gender)
+    if compiled is None:
+        return []
+    values = compiled.draw_scalar()
+    statuses = [compiled.interpret_scalar(idx, value) for idx, value in enumerate(values)]
+    picks = [random.randrange(len(encounters)) for _ in values] if encounters else None
+    return compiled.to_observations(patient, encounters, values, statuses, picks)
+
+
+def generate_lab_panels_batch(patients, encounters_by_patient, panel_name, rng=None):
+    """Draw one panel for a cohort of patients with a single vectorized draw.
+
+    ``encounters_by_patient`` maps ``patient_id`` to that patient's encounters.
+    Returns a mapping of ``patient_id`` to the panel observations.
+    """
+
+    engine = get_lab_panel_engine()
+    rng = rng if rng is not None else _lab_rng()
+    compiled = [
+        engine.compile(panel_name, patient.get("age", 30), patient.get("gender", ""))
+        for patient in patients
+    ]
+    if not patients or compiled[0] is None:
+        return {patient["patient_id"]: [] for patient in patients}
+    stacked = _StackedPanels(compiled)
+    values = _draw_panel_values(rng, *stacked.bounds())
+    statuses = stacked.interpret(values).tolist()
+    picks = rng.random(values.shape).tolist()
+    values = values.tolist()
+    results: Dict[str, List[Dict[str, Any]]] = {}
+    for row, (patient, panel) in enumerate(zip(patients, compiled)):
+        encounters = encounters_by_patient.get(patient["patient_id"], [])
+        count = len(encounters)
+        results[patient["patient_id"]] = panel.to_observations(
+            patient,
+            encounters,
+            values[row],
+            statuses[row],
+            [int(pick * count) for pick in picks[row]] if encounters else None,
+        )
+    return results
+
+
+def generate_observations_batch(
+    patients: Sequence[Dict[str, Any]],
+    encounters_by_patient: Mapping[str, List[Dict[str, Any]]],
+    conditions_by_patient: Optional[Mapping[str, List[Dict[str, Any]]]] = None,
+    medications_by_patient: Optional[Mapping[str, List[Dict[str, Any]]]] = None,
+    min_obs: int = 1,
+    max_obs: int = 8,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Cohort version of ``generate_observations``.
+
+    Panels are chosen per patient as before, then every patient needing a
+    panel shares one vectorized draw for it; routine observations follow the
+    per-patient path. Maps ``patient_id`` to that patient's observations.
+    """
+
+    conditions_by_patient = conditions_by_patient or {}
+    medications_by_patient = medications_by_patient or {}
+    panel_members: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    panels_by_patient: Dict[str, List[str]] = {}
+    for patient in patients:
+        patient_id = patient["patient_id"]
+        panels = determine_lab_panels(
+            patient, conditions_by_patient.get(patient_id), medications_by_patient.get(patient_id)
+        )
+        panels_by_patient[patient_id] = panels
+        for panel_name in panels:
+            panel_members[panel_name].append(patient)
+
+    rng = _lab_rng()
+    panel_results = {
+        panel_name: generate_lab_panels_batch(members, encounters_by_patient, panel_name, rng)
+        for panel_name, members in panel_members.items()
+    }
+
+    results: Dict[str, List[Dict[str, Any]]] = {}
+    for patient in patients:
+        patient_id = patient["patient_id"]
+        observations = [
+            observation
+            for panel_name in panels_by_patient[patient_id]
+            for observation in panel_results[panel_name][patient_id]
+        ]
+        observations.extend(
+            generate_routine_observations(
+                patient, encounters_by_patient.get(patient_id, []), min_obs, max_obs
+            )
+        )
+        results[patient_id] = observations
+    return results
 
-        # Select appropriate encounter
-        enc = random.choice(encounters) if encounters else None
-        date = enc["date"] if enc else patient["birthdate"]
-        
-        # Determine if value is critical
-        is_critical = is_critical_value(value, test)
-        status = "critical" if is_critical else "normal" if is_normal_value(value, test, age, gender) else "abnormal"
-        
-        observations.append({
-            "observation_id": str(uuid.uuid4()),
-            "patient_id": patient["patient_id"],
-            "encounter_id": enc["encounter_id"] if enc else None,
-            "type": test_name,
-            "loinc_code": test.get("loinc", ""),
-            "value": str(value),
-            "value_numeric": value_numeric,
-            "units": test.get("units", ""),
-            "reference_range": get_reference_range_string(test, age, gender),
-            "status": status,
-            "date": date,
-            "panel": panel_name
-        })
-    
-    return observations
 
 def generate_lab_value(test_name, age, gender, test_config):
     """Generate clinically realistic lab values"""
@@ -6167,6 +6915,237 @@ def get_reference_range_string(test_config, age, gender):
     units = test_config.get("units", "")
     return f"{normal_range[0]}-{normal_range[1]} {units}".strip()
 
+# Vectorized lab panel engine -------------------------------------------------
+
+# Mixture used by ``generate_lab_value``: 85% normal, 10% slightly abnormal and
+# 5% significantly abnormal. Components are indexed in ``_LAB_BANDS`` order.
+_LAB_BANDS = ("normal", "slight_low", "slight_high", "critical_low", "critical_high")
+_LAB_STRATUM_AGES = {"pediatric": 10, "adult": 40, "elderly": 70}
+
+
+def _lab_age_band(age: int) -> str:
+    if age >= 65:
+        return "elderly"
+    if age < 18:
+        return "pediatric"
+    return "adult"
+
+
+def _lab_rng() -> np.random.Generator:
+    # Seed from the stdlib RNG so ``random.seed`` keeps lab output reproducible.
+    return np.random.default_rng(random.getrandbits(64))
+
+
+@dataclass(frozen=True)
+class CompiledLabPanel:
+    """A lab panel resolved for one demographic stratum as parallel arrays."""
+
+    panel_name: str
+    names: Tuple[str, ...]
+    loinc_codes: Tuple[str, ...]
+    units: Tuple[str, ...]
+    reference_ranges: Tuple[str, ...]
+    normal_low: np.ndarray
+    normal_high: np.ndarray
+    critical_low: np.ndarray
+    critical_high: np.ndarray
+    band_low: np.ndarray
+    band_high: np.ndarray
+    # Per-test float bounds for single-patient draws, which use the stdlib RNG.
+    scalar_bands: Tuple[Tuple[Tuple[float, float], ...], ...]
+    scalar_limits: Tuple[Tuple[float, float, float, float], ...]
+
+    @classmethod
+    def build(cls, panel_name: str, tests: Sequence[Dict[str, Any]], age: int, gender: str) -> "CompiledLabPanel":
+        ranges = [get_adjusted_normal_range(test["name"], age, gender, test) for test in tests]
+        normal_low = np.array([float(low) for low, _ in ranges])
+        normal_high = np.array([float(high) for _, high in ranges])
+        # Falsy critical limits (None or 0) are ignored, matching ``is_critical_value``.
+        critical_low = np.array([float(test.get("critical_low") or np.nan) for test in tests])
+        critical_high = np.array([float(test.get("critical_high") or np.nan) for test in tests])
+        has_low = ~np.isnan(critical_low)
+        has_high = ~np.isnan(critical_high)
+
+        # A critical-low draw falls back to critical-high, then to normal, when
+        # the test has no such limit; resolve that once here.
+        crit_low_from = np.where(has_low, critical_low, np.where(has_high, normal_high * 1.5, normal_low))
+        crit_low_to = np.where(has_low, normal_low * 0.7, np.where(has_high, critical_high, normal_high))
+        crit_high_from = np.where(has_high, normal_high * 1.5, normal_low)
+        crit_high_to = np.where(has_high, critical_high, normal_high)
+        band_low = np.vstack([normal_low, normal_low * 0.8, normal_high, crit_low_from, crit_high_from])
+        band_high = np.vstack([normal_high, normal_low, normal_high * 1.2, crit_low_to, crit_high_to])
+        scalar_bands = tuple(
+            tuple(zip(lows, highs)) for lows, highs in zip(band_low.T.tolist(), band_high.T.tolist())
+        )
+        scalar_limits = tuple(
+            zip(normal_low.tolist(), normal_high.tolist(), critical_low.tolist(), critical_high.tolist())
+        )
+
+        reference_ranges = tuple(
+            f"{low}-{high} {test.get('units', '')}".strip() for (low, high), test in zip(ranges, tests)
+        )
+        return cls(
+            panel_name=panel_name,
+            names=tuple(test["name"] for test in tests),
+            loinc_codes=tuple(test.get("loinc", "") for test in tests),
+            units=tuple(test.get("units", "") for test in tests),
+            reference_ranges=reference_ranges,
+            normal_low=normal_low,
+            normal_high=normal_high,
+            critical_low=critical_low,
+            critical_high=critical_high,
+            band_low=band_low,
+            band_high=band_high,
+            scalar_bands=scalar_bands,
+            scalar_limits=scalar_limits,
+        )
+
+    def draw(self, rng: np.random.Generator, size: int = 1) -> np.ndarray:
+        """Return a ``(size, len(names))`` array of values for this stratum."""
+
+        band_low = np.broadcast_to(self.band_low, (size,) + self.band_low.shape)
+        band_high = np.broadcast_to(self.band_high, (size,) + self.band_high.shape)
+        return _draw_panel_values(rng, band_low, band_high)
+
+    def draw_scalar(self) -> List[float]:
+        """Draw one value per test with ``random``, following ``_draw_panel_values``."""
+
+        values = []
+        for bands in self.scalar_bands:
+            mixture = random.random()
+            side = random.random()
+            if mixture < 0.85:
+                low, high = bands[0]
+            elif mixture < 0.95:
+                low, high = bands[1 if side < 0.5 else 2]
+            else:
+                low, high = bands[3 if side < 0.5 else 4]
+            values.append(round(low + (high - low) * random.random(), 2))
+        return values
+
+    def interpret_scalar(self, index: int, value: float) -> str:
+        normal_low, normal_high, critical_low, critical_high = self.scalar_limits[index]
+        # NaN limits compare false, so missing critical limits never flag.
+        if value <= critical_low or value >= critical_high:
+            return "critical"
+        return "normal" if normal_low <= value <= normal_high else "abnormal"
+
+    def interpret(self, values: np.ndarray) -> np.ndarray:
+        """Classify values as ``critical``, ``normal`` or ``abnormal``."""
+
+        with np.errstate(invalid="ignore"):
+            critical = (values <= self.critical_low) | (values >= self.critical_high)
+        normal = (values >= self.normal_low) & (values <= self.normal_high)
+        return np.where(critical, "critical", np.where(normal, "normal", "abnormal"))
+
+    def to_observations(
+        self,
+        patient: Dict[str, Any],
+        encounters: Sequence[Dict[str, Any]],
+        values: Sequence[float],
+        statuses: Sequence[str],
+        picks: Optional[Sequence[int]],
+    ) -> List[Dict[str, Any]]:
+        """Build observation rows; ``picks`` indexes ``encounters`` per test (``None`` without encounters)."""
+
+        if picks is None:
+            picks = [None] * len(self.names)
+        observations = []
+        for idx, (value, status, pick) in enumerate(zip(values, statuses, picks)):
+            enc = encounters[pick] if pick is not None else None
+            observations.append({
+                "observation_id": str(uuid.uuid4()),
+                "patient_id": patient["patient_id"],
+                "encounter_id": enc["encounter_id"] if enc else None,
+                "type": self.names[idx],
+                "loinc_code": self.loinc_codes[idx],
+                "value": str(value),
+                "value_numeric": value,
+                "units": self.units[idx],
+                "reference_range": self.reference_ranges[idx],
+                "status": status,
+                "date": enc["date"] if enc else patient["birthdate"],
+                "panel": self.panel_name,
+            })
+        return observations
+
+
+class _StackedPanels:
+    """Per-row views of a cohort's compiled panels; each distinct stratum is stacked once."""
+
+    def __init__(self, panels: Sequence[CompiledLabPanel]) -> None:
+        distinct: Dict[int, int] = {}
+        strata: List[CompiledLabPanel] = []
+        rows = []
+        for panel in panels:
+            index = distinct.get(id(panel))
+            if index is None:
+                index = distinct[id(panel)] = len(strata)
+                strata.append(panel)
+            rows.append(index)
+        self._rows = np.array(rows, dtype=np.intp)
+        self._strata = strata
+
+    def _stack(self, attribute: str) -> np.ndarray:
+        return np.stack([getattr(panel, attribute) for panel in self._strata])[self._rows]
+
+    def bounds(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self._stack("band_low"), self._stack("band_high")
+
+    def interpret(self, values: np.ndarray) -> np.ndarray:
+        """Row-wise ``CompiledLabPanel.interpret`` for a ``(rows, tests)`` array."""
+
+        with np.errstate(invalid="ignore"):
+            critical = (values <= self._stack("critical_low")) | (values >= self._stack("critical_high"))
+        normal = (values >= self._stack("normal_low")) & (values <= self._stack("normal_high"))
+        return np.where(critical, "critical", np.where(normal, "normal", "abnormal"))
+
+
+def _draw_panel_values(rng: np.random.Generator, band_low: np.ndarray, band_high: np.ndarray) -> np.ndarray:
+    """Sample the lab mixture for bounds shaped ``(rows, bands, tests)``."""
+
+    rows, _, tests = band_low.shape
+    uniforms = rng.random((3, rows, tests))
+    mixture, side, position = uniforms
+    band = np.where(
+        mixture < 0.85,
+        0,
+        np.where(mixture < 0.95, np.where(side < 0.5, 1, 2), np.where(side < 0.5, 3, 4)),
+    )
+    low = np.take_along_axis(band_low, band[:, None, :], axis=1)[:, 0, :]
+    high = np.take_along_axis(band_high, band[:, None, :], axis=1)[:, 0, :]
+    return np.round(low + (high - low) * position, 2)
+
+
+class LabPanelEngine:
+    """Compile ``COMPREHENSIVE_LAB_PANELS`` into per-stratum arrays on first use.
+
+    Strata follow ``get_adjusted_normal_range``: the patient's gender (when a
+    test has a gender-specific range) and the pediatric/adult/elderly age band.
+    """
+
+    def __init__(self, panels: Optional[Mapping[str, Dict[str, Any]]] = None) -> None:
+        self.panels = panels if panels is not None else COMPREHENSIVE_LAB_PANELS
+        self._compiled: Dict[Tuple[str, str, str], Optional[CompiledLabPanel]] = {}
+
+    def compile(self, panel_name: str, age: int, gender: str) -> Optional[CompiledLabPanel]:
+        band = _lab_age_band(age)
+        key = (panel_name, gender or "", band)
+        if key not in self._compiled:
+            tests = self.panels.get(panel_name, {}).get("tests", [])
+            self._compiled[key] = (
+                CompiledLabPanel.build(panel_name, tests, _LAB_STRATUM_AGES[band], gender or "")
+                if tests
+                else None
+            )
+        return self._compiled[key]
+
+
+@lru_cache(maxsize=1)
+def get_lab_panel_engine() -> LabPanelEngine:
+    return LabPanelEngine()
+
+
 def generate_routine_observations(patient, encounters, min_obs, max_obs):
     """Generate basic vital signs and measurements"""
     n = random.randint(min_obs, max_obs)
@@ -6242,13 +7221,135 @@ def _baseline_mortality_probability(age: int, gender: Optional[str]) -> float:
     return min(base, 0.9)
 
 
-# PHASE 1: Clinically accurate death generation with ICD-10-CM coding
-def generate_death(patient, conditions=None, family_history=None):
-    """Generate clinically accurate death with proper ICD-10-CM coding and age stratification"""
+MORTALITY_MAX_AGE = 120
+_MORTALITY_SEXES = ("male", "female", "other")
+
 
+def _mortality_sex_index(gender: Optional[str]) -> int:
+    normalized_gender = (gender or "").lower()
+    if normalized_gender.startswith("m"):
+        return 0
+    if normalized_gender.startswith("f"):
+        return 1
+    return 2
+
+
+@dataclass(frozen=True)
+class _CauseTable:
+    causes: Tuple[Dict[str, Any], ...]
+    cumulative: Tuple[float, ...]
+
+    @classmethod
+    def build(cls, causes: Sequence[Dict[str, Any]]) -> "_CauseTable":
+        cumulative: List[float] = []
+        upto = 0.0
+        for cause in causes:
+            upto += cause["weight"]
+            cumulative.append(upto)
+        return cls(tuple(causes), tuple(cumulative))
+
+    def pick(self, draw: float) -> Dict[str, Any]:
+        """Return the cause a cumulative scan selects for ``random.uniform(0, total)`` == ``draw``."""
+
+        index = bisect.bisect_left(self.cumulative, draw)
+        return self.causes[min(index, len(self.causes) - 1)]
+
+    @property
+    def total(self) -> float:
+        return self.cumulative[-1] if self.cumulative else 0.0
+
+
+class MortalityModel:
+    """Precomputed tables behind ``generate_death``.
+
+    * ``baseline[sex, age]`` - annual baseline probability for ages
+      ``0..MORTALITY_MAX_AGE`` and sexes ``male``/``female``/``other``,
+    * ``relative_risk[i]`` - relative risk for ``condition_index`` entry ``i``
+      (index 0 is the neutral "no mortality data" slot),
+    * ``age_group[age]`` - index into ``cause_tables`` of ``DEATH_CAUSES_BY_AGE``.
+
+    ``life_table`` optionally points at a CSV with ``age,sex,probability``
+    columns (``sex`` may be ``male``, ``female``, ``other`` or ``all``); listed
+    cells replace the built-in baseline.
+    """
+
+    def __init__(self, life_table: Optional[Union[str, Path]] = None) -> None:
+        ages = np.arange(MORTALITY_MAX_AGE + 1)
+        self.baseline = np.array(
+            [[_baseline_mortality_probability(int(age), sex) for age in ages] for sex in ("m", "f", "")]
+        )
+        if life_table:
+            self._apply_life_table(Path(life_table))
+
+        self.condition_index: Dict[str, int] = {}
+        relative_risk = [1.0]
+        condition_causes: List[Optional[_CauseTable]] = [None]
+        for name, risk_data in CONDITION_MORTALITY_RISK.items():
+            self.condition_index[name] = len(relative_risk)
+            relative_risk.append(float(risk_data.get("relative_risk", 1.0)))
+            likely = risk_data.get("likely_deaths", [])
+            condition_causes.append(_CauseTable.build(likely) if likely else None)
+        self.relative_risk = np.array(relative_risk)
+        self._relative_risk_list = relative_risk
+        self.condition_causes = condition_causes
+
+        groups = list(DEATH_CAUSES_BY_AGE.items())
+        self.cause_tables = tuple(_CauseTable.build(causes) for _, causes in groups)
+        fallback = next(idx for idx, (bounds, _) in enumerate(groups) if bounds == (65, 120))
+        age_group = []
+        for age in ages:
+            match = next((idx for idx, ((low, high), _) in enumerate(groups) if low <= age <= high), fallback)
+            age_group.append(match)
+        self.age_group = np.array(age_group)
+
+    def _apply_life_table(self, path: Path) -> None:
+        with path.open("r", encoding="utf-8", newline="") as handle:
+            for row in csv.DictReader(handle):
+                age = int(row["age"])
+                if not 0 <= age <= MORTALITY_MAX_AGE:
+                    continue
+                probability = min(float(row["probability"]), 0.9)
+                sex = (row.get("sex") or "all").strip().lower()
+                rows = range(len(_MORTALITY_SEXES)) if sex in {"", "all"} else [_mortality_sex_index(sex)]
+                for sex_index in rows:
+                    self.baseline[sex_index, age] = probability
+
+    def baseline_probability(self, age: int, gender: Optional[str]) -> float:
+        return float(self.baseline[_mortality_sex_index(gender), min(max(age, 0), MORTALITY_MAX_AGE)])
+
+    def condition_indices(self, names: Sequence[Optional[str]]) -> List[int]:
+        return [self.condition_index.get(name, 0) for name in names if name]
+
+    def risk_multiplier(self, condition_indices: Sequence[int], family_history_boosts: Sequence[float]) -> float:
+        multiplier = 1.0
+        for index in condition_indices:
+            multiplier *= self._relative_risk_list[index]
+        for boost in family_history_boosts:
+            multiplier *= 1 + min(float(boost), 0.25)
+        return multiplier
+
+    def cause_table(self, age: int, cause_indices: Sequence[int]) -> _CauseTable:
+        tables = [self.condition_causes[index] for index in cause_indices if self.condition_causes[index]]
+        if not tables:
+            return self.cause_tables[self.age_group[min(max(age, 0), MORTALITY_MAX_AGE)]]
+        if len(tables) == 1:
+            return tables[0]
+        return _CauseTable.build([cause for table in tables for cause in table.causes])
+
+
+@lru_cache(maxsize=4)
+def get_mortality_model(life_table: Optional[str] = None) -> MortalityModel:
+    return MortalityModel(life_table)
+
+
+def _mortality_inputs(
+    model: MortalityModel,
+    patient: Dict[str, Any],
+    conditions: Optional[List[Dict[str, Any]]],
+    family_history: Optional[List[Dict[str, Any]]],
+) -> Tuple[float, float, List[int], List[str]]:
     age = int(patient.get("age", 0) or 0)
-    gender = patient.get("gender", "")
-    base_probability = _baseline_mortality_probability(age, gender)
+    base_probability = model.baseline_probability(age, patient.get("gender", ""))
 
     sdoh_score = patient.get("sdoh_risk_score", 0.0) or 0.0
     base_probability *= 1 + min(sdoh_score * 0.6, 0.4)
@@ -6258,57 +7359,30 @@ def generate_death(patient, conditions=None, family_history=None):
     if patient.get("alcohol_use") == "Heavy":
         base_probability *= 1.1
 
-    death_risk_multiplier = 1.0
-    likely_causes: List[Dict[str, Any]] = []
-    contributing_causes: List[str] = []
-
-    if conditions:
-        for condition in conditions:
-            name = condition.get("name") or condition.get("condition")
-            if not name:
-                continue
-            risk_data = CONDITION_MORTALITY_RISK.get(name, {})
-            death_risk_multiplier *= risk_data.get("relative_risk", 1.0)
-            likely_causes.extend(risk_data.get("likely_deaths", []))
-            contributing_causes.append(name)
-
-    if family_history:
-        for entry in family_history:
-            boost = entry.get("risk_modifier")
-            if boost:
-                death_risk_multiplier *= 1 + min(float(boost), 0.25)
-            condition_name = entry.get("condition_display") or entry.get("condition")
-            if condition_name:
-                history_risk = CONDITION_MORTALITY_RISK.get(condition_name, {})
-                likely_causes.extend(history_risk.get("likely_deaths", []))
+    contributing_causes = [
+        name for name in ((c.get("name") or c.get("condition")) for c in conditions or []) if name
+    ]
+    condition_indices = model.condition_indices(contributing_causes)
+    boosts = [entry["risk_modifier"] for entry in family_history or [] if entry.get("risk_modifier")]
+    history_indices = model.condition_indices(
+        [entry.get("condition_display") or entry.get("condition") for entry in family_history or []]
+    )
+    multiplier = model.risk_multiplier(condition_indices, boosts)
+    return base_probability, multiplier, condition_indices + history_indices, contributing_causes
 
-    death_probability = min(base_probability * death_risk_multiplier, 0.95)
-    if random.random() >= death_probability:
-        return None
 
+def _death_record(
+    patient: Dict[str, Any],
+    death_age: int,
+    primary_cause: Dict[str, Any],
+    contributing_causes: List[str],
+    death_risk_multiplier: float,
+) -> Dict[str, Any]:
     birth = datetime.strptime(patient["birthdate"], "%Y-%m-%d").date()
-    if age <= 1:
-        death_age = 1
-    else:
-        mean_death_age = max(1, age - random.randint(0, 4))
-        death_age = max(1, min(age, int(random.gauss(mean_death_age, 3))))
-
     death_date = birth + timedelta(days=death_age * 365)
     if death_date > datetime.now().date():
         death_date = datetime.now().date()
 
-    age_group = None
-    for (min_age, max_age), causes in DEATH_CAUSES_BY_AGE.items():
-        if min_age <= age <= max_age:
-            age_group = (min_age, max_age)
-            break
-    if not age_group:
-        age_group = (65, 120)
-    age_appropriate_causes = DEATH_CAUSES_BY_AGE[age_group]
-
-    cause_pool = likely_causes if likely_causes else age_appropriate_causes
-    primary_cause = weighted_choice(cause_pool)
-
     manner_of_death = "Natural"
     icd_code = primary_cause.get("icd10", "")
     if icd_code.startswith(("V", "W", "X", "Y")):
@@ -6333,16 +7407,82 @@ def generate_death(patient, conditions=None, family_history=None):
         "risk_multiplier": round(death_risk_multiplier, 3),
     }
 
-def weighted_choice(choices):
-    """Select an item from choices based on weight"""
-    total = sum(choice["weight"] for choice in choices)
-    r = random.uniform(0, total)
-    upto = 0
-    for choice in choices:
-        if upto + choice["weight"] >= r:
-            return choice
-        upto += choice["weight"]
-    return choices[-1]  # Fallback
+
+# PHASE 1: Clinically accurate death generation with ICD-10-CM coding
+def generate_death(patient, conditions=None, family_history=None, life_table=None):
+    """Generate clinically accurate death with proper ICD-10-CM coding and age stratification
+
+    ``life_table`` optionally names a CSV overriding the baseline mortality (see ``MortalityModel``).
+    """
+
+    model = get_mortality_model(str(life_table) if life_table else None)
+    age = int(patient.get("age", 0) or 0)
+    base_probability, death_risk_multiplier, cause_indices, contributing_causes = _mortality_inputs(
+        model, patient, conditions, family_history
+    )
+
+    death_probability = min(base_probability * death_risk_multiplier, 0.95)
+    if random.random() >= death_probability:
+        return None
+
+    if age <= 1:
+        death_age = 1
+    else:
+        mean_death_age = max(1, age - random.randint(0, 4))
+        death_age = max(1, min(age, int(random.gauss(mean_death_age, 3))))
+
+    cause_table = model.cause_table(age, cause_indices)
+    primary_cause = cause_table.pick(random.uniform(0, cause_table.total))
+    return _death_record(patient, death_age, primary_cause, contributing_causes, death_risk_multiplier)
+
+
+def generate_deaths_batch(
+    patients: Sequence[Dict[str, Any]],
+    conditions_by_patient: Optional[Mapping[str, List[Dict[str, Any]]]] = None,
+    family_history_by_patient: Optional[Mapping[str, List[Dict[str, Any]]]] = None,
+    life_table: Optional[Union[str, Path]] = None,
+) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Vectorized ``generate_death`` for a cohort; maps ``patient_id`` to a death record or ``None``."""
+
+    model = get_mortality_model(str(life_table) if life_table else None)
+    conditions_by_patient = conditions_by_patient or {}
+    family_history_by_patient = family_history_by_patient or {}
+    rng = np.random.default_rng(random.getrandbits(64))
+
+    inputs = [
+        _mortality_inputs(
+            model,
+            patient,
+            conditions_by_patient.get(patient.get("patient_id")),
+            family_history_by_patient.get(patient.get("patient_id")),
+        )
+        for patient in patients
+    ]
+    results: Dict[str, Optional[Dict[str, Any]]] = {patient.get("patient_id"): None for patient in patients}
+    if not patients:
+        return results
+
+    ages = np.array([int(patient.get("age", 0) or 0) for patient in patients])
+    base = np.array([item[0] for item in inputs])
+    multipliers = np.array([item[1] for item in inputs])
+    probabilities = np.minimum(base * multipliers, 0.95)
+    dies = rng.random(len(patients)) < probabilities
+
+    offsets = rng.integers(0, 5, size=len(patients))
+    mean_death_ages = np.maximum(1, ages - offsets)
+    death_ages = np.maximum(1, np.minimum(ages, rng.normal(mean_death_ages, 3).astype(int)))
+    death_ages = np.where(ages <= 1, 1, death_ages)
+    cause_draws = rng.random(len(patients))
+
+    for row in np.flatnonzero(dies):
+        patient = patients[row]
+        _, multiplier, cause_indices, contributing_causes = inputs[row]
+        cause_table = model.cause_table(int(ages[row]), cause_indices)
+        primary_cause = cause_table.pick(cause_draws[row] * cause_table.total)
+        results[patient.get("patient_id")] = _death_record(
+            patient, int(death_ages[row]), primary_cause, contributing_causes, multiplier
+        )
+    return results
 
 def generate_family_history(
     patient: Dict[str, Any],
@@ -6354,124 +7494,102 @@ def generate_family_history(
     if max_fam < min_fam:
         max_fam = min_fam
 
-    entries: List[Dict[str, Any]] = []
-    adjustments: Dict[str, float] = {}
-    patient_id = patient.get("patient_id", "")
-
     if max_fam == 0:
         patient["family_history_entries"] = []
         patient["family_history_adjustments"] = {}
         return [], {}
 
-    candidate_profiles = FAMILY_HISTORY_PROFILES.copy()
-    random.shuffle(candidate_profiles)
-
-    def _record_entry(
-        profile: Dict[str, Any],
-        relation: str,
-        source: str,
-        extra_fields: Optional[Dict[str, Any]] = None,
-    ) -> Optional[Dict[str, Any]]:
-        normalized_condition, catalog_entry = _resolve_condition_catalog_entry(profile.get("condition", ""))
-        relation_code = RELATION_ROLE_CODES.get(relation, "")
-        relation_factor = FAMILY_RELATIONSHIP_FACTORS.get(relation, 0.85)
-        risk_modifier = float(profile.get("risk_boost", 0.05) or 0.05) * relation_factor
-        onset_age = _sample_family_history_onset(profile)
-
-        entry = _build_family_history_entry(
-            patient,
-            profile,
-            relation,
-            relation_code,
-            onset_age,
-            risk_modifier,
-            normalized_condition,
-            catalog_entry,
-            source=source,
-        )
-
-        if extra_fields:
-            entry.update(extra_fields)
+    tables = get_family_history_tables()
+    probabilities = tables.probabilities(patient).tolist()
+    accumulator = _FamilyHistoryAccumulator(patient, tables)
 
-        if any(existing.get("condition_code") == entry.get("condition_code") and existing.get("relation") == relation for existing in entries):
-            return None
+    order = list(range(len(tables.profiles)))
+    random.shuffle(order)
 
-        entries.append(entry)
-        existing_boost = adjustments.get(normalized_condition, 0.0)
-        adjustments[normalized_condition] = round(min(existing_boost + risk_modifier, 0.3), 4)
-        return entry
-
-    for profile in candidate_profiles:
-        if len(entries) >= max_fam:
+    for index in order:
+        if len(accumulator.entries) >= max_fam:
             break
-        probability = _family_history_probability(profile, patient)
-        if random.random() > probability:
+        if random.random() > probabilities[index]:
             continue
-        relation = _choose_family_relation(profile.get("relations", {}))
+        compiled = tables.profiles[index]
+        relation = compiled.relations.draw()
         if not relation:
             continue
-        created = _record_entry(profile, relation, source="profile")
-        if created and len(entries) < max_fam and random.random() < 0.25:
-            alt_relations = {rel: weight for rel, weight in profile.get("relations", {}).items() if rel != relation}
-            alt_relation = _choose_family_relation(alt_relations) if alt_relations else None
+        created = accumulator.record(compiled, relation, "profile", _sample_family_history_onset(compiled.profile))
+        if created and len(accumulator.entries) < max_fam and random.random() < 0.25:
+            alternates = compiled.alternates.get(relation)
+            alt_relation = alternates.draw() if alternates else None
             if alt_relation:
-                _record_entry(profile, alt_relation, source="profile")
+                accumulator.record(compiled, alt_relation, "profile", _sample_family_history_onset(compiled.profile))
 
-    if len(entries) < min_fam:
-        profiles_by_weight = sorted(
-            candidate_profiles,
-            key=lambda p: _family_history_probability(p, patient),
-            reverse=True,
-        )
-        for profile in profiles_by_weight:
-            if len(entries) >= min_fam:
-                break
-            if any(_normalize_condition_display(e.get("condition_display", "")) == _normalize_condition_display(profile.get("condition", "")) for e in entries):
-                continue
-            relation = _choose_family_relation(profile.get("relations", {})) or "Mother"
-            _record_entry(profile, relation, source="forced")
+    if len(accumulator.entries) < min_fam:
+        accumulator.add_forced(order, probabilities, min_fam)
+    accumulator.add_genetic_markers(max_fam)
+    return accumulator.finish()
 
-    genetic_markers = patient.get("genetic_markers", [])
-    for marker in genetic_markers:
-        if len(entries) >= max_fam:
-            break
-        marker_name = marker.get("name") if isinstance(marker, dict) else str(marker)
-        marker_config = GENETIC_RISK_FACTORS.get(marker_name, {})
-        family_conditions = marker_config.get("family_history_conditions", [])
-        if not family_conditions:
-            continue
-        for condition in family_conditions:
-            if len(entries) >= max_fam:
+
+def generate_family_history_batch(
+    patients: Sequence[Dict[str, Any]],
+    min_fam: int = 0,
+    max_fam: int = 4,
+) -> Dict[str, Tuple[List[Dict[str, Any]], Dict[str, float]]]:
+    """Sample family history for a cohort with array draws over the compiled profile tables.
+
+    Profile order, inclusion, relation, second-relative and onset draws are
+    taken for the whole cohort at once; forced entries (``min_fam``) and
+    genetic-marker entries follow the per-patient path.
+    """
+
+    max_fam = max(max_fam, min_fam)
+    results: Dict[str, Tuple[List[Dict[str, Any]], Dict[str, float]]] = {}
+    if not patients:
+        return results
+    if max_fam == 0:
+        for patient in patients:
+            patient["family_history_entries"] = []
+            patient["family_history_adjustments"] = {}
+            results[patient.get("patient_id", "")] = ([], {})
+        return results
+
+    tables = get_family_history_tables()
+    rng = np.random.default_rng(random.getrandbits(64))
+    shape = (len(patients), len(tables.profiles))
+    probabilities = np.vstack([tables.probabilities(patient) for patient in patients])
+    orders = np.argsort(rng.random(shape), axis=1)
+    included = rng.random(shape) <= probabilities
+    relation_draws = rng.random(shape)
+    second_relative = rng.random(shape) < 0.25
+    alternate_draws = rng.random(shape)
+    onset_noise = rng.standard_normal(shape + (2,))
+
+    for row, patient in enumerate(patients):
+        accumulator = _FamilyHistoryAccumulator(patient, tables)
+        for index in orders[row].tolist():
+            if len(accumulator.entries) >= max_fam:
                 break
-            normalized_condition, catalog_entry = _resolve_condition_catalog_entry(condition)
-            if any(_normalize_condition_display(entry.get("condition_display", "")) == normalized_condition for entry in entries):
+            if not included[row, index]:
                 continue
-            relation = random.choice(["Mother", "Father", "Sibling"])
-            relation_code = RELATION_ROLE_CODES.get(relation, "")
-            relation_factor = FAMILY_RELATIONSHIP_FACTORS.get(relation, 0.85)
-            risk_modifier = 0.1 * relation_factor
-            profile_stub = {
-                "condition": condition,
-                "category": catalog_entry.get("category") if catalog_entry else None,
-                "risk_boost": risk_modifier,
-                "notes": f"Genetic risk marker {marker_name}",
-            }
-            entry = _build_family_history_entry(
-                patient,
-                profile_stub,
-                relation,
-                relation_code,
-                _sample_family_history_onset({"onset_mean": patient.get("age", 40), "onset_sd": 6}),
-                risk_modifier,
-                normalized_condition,
-                catalog_entry,
-                source="genetic_marker",
-            )
-            entry["genetic_marker"] = marker_name
-            entries.append(entry)
-            existing_boost = adjustments.get(normalized_condition, 0.0)
-            adjustments[normalized_condition] = round(min(existing_boost + risk_modifier, 0.3), 4)
-
-    patient["family_history_entries"] = entries
-    patient["family_history_adjustments"] = adjustments
-    return entries, adjustments
+            compiled = tables.profiles[index]
+            relation = compiled.relations.draw(relation_draws[row, index])
+            if not relation:
+                continue
+            onset_mean = compiled.profile.get("onset_mean")
+            onset_sd = float(compiled.profile.get("onset_sd") or 6)
+
+            def _onset(slot: int) -> Optional[int]:
+                if onset_mean is None:
+                    return None
+                return int(round(max(0.0, float(onset_mean) + onset_sd * onset_noise[row, index, slot])))
+
+            created = accumulator.record(compiled, relation, "profile", _onset(0))
+            if created and len(accumulator.entries) < max_fam and second_relative[row, index]:
+                alternates = compiled.alternates.get(relation)
+                alt_relation = alternates.draw(alternate_draws[row, index]) if alternates else None
+                if alt_relation:
+                    accumulator.record(compiled, alt_relation, "profile", _onset(1))
+
+        if len(accumulator.entries) < min_fam:
+            accumulator.add_forced(orders[row].tolist(), probabilities[row].tolist(), min_fam)
+        accumulator.add_genetic_markers(max_fam)
+        results[patient.get("patient_id", "")] = accumulator.finish()
+    return results
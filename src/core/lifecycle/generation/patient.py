@@ -16,7 +16,7 @@ from ..constants import (
     MAX_PATIENT_AGE,
 )
 from ..models import Patient as LifecyclePatient
-from .clinical import sample_from_dist
+from .sampling import sample_from_dist
 
 fake = Faker()
 
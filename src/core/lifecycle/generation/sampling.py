@@ -0,0 +1,112 @@
+"""Weighted sampling helpers shared by the lifecycle generators.
+
+Weighted draws use Walker alias tables: building a table is O(n) and every
+draw afterwards costs one uniform variate, one comparison and two lookups, no
+matter how many outcomes the distribution has. Tables are immutable, so they
+can be built once next to the distribution they describe and reused for every
+patient. One-off draws from throwaway weight lists use ``random.choices``
+instead, since building a table would cost more than the single draw.
+
+Draws take an ``rng`` with a ``random()`` method. It defaults to the stdlib
+``random`` module, so ``random.seed`` (and ``--seed``) keep runs reproducible;
+pass a ``random.Random`` instance to bind draws to a dedicated generator.
+"""
+from __future__ import annotations
+
+import random
+from functools import lru_cache
+from typing import Any, Generic, Hashable, Mapping, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class AliasTable(Generic[T]):
+    """Walker alias table over ``items`` with non-negative ``weights``."""
+
+    __slots__ = ("items", "total", "_size", "_probability", "_alias")
+
+    def __init__(self, items: Sequence[T], weights: Sequence[float]) -> None:
+        if len(items) != len(weights):
+            raise ValueError("AliasTable needs one weight per item")
+        cleaned = [max(float(weight), 0.0) for weight in weights]
+        total = sum(cleaned)
+        if not items or total <= 0:
+            raise ValueError("AliasTable needs at least one item with a positive weight")
+
+        size = len(items)
+        scaled = [weight * size / total for weight in cleaned]
+        probability = [1.0] * size
+        alias = list(range(size))
+        small = [index for index, value in enumerate(scaled) if value < 1.0]
+        large = [index for index, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            lesser = small.pop()
+            greater = large.pop()
+            probability[lesser] = scaled[lesser]
+            alias[lesser] = greater
+            scaled[greater] += scaled[lesser] - 1.0
+            (small if scaled[greater] < 1.0 else large).append(greater)
+        # Whatever is left over is 1.0 up to rounding error.
+        for index in small + large:
+            probability[index] = 1.0
+
+        self.items: Tuple[T, ...] = tuple(items)
+        self.total = total
+        self._size = size
+        self._probability = tuple(probability)
+        self._alias = tuple(alias)
+
+    @classmethod
+    def from_mapping(cls, weights: Mapping[T, float]) -> "AliasTable[T]":
+        return cls(list(weights), list(weights.values()))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def draw_index(self, rng: Any = None) -> int:
+        scaled = (rng or random).random() * self._size
+        index = min(int(scaled), self._size - 1)
+        # The fractional part is itself uniform on [0, 1) and independent of ``index``.
+        return index if scaled - index < self._probability[index] else self._alias[index]
+
+    def draw(self, rng: Any = None) -> T:
+        return self.items[self.draw_index(rng)]
+
+
+@lru_cache(maxsize=512)
+def _cached_table(pairs: Tuple[Tuple[Hashable, float], ...]) -> AliasTable:
+    return AliasTable([item for item, _ in pairs], [weight for _, weight in pairs])
+
+
+def alias_table(weights: Mapping[T, float]) -> AliasTable[T]:
+    """Return a (cached) alias table for a ``{item: weight}`` mapping.
+
+    Tables are cached on the mapping's contents, so configuration dictionaries
+    that are passed in for every patient only pay for table construction once.
+    """
+
+    pairs = tuple(weights.items())
+    try:
+        return _cached_table(pairs)
+    except TypeError:  # unhashable items or weights
+        return AliasTable([item for item, _ in pairs], [weight for _, weight in pairs])
+
+
+def sample_from_dist(dist: Mapping[T, float], rng: Any = None) -> T:
+    """Draw one key of ``dist`` with probability proportional to its value."""
+
+    return alias_table(dist).draw(rng)
+
+
+def weighted_choice(choices: Sequence[Any], rng: Any = None) -> Any:
+    """Pick from ``(item, weight)`` pairs, or from mappings carrying a ``"weight"`` key.
+
+    Meant for one-off lists; distributions drawn from repeatedly should build an
+    :class:`AliasTable` (or go through :func:`sample_from_dist`) once instead.
+    """
+
+    if choices and isinstance(choices[0], Mapping):
+        items, weights = list(choices), [choice["weight"] for choice in choices]
+    else:
+        items, weights = [item for item, _ in choices], [weight for _, weight in choices]
+    return (rng or random).choices(items, weights)[0]
@@ -8,15 +8,7 @@ from typing import Any, Dict, Optional
 import yaml
 
 from .scenarios import get_scenario
-from ..terminology import (
-    filter_by_code,
-    load_icd10_conditions,
-    load_loinc_labs,
-    load_rxnorm_medications,
-    load_snomed_conditions,
-    load_umls_concepts,
-    load_vsac_value_sets,
-)
+from ..terminology import TerminologyService
 
 DEPRECATED_SCENARIO_KEYS = {
     "simulate_migration",
@@ -53,41 +45,26 @@ def _attach_terminology_payload(scenario: Dict[str, object]) -> Dict[str, object
     root_override = scenario.get("terminology_root")
     payload: Dict[str, object] = {}
 
-    icd_codes = terminology.get("icd10_codes")
-    if icd_codes:
-        payload["icd10"] = filter_by_code(load_icd10_conditions(root_override), icd_codes)
-
-    snomed_ids = terminology.get("snomed_ids")
-    if snomed_ids:
-        payload["snomed"] = filter_by_code(load_snomed_conditions(root_override), snomed_ids)
-
-    loinc_codes = terminology.get("loinc_codes")
-    if loinc_codes:
-        payload["loinc"] = filter_by_code(load_loinc_labs(root_override), loinc_codes)
-
-    rxnorm_cuis = terminology.get("rxnorm_cuis")
-    if rxnorm_cuis:
-        payload["rxnorm"] = filter_by_code(load_rxnorm_medications(root_override), rxnorm_cuis)
-
-    value_set_oids = terminology.get("value_set_oids")
-    if value_set_oids:
-        members = load_vsac_value_sets(root_override)
-        if members:
-            grouped = {}
-            wanted = set(value_set_oids)
-            for member in members:
-                if member.value_set_oid not in wanted:
-                    continue
-                grouped.setdefault(member.value_set_oid, []).append(member)
+    with TerminologyService(root_override) as service:
+        for system, key in (
+            ("icd10", "icd10_codes"),
+            ("snomed", "snomed_ids"),
+            ("loinc", "loinc_codes"),
+            ("rxnorm", "rxnorm_cuis"),
+        ):
+            codes = terminology.get(key)
+            if codes:
+                payload[system] = list(service.get_many(system, codes).values())
+
+        value_set_oids = terminology.get("value_set_oids")
+        if value_set_oids:
+            grouped = service.value_set_members(value_set_oids)
             if grouped:
                 payload["vsac"] = grouped
 
-    umls_cuis = terminology.get("umls_cuis")
-    if umls_cuis:
-        concepts = load_umls_concepts(root_override)
-        if concepts:
-            lookup = {concept.cui: concept for concept in concepts if concept.cui}
-            selected = [lookup[cui] for cui in umls_cuis if cui in lookup]
+        umls_cuis = terminology.get("umls_cuis")
+        if umls_cuis:
+            selected = list(service.concepts(umls_cuis).values())
             if selected:
                 payload["umls"] = selected
 
@@ -3,17 +3,35 @@
 These dataclasses provide a structured representation of the clinical artifacts
 produced by the generator so the legacy dictionary layouts can be
 progressively retired.
+
+The record classes are slotted and keep their code, system and status strings
+interned, so a large in-memory cohort does not pay for one ``__dict__`` and one
+copy of every repeated code per record. ``metadata`` dictionaries are only
+allocated when a record has extra source fields or somebody writes to them, and
+observations can optionally be held column-wise in :class:`ObservationColumns`.
 """
 from __future__ import annotations
 
-from dataclasses import asdict, dataclass, field
+import sys
+from dataclasses import dataclass, field, fields, is_dataclass
 from datetime import date, datetime
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Mapping, Optional, Sequence, Union, overload
+
+from .records import CARE_PLAN_SUMMARY_FIELDS, PatientRecord, patient_export_row
 
 
+# Generated records repeat the same handful of ISO dates across encounters,
+# conditions and medications, so parsed values are memoized.
+@lru_cache(maxsize=65536)
 def _parse_date(value: Optional[str]) -> Optional[date]:
     if not value:
         return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        pass
     try:
         return datetime.strptime(value, "%Y-%m-%d").date()
     except ValueError:
@@ -23,6 +41,7 @@ def _parse_date(value: Optional[str]) -> Optional[date]:
             return None
 
 
+@lru_cache(maxsize=65536)
 def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
     if not value:
         return None
@@ -35,14 +54,96 @@ def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
             return None
 
 
-@dataclass
+_NO_DATES: Mapping[str, date] = MappingProxyType({})
+
+
+def _known_date(value: Optional[str], dates: Mapping[str, date]) -> Optional[date]:
+    """Return the typed date for ``value`` from ``dates`` (dates generation already holds), parsing otherwise."""
+
+    typed = dates.get(value) if value else None
+    return typed if typed is not None else _parse_date(value)
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+
+def _extra_fields(data: Dict[str, Any], known: FrozenSet[str]) -> Optional[Dict[str, Any]]:
+    """Collect source fields without a dedicated attribute; ``None`` when there are none.
+
+    Code-like values (``*_code``, ``*_system``) repeat across the cohort and are interned.
+    """
+
+    extra = {
+        key: _intern(value) if key.endswith(("_code", "_system")) else value
+        for key, value in data.items()
+        if key not in known
+    }
+    return extra or None
+
+
+@lru_cache(maxsize=None)
+def _field_names(cls: type) -> tuple:
+    return tuple(item.name for item in fields(cls))
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, date):
+        return value.isoformat()
+    if is_dataclass(value):
+        return _record_payload(value)
+    if isinstance(value, (list, tuple, ObservationColumns)):
+        return [_json_value(item) for item in value]
+    return value
+
+
+def _record_payload(record: Any) -> Dict[str, Any]:
+    """JSON-ready field values of a record: dates as ISO strings, nested records expanded.
+
+    Dictionaries are shared with the record rather than copied, and an unset
+    lazy ``metadata`` slot is emitted as ``{}`` without allocating one on the record.
+    """
+
+    cls = type(record)
+    slot = getattr(cls, "_metadata_slot", None)
+    payload: Dict[str, Any] = {}
+    for name in _field_names(cls):
+        if name == "metadata" and slot is not None:
+            payload[name] = slot.__get__(record, cls) or {}
+        else:
+            payload[name] = _json_value(getattr(record, name))
+    return payload
+
+
+def _lazy_metadata(cls):
+    """Back ``metadata`` by its slot but only allocate the dictionary on first access."""
+
+    slot = cls.__dict__["metadata"]
+
+    def _get(self) -> Dict[str, Any]:
+        value = slot.__get__(self, cls)
+        if value is None:
+            value = {}
+            slot.__set__(self, value)
+        return value
+
+    cls._metadata_slot = slot
+    cls.metadata = property(_get, slot.__set__)
+    return cls
+
+
+@dataclass(slots=True)
 class ClinicalCode:
     system: str
     code: str
     display: str = ""
 
 
-@dataclass
+_ENCOUNTER_FIELDS = frozenset({"encounter_id", "patient_id", "date", "type", "reason", "provider", "location"})
+
+
+@_lazy_metadata
+@dataclass(slots=True)
 class Encounter:
     encounter_id: str
     patient_id: str
@@ -51,28 +152,39 @@ class Encounter:
     start_date: Optional[date]
     provider: Optional[str] = None
     location: Optional[str] = None
-    metadata: Dict[str, Any] = field(default_factory=dict)
+    metadata: Dict[str, Any] = None  # allocated on first access
 
     @classmethod
-    def from_legacy(cls, data: Dict[str, Any]) -> "Encounter":
-        metadata = {
-            key: value
-            for key, value in data.items()
-            if key not in {"encounter_id", "patient_id", "date", "type", "reason", "provider", "location"}
-        }
+    def from_legacy(cls, data: Dict[str, Any], dates: Mapping[str, date] = _NO_DATES) -> "Encounter":
         return cls(
             encounter_id=data.get("encounter_id", ""),
             patient_id=data.get("patient_id", ""),
-            encounter_type=data.get("type", ""),
-            reason=data.get("reason", ""),
-            start_date=_parse_date(data.get("date")),
-            provider=data.get("provider"),
-            location=data.get("location"),
-            metadata=metadata,
+            encounter_type=_intern(data.get("type", "")),
+            reason=_intern(data.get("reason", "")),
+            start_date=_known_date(data.get("date"), dates),
+            provider=_intern(data.get("provider")),
+            location=_intern(data.get("location")),
+            metadata=_extra_fields(data, _ENCOUNTER_FIELDS),
         )
 
 
-@dataclass
+_CONDITION_FIELDS = frozenset(
+    {
+        "condition_id",
+        "patient_id",
+        "encounter_id",
+        "name",
+        "status",
+        "onset_date",
+        "icd10_code",
+        "snomed_code",
+        "condition_category",
+    }
+)
+
+
+@_lazy_metadata
+@dataclass(slots=True)
 class Condition:
     condition_id: str
     patient_id: str
@@ -82,40 +194,41 @@ class Condition:
     icd10_code: Optional[str] = None
     snomed_code: Optional[str] = None
     category: Optional[str] = None
-    metadata: Dict[str, Any] = field(default_factory=dict)
+    metadata: Dict[str, Any] = None  # allocated on first access
 
     @classmethod
-    def from_legacy(cls, data: Dict[str, Any]) -> "Condition":
-        metadata = {
-            key: value
-            for key, value in data.items()
-            if key
-            not in {
-                "condition_id",
-                "patient_id",
-                "encounter_id",
-                "name",
-                "status",
-                "onset_date",
-                "icd10_code",
-                "snomed_code",
-                "condition_category",
-            }
-        }
+    def from_legacy(cls, data: Dict[str, Any], dates: Mapping[str, date] = _NO_DATES) -> "Condition":
         return cls(
             condition_id=data.get("condition_id", ""),
             patient_id=data.get("patient_id", ""),
-            name=data.get("name", ""),
-            clinical_status=data.get("status", "unknown"),
-            onset_date=_parse_date(data.get("onset_date")),
-            icd10_code=data.get("icd10_code"),
-            snomed_code=data.get("snomed_code"),
-            category=data.get("condition_category"),
-            metadata=metadata,
+            name=_intern(data.get("name", "")),
+            clinical_status=_intern(data.get("status", "unknown")),
+            onset_date=_known_date(data.get("onset_date"), dates),
+            icd10_code=_intern(data.get("icd10_code")),
+            snomed_code=_intern(data.get("snomed_code")),
+            category=_intern(data.get("condition_category")),
+            metadata=_extra_fields(data, _CONDITION_FIELDS),
         )
 
 
-@dataclass
+_MEDICATION_FIELDS = frozenset(
+    {
+        "medication_id",
+        "patient_id",
+        "name",
+        "start_date",
+        "end_date",
+        "rxnorm_code",
+        "ndc_code",
+        "therapeutic_class",
+        "indication",
+        "therapy_category",
+    }
+)
+
+
+@_lazy_metadata
+@dataclass(slots=True)
 class MedicationOrder:
     medication_id: str
     patient_id: str
@@ -127,43 +240,44 @@ class MedicationOrder:
     therapeutic_class: Optional[str]
     indication: Optional[str] = None
     therapy_category: Optional[str] = None
-    metadata: Dict[str, Any] = field(default_factory=dict)
+    metadata: Dict[str, Any] = None  # allocated on first access
 
     @classmethod
-    def from_legacy(cls, data: Dict[str, Any]) -> "MedicationOrder":
-        metadata = {
-            key: value
-            for key, value in data.items()
-            if key
-            not in {
-                "medication_id",
-                "patient_id",
-                "name",
-                "start_date",
-                "end_date",
-                "rxnorm_code",
-                "ndc_code",
-                "therapeutic_class",
-                "indication",
-                "therapy_category",
-            }
-        }
+    def from_legacy(cls, data: Dict[str, Any], dates: Mapping[str, date] = _NO_DATES) -> "MedicationOrder":
         return cls(
             medication_id=data.get("medication_id", ""),
             patient_id=data.get("patient_id", ""),
-            name=data.get("name", ""),
-            start_date=_parse_date(data.get("start_date")),
-            end_date=_parse_date(data.get("end_date")),
-            rxnorm_code=data.get("rxnorm_code"),
-            ndc_code=data.get("ndc_code"),
-            therapeutic_class=data.get("therapeutic_class"),
-            indication=data.get("indication"),
-            therapy_category=data.get("therapy_category"),
-            metadata=metadata,
+            name=_intern(data.get("name", "")),
+            start_date=_known_date(data.get("start_date"), dates),
+            end_date=_known_date(data.get("end_date"), dates),
+            rxnorm_code=_intern(data.get("rxnorm_code")),
+            ndc_code=_intern(data.get("ndc_code")),
+            therapeutic_class=_intern(data.get("therapeutic_class")),
+            indication=_intern(data.get("indication")),
+            therapy_category=_intern(data.get("therapy_category")),
+            metadata=_extra_fields(data, _MEDICATION_FIELDS),
         )
 
 
-@dataclass
+_OBSERVATION_FIELDS = frozenset(
+    {
+        "observation_id",
+        "patient_id",
+        "encounter_id",
+        "type",
+        "value",
+        "unit",
+        "status",
+        "status_category",
+        "observation_date",
+        "interpretation",
+        "reference_range",
+    }
+)
+
+
+@_lazy_metadata
+@dataclass(slots=True)
 class Observation:
     observation_id: str
     patient_id: str
@@ -175,49 +289,159 @@ class Observation:
     encounter_id: Optional[str] = None
     interpretation: Optional[str] = None
     reference_range: Optional[Dict[str, Any]] = None
-    metadata: Dict[str, Any] = field(default_factory=dict)
+    metadata: Dict[str, Any] = None  # allocated on first access
 
     @classmethod
     def from_legacy(cls, data: Dict[str, Any]) -> "Observation":
-        metadata = {
-            key: value
-            for key, value in data.items()
-            if key
-            not in {
-                "observation_id",
-                "patient_id",
-                "encounter_id",
-                "type",
-                "value",
-                "unit",
-                "status",
-                "status_category",
-                "observation_date",
-                "interpretation",
-                "reference_range",
-            }
-        }
-        ref_range = data.get("reference_range")
-        if isinstance(ref_range, dict):
-            range_payload = ref_range
-        else:
-            range_payload = None
-        return cls(
-            observation_id=data.get("observation_id", ""),
-            patient_id=data.get("patient_id", ""),
-            name=data.get("type", ""),
-            value=data.get("value"),
-            unit=data.get("unit"),
-            status=data.get("status"),
-            effective_datetime=_parse_datetime(data.get("observation_date")),
-            encounter_id=data.get("encounter_id"),
-            interpretation=data.get("interpretation"),
-            reference_range=range_payload,
-            metadata=metadata,
-        )
+        return cls(*_observation_values(data))
+
+
+def _observation_values(data: Dict[str, Any]) -> tuple:
+    """Positional :class:`Observation` field values for a legacy observation dictionary.
+
+    Structured (dict) reference ranges populate ``reference_range``; the display
+    strings the generators emit are kept in ``metadata["reference_range"]``.
+    """
+
+    ref_range = data.get("reference_range")
+    metadata = _extra_fields(data, _OBSERVATION_FIELDS)
+    if ref_range and isinstance(ref_range, str):
+        metadata = {**(metadata or {}), "reference_range": ref_range}
+    return (
+        data.get("observation_id", ""),
+        data.get("patient_id", ""),
+        _intern(data.get("type", "")),
+        data.get("value"),
+        _intern(data.get("unit")),
+        _intern(data.get("status")),
+        _parse_datetime(data.get("observation_date")),
+        data.get("encounter_id"),
+        _intern(data.get("interpretation")),
+        ref_range if isinstance(ref_range, dict) else None,
+        metadata,
+    )
+
+
+# Every Observation field except ``metadata``, which the column store splits per key.
+_OBSERVATION_COLUMNS = tuple(item.name for item in fields(Observation))[:-1]
 
 
-@dataclass
+class _Absent:
+    """Marks rows without a given metadata key; pickles and copies as the singleton."""
+
+    __slots__ = ()
+
+    def __reduce__(self) -> str:
+        return "_ABSENT"
+
+
+_ABSENT = _Absent()
+
+
+class ObservationColumns(Sequence[Observation]):
+    """Column-oriented backing store for a patient's observations.
+
+    Observations are by far the largest lifecycle table, so rather than one
+    object (and one metadata dict) per measurement each attribute and each
+    metadata key is kept in its own list. Indexing and iteration build
+    :class:`Observation` views on demand; views are snapshots, so assigning to
+    them does not write back into the store.
+    """
+
+    __slots__ = ("_columns", "_extra", "_size")
+
+    def __init__(self, observations: Iterable[Observation] = ()) -> None:
+        self._columns: Dict[str, List[Any]] = {name: [] for name in _OBSERVATION_COLUMNS}
+        self._extra: Dict[str, List[Any]] = {}
+        self._size = 0
+        for observation in observations:
+            self.append(observation)
+
+    @classmethod
+    def from_legacy(cls, records: Iterable[Dict[str, Any]]) -> "ObservationColumns":
+        """Parse legacy dictionaries straight into columns without building objects."""
+
+        store = cls()
+        for record in records:
+            values = _observation_values(record)
+            store._append(values[:-1], values[-1])
+        return store
+
+    def append(self, observation: Observation) -> None:
+        self._append(
+            [getattr(observation, name) for name in _OBSERVATION_COLUMNS],
+            Observation._metadata_slot.__get__(observation, Observation),
+        )
+
+    def _append(self, values: Sequence[Any], metadata: Optional[Dict[str, Any]]) -> None:
+        for column, value in zip(self._columns.values(), values):
+            column.append(value)
+        extra = self._extra
+        if metadata:
+            for key in metadata.keys() - extra.keys():
+                extra[key] = [_ABSENT] * self._size
+        for key, column in extra.items():
+            column.append(metadata.get(key, _ABSENT) if metadata else _ABSENT)
+        self._size += 1
+
+    def column(self, name: str) -> List[Any]:
+        """Return the values of a field or metadata key, ``None`` where a row lacks the key."""
+
+        if name in self._columns:
+            return list(self._columns[name])
+        return [None if value is _ABSENT else value for value in self._extra.get(name, [None] * self._size)]
+
+    def _metadata_at(self, index: int) -> Optional[Dict[str, Any]]:
+        metadata = {key: column[index] for key, column in self._extra.items() if column[index] is not _ABSENT}
+        return metadata or None
+
+    def __len__(self) -> int:
+        return self._size
+
+    @overload
+    def __getitem__(self, index: int) -> Observation: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Observation]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(self._size))]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("observation index out of range")
+        return Observation(*(column[index] for column in self._columns.values()), self._metadata_at(index))
+
+    def __iter__(self) -> Iterator[Observation]:
+        for index, values in enumerate(zip(*self._columns.values())):
+            yield Observation(*values, self._metadata_at(index))
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (ObservationColumns, list)):
+            return len(self) == len(other) and all(left == right for left, right in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"ObservationColumns({self._size} observations)"
+
+
+_IMMUNIZATION_FIELDS = frozenset(
+    {
+        "immunization_id",
+        "patient_id",
+        "name",
+        "date",
+        "cvx_code",
+        "rxnorm_code",
+        "lot_number",
+        "performer",
+    }
+)
+
+
+@_lazy_metadata
+@dataclass(slots=True)
 class ImmunizationRecord:
     immunization_id: str
     patient_id: str
@@ -227,39 +451,24 @@ class ImmunizationRecord:
     rxnorm_code: Optional[str]
     lot_number: Optional[str]
     performer: Optional[str]
-    metadata: Dict[str, Any] = field(default_factory=dict)
+    metadata: Dict[str, Any] = None  # allocated on first access
 
     @classmethod
-    def from_legacy(cls, data: Dict[str, Any]) -> "ImmunizationRecord":
-        metadata = {
-            key: value
-            for key, value in data.items()
-            if key
-            not in {
-                "immunization_id",
-                "patient_id",
-                "name",
-                "date",
-                "cvx_code",
-                "rxnorm_code",
-                "lot_number",
-                "performer",
-            }
-        }
+    def from_legacy(cls, data: Dict[str, Any], dates: Mapping[str, date] = _NO_DATES) -> "ImmunizationRecord":
         return cls(
             immunization_id=data.get("immunization_id", ""),
             patient_id=data.get("patient_id", ""),
-            name=data.get("name", ""),
-            date_administered=_parse_date(data.get("date")),
-            cvx_code=data.get("cvx_code"),
-            rxnorm_code=data.get("rxnorm_code"),
+            name=_intern(data.get("name", "")),
+            date_administered=_known_date(data.get("date"), dates),
+            cvx_code=_intern(data.get("cvx_code")),
+            rxnorm_code=_intern(data.get("rxnorm_code")),
             lot_number=data.get("lot_number"),
-            performer=data.get("performer"),
-            metadata=metadata,
+            performer=_intern(data.get("performer")),
+            metadata=_extra_fields(data, _IMMUNIZATION_FIELDS),
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class CarePlanSummary:
     total: int = 0
     completed: int = 0
@@ -268,7 +477,29 @@ class CarePlanSummary:
     in_progress: int = 0
 
 
-@dataclass
+_FAMILY_HISTORY_FIELDS = frozenset(
+    {
+        "family_history_id",
+        "patient_id",
+        "relation",
+        "relation_code",
+        "condition",
+        "condition_display",
+        "condition_code",
+        "condition_system",
+        "icd10_code",
+        "onset_age",
+        "recorded_date",
+        "risk_modifier",
+        "notes",
+        "source",
+        "genetic_marker",
+    }
+)
+
+
+@_lazy_metadata
+@dataclass(slots=True)
 class FamilyHistoryEntry:
     family_history_id: str
     patient_id: str
@@ -285,54 +516,46 @@ class FamilyHistoryEntry:
     notes: Optional[str] = None
     source: Optional[str] = None
     genetic_marker: Optional[str] = None
-    metadata: Dict[str, Any] = field(default_factory=dict)
+    metadata: Dict[str, Any] = None  # allocated on first access
 
     @classmethod
-    def from_legacy(cls, data: Dict[str, Any]) -> "FamilyHistoryEntry":
-        metadata = {
-            key: value
-            for key, value in data.items()
-            if key
-            not in {
-                "family_history_id",
-                "patient_id",
-                "relation",
-                "relation_code",
-                "condition",
-                "condition_display",
-                "condition_code",
-                "condition_system",
-                "icd10_code",
-                "onset_age",
-                "recorded_date",
-                "risk_modifier",
-                "notes",
-                "source",
-                "genetic_marker",
-            }
-        }
-
+    def from_legacy(cls, data: Dict[str, Any], dates: Mapping[str, date] = _NO_DATES) -> "FamilyHistoryEntry":
         return cls(
             family_history_id=str(data.get("family_history_id", "")),
             patient_id=str(data.get("patient_id", "")),
-            relation=data.get("relation", ""),
-            condition=data.get("condition", ""),
-            condition_display=data.get("condition_display"),
-            relation_code=data.get("relation_code"),
-            condition_code=data.get("condition_code"),
-            condition_system=data.get("condition_system"),
-            icd10_code=data.get("icd10_code"),
+            relation=_intern(data.get("relation", "")),
+            condition=_intern(data.get("condition", "")),
+            condition_display=_intern(data.get("condition_display")),
+            relation_code=_intern(data.get("relation_code")),
+            condition_code=_intern(data.get("condition_code")),
+            condition_system=_intern(data.get("condition_system")),
+            icd10_code=_intern(data.get("icd10_code")),
             onset_age=data.get("onset_age"),
-            recorded_date=_parse_date(data.get("recorded_date")),
+            recorded_date=_known_date(data.get("recorded_date"), dates),
             risk_modifier=data.get("risk_modifier"),
             notes=data.get("notes"),
-            source=data.get("source"),
-            genetic_marker=data.get("genetic_marker"),
-            metadata=metadata,
+            source=_intern(data.get("source")),
+            genetic_marker=_intern(data.get("genetic_marker")),
+            metadata=_extra_fields(data, _FAMILY_HISTORY_FIELDS),
         )
 
 
-@dataclass
+_DEATH_FIELDS = frozenset(
+    {
+        "patient_id",
+        "death_date",
+        "age_at_death",
+        "primary_cause_code",
+        "primary_cause_description",
+        "contributing_causes",
+        "manner_of_death",
+        "death_certificate_type",
+    }
+)
+
+
+@_lazy_metadata
+@dataclass(slots=True)
 class DeathRecord:
     patient_id: str
     death_date: Optional[date]
@@ -342,39 +565,37 @@ class DeathRecord:
     contributing_causes: Optional[str] = None
     manner_of_death: Optional[str] = None
     death_certificate_type: Optional[str] = None
-    metadata: Dict[str, Any] = field(default_factory=dict)
+    metadata: Dict[str, Any] = None  # allocated on first access
 
     @classmethod
-    def from_legacy(cls, data: Dict[str, Any]) -> "DeathRecord":
-        metadata = {
-            key: value
-            for key, value in data.items()
-            if key
-            not in {
-                "patient_id",
-                "death_date",
-                "age_at_death",
-                "primary_cause_code",
-                "primary_cause_description",
-                "contributing_causes",
-                "manner_of_death",
-                "death_certificate_type",
-            }
-        }
+    def from_legacy(cls, data: Dict[str, Any], dates: Mapping[str, date] = _NO_DATES) -> "DeathRecord":
         return cls(
             patient_id=str(data.get("patient_id", "")),
-            death_date=_parse_date(data.get("death_date")),
+            death_date=_known_date(data.get("death_date"), dates),
             age_at_death=data.get("age_at_death"),
-            primary_cause_code=data.get("primary_cause_code", ""),
-            primary_cause_description=data.get("primary_cause_description"),
+            primary_cause_code=_intern(data.get("primary_cause_code", "")),
+            primary_cause_description=_intern(data.get("primary_cause_description")),
             contributing_causes=data.get("contributing_causes"),
-            manner_of_death=data.get("manner_of_death"),
-            death_certificate_type=data.get("death_certificate_type"),
-            metadata=metadata,
+            manner_of_death=_intern(data.get("manner_of_death")),
+            death_certificate_type=_intern(data.get("death_certificate_type")),
+            metadata=_extra_fields(data, _DEATH_FIELDS),
         )
 
 
-@dataclass
+_PROFILE_SDOH_FIELDS = ("smoking_status", "alcohol_use", "education", "employment_status", "income", "housing_status")
+_GENERATED_SDOH_FIELDS = (
+    "sdoh_risk_score",
+    "sdoh_risk_factors",
+    "community_deprivation_index",
+    "access_to_care_score",
+    "transportation_access",
+    "language_access_barrier",
+    "social_support_score",
+    "sdoh_care_gaps",
+)
+
+
+@dataclass(slots=True)
 class Patient:
     patient_id: str
     first_name: str
@@ -394,7 +615,7 @@ class Patient:
     conditions: List[Condition] = field(default_factory=list)
     medications: List[MedicationOrder] = field(default_factory=list)
     immunizations: List[ImmunizationRecord] = field(default_factory=list)
-    observations: List[Observation] = field(default_factory=list)
+    observations: Union[List[Observation], ObservationColumns] = field(default_factory=list)
     allergies: List[Dict[str, Any]] = field(default_factory=list)
     procedures: List[Dict[str, Any]] = field(default_factory=list)
     care_plans: List[Dict[str, Any]] = field(default_factory=list)
@@ -402,6 +623,83 @@ class Patient:
     metadata: Dict[str, Any] = field(default_factory=dict)
     family_history: List[FamilyHistoryEntry] = field(default_factory=list)
     death: Optional[DeathRecord] = None
+    age: Optional[int] = None
+
+    @classmethod
+    def from_record(
+        cls,
+        record: PatientRecord,
+        *,
+        birth_date: date,
+        encounters: List[Dict[str, Any]],
+        conditions: List[Dict[str, Any]],
+        medications: List[Dict[str, Any]],
+        immunizations: List[Dict[str, Any]],
+        observations: List[Dict[str, Any]],
+        allergies: List[Dict[str, Any]],
+        procedures: List[Dict[str, Any]],
+        care_plans: List[Dict[str, Any]],
+        family_history: Optional[List[Dict[str, Any]]] = None,
+        death: Optional[Dict[str, Any]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        dates: Mapping[str, date] = _NO_DATES,
+        columnar_observations: bool = False,
+    ) -> "Patient":
+        """Build the patient directly from its generation-time :class:`PatientRecord`.
+
+        ``birth_date`` is the profile's own ``date``, and ``dates`` maps ISO
+        strings to the ``date`` objects generation already holds (encounter
+        dates), so records dated on them are not parsed again. ``metadata``
+        defaults to the record's generated metadata.
+        """
+
+        metadata = metadata if metadata is not None else record.metadata
+        sdoh = {key: getattr(record, key) for key in _PROFILE_SDOH_FIELDS}
+        sdoh.update((key, metadata.get(key)) for key in _GENERATED_SDOH_FIELDS)
+        identifiers = {key: getattr(record, key) for key in ("mrn", "vista_id", "ssn")}
+        contact = {"phone": record.phone, "email": record.email, "insurance": record.insurance}
+        address = {
+            "line": record.address,
+            "city": record.city,
+            "state": record.state,
+            "postal_code": record.zip,
+            "country": record.country,
+        }
+        return cls(
+            patient_id=record.patient_id,
+            first_name=record.first_name,
+            last_name=record.last_name,
+            middle_name=record.middle_name,
+            birth_date=birth_date,
+            gender=record.gender,
+            race=record.race,
+            ethnicity=record.ethnicity,
+            language=record.language,
+            marital_status=record.marital_status,
+            contact={k: v for k, v in contact.items() if v},
+            address={k: v for k, v in address.items() if v},
+            identifiers={k: v for k, v in identifiers.items() if v},
+            sdoh={k: v for k, v in sdoh.items() if v is not None},
+            encounters=[Encounter.from_legacy(item, dates) for item in encounters],
+            conditions=[Condition.from_legacy(item, dates) for item in conditions],
+            medications=[MedicationOrder.from_legacy(item, dates) for item in medications],
+            immunizations=[ImmunizationRecord.from_legacy(item, dates) for item in immunizations],
+            observations=(
+                ObservationColumns.from_legacy(observations)
+                if columnar_observations
+                else [Observation.from_legacy(item) for item in observations]
+            ),
+            allergies=allergies,
+            procedures=procedures,
+            care_plans=care_plans,
+            care_plan=CarePlanSummary(
+                **{key: metadata.get(f"care_plan_{key}", 0) for key in CARE_PLAN_SUMMARY_FIELDS}
+            ),
+            metadata=metadata,
+            family_history=[FamilyHistoryEntry.from_legacy(entry, dates) for entry in family_history or []],
+            death=DeathRecord.from_legacy(death, dates) if death else None,
+            age=record.age,
+        )
 
     @classmethod
     def from_legacy(
@@ -418,26 +716,12 @@ class Patient:
         family_history: Optional[List[Dict[str, Any]]] = None,
         death: Optional[Dict[str, Any]] = None,
         metadata: Optional[Dict[str, Any]] = None,
+        columnar_observations: bool = False,
     ) -> "Patient":
         birth_date = _parse_date(patient.get("birthdate")) or date.today()
         sdoh = {
             key: patient.get(key)
-            for key in (
-                "smoking_status",
-                "alcohol_use",
-                "education",
-                "employment_status",
-                "income",
-                "housing_status",
-                "sdoh_risk_score",
-                "sdoh_risk_factors",
-                "community_deprivation_index",
-                "access_to_care_score",
-                "transportation_access",
-                "language_access_barrier",
-                "social_support_score",
-                "sdoh_care_gaps",
-            )
+            for key in _PROFILE_SDOH_FIELDS + _GENERATED_SDOH_FIELDS
             if key in patient
         }
         identifiers = {
@@ -502,7 +786,11 @@ class Patient:
             conditions=[Condition.from_legacy(item) for item in conditions],
             medications=[MedicationOrder.from_legacy(item) for item in medications],
             immunizations=[ImmunizationRecord.from_legacy(item) for item in immunizations],
-            observations=[Observation.from_legacy(item) for item in observations],
+            observations=(
+                ObservationColumns.from_legacy(observations)
+                if columnar_observations
+                else [Observation.from_legacy(item) for item in observations]
+            ),
             allergies=allergies,
             procedures=procedures,
             care_plans=care_plan_details,
@@ -512,33 +800,36 @@ class Patient:
             death=death_record,
         )
 
+    def to_legacy_row(self) -> Dict[str, Any]:
+        """Return the flat ``patients`` export row; the layout matches ``PatientRecord.to_dict``."""
+
+        identifiers, contact, address = self.identifiers, self.contact, self.address
+        core = {
+            "patient_id": self.patient_id,
+            "vista_id": identifiers.get("vista_id"),
+            "mrn": identifiers.get("mrn"),
+            "ssn": identifiers.get("ssn"),
+            "first_name": self.first_name,
+            "last_name": self.last_name,
+            "middle_name": self.middle_name,
+            "gender": self.gender,
+            "birthdate": self.birth_date.isoformat(),
+            "age": self.age,
+            "race": self.race,
+            "ethnicity": self.ethnicity,
+            "address": address.get("line", ""),
+            "city": address.get("city", ""),
+            "state": address.get("state", ""),
+            "zip": address.get("postal_code", ""),
+            "country": address.get("country", ""),
+            "phone": contact.get("phone", ""),
+            "email": contact.get("email", ""),
+            "insurance": contact.get("insurance", ""),
+            "marital_status": self.marital_status,
+            "language": self.language,
+        }
+        core.update((key, self.sdoh.get(key)) for key in _PROFILE_SDOH_FIELDS)
+        return patient_export_row(core, self.metadata)
+
     def to_serializable_dict(self) -> Dict[str, Any]:
-        payload = asdict(self)
-        payload["birth_date"] = self.birth_date.isoformat()
-        for encounter in payload.get("encounters", []):
-            if encounter.get("start_date"):
-                encounter["start_date"] = encounter["start_date"].isoformat()
-        for condition in payload.get("conditions", []):
-            if condition.get("onset_date"):
-                condition["onset_date"] = condition["onset_date"].isoformat()
-        for medication in payload.get("medications", []):
-            if medication.get("start_date"):
-                medication["start_date"] = medication["start_date"].isoformat()
-            if medication.get("end_date"):
-                medication["end_date"] = medication["end_date"].isoformat()
-        for immunization in payload.get("immunizations", []):
-            if immunization.get("date_administered"):
-                immunization["date_administered"] = immunization["date_administered"].isoformat()
-        for observation in payload.get("observations", []):
-            eff = observation.get("effective_datetime")
-            if eff:
-                observation["effective_datetime"] = eff.isoformat()
-        for entry in payload.get("family_history", []):
-            recorded = entry.get("recorded_date")
-            if isinstance(recorded, date):
-                entry["recorded_date"] = recorded.isoformat()
-        death_record = payload.get("death")
-        if isinstance(death_record, dict) and death_record.get("death_date"):
-            if isinstance(death_record["death_date"], date):
-                death_record["death_date"] = death_record["death_date"].isoformat()
-        return payload
+        return _record_payload(self)
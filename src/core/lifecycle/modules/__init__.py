@@ -1,11 +1,16 @@
 """Module-based clinical workflow execution for Phase 3."""
 
-from .engine import ModuleEngine, ModuleExecutionResult
+from .cache import MODULE_CACHE_ENV, ModuleCache
+from .engine import ModuleEngine, ModuleExecutionResult, ModuleMetadata, ModuleProfiler
 from .validation import ModuleValidationError, validate_module_definition
 
 __all__ = [
+    "MODULE_CACHE_ENV",
+    "ModuleCache",
     "ModuleEngine",
     "ModuleExecutionResult",
+    "ModuleMetadata",
+    "ModuleProfiler",
     "ModuleValidationError",
     "validate_module_definition",
 ]
@@ -0,0 +1,129 @@
+"""On-disk cache of parsed, parameter-resolved module definitions.
+
+Loading a module means parsing YAML, resolving ``use:`` parameter tokens and
+running structural validation. The result only depends on the module file and
+the parameter domains under ``data/parameters``, so it can be pickled once and
+reused by worker processes and repeated CLI runs (for example the Monte Carlo
+and KPI tools, which start a fresh generator per iteration).
+
+Cache entries are keyed by the SHA-256 of the module YAML, the combined digest
+of every parameter domain file and :data:`CACHE_FORMAT_VERSION`, so editing a
+module or a parameter file simply produces a new key.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Optional, Set, Tuple
+
+from src.core.parameters import parameter_domain_paths
+
+if TYPE_CHECKING:  # pragma: no cover - import for type checking only
+    from .engine import ModuleDefinition
+
+
+MODULE_CACHE_ENV = "MODULE_CACHE_DIR"
+CACHE_FORMAT_VERSION = 1
+
+
+def _file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parameter_fingerprint() -> str:
+    """Return a digest covering the name and contents of every parameter domain file."""
+
+    digest = hashlib.sha256()
+    for path in parameter_domain_paths():
+        digest.update(path.name.encode("utf-8"))
+        digest.update(_file_digest(path).encode("ascii"))
+    return digest.hexdigest()
+
+
+class ModuleCache:
+    """Store compiled :class:`ModuleDefinition` objects as pickles on disk."""
+
+    def __init__(self, cache_dir: Path) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.hits = 0
+        self.misses = 0
+        self._parameter_digest: Optional[str] = None
+
+    @classmethod
+    def from_environment(cls, cache_dir: Optional[Path] = None) -> Optional["ModuleCache"]:
+        """Build a cache for ``cache_dir`` or ``$MODULE_CACHE_DIR``; ``None`` when neither is set."""
+
+        location = cache_dir or os.environ.get(MODULE_CACHE_ENV)
+        if not location:
+            return None
+        return cls(Path(location))
+
+    def _parameter_key(self) -> str:
+        if self._parameter_digest is None:
+            self._parameter_digest = parameter_fingerprint()
+        return self._parameter_digest
+
+    def cache_key(self, module_path: Path) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"v{CACHE_FORMAT_VERSION}".encode("ascii"))
+        digest.update(_file_digest(module_path).encode("ascii"))
+        digest.update(self._parameter_key().encode("ascii"))
+        return digest.hexdigest()
+
+    def _entry_path(self, module_name: str, key: str) -> Path:
+        return self.cache_dir / f"{module_name}.{key[:24]}.pickle"
+
+    def load(
+        self, module_name: str, module_path: Path
+    ) -> Optional[Tuple["ModuleDefinition", Dict[str, Set[str]]]]:
+        """Return ``(definition, parameter_usage)`` when a valid entry exists."""
+
+        try:
+            key = self.cache_key(module_path)
+            with self._entry_path(module_name, key).open("rb") as handle:
+                payload = pickle.load(handle)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            self.misses += 1
+            return None
+        if not isinstance(payload, dict) or payload.get("key") != key:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return payload["definition"], payload.get("parameter_usage", {})
+
+    def store(
+        self,
+        module_name: str,
+        module_path: Path,
+        definition: "ModuleDefinition",
+        parameter_usage: Optional[Dict[str, Set[str]]] = None,
+    ) -> None:
+        """Persist a validated definition; failures are ignored so caching never blocks generation."""
+
+        try:
+            key = self.cache_key(module_path)
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            payload = {
+                "key": key,
+                "definition": definition,
+                "parameter_usage": parameter_usage or {},
+            }
+            # Write atomically so concurrent workers never observe a partial pickle.
+            fd, tmp_name = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as handle:
+                    pickle.dump(payload, handle, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_name, self._entry_path(module_name, key))
+            except BaseException:
+                Path(tmp_name).unlink(missing_ok=True)
+                raise
+        except OSError:
+            return
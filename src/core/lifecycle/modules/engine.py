@@ -1,21 +1,29 @@
 from __future__ import annotations
 
+import csv
+import json
 import math
 import random
+import time
 import uuid
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
 
 import yaml
 
+from .cache import ModuleCache
 from .validation import ModuleValidationError, validate_module_definition
 from .reference_utils import ParameterResolutionError, resolve_definition_parameters
 from ..constants import MAX_PATIENT_AGE
+from ..generation.sampling import AliasTable
 
 
 MODULES_ROOT = Path("modules")
+# Loop guard: a single module run stops after this many state transitions.
+MAX_STATE_VISITS = 200
 
 
 def _ensure_modules_root(root: Optional[Path]) -> Path:
@@ -54,6 +62,39 @@ def _convert_to_days(quantity: Any, unit: str) -> float:
     return value
 
 
+def _condition_type(condition: Dict[str, Any]) -> Optional[str]:
+    condition_type = condition.get("condition_type") or condition.get("type")
+    if not condition_type:
+        if "attribute" in condition:
+            condition_type = "attribute"
+        elif "field" in condition or "demographic_field" in condition:
+            condition_type = "demographic"
+        elif "quantity" in condition or "unit" in condition:
+            condition_type = "age"
+        elif "probability" in condition or "p" in condition:
+            condition_type = "random"
+        elif "conditions" in condition:
+            # allow shorthand for logical groups
+            condition_type = "and"
+    return condition_type.lower() if condition_type else None
+
+
+def _observation_draw_bounds(observation: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    if observation.get("value") is not None or "value_range" not in observation:
+        return None
+    bounds = observation["value_range"]
+    low = float(bounds.get("min", 0))
+    high = float(bounds.get("max", low + 1))
+    return low, high
+
+
+def _symptom_value_range(config: Dict[str, Any]) -> Tuple[float, float]:
+    value_range = config.get("range") or config.get("value_range") or {}
+    low = float(value_range.get("low", value_range.get("min", 0)))
+    high = float(value_range.get("high", value_range.get("max", low)))
+    return low, high
+
+
 MODULE_GUARDRAIL_OVERRIDES: Dict[str, Dict[str, Any]] = {
     "adult_primary_care_wellness": {"min_age": 18},
     "adult_immunization_catchup": {"min_age": 18},
@@ -155,6 +196,76 @@ def _derive_guardrails(module_name: str) -> Dict[str, Any]:
     return guardrails
 
 
+
+
+def _module_header_text(text: str) -> str:
+    """Return module YAML without its ``states`` block."""
+
+    header_lines: List[str] = []
+    in_states = False
+    for line in text.splitlines():
+        if line and not line[0].isspace() and not line.startswith("#"):
+            in_states = line.split(":", 1)[0].strip() == "states"
+        if not in_states:
+            header_lines.append(line)
+    return "\n".join(header_lines)
+
+
+@dataclass(frozen=True)
+class ModuleMetadata:
+    """Lightweight index entry describing a module without its state machine."""
+
+    name: str
+    path: Path
+    guardrails: Mapping[str, Any]
+    categories: Mapping[str, str]
+    replace_categories: FrozenSet[str]
+
+    @classmethod
+    def from_path(cls, module_name: str, path: Path) -> "ModuleMetadata":
+        """Index a module by parsing only its header, skipping the ``states`` block."""
+
+        if not path.exists():
+            raise FileNotFoundError(f"Module '{module_name}' not found at {path}")
+        header = yaml.safe_load(_module_header_text(path.read_text(encoding="utf-8"))) or {}
+        if not isinstance(header, dict):
+            raise ModuleValidationError(module_name, ["module header is not a mapping"])
+        categories = header.get("categories") or {}
+        issues: List[str] = []
+        if not header.get("name"):
+            issues.append("module must define a name")
+        if not isinstance(categories, dict):
+            issues.append("'categories' must be a mapping")
+        if issues:
+            raise ModuleValidationError(module_name, issues)
+        guardrails = {
+            key: frozenset(value) if key == "allowed_genders" else value
+            for key, value in _derive_guardrails(module_name).items()
+        }
+        replace = frozenset(
+            category for category, mode in categories.items() if str(mode).lower() == "replace"
+        )
+        return cls(
+            name=module_name,
+            path=path,
+            guardrails=MappingProxyType(guardrails),
+            categories=MappingProxyType(dict(categories)),
+            replace_categories=replace,
+        )
+
+    def admits(self, age: int, gender: str) -> bool:
+        min_age = self.guardrails.get("min_age")
+        if min_age is not None and age < int(min_age):
+            return False
+        max_age = self.guardrails.get("max_age")
+        if max_age is not None and age > int(max_age):
+            return False
+        allowed_genders = self.guardrails.get("allowed_genders")
+        if allowed_genders and gender not in allowed_genders:
+            return False
+        return True
+
+
 @dataclass
 class ModuleState:
     name: str
@@ -283,33 +394,358 @@ class ModuleExecutionResult:
         self.attributes.update(other.attributes)
 
 
+@dataclass
+class StateProfile:
+    """Aggregated timings for one ``(module, state type)`` pair."""
+
+    visits: int = 0
+    handler_seconds: float = 0.0
+    transition_seconds: float = 0.0
+
+
+@dataclass
+class ModuleProfile:
+    """Aggregated timings and guard counters for one module."""
+
+    runs: int = 0
+    visits: int = 0
+    handler_seconds: float = 0.0
+    transition_seconds: float = 0.0
+    max_call_depth: int = 0
+    loop_guard_hits: int = 0
+
+
+class ModuleProfiler:
+    """Opt-in instrumentation for :class:`ModuleEngine` runs.
+
+    Records visits, handler time and transition-evaluation time per module and
+    per state type, the deepest submodule call stack observed per module, and
+    how often the ``MAX_STATE_VISITS`` loop guard fires. Self time per state is
+    also accumulated by call path for flamegraph-compatible folded stacks.
+    Engines created without ``profile=True`` never touch this class.
+    """
+
+    def __init__(self) -> None:
+        self.modules: Dict[str, ModuleProfile] = {}
+        self.states: Dict[Tuple[str, str], StateProfile] = {}
+        self.folded: Dict[str, float] = {}
+        self._frames: List[List[Any]] = []
+
+    def start_module(self, module_name: str, depth: int) -> None:
+        profile = self.modules.setdefault(module_name, ModuleProfile())
+        profile.runs += 1
+        profile.max_call_depth = max(profile.max_call_depth, depth)
+        self._frames.append([module_name, 0.0])
+
+    def finish_module(self) -> None:
+        _, child_seconds = self._frames.pop()
+        if self._frames:
+            self._frames[-1][1] += child_seconds
+
+    def enter_state(self, state: ModuleState) -> None:
+        self._frames.append([f"{state.name}[{state.type}]", 0.0])
+
+    def exit_state(
+        self,
+        module_name: str,
+        state: ModuleState,
+        handler_seconds: float,
+        transition_seconds: float,
+    ) -> None:
+        label, child_seconds = self._frames.pop()
+        elapsed = handler_seconds + transition_seconds
+        path = ";".join(frame[0] for frame in self._frames) + ";" + label
+        self.folded[path] = self.folded.get(path, 0.0) + max(elapsed - child_seconds, 0.0)
+        if self._frames:
+            self._frames[-1][1] += elapsed
+
+        module_profile = self.modules.setdefault(module_name, ModuleProfile())
+        module_profile.visits += 1
+        module_profile.handler_seconds += handler_seconds
+        module_profile.transition_seconds += transition_seconds
+        state_profile = self.states.setdefault((module_name, state.type), StateProfile())
+        state_profile.visits += 1
+        state_profile.handler_seconds += handler_seconds
+        state_profile.transition_seconds += transition_seconds
+
+    def record_loop_guard(self, module_name: str) -> None:
+        self.modules.setdefault(module_name, ModuleProfile()).loop_guard_hits += 1
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """Flatten module and state-type aggregates into export rows."""
+
+        rows: List[Dict[str, Any]] = []
+        for module_name, profile in sorted(self.modules.items()):
+            rows.append(
+                {
+                    "module": module_name,
+                    "state_type": "*",
+                    "runs": profile.runs,
+                    "visits": profile.visits,
+                    "handler_seconds": round(profile.handler_seconds, 6),
+                    "transition_seconds": round(profile.transition_seconds, 6),
+                    "max_call_depth": profile.max_call_depth,
+                    "loop_guard_hits": profile.loop_guard_hits,
+                }
+            )
+            for (state_module, state_type), state_profile in sorted(self.states.items()):
+                if state_module != module_name:
+                    continue
+                rows.append(
+                    {
+                        "module": module_name,
+                        "state_type": state_type,
+                        "runs": "",
+                        "visits": state_profile.visits,
+                        "handler_seconds": round(state_profile.handler_seconds, 6),
+                        "transition_seconds": round(state_profile.transition_seconds, 6),
+                        "max_call_depth": "",
+                        "loop_guard_hits": "",
+                    }
+                )
+        return rows
+
+    def export(self, output_dir: Path, prefix: str = "module_profile") -> Dict[str, Path]:
+        """Write ``<prefix>.json``, ``<prefix>.csv`` and ``<prefix>.folded`` to ``output_dir``."""
+
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        rows = self.rows()
+        paths = {
+            "json": output_dir / f"{prefix}.json",
+            "csv": output_dir / f"{prefix}.csv",
+            "folded": output_dir / f"{prefix}.folded",
+        }
+        with paths["json"].open("w", encoding="utf-8") as handle:
+            json.dump(rows, handle, indent=2)
+        with paths["csv"].open("w", encoding="utf-8", newline="") as handle:
+            writer = csv.DictWriter(handle, fieldnames=list(rows[0].keys()) if rows else ["module"])
+            writer.writeheader()
+            writer.writerows(rows)
+        with paths["folded"].open("w", encoding="utf-8") as handle:
+            for path, seconds in sorted(self.folded.items()):
+                # flamegraph.pl / speedscope expect integer sample weights; use microseconds.
+                handle.write(f"{path} {max(int(round(seconds * 1_000_000)), 1)}\n")
+        return paths
+
+
+# Submodule memoization -------------------------------------------------------
+
+# Only emitting and bookkeeping states whose effects are confined to the
+# submodule's own outputs can be compiled; ``*_end`` states may mutate entries
+# owned by the caller and nested ``call_submodule`` states are interpreted.
+_MEMOIZABLE_STATE_TYPES = frozenset(
+    {
+        "start",
+        "terminal",
+        "decision",
+        "delay",
+        "encounter",
+        "condition_onset",
+        "medication_start",
+        "procedure",
+        "immunization",
+        "care_plan",
+        "care_plan_start",
+        "observation",
+        "symptom",
+        "set_attribute",
+    }
+)
+_STATIC_CONDITION_TYPES = frozenset({"attribute", "demographic", "hascondition", "and", "or", "not"})
+_ENTRY_ID_FIELDS = {
+    "encounters": "encounter_id",
+    "conditions": "condition_id",
+    "medications": "medication_id",
+    "procedures": "procedure_id",
+    "immunizations": "immunization_id",
+    "care_plans": "care_plan_id",
+    "observations": "observation_id",
+}
+_ENTRY_DATE_FIELDS = {
+    "encounters": "date",
+    "conditions": "onset_date",
+    "medications": "start_date",
+    "procedures": "date",
+    "immunizations": "date",
+    "care_plans": "start_date",
+    "observations": "date",
+}
+MAX_SEGMENT_TEMPLATES = 1024
+
+# References inside a template: ("entry", index) points at an entry created by
+# the segment, ("inherited", None) at the caller's last encounter and
+# ("value", literal) at a constant.
+_Reference = Tuple[str, Any]
+
+
+def _segment_dependencies(
+    definition: ModuleDefinition,
+) -> Optional[Tuple[Tuple[str, ...], Tuple[str, ...]]]:
+    """Return the attributes and demographic fields that fully determine a module's path.
+
+    ``None`` means the path depends on randomness (probabilistic transitions,
+    random conditions, delay ranges), on the simulated clock (age conditions)
+    or on state types that cannot be replayed, so the module must be interpreted.
+    Value draws inside observation and symptom states do not disqualify a
+    module; they are replayed in the same order as the interpreter would draw.
+    """
+
+    attributes: Set[str] = set()
+    fields: Set[str] = set()
+
+    def is_static(condition: Any) -> bool:
+        if not isinstance(condition, dict):
+            return True
+        condition_type = _condition_type(condition)
+        if condition_type is None:
+            return True
+        if condition_type not in _STATIC_CONDITION_TYPES:
+            return False
+        if condition_type == "attribute":
+            if condition.get("attribute") is not None:
+                attributes.add(condition["attribute"])
+        elif condition_type == "demographic":
+            field_name = condition.get("field") or condition.get("attribute")
+            if field_name:
+                fields.add(field_name)
+        elif condition_type in {"and", "or"}:
+            return all(is_static(sub) for sub in condition.get("conditions", []))
+        elif condition_type == "not":
+            return is_static(condition.get("condition"))
+        return True
+
+    for state in definition.states.values():
+        if state.type not in _MEMOIZABLE_STATE_TYPES:
+            return None
+        if state.type == "delay" and not ({"duration_days", "exact"} & state.data.keys()):
+            if "range" in state.data:
+                return None
+        for transition in state.transitions:
+            if transition.get("probability") is not None:
+                return None
+            condition = transition.get("condition")
+            if condition and not is_static(condition):
+                return None
+    return tuple(sorted(attributes)), tuple(sorted(fields))
+
+
+@dataclass
+class _TemplateEntry:
+    category: str
+    fields: Dict[str, Any]
+    offset: timedelta
+    encounter_ref: Optional[_Reference] = None
+    draw: Optional[Tuple[float, float]] = None
+
+
+@dataclass
+class _SegmentTemplate:
+    """Outputs of one submodule run, expressed relative to its start time."""
+
+    entries: List[_TemplateEntry]
+    attribute_writes: List[Tuple[str, _Reference]]
+    duration: timedelta
+    last_encounter_ref: _Reference
+    visited: int
+
+
 class ModuleEngine:
-    """Interpret clinical workflow modules and generate structured patient events."""
+    """Interpret clinical workflow modules and generate structured patient events.
+
+    Every requested module is indexed up front (name, guardrails and
+    categories) from its header alone. With ``lazy=True`` that header check is
+    all construction does: a module's ``states`` block is parsed, validated
+    and registered the first time an eligible patient needs it, so modules no
+    patient qualifies for are never parsed. Modules with a valid
+    compiled-cache entry skip parsing entirely.
+    """
 
     def __init__(
         self,
         module_names: Sequence[str],
         *,
         modules_root: Optional[Path] = None,
+        cache_dir: Optional[Path] = None,
+        lazy: bool = False,
+        profile: bool = False,
+        memoize_submodules: bool = True,
     ) -> None:
         self.modules_root = _ensure_modules_root(modules_root)
+        self.module_cache = ModuleCache.from_environment(cache_dir)
+        self.profiler: Optional[ModuleProfiler] = ModuleProfiler() if profile else None
+        # Profiles should reflect interpreted execution, so replay is disabled while profiling.
+        self.memoize_submodules = memoize_submodules and self.profiler is None
+        self.segment_templates: Dict[Tuple[Any, ...], _SegmentTemplate] = {}
+        self.segment_replays = 0
+        self._segment_dependency_cache: Dict[str, Optional[Tuple[Tuple[str, ...], Tuple[str, ...]]]] = {}
+        self.module_index: Dict[str, ModuleMetadata] = {}
         self.definition_cache: Dict[str, ModuleDefinition] = {}
-        self.guardrails: Dict[str, Dict[str, Any]] = {}
+        self.parameter_usage: Dict[str, Dict[str, Set[str]]] = {}
+        self.guardrails: Dict[str, Mapping[str, Any]] = {}
         self.replace_categories: Dict[str, Set[str]] = {}
-        self.primary_definitions: List[ModuleDefinition] = []
+        self.primary_modules: List[str] = []
+        self._eligibility_buckets: Dict[Tuple[int, str], Tuple[str, ...]] = {}
+        # Keyed by object ids; each value pins its transition list so the ids stay valid.
+        self._transition_tables: Dict[
+            Tuple[int, Tuple[int, ...]], Tuple[List[Dict[str, Any]], Optional[AliasTable]]
+        ] = {}
         for module_name in module_names:
-            definition = self._get_or_load_definition(module_name)
-            self.primary_definitions.append(definition)
+            self._index_module(module_name)
+            self.primary_modules.append(module_name)
+        if not lazy:
+            for module_name in self.primary_modules:
+                self._get_or_load_definition(module_name)
+
+    def transition_table(
+        self,
+        transitions: List[Dict[str, Any]],
+        probabilistic: Sequence[Dict[str, Any]],
+    ) -> Optional[AliasTable]:
+        """Alias table over the eligible probabilistic ``transitions`` of a state.
+
+        Tables are built once per (state, eligible subset); ``None`` means every
+        eligible weight is zero and the caller falls back to the last entry.
+        """
+
+        key = (id(transitions), tuple(id(entry) for entry in probabilistic))
+        cached = self._transition_tables.get(key)
+        if cached is not None:
+            return cached[1]
+        weights: List[float] = []
+        for entry in probabilistic:
+            try:
+                weights.append(max(float(entry.get("probability", 0.0)), 0.0))
+            except (TypeError, ValueError):
+                weights.append(0.0)
+        table = AliasTable([entry.get("to") for entry in probabilistic], weights) if sum(weights) > 0 else None
+        self._transition_tables[key] = (transitions, table)
+        return table
+
+    @property
+    def primary_definitions(self) -> List[ModuleDefinition]:
+        """Definitions of the requested modules that have been loaded so far."""
+
+        return [
+            self.definition_cache[name]
+            for name in self.primary_modules
+            if name in self.definition_cache
+        ]
+
+    def _index_module(self, module_name: str) -> ModuleMetadata:
+        metadata = self.module_index.get(module_name)
+        if metadata is not None:
+            return metadata
+        metadata = ModuleMetadata.from_path(module_name, self._module_path(module_name))
+        self.module_index[module_name] = metadata
+        if metadata.guardrails:
+            self.guardrails[module_name] = metadata.guardrails
+        self.replace_categories[module_name] = set(metadata.replace_categories)
+        return metadata
 
     def _register_definition(self, definition: ModuleDefinition) -> None:
         module_name = definition.name
         self.definition_cache[module_name] = definition
-        guardrails = _derive_guardrails(module_name)
-        if guardrails:
-            allowed = guardrails.get("allowed_genders")
-            if allowed:
-                guardrails["allowed_genders"] = frozenset(allowed)
-            self.guardrails[module_name] = guardrails
         replace = {
             category
             for category, mode in definition.categories.items()
@@ -320,14 +756,38 @@ class ModuleEngine:
         else:
             self.replace_categories.setdefault(module_name, set())
 
-    def _prepare_definition(self, module_name: str, definition: ModuleDefinition) -> ModuleDefinition:
+    @staticmethod
+    def _check_definition(module_name: str, definition: ModuleDefinition) -> Dict[str, Set[str]]:
         try:
-            resolve_definition_parameters(definition)
+            usage = resolve_definition_parameters(definition)
         except ParameterResolutionError as exc:
             raise ModuleValidationError(module_name, [str(exc)]) from exc
         issues = validate_module_definition(definition)
         if issues:
             raise ModuleValidationError(module_name, issues)
+        return usage
+
+    def _prepare_definition(self, module_name: str, definition: ModuleDefinition) -> ModuleDefinition:
+        self.parameter_usage[module_name] = self._check_definition(module_name, definition)
+        self._register_definition(definition)
+        return definition
+
+    def _load_cached_definition(self, module_name: str, path: Path) -> Optional[ModuleDefinition]:
+        """Register the compiled-cache entry for ``module_name`` if it is present and sound."""
+
+        compiled = self.module_cache.load(module_name, path) if self.module_cache is not None else None
+        if compiled is None:
+            return None
+        definition, usage = compiled
+        if (
+            not isinstance(definition, ModuleDefinition)
+            or definition.name != module_name
+            or not isinstance(usage, dict)
+            or validate_module_definition(definition)
+        ):
+            # A damaged entry is rebuilt from the YAML rather than failing mid-run.
+            return None
+        self.parameter_usage[module_name] = usage
         self._register_definition(definition)
         return definition
 
@@ -335,11 +795,23 @@ class ModuleEngine:
         cached = self.definition_cache.get(module_name)
         if cached:
             return cached
-        definition = self._load_module(module_name)
-        return self._prepare_definition(module_name, definition)
+        path = self._module_path(module_name)
+        if path.exists():
+            definition = self._load_cached_definition(module_name, path)
+            if definition is not None:
+                return definition
+        definition = self._prepare_definition(module_name, self._load_module(module_name))
+        if self.module_cache is not None:
+            self.module_cache.store(
+                module_name, path, definition, self.parameter_usage.get(module_name)
+            )
+        return definition
+
+    def _module_path(self, module_name: str) -> Path:
+        return self.modules_root / f"{module_name}.yaml"
 
     def _load_module(self, module_name: str) -> ModuleDefinition:
-        path = self.modules_root / f"{module_name}.yaml"
+        path = self._module_path(module_name)
         if not path.exists():
             raise FileNotFoundError(f"Module '{module_name}' not found at {path}")
         with path.open("r", encoding="utf-8") as handle:
@@ -352,44 +824,72 @@ class ModuleEngine:
             categories.update(replace)
         return categories
 
-    def _module_is_eligible(self, definition: ModuleDefinition, patient: Dict[str, Any]) -> bool:
-        guardrails = self.guardrails.get(definition.name)
-        if not guardrails:
-            return True
+    def _segment_key(
+        self,
+        definition: ModuleDefinition,
+        patient: Dict[str, Any],
+        attributes: Dict[str, Any],
+        last_encounter_id: Optional[str],
+    ) -> Optional[Tuple[Any, ...]]:
+        """Return the memoization key for a submodule call, or ``None`` if it must be interpreted."""
 
+        if not self.memoize_submodules:
+            return None
+        name = definition.name
+        if name not in self._segment_dependency_cache:
+            self._segment_dependency_cache[name] = _segment_dependencies(definition)
+        dependencies = self._segment_dependency_cache[name]
+        if dependencies is None:
+            return None
+        attribute_names, field_names = dependencies
+        key = (
+            name,
+            tuple((attribute, attributes.get(attribute)) for attribute in attribute_names),
+            tuple((field_name, patient.get(field_name)) for field_name in field_names),
+            last_encounter_id is None,
+        )
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    @staticmethod
+    def _patient_bucket(patient: Dict[str, Any]) -> Tuple[int, str]:
         try:
             age = int(patient.get("age", 0) or 0)
         except (TypeError, ValueError):
             age = 0
+        gender = str(patient.get("gender") or "").lower()
+        return age, gender
 
-        min_age = guardrails.get("min_age")
-        if min_age is not None and age < int(min_age):
-            return False
+    def _name_is_eligible(self, module_name: str, bucket: Tuple[int, str]) -> bool:
+        return self._index_module(module_name).admits(*bucket)
 
-        max_age = guardrails.get("max_age")
-        if max_age is not None and age > int(max_age):
-            return False
+    def eligible_modules(self, patient: Dict[str, Any]) -> Tuple[str, ...]:
+        """Return the requested modules whose guardrails admit the patient.
 
-        allowed_genders = guardrails.get("allowed_genders")
-        if allowed_genders:
-            gender = str(patient.get("gender") or "").lower()
-            if gender not in allowed_genders:
-                return False
+        Results are memoized per ``(age, gender)`` bucket, so guardrails are
+        evaluated once per demographic stratum rather than once per patient.
+        """
 
-        return True
+        bucket = self._patient_bucket(patient)
+        eligible = self._eligibility_buckets.get(bucket)
+        if eligible is None:
+            eligible = tuple(
+                name for name in self.primary_modules if self._name_is_eligible(name, bucket)
+            )
+            self._eligibility_buckets[bucket] = eligible
+        return eligible
 
     def execute(self, patient: Dict[str, Any]) -> ModuleExecutionResult:
-        if not self.primary_definitions:
-            return ModuleExecutionResult()
-
         result = ModuleExecutionResult()
-        for definition in self.primary_definitions:
-            if not self._module_is_eligible(definition, patient):
-                continue
+        for module_name in self.eligible_modules(patient):
+            definition = self._get_or_load_definition(module_name)
             runner = _ModuleRunner(self, definition, patient)
             module_result = runner.run()
             module_result.replacements.update(
-                self.replace_categories.get(definition.name, set())
+                self.replace_categories.get(module_name, set())
             )
             result.merge(module_result)
         return result
@@ -437,33 +937,106 @@ class _ModuleRunner:
         return start_date
 
     def run(self) -> ModuleExecutionResult:
-        state_name = "start"
-        while state_name:
-            if self.visited > 200:
-                break
-            state = self.definition.states.get(state_name)
-            if state is None:
-                break
-            next_state = self._execute_state(state)
-            if not next_state:
-                break
-            state_name = next_state
-            self.visited += 1
+        profiler = self.engine.profiler
+        execute_state = self._execute_state if profiler is None else self._execute_state_profiled
+        if profiler is not None:
+            profiler.start_module(self.definition.name, len(self.call_stack))
+        try:
+            state_name = "start"
+            while state_name:
+                if self.visited > MAX_STATE_VISITS:
+                    if profiler is not None:
+                        profiler.record_loop_guard(self.definition.name)
+                    break
+                state = self.definition.states.get(state_name)
+                if state is None:
+                    break
+                next_state = execute_state(state)
+                if not next_state:
+                    break
+                state_name = next_state
+                self.visited += 1
+        finally:
+            if profiler is not None:
+                profiler.finish_module()
+        if self.attributes:
+            self.output.attributes.update(self.attributes)
+        return self.output
+
+    def replay(self, template: _SegmentTemplate) -> ModuleExecutionResult:
+        """Instantiate a compiled segment at ``current_time`` instead of interpreting states."""
+
+        start = self.current_time
+        inherited_encounter_id = self.last_encounter_id
+        created: List[str] = []
+
+        def resolve(reference: _Reference) -> Any:
+            kind, value = reference
+            if kind == "entry":
+                return created[value]
+            if kind == "inherited":
+                return inherited_encounter_id
+            return value
+
+        indexes = {
+            "encounters": self.encounter_index,
+            "conditions": self.condition_index,
+            "medications": self.medication_index,
+            "care_plans": self.care_plan_index,
+        }
+        patient_id = self.patient["patient_id"]
+        for item in template.entries:
+            entry = dict(item.fields)
+            entry_id = str(uuid.uuid4())
+            entry[_ENTRY_ID_FIELDS[item.category]] = entry_id
+            entry["patient_id"] = patient_id
+            entry[_ENTRY_DATE_FIELDS[item.category]] = (start + item.offset).date().isoformat()
+            if item.encounter_ref is not None:
+                entry["encounter_id"] = resolve(item.encounter_ref)
+            if item.draw is not None:
+                value = round(random.uniform(*item.draw), 2)
+                entry["value"] = str(value)
+                entry["value_numeric"] = value
+            getattr(self.output, item.category).append(entry)
+            index = indexes.get(item.category)
+            if index is not None:
+                index[entry_id] = entry
+            created.append(entry_id)
+
+        for attribute, reference in template.attribute_writes:
+            self.attributes[attribute] = resolve(reference)
+        self.current_time = start + template.duration
+        self.last_encounter_id = resolve(template.last_encounter_ref)
+        self.visited = template.visited
         if self.attributes:
             self.output.attributes.update(self.attributes)
         return self.output
 
     # State execution helpers -------------------------------------------------
 
+    def _handle_state(self, state: ModuleState) -> None:
+        handler = getattr(self, f"_handle_{state.type}", None)
+        # Unknown state types are ignored but still follow transitions
+        if handler:
+            handler(state)
+
     def _execute_state(self, state: ModuleState) -> Optional[str]:
-        handler_name = f"_handle_{state.type}"
-        handler = getattr(self, handler_name, None)
-        if not handler:
-            # Unknown state types are ignored but still follow transitions
-            return self._choose_transition(state.transitions)
-        handler(state)
+        self._handle_state(state)
         return self._choose_transition(state.transitions)
 
+    def _execute_state_profiled(self, state: ModuleState) -> Optional[str]:
+        """:meth:`_execute_state` with handler and transition time reported to the profiler."""
+
+        profiler = self.engine.profiler
+        clock = time.perf_counter
+        profiler.enter_state(state)
+        started = clock()
+        self._handle_state(state)
+        handled = clock()
+        next_state = self._choose_transition(state.transitions)
+        profiler.exit_state(self.definition.name, state, handled - started, clock() - handled)
+        return next_state
+
     def _handle_start(self, _: ModuleState) -> None:
         # no-op; transitions dictate next state
         return None
@@ -680,11 +1253,9 @@ class _ModuleRunner:
         attach = bool(state.data.get("attach_to_last_encounter", False))
         for observation in state.data.get("observations", []):
             value = observation.get("value")
-            if value is None and "value_range" in observation:
-                bounds = observation["value_range"]
-                low = float(bounds.get("min", 0))
-                high = float(bounds.get("max", low + 1))
-                value = round(random.uniform(low, high), 2)
+            draw = _observation_draw_bounds(observation)
+            if draw is not None:
+                value = round(random.uniform(*draw), 2)
             entry = {
                 "observation_id": str(uuid.uuid4()),
                 "patient_id": self.patient["patient_id"],
@@ -706,9 +1277,7 @@ class _ModuleRunner:
         symptom_name = state.data.get("symptom") or state.data.get("name", "Symptom")
         value = state.data.get("value")
         if value is None:
-            value_range = state.data.get("range") or state.data.get("value_range") or {}
-            low = float(value_range.get("low", value_range.get("min", 0)))
-            high = float(value_range.get("high", value_range.get("max", low)))
+            low, high = _symptom_value_range(state.data)
             if high == low:
                 value = low
             else:
@@ -735,11 +1304,14 @@ class _ModuleRunner:
         if module_name in self.call_stack:
             return
         try:
+            # Check guardrails against the index before paying for a full load.
+            if not self.engine._name_is_eligible(
+                module_name, self.engine._patient_bucket(self.patient)
+            ):
+                return
             sub_definition = self.engine._get_or_load_definition(module_name)
         except (FileNotFoundError, ModuleValidationError):
             return
-        if not self.engine._module_is_eligible(sub_definition, self.patient):
-            return
 
         share_context = bool(state.data.get("share_context", True))
         share_conditions = bool(state.data.get("share_conditions", share_context))
@@ -770,7 +1342,14 @@ class _ModuleRunner:
         else:
             attribute_store = dict(seed_attributes)
 
-        sub_runner = _ModuleRunner(
+        inherited_encounter_id = self.last_encounter_id if inherit_last_encounter else None
+        segment_key = self.engine._segment_key(
+            sub_definition, self.patient, attribute_store, inherited_encounter_id
+        )
+        template = self.engine.segment_templates.get(segment_key) if segment_key else None
+        record = segment_key is not None and template is None
+        runner_class = _RecordingRunner if record else _ModuleRunner
+        sub_runner = runner_class(
             self.engine,
             sub_definition,
             self.patient,
@@ -780,10 +1359,16 @@ class _ModuleRunner:
             medication_index=self.medication_index if share_medications else None,
             care_plan_index=self.care_plan_index if share_care_plans else None,
             encounter_index=self.encounter_index if share_encounters else None,
-            last_encounter_id=self.last_encounter_id if inherit_last_encounter else None,
+            last_encounter_id=inherited_encounter_id,
             call_stack=self.call_stack,
         )
-        sub_result = sub_runner.run()
+        if template is not None:
+            sub_result = sub_runner.replay(template)
+            self.engine.segment_replays += 1
+        else:
+            sub_result = sub_runner.run()
+            if record and len(self.engine.segment_templates) < MAX_SEGMENT_TEMPLATES:
+                self.engine.segment_templates[segment_key] = sub_runner.compile_template()
         sub_result.replacements.update(
             self.engine.replace_categories.get(sub_definition.name, set())
         )
@@ -858,26 +1443,8 @@ class _ModuleRunner:
 
         probabilistic = [entry for entry in eligible if entry.get("probability") is not None]
         if probabilistic:
-            weights: List[float] = []
-            total = 0.0
-            for entry in probabilistic:
-                try:
-                    weight = max(float(entry.get("probability", 0.0)), 0.0)
-                except (TypeError, ValueError):
-                    weight = 0.0
-                weights.append(weight)
-                total += weight
-            if total <= 0:
-                target = probabilistic[-1].get("to")
-                return None if target == "end" else target
-            r = random.uniform(0.0, total)
-            upto = 0.0
-            for entry, weight in zip(probabilistic, weights):
-                upto += weight
-                if upto >= r:
-                    target = entry.get("to")
-                    return None if target == "end" else target
-            target = probabilistic[-1].get("to")
+            table = self.engine.transition_table(transitions, probabilistic)
+            target = table.draw() if table is not None else probabilistic[-1].get("to")
             return None if target == "end" else target
 
         target = eligible[0].get("to")
@@ -888,22 +1455,9 @@ class _ModuleRunner:
     def _evaluate_condition(self, condition: Dict[str, Any]) -> bool:
         if not isinstance(condition, dict):
             return False
-        condition_type = condition.get("condition_type") or condition.get("type")
-        if not condition_type:
-            if "attribute" in condition:
-                condition_type = "attribute"
-            elif "field" in condition or "demographic_field" in condition:
-                condition_type = "demographic"
-            elif "quantity" in condition or "unit" in condition:
-                condition_type = "age"
-            elif "probability" in condition or "p" in condition:
-                condition_type = "random"
-            elif "conditions" in condition:
-                # allow shorthand for logical groups
-                condition_type = "and"
+        condition_type = _condition_type(condition)
         if not condition_type:
             return False
-        condition_type = condition_type.lower()
 
         if condition_type == "attribute":
             attribute = condition.get("attribute")
@@ -997,3 +1551,78 @@ class _ModuleRunner:
         birthdate = datetime.strptime(self.patient["birthdate"], "%Y-%m-%d")
         delta = self.current_time - birthdate
         return delta.days / 365.0 if delta.days > 0 else 0.0
+
+
+class _RecordingRunner(_ModuleRunner):
+    """Interpret a memoizable submodule while capturing what each state emitted."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.start_time = self.current_time
+        self.inherited_encounter_id = self.last_encounter_id
+        self.initial_attributes = dict(self.attributes)
+        self.trace: List[Tuple[ModuleState, datetime, Dict[str, int]]] = []
+
+    def _output_sizes(self) -> Dict[str, int]:
+        return {category: len(getattr(self.output, category)) for category in _ENTRY_ID_FIELDS}
+
+    def _execute_state(self, state: ModuleState) -> Optional[str]:
+        self.trace.append((state, self.current_time, self._output_sizes()))
+        return super()._execute_state(state)
+
+    @staticmethod
+    def _state_draws(state: ModuleState) -> List[Optional[Tuple[float, float]]]:
+        if state.type == "observation":
+            return [_observation_draw_bounds(item) for item in state.data.get("observations", [])]
+        if state.type == "symptom" and state.data.get("value") is None:
+            low, high = _symptom_value_range(state.data)
+            return [None if high == low else (low, high)]
+        return []
+
+    def compile_template(self) -> _SegmentTemplate:
+        """Build a replayable template from the completed run; call before the caller mutates outputs."""
+
+        id_positions: Dict[str, int] = {}
+
+        def reference(value: Any, *, allow_inherited: bool = True) -> _Reference:
+            if isinstance(value, str) and value in id_positions:
+                return ("entry", id_positions[value])
+            if allow_inherited and value is not None and value == self.inherited_encounter_id:
+                return ("inherited", None)
+            return ("value", value)
+
+        entries: List[_TemplateEntry] = []
+        final_sizes = self._output_sizes()
+        for position, (state, emitted_at, sizes) in enumerate(self.trace):
+            next_sizes = self.trace[position + 1][2] if position + 1 < len(self.trace) else final_sizes
+            draws = self._state_draws(state)
+            offset = emitted_at - self.start_time
+            for category, id_field in _ENTRY_ID_FIELDS.items():
+                created = getattr(self.output, category)[sizes[category]:next_sizes[category]]
+                for slot, entry in enumerate(created):
+                    encounter_ref = None
+                    if category != "encounters" and "encounter_id" in entry:
+                        encounter_ref = reference(entry["encounter_id"])
+                    id_positions[entry[id_field]] = len(entries)
+                    entries.append(
+                        _TemplateEntry(
+                            category=category,
+                            fields=dict(entry),
+                            offset=offset,
+                            encounter_ref=encounter_ref,
+                            draw=draws[slot] if category == "observations" and slot < len(draws) else None,
+                        )
+                    )
+
+        attribute_writes = [
+            (attribute, reference(value, allow_inherited=False))
+            for attribute, value in self.attributes.items()
+            if attribute not in self.initial_attributes or self.initial_attributes[attribute] != value
+        ]
+        return _SegmentTemplate(
+            entries=entries,
+            attribute_writes=attribute_writes,
+            duration=self.current_time - self.start_time,
+            last_encounter_ref=reference(self.last_encounter_id),
+            visited=self.visited,
+        )
@@ -2,9 +2,11 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional
+from datetime import date
+from typing import Any, Dict, List, Mapping, Optional
 
 from .models import Patient as LifecyclePatient
+from .records import PatientRecord
 
 
 @dataclass
@@ -13,6 +15,8 @@ class LifecycleOrchestrator:
 
     scenario_name: str = "unspecified"
     scenario_details: Dict[str, Any] = field(default_factory=dict)
+    # Hold observations in an ObservationColumns store rather than one object per row.
+    columnar_observations: bool = False
 
     def build_patient(
         self,
@@ -31,11 +35,7 @@ class LifecycleOrchestrator:
     ) -> LifecyclePatient:
         """Assemble a `LifecyclePatient` enriched with scenario metadata."""
 
-        merged_metadata: Dict[str, Any] = dict(metadata or {})
-        merged_metadata.setdefault("scenario", self.scenario_name)
-        if self.scenario_details:
-            merged_metadata.setdefault("scenario_details", self.scenario_details)
-
+        merged_metadata = self._scenario_metadata(metadata)
         patient_payload = dict(patient)
         for summary_key in (
             "care_plan_total",
@@ -59,4 +59,50 @@ class LifecycleOrchestrator:
             family_history=family_history,
             death=death,
             metadata=merged_metadata,
+            columnar_observations=self.columnar_observations,
+        )
+
+    def build_from_record(
+        self,
+        record: PatientRecord,
+        *,
+        birth_date: date,
+        encounters: List[Dict[str, Any]],
+        conditions: List[Dict[str, Any]],
+        medications: List[Dict[str, Any]],
+        immunizations: List[Dict[str, Any]],
+        observations: List[Dict[str, Any]],
+        allergies: List[Dict[str, Any]],
+        procedures: List[Dict[str, Any]],
+        care_plans: List[Dict[str, Any]],
+        family_history: Optional[List[Dict[str, Any]]] = None,
+        death: Optional[Dict[str, Any]] = None,
+        dates: Optional[Mapping[str, date]] = None,
+    ) -> LifecyclePatient:
+        """Assemble a `LifecyclePatient` straight from the generation-time `PatientRecord`."""
+
+        metadata = self._scenario_metadata({**record.metadata, "care_plan_details": care_plans})
+        return LifecyclePatient.from_record(
+            record,
+            birth_date=birth_date,
+            encounters=encounters,
+            conditions=conditions,
+            medications=medications,
+            immunizations=immunizations,
+            observations=observations,
+            allergies=allergies,
+            procedures=procedures,
+            care_plans=care_plans,
+            family_history=family_history,
+            death=death,
+            metadata=metadata,
+            dates=dates or {},
+            columnar_observations=self.columnar_observations,
         )
+
+    def _scenario_metadata(self, metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        merged_metadata: Dict[str, Any] = dict(metadata or {})
+        merged_metadata.setdefault("scenario", self.scenario_name)
+        if self.scenario_details:
+            merged_metadata.setdefault("scenario_details", self.scenario_details)
+        return merged_metadata
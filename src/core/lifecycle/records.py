@@ -6,7 +6,27 @@ import random
 import uuid
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Mapping, Optional
+
+
+#: Generator-computed attributes persisted on ``PatientRecord.metadata`` and their defaults.
+GENERATED_METADATA_DEFAULTS: Dict[str, Any] = {
+    "sdoh_risk_score": 0.0,
+    "sdoh_risk_factors": [],
+    "community_deprivation_index": 0.0,
+    "access_to_care_score": 0.0,
+    "transportation_access": "",
+    "language_access_barrier": False,
+    "social_support_score": 0.0,
+    "sdoh_care_gaps": [],
+    "genetic_risk_score": 0.0,
+    "genetic_markers": [],
+    "precision_markers": [],
+    "comorbidity_profile": [],
+}
+
+#: Keys of ``care_plan_summary`` exported as ``care_plan_<key>`` metadata.
+CARE_PLAN_SUMMARY_FIELDS = ("total", "completed", "overdue", "scheduled", "in_progress")
 
 
 @dataclass
@@ -84,58 +104,114 @@ class PatientRecord:
             self.mrn = f"MRN{random.randint(100000, 999999)}"
         return self.mrn
 
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert to a dictionary for backward compatibility with CSV/Parquet exports."""
-
-        return {
-            "patient_id": self.patient_id,
-            "vista_id": self.vista_id,
-            "mrn": self.mrn,
-            "first_name": self.first_name,
-            "last_name": self.last_name,
-            "middle_name": self.middle_name,
-            "gender": self.gender,
-            "birthdate": self.birthdate,
-            "age": self.age,
-            "race": self.race,
-            "ethnicity": self.ethnicity,
-            "address": self.address,
-            "city": self.city,
-            "state": self.state,
-            "zip": self.zip,
-            "country": self.country,
-            "phone": self.phone,
-            "email": self.email,
-            "marital_status": self.marital_status,
-            "language": self.language,
-            "insurance": self.insurance,
-            "ssn": self.ssn,
-            "smoking_status": self.smoking_status,
-            "alcohol_use": self.alcohol_use,
-            "education": self.education,
-            "employment_status": self.employment_status,
-            "income": self.income,
-            "housing_status": self.housing_status,
-            "sdoh_risk_score": self.metadata.get("sdoh_risk_score", 0.0),
-            "sdoh_risk_factors": json.dumps(self.metadata.get("sdoh_risk_factors", [])),
-            "community_deprivation_index": self.metadata.get("community_deprivation_index", 0.0),
-            "access_to_care_score": self.metadata.get("access_to_care_score", 0.0),
-            "transportation_access": self.metadata.get("transportation_access", ""),
-            "language_access_barrier": self.metadata.get("language_access_barrier", False),
-            "social_support_score": self.metadata.get("social_support_score", 0.0),
-            "sdoh_care_gaps": json.dumps(self.metadata.get("sdoh_care_gaps", [])),
-            "genetic_risk_score": self.metadata.get("genetic_risk_score", 0.0),
-            "genetic_markers": json.dumps(self.metadata.get("genetic_markers", [])),
-            "precision_markers": json.dumps(self.metadata.get("precision_markers", [])),
-            "comorbidity_profile": json.dumps(self.metadata.get("comorbidity_profile", [])),
-            "care_plan_total": self.metadata.get("care_plan_total", 0),
-            "care_plan_completed": self.metadata.get("care_plan_completed", 0),
-            "care_plan_overdue": self.metadata.get("care_plan_overdue", 0),
-            "care_plan_scheduled": self.metadata.get("care_plan_scheduled", 0),
-            "deceased": self.metadata.get("deceased", False),
-            "death_date": (self.metadata.get("death_record", {}) or {}).get("death_date"),
-            "death_primary_cause": (self.metadata.get("death_record", {}) or {}).get("primary_cause_description"),
+    def update_from_generation(
+        self,
+        generated: Mapping[str, Any],
+        *,
+        death: Optional[Dict[str, Any]] = None,
+        family_history: Optional[List[Dict[str, Any]]] = None,
+        family_history_adjustments: Optional[Dict[str, float]] = None,
+    ) -> None:
+        """Persist the attributes the clinical generators wrote onto the working patient dict."""
+
+        metadata = self.metadata
+        for key, default in GENERATED_METADATA_DEFAULTS.items():
+            value = generated.get(key, default)
+            metadata[key] = list(value) if value is default and isinstance(default, list) else value
+        care_summary = generated.get("care_plan_summary") or {}
+        for key in CARE_PLAN_SUMMARY_FIELDS:
+            metadata[f"care_plan_{key}"] = care_summary.get(key, 0)
+        metadata["deceased"] = generated.get("deceased", False)
+        metadata["death_record"] = death
+        metadata["family_history_entries"] = family_history if family_history is not None else []
+        metadata["family_history_adjustments"] = family_history_adjustments or {}
+
+    def to_dict(self, *, encode_json: bool = True) -> Dict[str, Any]:
+        """Convert to a dictionary for backward compatibility with CSV/Parquet exports.
+
+        With ``encode_json=False`` list-valued metadata is left as Python lists;
+        that is the working dictionary the clinical generators enrich in place.
+        """
+
+        core = {name: getattr(self, name) for name in PATIENT_ROW_FIELDS}
+        return patient_export_row(core, self.metadata, encode_json=encode_json)
+
+
+#: Demographic columns leading the patient export row, in column order.
+PATIENT_ROW_FIELDS = (
+    "patient_id",
+    "vista_id",
+    "mrn",
+    "first_name",
+    "last_name",
+    "middle_name",
+    "gender",
+    "birthdate",
+    "age",
+    "race",
+    "ethnicity",
+    "address",
+    "city",
+    "state",
+    "zip",
+    "country",
+    "phone",
+    "email",
+    "marital_status",
+    "language",
+    "insurance",
+    "ssn",
+    "smoking_status",
+    "alcohol_use",
+    "education",
+    "employment_status",
+    "income",
+    "housing_status",
+)
+
+
+def patient_export_row(
+    core: Mapping[str, Any], metadata: Mapping[str, Any], *, encode_json: bool = True
+) -> Dict[str, Any]:
+    """Build the patient export row from ``PATIENT_ROW_FIELDS`` values and generated metadata."""
+
+    encode = json.dumps if encode_json else _identity
+    death_record = metadata.get("death_record", {}) or {}
+    row = {name: core.get(name) for name in PATIENT_ROW_FIELDS}
+    row.update(
+        {
+            "sdoh_risk_score": metadata.get("sdoh_risk_score", 0.0),
+            "sdoh_risk_factors": encode(metadata.get("sdoh_risk_factors", [])),
+            "community_deprivation_index": metadata.get("community_deprivation_index", 0.0),
+            "access_to_care_score": metadata.get("access_to_care_score", 0.0),
+            "transportation_access": metadata.get("transportation_access", ""),
+            "language_access_barrier": metadata.get("language_access_barrier", False),
+            "social_support_score": metadata.get("social_support_score", 0.0),
+            "sdoh_care_gaps": encode(metadata.get("sdoh_care_gaps", [])),
+            "genetic_risk_score": metadata.get("genetic_risk_score", 0.0),
+            "genetic_markers": encode(metadata.get("genetic_markers", [])),
+            "precision_markers": encode(metadata.get("precision_markers", [])),
+            "comorbidity_profile": encode(metadata.get("comorbidity_profile", [])),
+            "care_plan_total": metadata.get("care_plan_total", 0),
+            "care_plan_completed": metadata.get("care_plan_completed", 0),
+            "care_plan_overdue": metadata.get("care_plan_overdue", 0),
+            "care_plan_scheduled": metadata.get("care_plan_scheduled", 0),
+            "deceased": metadata.get("deceased", False),
+            "death_date": death_record.get("death_date"),
+            "death_primary_cause": death_record.get("primary_cause_description"),
         }
+    )
+    return row
+
+
+def _identity(value: Any) -> Any:
+    return value
 
 
-__all__ = ["PatientRecord"]
+__all__ = [
+    "PatientRecord",
+    "GENERATED_METADATA_DEFAULTS",
+    "CARE_PLAN_SUMMARY_FIELDS",
+    "PATIENT_ROW_FIELDS",
+    "patient_export_row",
+]
@@ -0,0 +1,286 @@
+"""MLLP transport for streaming HL7 v2 messages to an interface engine.
+
+Messages are framed per the Minimal Lower Layer Protocol (``<VT>message<FS><CR>``)
+and sent over ``connections`` persistent TCP connections, each waiting for the
+ACK of its current message before sending the next. ACKs are matched on
+MSA-2 (the message control id); ``AA``/``CA`` counts as accepted, any other
+acknowledgment code as a negative ACK. Transport errors and ACK timeouts are
+retried with exponential backoff on a fresh connection. An ACK for another
+control id fails the message without a resend, since the listener may already
+have taken it, and a refused connection aborts the run. Messages are pulled from
+the source iterable on the default executor, so generating them does not stall
+the event loop. An optional ``rate`` caps the aggregate send rate so feeds can
+be replayed at a realistic pace.
+
+:func:`serve_ack_listener` starts a minimal local listener that acknowledges
+every message, for load-testing without an interface engine.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+__all__ = [
+    "MLLPSender",
+    "SendResult",
+    "build_ack",
+    "frame_message",
+    "read_frame",
+    "send_messages",
+    "serve_ack_listener",
+]
+
+START_BLOCK = b"\x0b"
+END_BLOCK = b"\x1c\r"
+ACCEPT_CODES = frozenset({"AA", "CA"})
+
+
+def frame_message(message: str) -> bytes:
+    """Wrap an HL7 message (``\\r``-separated segments) in an MLLP block."""
+
+    return START_BLOCK + message.encode("utf-8") + END_BLOCK
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Optional[str]:
+    """Read one MLLP block; return ``None`` when the peer closes cleanly."""
+
+    try:
+        block = await reader.readuntil(END_BLOCK)
+    except asyncio.IncompleteReadError as exc:
+        if not exc.partial.strip():
+            return None
+        raise
+    start = block.find(START_BLOCK)
+    if start < 0:
+        raise ValueError("MLLP block without start byte")
+    return block[start + 1 : -len(END_BLOCK)].decode("utf-8")
+
+
+def _segment_fields(message: str, segment_id: str) -> List[str]:
+    for segment in message.split("\r"):
+        if segment.startswith(segment_id + "|"):
+            return segment.split("|")
+    return []
+
+
+def build_ack(message: str, code: str = "AA", text: str = "") -> str:
+    """Return the ACK for ``message`` with MSA-1 ``code`` and MSA-2 echoing MSH-10."""
+
+    msh = _segment_fields(message, "MSH")
+    control_id = msh[9] if len(msh) > 9 else ""
+    sending = msh[2:4] if len(msh) > 3 else ["", ""]
+    receiving = msh[4:6] if len(msh) > 5 else ["", ""]
+    version = msh[11] if len(msh) > 11 else "2.5"
+    timestamp = time.strftime("%Y%m%d%H%M%S")
+    header = "|".join(
+        ["MSH", "^~\\&", *receiving, *sending, timestamp, "", "ACK", f"ACK{control_id}", "P", version]
+    )
+    return f"{header}\rMSA|{code}|{control_id}" + (f"|{text}" if text else "")
+
+
+@dataclass
+class SendResult:
+    """Outcome of an MLLP send run."""
+
+    messages: int = 0
+    accepted: int = 0
+    rejected: int = 0
+    failed: int = 0
+    retries: int = 0
+    connections_opened: int = 0
+    elapsed_seconds: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def messages_per_second(self) -> float:
+        return self.accepted / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+
+class MLLPSender:
+    """Send HL7 messages over MLLP with ``connections`` concurrent connections."""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        *,
+        connections: int = 4,
+        timeout: float = 10.0,
+        max_retries: int = 3,
+        backoff: float = 0.2,
+        max_backoff: float = 10.0,
+        rate: Optional[float] = None,
+    ):
+        if connections < 1:
+            raise ValueError("connections must be at least 1")
+        if rate is not None and rate <= 0:
+            raise ValueError("rate must be positive")
+        self.host = host
+        self.port = port
+        self.connections = connections
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.rate = rate
+        self.result = SendResult()
+        self._next_slot = 0.0
+
+    async def _pace(self) -> None:
+        if self.rate is None:
+            return
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(self._next_slot, now)
+        self._next_slot = slot + 1.0 / self.rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _exchange(self, stream: List[Any], message: str) -> str:
+        if stream[0] is None:
+            stream[0], stream[1] = await asyncio.open_connection(self.host, self.port)
+            self.result.connections_opened += 1
+        reader, writer = stream
+        writer.write(frame_message(message))
+        await writer.drain()
+        ack = await read_frame(reader)
+        if ack is None:
+            raise ConnectionResetError("listener closed the connection before acknowledging")
+        return ack
+
+    async def _send(self, stream: List[Any], message: str) -> None:
+        msh = _segment_fields(message, "MSH")
+        control_id = msh[9] if len(msh) > 9 else ""
+        attempt = 0
+        while True:
+            try:
+                ack = await asyncio.wait_for(self._exchange(stream, message), self.timeout)
+                break
+            except ConnectionRefusedError:
+                _close(stream)
+                raise
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+                _close(stream)
+                if attempt >= self.max_retries:
+                    raise
+                self.result.retries += 1
+                delay = min(self.backoff * (2 ** attempt), self.max_backoff)
+                await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+                attempt += 1
+
+        msa = _segment_fields(ack, "MSA")
+        if len(msa) < 3 or msa[2] != control_id:
+            # The listener did answer, so a resend could deliver the message twice.
+            _close(stream)
+            raise ValueError(f"ACK does not acknowledge control id {control_id!r}")
+        if msa[1] in ACCEPT_CODES:
+            self.result.accepted += 1
+        else:
+            self.result.rejected += 1
+            detail = msa[3] if len(msa) > 3 else ""
+            self.result.errors.append(f"{control_id}: {msa[1]} {detail}".rstrip())
+
+    async def _worker(self, queue: "asyncio.Queue[Optional[str]]") -> None:
+        stream: List[Any] = [None, None]
+        try:
+            while True:
+                message = await queue.get()
+                if message is None:
+                    return
+                await self._pace()
+                try:
+                    await self._send(stream, message)
+                except ConnectionRefusedError:
+                    raise
+                except Exception as exc:  # keep draining the feed
+                    self.result.failed += 1
+                    self.result.errors.append(str(exc) or exc.__class__.__name__)
+        finally:
+            _close(stream)
+
+    async def _feed(self, messages: Iterator[str], queue: "asyncio.Queue[Optional[str]]") -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await loop.run_in_executor(None, _take, messages, queue.maxsize)
+            if not batch:
+                break
+            for message in batch:
+                self.result.messages += 1
+                await queue.put(message)
+        for _ in range(self.connections):
+            await queue.put(None)
+
+    async def send(self, messages: Iterable[str]) -> SendResult:
+        """Send every message (consumed lazily) and return the aggregated result.
+
+        Raises :class:`ConnectionRefusedError` as soon as the listener refuses a
+        connection instead of retrying every message against it.
+        """
+
+        self.result = SendResult()
+        self._next_slot = 0.0
+        queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue(maxsize=self.connections * 2)
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(self._feed(iter(messages), queue))]
+        tasks.extend(asyncio.create_task(self._worker(queue)) for _ in range(self.connections))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+        self.result.elapsed_seconds = time.perf_counter() - started
+        return self.result
+
+
+def _take(messages: Iterator[str], count: int) -> List[str]:
+    return list(islice(messages, count))
+
+
+def _close(stream: List[Any]) -> None:
+    if stream[1] is not None:
+        stream[1].close()
+    stream[0] = stream[1] = None
+
+
+def send_messages(host: str, port: int, messages: Iterable[str], **options: Any) -> SendResult:
+    """Synchronous wrapper around :meth:`MLLPSender.send`."""
+
+    return asyncio.run(MLLPSender(host, port, **options).send(messages))
+
+
+async def serve_ack_listener(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    respond: Optional[Callable[[str], Optional[str]]] = None,
+) -> asyncio.AbstractServer:
+    """Start an MLLP listener that answers each message with ``respond(message)``.
+
+    ``respond`` defaults to an ``AA`` acknowledgment; returning ``None`` drops
+    the connection without acknowledging. The bound port is available from
+    ``server.sockets[0].getsockname()[1]``.
+    """
+
+    respond = respond or build_ack
+
+    async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                message = await read_frame(reader)
+                if message is None:
+                    break
+                ack = respond(message)
+                if ack is None:
+                    break
+                writer.write(frame_message(ack))
+                await writer.drain()
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(_handle, host, port)
@@ -11,7 +11,7 @@ from __future__ import annotations
 import os
 from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Iterable
+from typing import Any, Dict, Iterable, List
 
 import yaml
 
@@ -27,6 +27,15 @@ def _parameter_root() -> Path:
     return DEFAULT_PARAMETER_ROOT
 
 
+def parameter_domain_paths() -> List[Path]:
+    """Return the sorted list of parameter domain YAML files under the active root."""
+
+    root = _parameter_root()
+    if not root.is_dir():
+        return []
+    return sorted(root.glob("*.yaml"))
+
+
 @lru_cache(maxsize=32)
 def load_parameter_domain(domain: str) -> Dict[str, Any]:
     """Load and cache a parameter domain (e.g., ``asthma``).
@@ -2,6 +2,7 @@ import polars as pl
 from faker import Faker
 import random
 import concurrent.futures
+import heapq
 import sys
 import argparse
 import os
@@ -12,11 +13,15 @@ from datetime import date, datetime, timedelta
 import uuid
 import math
 from collections import defaultdict, Counter
-from functools import partial
+from dataclasses import dataclass, field
+from functools import lru_cache, partial
+from operator import attrgetter
 from pathlib import Path
-from typing import List, Dict, Optional, Any, Tuple, Union, Iterable, Callable, Set
+from typing import List, Dict, Optional, Any, Tuple, Union, Iterable, Iterator, Callable, NamedTuple, Sequence, Set
 from tqdm import tqdm
 
+from .fhir_templates import SLOT, ResourceTemplate, coded_concept, encode_resource
+from .mllp import send_messages
 from .terminology_catalogs import LAB_CODES
 from .lifecycle import (
     Patient as LifecyclePatient,
@@ -50,16 +55,19 @@ from .lifecycle.generation.clinical import (
     CONDITION_CATALOG,
     MEDICATION_CATALOG,
     IMMUNIZATION_CATALOG,
+    CarePlanIndex,
+    EncounterTimeline,
+    flatten_care_plan_fields,
     generate_allergies,
     plan_allergy_followups,
     generate_care_plans,
     generate_conditions,
-    generate_death,
+    generate_deaths_batch,
     generate_encounters,
-    generate_family_history,
-    generate_immunizations,
+    generate_family_history_batch,
+    generate_immunizations_batch,
     generate_medications,
-    generate_observations,
+    generate_observations_batch,
     generate_procedures,
     assign_conditions,
     parse_distribution,
@@ -70,10 +78,9 @@ from .lifecycle.orchestrator import LifecycleOrchestrator
 from .lifecycle.scenarios import list_scenarios
 from .terminology import (
     TerminologyEntry,
+    TerminologyService,
     ValueSetMember,
     UmlsConcept,
-    load_loinc_labs,
-    load_rxnorm_medications,
 )
 from .lifecycle.modules import ModuleEngine, ModuleExecutionResult
 
@@ -186,8 +193,228 @@ def build_terminology_lookup(
     return lookup
 
 
+OBSERVATION_ENRICHMENT_COLUMNS = ("loinc_display", "loinc_ncbi_url", "value_set_oids", "value_set_names")
+MEDICATION_ENRICHMENT_COLUMNS = ("rxnorm_display", "ndc_example", "umls_cuis", "umls_semantic_types")
+
+
+def _joined_distinct(values: Iterable[Optional[str]]) -> Optional[str]:
+    distinct = sorted({value for value in values if value})
+    return ",".join(distinct) if distinct else None
+
+
+def build_enrichment_frames(
+    terminology_lookup: Dict[str, Dict[str, TerminologyEntry]],
+) -> Dict[str, pl.DataFrame]:
+    """Collapse the terminology lookup into one enrichment row per distinct code.
+
+    Returns ``{"observations": ..., "medications": ...}`` frames keyed by a
+    ``code`` column: LOINC display/NCBI URL plus the aggregated VSAC value set
+    OIDs and names for observations, RxNorm display/NDC example plus the
+    aggregated UMLS CUIs and semantic types for medications.
+    """
+
+    rows: Dict[str, Dict[str, Dict[str, Optional[str]]]] = {"observations": {}, "medications": {}}
+
+    for code, entry in terminology_lookup.get("loinc", {}).items():
+        rows["observations"].setdefault(str(code), {}).update(
+            loinc_display=entry.display,
+            loinc_ncbi_url=entry.metadata.get("ncbi_url") or None,
+        )
+    vsac_by_code: Dict[str, List[TerminologyEntry]] = {}
+    for entry in terminology_lookup.get("vsac", {}).values():
+        vsac_by_code.setdefault(str(entry.code), []).append(entry)
+    for code, entries in vsac_by_code.items():
+        oids = _joined_distinct(entry.metadata.get("value_set_oid") for entry in entries)
+        if oids:
+            rows["observations"].setdefault(code, {}).update(
+                value_set_oids=oids,
+                value_set_names=_joined_distinct(entry.metadata.get("value_set_name") for entry in entries),
+            )
+
+    for code, entry in terminology_lookup.get("rxnorm", {}).items():
+        rows["medications"].setdefault(str(code), {}).update(
+            rxnorm_display=entry.display,
+            ndc_example=entry.metadata.get("ndc_example") or None,
+        )
+    umls_by_code: Dict[str, List[TerminologyEntry]] = {}
+    for entry in terminology_lookup.get("umls", {}).values():
+        sab = entry.metadata.get("sab")
+        source_code = entry.metadata.get("code")
+        if sab and source_code and sab.upper() == "RXNORM":
+            umls_by_code.setdefault(str(source_code), []).append(entry)
+    for code, entries in umls_by_code.items():
+        rows["medications"].setdefault(code, {}).update(
+            umls_cuis=_joined_distinct(entry.code for entry in entries),
+            umls_semantic_types=_joined_distinct(entry.metadata.get("semantic_type") for entry in entries),
+        )
+
+    frames: Dict[str, pl.DataFrame] = {}
+    for table, columns in (
+        ("observations", OBSERVATION_ENRICHMENT_COLUMNS),
+        ("medications", MEDICATION_ENRICHMENT_COLUMNS),
+    ):
+        frames[table] = pl.DataFrame(
+            [
+                {"code": code, **{column: values.get(column) for column in columns}}
+                for code, values in rows[table].items()
+            ],
+            schema={"code": pl.Utf8, **{column: pl.Utf8 for column in columns}},
+        )
+    return frames
+
+
+def enrich_event_frame(
+    frame: pl.DataFrame,
+    enrichment: pl.DataFrame,
+    code_columns: Sequence[str],
+    *,
+    overwrite: Sequence[str] = (),
+) -> pl.DataFrame:
+    """Left-join per-code ``enrichment`` columns onto an event table.
+
+    The join key is the first non-empty value among ``code_columns``. Existing
+    values win unless the column is listed in ``overwrite``, and enrichment
+    columns that match no row are left out so tables only gain columns they use.
+    The frame keeps its own column order; new enrichment columns are appended.
+    """
+
+    present = [column for column in code_columns if column in frame.columns]
+    if frame.is_empty() or enrichment.is_empty() or not present:
+        return frame
+
+    def _non_empty(column: str) -> pl.Expr:
+        value = pl.col(column).cast(pl.Utf8)
+        return pl.when(value != "").then(value)
+
+    key = "__enrichment_code"
+    joined = frame.with_columns(pl.coalesce([_non_empty(column) for column in present]).alias(key)).join(
+        enrichment.rename({"code": key}), on=key, how="left", maintain_order="left", suffix="__enriched"
+    )
+    updates: List[pl.Expr] = []
+    drop = [key]
+    for column in enrichment.columns:
+        if column == "code":
+            continue
+        if column in frame.columns:
+            enriched = f"{column}__enriched"
+            existing = pl.col(column).cast(pl.Utf8)
+            ordered = [pl.col(enriched), existing] if column in overwrite else [existing, pl.col(enriched)]
+            updates.append(pl.coalesce(ordered).alias(column))
+            drop.append(enriched)
+        elif joined.get_column(column).null_count() == joined.height:
+            drop.append(column)
+    return joined.with_columns(updates).drop(drop)
+
+
 TERMINOLOGY_MAPPINGS = build_default_terminology_mappings()
 
+NCBI_EXTENSION_URL = "https://www.ncbi.nlm.nih.gov/"
+UMLS_CONCEPT_EXTENSION_URL = "http://example.org/fhir/StructureDefinition/umls-concept"
+
+
+@lru_cache(maxsize=None)
+def _coding_system_keys(system: str) -> Tuple[Optional[str], Optional[str]]:
+    """Return the terminology lookup key and UMLS source (SAB) for a coding system URL."""
+
+    if system.endswith("icd-10-cm"):
+        lookup_key: Optional[str] = "icd10"
+    elif "snomed" in system:
+        lookup_key = "snomed"
+    else:
+        lookup_key = None
+    if "icd-10" in system:
+        sab: Optional[str] = "ICD10CM"
+    elif "snomed" in system:
+        sab = "SNOMEDCT_US"
+    else:
+        sab = None
+    return lookup_key, sab
+
+
+IDENTIFIER_TYPE_SYSTEM = "http://terminology.hl7.org/CodeSystem/v2-0203"
+PROBLEM_LIST_CATEGORY = coded_concept(
+    "http://terminology.hl7.org/CodeSystem/condition-category",
+    "problem-list-item",
+    "Problem List Item",
+)
+
+PATIENT_TEMPLATE = ResourceTemplate(
+    "Patient",
+    [
+        ("id", SLOT),
+        ("identifier", SLOT),
+        ("active", SLOT),
+        ("telecom", SLOT),
+        ("name", SLOT),
+        ("gender", SLOT),
+        ("birthDate", SLOT),
+        ("address", SLOT),
+    ],
+)
+CONDITION_TEMPLATE = ResourceTemplate(
+    "Condition",
+    [
+        ("id", SLOT),
+        ("subject", SLOT),
+        ("code", SLOT),
+        ("clinicalStatus", SLOT),
+        (
+            "verificationStatus",
+            coded_concept("http://terminology.hl7.org/CodeSystem/condition-ver-status", "confirmed"),
+        ),
+        ("onsetDateTime", SLOT),
+        ("category", SLOT),
+    ],
+)
+ALLERGY_INTOLERANCE_TEMPLATE = ResourceTemplate(
+    "AllergyIntolerance",
+    [
+        ("id", SLOT),
+        ("patient", SLOT),
+        ("code", SLOT),
+        (
+            "clinicalStatus",
+            coded_concept("http://terminology.hl7.org/CodeSystem/allergyintolerance-clinical", "active"),
+        ),
+        (
+            "verificationStatus",
+            coded_concept("http://terminology.hl7.org/CodeSystem/allergyintolerance-verification", "confirmed"),
+        ),
+        ("reaction", SLOT),
+        ("type", "allergy"),
+    ],
+)
+MEDICATION_STATEMENT_TEMPLATE = ResourceTemplate(
+    "MedicationStatement",
+    [("id", SLOT), ("status", SLOT), ("medicationCodeableConcept", SLOT), ("subject", SLOT)],
+)
+IMMUNIZATION_TEMPLATE = ResourceTemplate(
+    "Immunization",
+    [
+        ("id", SLOT),
+        ("status", SLOT),
+        ("vaccineCode", SLOT),
+        ("patient", SLOT),
+        ("occurrenceDateTime", SLOT),
+        ("primarySource", True),
+    ],
+)
+OBSERVATION_TEMPLATE = ResourceTemplate(
+    "Observation",
+    [("id", SLOT), ("status", SLOT), ("code", SLOT), ("subject", SLOT)],
+)
+FAMILY_MEMBER_HISTORY_TEMPLATE = ResourceTemplate(
+    "FamilyMemberHistory",
+    [
+        ("id", SLOT),
+        ("status", "completed"),
+        ("patient", SLOT),
+        ("date", SLOT),
+        ("name", SLOT),
+        ("relationship", SLOT),
+    ],
+)
+
 # Migration Simulation Classes
 
 class FHIRFormatter:
@@ -212,6 +439,20 @@ class FHIRFormatter:
             key = (sab.upper(), source_code)
             self.umls_by_source.setdefault(key, []).append(entry)
 
+        self._coding_cache: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+        self.coding_cache_hits = 0
+        self.coding_cache_misses = 0
+
+    def _emit(
+        self,
+        template: ResourceTemplate,
+        values: Dict[str, Any],
+        extras: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Materialize a templated resource; subclasses may emit another representation."""
+
+        return template.build(values, extras)
+
     def create_patient_resource(self, patient_record: Union[PatientRecord, LifecyclePatient]) -> Dict[str, Any]:
         """Create basic FHIR R4 Patient resource"""
 
@@ -237,9 +478,7 @@ class FHIRFormatter:
         identifiers_payload = [
             {
                 "use": "usual",
-                "type": {
-                    "coding": [{"system": "http://terminology.hl7.org/CodeSystem/v2-0203", "code": "MR"}]
-                },
+                "type": coded_concept(IDENTIFIER_TYPE_SYSTEM, "MR"),
                 "value": mrn,
             }
         ]
@@ -247,9 +486,7 @@ class FHIRFormatter:
             identifiers_payload.append(
                 {
                     "use": "official",
-                    "type": {
-                        "coding": [{"system": "http://terminology.hl7.org/CodeSystem/v2-0203", "code": "SS"}]
-                    },
+                    "type": coded_concept(IDENTIFIER_TYPE_SYSTEM, "SS"),
                     "system": "http://hl7.org/fhir/sid/us-ssn",
                     "value": ssn,
                 }
@@ -280,8 +517,7 @@ class FHIRFormatter:
                     }
                 )
 
-        resource = {
-            "resourceType": "Patient",
+        values = {
             "id": patient_record.patient_id,
             "identifier": identifiers_payload,
             "active": True,
@@ -297,6 +533,7 @@ class FHIRFormatter:
             "birthDate": birthdate,
             "address": address_payload,
         }
+        extras: Dict[str, Any] = {}
 
         if death_record:
             if isinstance(death_record, dict):
@@ -304,10 +541,10 @@ class FHIRFormatter:
             else:
                 death_date_value = death_record.death_date.isoformat() if death_record.death_date else None
             if death_date_value:
-                resource["deceasedDateTime"] = death_date_value
-                resource["active"] = False
+                extras["deceasedDateTime"] = death_date_value
+                values["active"] = False
 
-        return resource
+        return self._emit(PATIENT_TEMPLATE, values, extras)
     
     def create_condition_resource(
         self,
@@ -347,29 +584,14 @@ class FHIRFormatter:
                 }
             )
 
-        resource: Dict[str, Any] = {
-            "resourceType": "Condition",
+        values: Dict[str, Any] = {
             "id": condition_id,
             "subject": {"reference": f"Patient/{patient_id}"},
             "code": {"coding": coding},
-            "clinicalStatus": {
-                "coding": [
-                    {
-                        "system": "http://terminology.hl7.org/CodeSystem/condition-clinical",
-                        "code": status,
-                    }
-                ]
-            },
-            "verificationStatus": {
-                "coding": [
-                    {
-                        "system": "http://terminology.hl7.org/CodeSystem/condition-ver-status",
-                        "code": "confirmed",
-                    }
-                ]
-            },
+            "clinicalStatus": coded_concept("http://terminology.hl7.org/CodeSystem/condition-clinical", status),
             "onsetDateTime": onset_date,
         }
+        extras: Dict[str, Any] = {}
 
         def _as_dict(value: Any) -> Optional[Dict[str, Any]]:
             if value is None or value == "":
@@ -399,18 +621,15 @@ class FHIRFormatter:
         elif isinstance(condition, dict):
             category_text = condition.get("condition_category")
 
-        category_entry: Dict[str, Any] = {
-            "coding": [
+        if category_text:
+            values["category"] = [
                 {
-                    "system": "http://terminology.hl7.org/CodeSystem/condition-category",
-                    "code": "problem-list-item",
-                    "display": "Problem List Item",
+                    "coding": PROBLEM_LIST_CATEGORY["coding"],
+                    "text": str(category_text).replace("_", " ").title(),
                 }
             ]
-        }
-        if category_text:
-            category_entry["text"] = str(category_text).replace("_", " ").title()
-        resource.setdefault("category", []).append(category_entry)
+        else:
+            values["category"] = [PROBLEM_LIST_CATEGORY]
 
         if stage_detail:
             stage_entry: Dict[str, Any] = {}
@@ -435,7 +654,7 @@ class FHIRFormatter:
                 stage_entry["type"] = {"text": stage_type.replace("_", " ").title()}
 
             if stage_entry:
-                resource.setdefault("stage", []).append(stage_entry)
+                extras["stage"] = [stage_entry]
 
         if severity_detail:
             severity_coding: Dict[str, Any] = {}
@@ -450,63 +669,104 @@ class FHIRFormatter:
                 severity_coding["display"] = severity_display
 
             if severity_coding:
-                resource["severity"] = {"coding": [severity_coding]}
+                extras["severity"] = {"coding": [severity_coding]}
             elif severity_display:
-                resource["severity"] = {"text": severity_display}
+                extras["severity"] = {"text": severity_display}
 
-        return resource
+        return self._emit(CONDITION_TEMPLATE, values, extras)
+
+    def coding_cache_stats(self) -> Dict[str, float]:
+        """Report how often coded elements were served from the coding cache."""
+
+        lookups = self.coding_cache_hits + self.coding_cache_misses
+        return {
+            "hits": self.coding_cache_hits,
+            "misses": self.coding_cache_misses,
+            "size": len(self._coding_cache),
+            "hit_rate": self.coding_cache_hits / lookups if lookups else 0.0,
+        }
+
+    def _cached_coding(self, key: Tuple[Any, ...], build: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Return the coding fragment for ``key``, building it on first use.
+
+        Fragments are shared between resources and only ever serialized, so
+        callers must treat them as read-only.
+        """
+
+        coding = self._coding_cache.get(key)
+        if coding is None:
+            self.coding_cache_misses += 1
+            coding = self._coding_cache[key] = build()
+        else:
+            self.coding_cache_hits += 1
+        return coding
+
+    def _umls_extensions(self, sab: str, code: str) -> List[Dict[str, Any]]:
+        return [
+            {
+                "url": UMLS_CONCEPT_EXTENSION_URL,
+                "extension": [
+                    {"url": "cui", "valueCode": concept.code},
+                    {"url": "preferredName", "valueString": concept.display},
+                    {
+                        "url": "semanticType",
+                        "valueString": concept.metadata.get("semantic_type", ""),
+                    },
+                ],
+            }
+            for concept in self.umls_by_source.get((sab, code), [])
+        ]
 
     def _build_coding(self, system: str, code: Optional[str], display: str) -> Dict[str, Any]:
-        coding_entry = {
+        if not code:
+            return {"system": system, "code": code, "display": display}
+        return self._cached_coding((system, code, display), partial(self._compose_coding, system, code, display))
+
+    def _compose_coding(self, system: str, code: str, display: str) -> Dict[str, Any]:
+        coding_entry: Dict[str, Any] = {
             "system": system,
             "code": code,
             "display": display,
         }
-        if not code:
+        lookup_key, sab = _coding_system_keys(system)
+        extensions: List[Dict[str, Any]] = []
+        entry = self.terminology_lookup.get(lookup_key, {}).get(code) if lookup_key else None
+        if entry is not None and entry.metadata.get("ncbi_url"):
+            extensions.append({"url": NCBI_EXTENSION_URL, "valueUri": entry.metadata["ncbi_url"]})
+        if sab:
+            extensions.extend(self._umls_extensions(sab, code))
+        if extensions:
+            coding_entry["extension"] = extensions
+        return coding_entry
+
+    def _rxnorm_coding(self, rxnorm_code: str, fallback_display: str) -> Dict[str, Any]:
+        def _build() -> Dict[str, Any]:
+            rxnorm_entry = self.rxnorm_lookup.get(rxnorm_code)
+            coding_entry: Dict[str, Any] = {
+                "system": "http://www.nlm.nih.gov/research/umls/rxnorm",
+                "code": rxnorm_code,
+                "display": rxnorm_entry.display if rxnorm_entry else fallback_display,
+            }
+            umls_extensions = self._umls_extensions("RXNORM", rxnorm_code)
+            if umls_extensions:
+                coding_entry["extension"] = umls_extensions
             return coding_entry
 
-        lookup_key = None
-        if system.endswith("icd-10-cm"):
-            lookup_key = "icd10"
-        elif "snomed" in system:
-            lookup_key = "snomed"
-
-        def _system_to_sab(value: str) -> Optional[str]:
-            if "icd-10" in value:
-                return "ICD10CM"
-            if "snomed" in value:
-                return "SNOMEDCT_US"
-            return None
+        return self._cached_coding(("rxnorm", rxnorm_code, fallback_display), _build)
 
-        if lookup_key and code in self.terminology_lookup.get(lookup_key, {}):
-            entry = self.terminology_lookup[lookup_key][code]
-            ncbi_url = entry.metadata.get("ncbi_url")
-            if ncbi_url:
-                coding_entry.setdefault("extension", []).append(
-                    {
-                        "url": "https://www.ncbi.nlm.nih.gov/",
-                        "valueUri": ncbi_url,
-                    }
-                )
+    def _loinc_coding(self, loinc_code: Optional[str], fallback_display: str) -> Dict[str, Any]:
+        def _build() -> Dict[str, Any]:
+            loinc_entry = self.loinc_lookup.get(str(loinc_code)) if loinc_code else None
+            coding_entry: Dict[str, Any] = {
+                "system": "http://loinc.org" if loinc_code else "http://terminology.hl7.org/CodeSystem/data-absent-reason",
+                "code": loinc_code or "unknown",
+                "display": loinc_entry.display if loinc_entry else fallback_display,
+            }
+            if loinc_entry and loinc_entry.metadata.get("ncbi_url"):
+                coding_entry["extension"] = [{"url": NCBI_EXTENSION_URL, "valueUri": loinc_entry.metadata["ncbi_url"]}]
+            return coding_entry
 
-        sab = _system_to_sab(system)
-        if sab:
-            for concept in self.umls_by_source.get((sab, code), []):
-                extensions = coding_entry.setdefault("extension", [])
-                extensions.append(
-                    {
-                        "url": "http://example.org/fhir/StructureDefinition/umls-concept",
-                        "extension": [
-                            {"url": "cui", "valueCode": concept.code},
-                            {"url": "preferredName", "valueString": concept.display},
-                            {
-                                "url": "semanticType",
-                                "valueString": concept.metadata.get("semantic_type", ""),
-                            },
-                        ],
-                    }
-                )
-        return coding_entry
+        return self._cached_coding(("loinc", loinc_code, fallback_display), _build)
 
     def create_allergy_intolerance_resource(
         self,
@@ -588,23 +848,6 @@ class FHIRFormatter:
         if severity:
             reaction_entry["severity"] = severity.lower()
 
-        clinical_status = {
-            "coding": [
-                {
-                    "system": "http://terminology.hl7.org/CodeSystem/allergyintolerance-clinical",
-                    "code": "active",
-                }
-            ]
-        }
-        verification_status = {
-            "coding": [
-                {
-                    "system": "http://terminology.hl7.org/CodeSystem/allergyintolerance-verification",
-                    "code": "confirmed",
-                }
-            ]
-        }
-
         severity_code = allergy.get("severity_code")
         severity_system = allergy.get("severity_system", "http://snomed.info/sct")
         criticality = None
@@ -615,29 +858,26 @@ class FHIRFormatter:
             elif severity_lower in {"moderate", "mild"}:
                 criticality = "low"
 
-        resource: Dict[str, Any] = {
-            "resourceType": "AllergyIntolerance",
+        values = {
             "id": allergy_id,
             "patient": {"reference": f"Patient/{patient_id}"},
             "code": {
                 "coding": substance_coding,
                 "text": substance_display,
             },
-            "clinicalStatus": clinical_status,
-            "verificationStatus": verification_status,
             "reaction": [reaction_entry],
         }
-
-        resource["type"] = "allergy"
+        extras: Dict[str, Any] = {}
 
         recorded_date = allergy.get("recorded_date")
         if recorded_date:
-            resource["recordedDate"] = recorded_date
+            extras["recordedDate"] = recorded_date
         if category_value:
-            resource["category"] = [category_value]
+            extras["category"] = [category_value]
         if criticality:
-            resource["criticality"] = criticality
-        extensions = resource.setdefault("extension", [])
+            extras["criticality"] = criticality
+        extensions: List[Dict[str, Any]] = []
+        extras["extension"] = extensions
         if severity_code:
             extensions.append(
                 {
@@ -671,9 +911,9 @@ class FHIRFormatter:
             )
         followup_summary = allergy.get("followup_summary")
         if followup_summary:
-            resource.setdefault("note", []).append({"text": followup_summary})
+            extras["note"] = [{"text": followup_summary}]
 
-        return resource
+        return self._emit(ALLERGY_INTOLERANCE_TEMPLATE, values, extras)
 
     def create_medication_statement_resource(
         self,
@@ -713,32 +953,7 @@ class FHIRFormatter:
 
         medication_coding: List[Dict[str, Any]] = []
         if rxnorm_code:
-            rxnorm_entry = self.rxnorm_lookup.get(str(rxnorm_code))
-            display = rxnorm_entry.display if rxnorm_entry else medication_name
-            coding_entry = {
-                "system": "http://www.nlm.nih.gov/research/umls/rxnorm",
-                "code": str(rxnorm_code),
-                "display": display,
-            }
-            umls_concepts = self.umls_by_source.get(("RXNORM", str(rxnorm_code)), [])
-            if umls_concepts:
-                coding_entry.setdefault("extension", []).extend(
-                    [
-                        {
-                            "url": "http://example.org/fhir/StructureDefinition/umls-concept",
-                            "extension": [
-                                {"url": "cui", "valueCode": concept.code},
-                                {"url": "preferredName", "valueString": concept.display},
-                                {
-                                    "url": "semanticType",
-                                    "valueString": concept.metadata.get("semantic_type", ""),
-                                },
-                            ],
-                        }
-                        for concept in umls_concepts
-                    ]
-                )
-            medication_coding.append(coding_entry)
+            medication_coding.append(self._rxnorm_coding(str(rxnorm_code), medication_name))
 
         medication_codeable = (
             {"coding": medication_coding}
@@ -752,21 +967,21 @@ class FHIRFormatter:
         else:
             status = medication.get("status") or ("completed" if medication.get("end_date") else "active")
 
-        resource: Dict[str, Any] = {
-            "resourceType": "MedicationStatement",
+        values = {
             "id": medication_id,
             "status": status,
             "medicationCodeableConcept": medication_codeable,
             "subject": {"reference": f"Patient/{patient_id}"},
         }
+        extras: Dict[str, Any] = {}
 
         if end_iso:
-            resource["effectivePeriod"] = {
+            extras["effectivePeriod"] = {
                 "start": start_iso,
                 "end": end_iso,
             }
         else:
-            resource["effectiveDateTime"] = start_iso
+            extras["effectiveDateTime"] = start_iso
 
         reason = None
         if isinstance(medication, LifecycleMedicationOrder):
@@ -774,7 +989,7 @@ class FHIRFormatter:
         else:
             reason = medication.get("indication")
         if reason:
-            resource["reasonCode"] = [{"text": reason}]
+            extras["reasonCode"] = [{"text": reason}]
 
         therapeutic_class = None
         route = None
@@ -808,7 +1023,7 @@ class FHIRFormatter:
                 }
             )
         if extensions:
-            resource.setdefault("extension", []).extend(extensions)
+            extras["extension"] = extensions
 
         dosage_entry: Dict[str, Any] = {}
         dosage_text = None
@@ -821,9 +1036,9 @@ class FHIRFormatter:
         if route:
             dosage_entry["route"] = {"text": route}
         if dosage_entry:
-            resource["dosage"] = [dosage_entry]
+            extras["dosage"] = [dosage_entry]
 
-        return resource
+        return self._emit(MEDICATION_STATEMENT_TEMPLATE, values, extras)
 
     def create_immunization_resource(
         self,
@@ -920,24 +1135,23 @@ class FHIRFormatter:
                 "text": site_text.title(),
             }
 
-        resource: Dict[str, Any] = {
-            "resourceType": "Immunization",
+        values = {
             "id": metadata.get("immunization_id", str(uuid.uuid4())),
             "status": metadata.get("status", "completed"),
             "vaccineCode": {"coding": coding, "text": vaccine_name},
             "patient": {"reference": f"Patient/{patient_id}"},
             "occurrenceDateTime": occurrence,
-            "primarySource": True,
         }
+        extras: Dict[str, Any] = {}
 
         if lot_number:
-            resource["lotNumber"] = lot_number
+            extras["lotNumber"] = lot_number
         if performer:
-            resource["performer"] = [{"actor": {"display": performer}}]
+            extras["performer"] = [{"actor": {"display": performer}}]
         if route_element:
-            resource["route"] = route_element
+            extras["route"] = route_element
         if site_element:
-            resource["site"] = site_element
+            extras["site"] = site_element
 
         dose_number = metadata.get("dose_number")
         series_total = metadata.get("series_total")
@@ -950,9 +1164,9 @@ class FHIRFormatter:
                 protocol_entry["doseNumberPositiveInt"] = int(dose_number)
             if series_total:
                 protocol_entry["seriesDosesPositiveInt"] = int(series_total)
-            resource["protocolApplied"] = [protocol_entry]
+            extras["protocolApplied"] = [protocol_entry]
 
-        return resource
+        return self._emit(IMMUNIZATION_TEMPLATE, values, extras)
 
     def create_care_plan_resource(
         self,
@@ -1092,33 +1306,18 @@ class FHIRFormatter:
             status = "final"
 
         loinc_code = observation.metadata.get("loinc_code") or observation.metadata.get("loinc")
-        loinc_entry = self.loinc_lookup.get(str(loinc_code)) if loinc_code else None
-        display = loinc_entry.display if loinc_entry else observation.name
-
-        coding = {
-            "system": "http://loinc.org" if loinc_code else "http://terminology.hl7.org/CodeSystem/data-absent-reason",
-            "code": loinc_code or "unknown",
-            "display": display,
-        }
-
-        if loinc_entry and loinc_entry.metadata.get("ncbi_url"):
-            coding.setdefault("extension", []).append(
-                {
-                    "url": "https://www.ncbi.nlm.nih.gov/",
-                    "valueUri": loinc_entry.metadata["ncbi_url"],
-                }
-            )
+        coding = self._loinc_coding(loinc_code, observation.name)
 
-        observation_resource: Dict[str, Any] = {
-            "resourceType": "Observation",
+        values = {
             "id": observation_id,
             "status": status,
             "code": {"coding": [coding]},
             "subject": {"reference": f"Patient/{patient_id}"},
         }
+        extras: Dict[str, Any] = {}
 
         if observation.effective_datetime:
-            observation_resource["effectiveDateTime"] = observation.effective_datetime.isoformat()
+            extras["effectiveDateTime"] = observation.effective_datetime.isoformat()
 
         value_numeric = observation.metadata.get("value_numeric")
         if value_numeric is not None:
@@ -1128,32 +1327,28 @@ class FHIRFormatter:
                 if observation.unit:
                     value_payload["unit"] = observation.unit
                     value_payload["system"] = "http://unitsofmeasure.org"
-                observation_resource["valueQuantity"] = value_payload
+                extras["valueQuantity"] = value_payload
             except (TypeError, ValueError):
-                observation_resource["valueString"] = str(observation.value)
+                extras["valueString"] = str(observation.value)
         elif observation.value is not None:
-            observation_resource["valueString"] = str(observation.value)
+            extras["valueString"] = str(observation.value)
 
         if observation.interpretation:
-            observation_resource["interpretation"] = [
-                {
-                    "coding": [
-                        {
-                            "system": "http://terminology.hl7.org/CodeSystem/v3-ObservationInterpretation",
-                            "code": observation.interpretation,
-                        }
-                    ]
-                }
+            extras["interpretation"] = [
+                coded_concept(
+                    "http://terminology.hl7.org/CodeSystem/v3-ObservationInterpretation",
+                    observation.interpretation,
+                )
             ]
 
         if observation.reference_range:
-            observation_resource["referenceRange"] = [observation.reference_range]
+            extras["referenceRange"] = [observation.reference_range]
 
         if loinc_code and str(loinc_code) in self.vsac_by_code:
             for member in self.vsac_by_code[str(loinc_code)]:
                 value_set_oid = member.metadata.get("value_set_oid")
                 canonical = f"urn:oid:{value_set_oid}" if value_set_oid else None
-                extensions = observation_resource.setdefault("extension", [])
+                extensions = extras.setdefault("extension", [])
                 extension_payload = {
                     "url": "http://hl7.org/fhir/StructureDefinition/valueset-reference",
                 }
@@ -1163,7 +1358,7 @@ class FHIRFormatter:
                     extension_payload["valueString"] = member.metadata.get("value_set_name", "")
                 extensions.append(extension_payload)
 
-        return observation_resource
+        return self._emit(OBSERVATION_TEMPLATE, values, extras)
 
     def create_family_history_resource(
         self,
@@ -1184,10 +1379,8 @@ class FHIRFormatter:
                 }
             )
 
-        resource: Dict[str, Any] = {
-            "resourceType": "FamilyMemberHistory",
+        values = {
             "id": resource_id,
-            "status": "completed",
             "patient": {"reference": f"Patient/{patient_id}"},
             "date": recorded_date,
             "name": relation,
@@ -1196,6 +1389,7 @@ class FHIRFormatter:
                 "coding": relationship_coding,
             },
         }
+        extras: Dict[str, Any] = {}
 
         condition_component: Dict[str, Any] = {}
         if entry.condition_code:
@@ -1227,9 +1421,42 @@ class FHIRFormatter:
             condition_component["note"] = [{"text": "; ".join(notes)}]
 
         if condition_component:
-            resource["condition"] = [condition_component]
+            extras["condition"] = [condition_component]
+
+        return self._emit(FAMILY_MEMBER_HISTORY_TEMPLATE, values, extras)
+
+class FHIRNDJSONFormatter(FHIRFormatter):
+    """FHIRFormatter whose ``create_*_resource`` methods return compact JSON bytes.
+
+    Templated resources are encoded directly from their slot values; each
+    result is one NDJSON line without the trailing newline.
+    """
+
+    def _emit(
+        self,
+        template: ResourceTemplate,
+        values: Dict[str, Any],
+        extras: Optional[Dict[str, Any]] = None,
+    ) -> bytes:
+        return template.encode(values, extras)
+
+    def create_care_plan_resource(self, patient_id: str, care_plan: Dict[str, Any]) -> bytes:
+        return encode_resource(super().create_care_plan_resource(patient_id, care_plan))
+
+
+# LOINC order codes for lab panels that have one; other panels are ordered
+# under a local service id.
+HL7_PANEL_CODES: Dict[str, Tuple[str, str]] = {
+    "Basic_Metabolic_Panel": ("51990-0", "Basic metabolic panel - Blood"),
+    "Complete_Blood_Count": ("58410-2", "CBC panel - Blood by Automated count"),
+    "Lipid_Panel": ("57698-3", "Lipid panel with direct LDL - Serum or Plasma"),
+    "Liver_Function_Panel": ("24325-3", "Hepatic function 2000 panel - Serum or Plasma"),
+    "Renal_Function_Panel": ("24362-6", "Renal function 2000 panel - Serum or Plasma"),
+}
+
+# OBX-8 abnormal flags (HL7 table 0078) for generated result statuses.
+HL7_ABNORMAL_FLAGS = {"normal": "N", "abnormal": "A", "critical": "AA"}
 
-        return resource
 
 class HL7v2Formatter:
     """HL7 v2.x message formatter for Phase 2"""
@@ -1253,12 +1480,19 @@ class HL7v2Formatter:
         patient_record: Union[PatientRecord, LifecyclePatient],
         encounter: Dict[str, Any] = None,
         message_type: str = "A04",
+        event_time: Optional[datetime] = None,
+        message_control_id: Optional[str] = None,
     ) -> str:
-        """Create HL7 v2 ADT (Admit/Discharge/Transfer) message"""
-        from datetime import datetime
+        """Create HL7 v2 ADT (Admit/Discharge/Transfer) message
 
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        message_control_id = f"MSG{random.randint(100000, 999999)}"
+        ``event_time`` and ``message_control_id`` default to now and a random
+        id; replayed feeds pass the simulated event time and a feed sequence.
+        The encounter may carry ``admit_datetime``/``discharge_datetime`` (HL7
+        TS strings) for PV1-44/PV1-45.
+        """
+
+        timestamp = (event_time or datetime.now()).strftime("%Y%m%d%H%M%S")
+        message_control_id = message_control_id or f"MSG{random.randint(100000, 999999)}"
 
         segments = []
 
@@ -1452,8 +1686,9 @@ class HL7v2Formatter:
                 "",   # Account Status
                 "",   # Pending Location
                 "",   # Prior Temporary Location
-                encounter.get('date', '').replace('-', '') if encounter.get('date') else timestamp[:8],  # Admit Date/Time
-                "",   # Discharge Date/Time
+                encounter.get('admit_datetime')
+                or (encounter.get('date', '').replace('-', '') if encounter.get('date') else timestamp[:8]),  # Admit Date/Time
+                encounter.get('discharge_datetime', ""),  # Discharge Date/Time
                 "",   # Current Patient Balance
                 "",   # Total Charges
                 "",   # Total Adjustments
@@ -1473,13 +1708,123 @@ class HL7v2Formatter:
         patient_record: Union[PatientRecord, LifecyclePatient], observations: list
     ) -> str:
         """Create HL7 v2 ORU (Observation Result) message for lab results"""
-        from datetime import datetime
 
         timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
         message_control_id = f"LAB{random.randint(100000, 999999)}"
 
-        segments = []
+        segments = [
+            HL7v2Formatter._oru_header(timestamp, message_control_id),
+            HL7v2Formatter._oru_pid_segment(patient_record),
+        ]
+        
+        # OBR - Observation Request
+        obr = (f"OBR|1|{random.randint(100000, 999999)}|{random.randint(100000, 999999)}|"
+               f"CBC^Complete Blood Count^L|||{timestamp}||||||||||DOE^JOHN^A")
+        segments.append(obr)
+        
+        # OBX - Observation/Result segments
+        for i, obs in enumerate(observations[:5], 1):  # Limit to 5 observations
+            obs_type = obs.get('type', 'Unknown')
+            obs_value = obs.get('value', '')
+            
+            # Map observation types to LOINC codes
+            loinc_code = HL7v2Formatter._get_loinc_code(obs_type)
+            data_type = HL7v2Formatter._get_hl7_data_type(obs_type)
+            units = HL7v2Formatter._get_observation_units(obs_type)
+            
+            obx = (f"OBX|{i}|{data_type}|{loinc_code}^{obs_type}^LN||{obs_value}|{units}||||F|||"
+                   f"{timestamp}")
+            segments.append(obx)
+        
+        return "\r".join(segments)
 
+    @staticmethod
+    def create_panel_oru_message(
+        patient_record: Union[PatientRecord, LifecyclePatient],
+        panel: Optional[str],
+        observations: Sequence[LifecycleObservation],
+        collected: datetime,
+        event_time: datetime,
+        message_control_id: str,
+        ordering_provider: Optional[str] = None,
+        placer_order_number: str = "",
+    ) -> str:
+        """Create an ORU^R01 for one lab order: a single OBR for ``panel`` and an OBX per result.
+
+        Panels with a LOINC panel code are ordered by that code; other panels
+        use a local (``L``) service id, and results without a panel are ordered
+        as the individual test.
+        """
+
+        timestamp = event_time.strftime("%Y%m%d%H%M%S")
+        collected_ts = collected.strftime("%Y%m%d%H%M%S")
+        if panel:
+            code, display = HL7_PANEL_CODES.get(panel, (panel.upper(), panel.replace("_", " ")))
+            service_id = f"{code}^{display}^{'LN' if panel in HL7_PANEL_CODES else 'L'}"
+        else:
+            first = observations[0]
+            service_id = f"{HL7v2Formatter._observation_loinc(first)}^{first.name}^LN"
+
+        obr = [""] * 26
+        obr[0] = "OBR"
+        obr[1] = "1"
+        obr[2] = placer_order_number
+        obr[3] = placer_order_number
+        obr[4] = service_id
+        obr[7] = collected_ts  # Observation Date/Time
+        obr[16] = HL7v2Formatter._format_provider(ordering_provider)
+        obr[22] = timestamp  # Results Rpt/Status Chng
+        obr[25] = "F"
+
+        segments = [
+            HL7v2Formatter._oru_header(timestamp, message_control_id),
+            HL7v2Formatter._oru_pid_segment(patient_record),
+            "|".join(obr),
+        ]
+        for index, observation in enumerate(observations, 1):
+            metadata = observation.metadata or {}
+            value = observation.value if observation.value is not None else metadata.get("value_numeric", "")
+            numeric = metadata.get("value_numeric")
+            if numeric is None:
+                try:
+                    float(value)
+                except (TypeError, ValueError):
+                    data_type = "ST"
+                else:
+                    data_type = "NM"
+            else:
+                data_type = "NM"
+            units = (
+                observation.unit
+                or metadata.get("units")
+                or HL7v2Formatter._get_observation_units(observation.name)
+            )
+            reference_range = observation.reference_range or {}
+            reference_range = reference_range.get("text") or (
+                f"{reference_range['low']}-{reference_range['high']}"
+                if reference_range.get("low") is not None and reference_range.get("high") is not None
+                else metadata.get("reference_range", "")
+            )
+            flag = observation.interpretation or HL7_ABNORMAL_FLAGS.get(observation.status or "", "")
+            observed = observation.effective_datetime or collected
+            segments.append(
+                f"OBX|{index}|{data_type}|{HL7v2Formatter._observation_loinc(observation)}^{observation.name}^LN||"
+                f"{value}|{units}|{reference_range}|{flag}|||F|||{observed.strftime('%Y%m%d%H%M%S')}"
+            )
+        return "\r".join(segments)
+
+    @staticmethod
+    def _observation_loinc(observation: LifecycleObservation) -> str:
+        metadata = observation.metadata or {}
+        return metadata.get("loinc_code") or HL7v2Formatter._get_loinc_code(observation.name)
+
+    @staticmethod
+    def _oru_header(timestamp: str, message_control_id: str) -> str:
+        return (f"MSH|^~\\&|VistA|VA_FACILITY|LAB|LAB_FACILITY|{timestamp}||"
+                f"ORU^R01|{message_control_id}|P|2.5")
+
+    @staticmethod
+    def _oru_pid_segment(patient_record: Union[PatientRecord, LifecyclePatient]) -> str:
         if isinstance(patient_record, LifecyclePatient):
             identifiers = patient_record.identifiers
             mrn = identifiers.get("mrn") or identifiers.get("vista_id") or patient_record.patient_id
@@ -1504,43 +1849,16 @@ class HL7v2Formatter:
             address_state = patient_record.state
             address_zip = patient_record.zip
 
-        # MSH - Message Header
-        msh = (f"MSH|^~\\&|VistA|VA_FACILITY|LAB|LAB_FACILITY|{timestamp}||"
-               f"ORU^R01|{message_control_id}|P|2.5")
-        segments.append(msh)
-
         # PID - Patient Identification (same as ADT)
         identifier = f"{mrn}^^^VA^MR"
         if ssn:
             identifier = f"{identifier}~{ssn}^^^USA^SS"
 
-        pid = (
+        return (
             f"PID|1||{identifier}||{patient_record.last_name}^"
             f"{patient_record.first_name}^{middle_name}||{birthdate}|{gender}|||"
             f"{address_line}^^{address_city}^{address_state}^{address_zip}"
         )
-        segments.append(pid)
-        
-        # OBR - Observation Request
-        obr = (f"OBR|1|{random.randint(100000, 999999)}|{random.randint(100000, 999999)}|"
-               f"CBC^Complete Blood Count^L|||{timestamp}||||||||||DOE^JOHN^A")
-        segments.append(obr)
-        
-        # OBX - Observation/Result segments
-        for i, obs in enumerate(observations[:5], 1):  # Limit to 5 observations
-            obs_type = obs.get('type', 'Unknown')
-            obs_value = obs.get('value', '')
-            
-            # Map observation types to LOINC codes
-            loinc_code = HL7v2Formatter._get_loinc_code(obs_type)
-            data_type = HL7v2Formatter._get_hl7_data_type(obs_type)
-            units = HL7v2Formatter._get_observation_units(obs_type)
-            
-            obx = (f"OBX|{i}|{data_type}|{loinc_code}^{obs_type}^LN||{obs_value}|{units}||||F|||"
-                   f"{timestamp}")
-            segments.append(obx)
-        
-        return "\r".join(segments)
     
     @staticmethod
     def _get_hl7_race_code(race: str) -> str:
@@ -3632,6 +3950,524 @@ class HL7MessageValidator:
         
         return validation_result
 
+
+def _hl7_encounter_dict(encounter: LifecycleEncounter) -> Dict[str, Any]:
+    return {
+        "encounter_id": encounter.encounter_id,
+        "patient_id": encounter.patient_id,
+        "date": encounter.start_date.isoformat() if encounter.start_date else None,
+        "type": encounter.encounter_type,
+        "reason": encounter.reason,
+        "provider": encounter.provider,
+        "location": encounter.location,
+    }
+
+
+def _hl7_observation_dict(observation: LifecycleObservation) -> Dict[str, Any]:
+    return {
+        "observation_id": observation.observation_id,
+        "patient_id": observation.patient_id,
+        "type": observation.name,
+        "value": observation.value,
+        "unit": observation.unit,
+        "status": observation.status,
+        "interpretation": observation.interpretation,
+        "observation_date": observation.effective_datetime.isoformat()
+        if observation.effective_datetime
+        else None,
+    }
+
+
+def iter_hl7_messages(
+    patients: Iterable[Union[PatientRecord, LifecyclePatient]],
+    encounters_list: Iterable[Dict[str, Any]] = (),
+    observations_list: Iterable[Dict[str, Any]] = (),
+    formatter: Optional[HL7v2Formatter] = None,
+) -> Iterable[Tuple[str, str, str]]:
+    """Lazily yield ``(patient_id, message_type, message)`` for each patient's ADT and ORU.
+
+    Lifecycle patients carry their own events. Legacy encounter and
+    observation rows are grouped by patient in a single pass up front rather
+    than rescanned for every patient.
+    """
+
+    formatter = formatter or HL7v2Formatter()
+    legacy_encounters: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for encounter in encounters_list:
+        legacy_encounters[encounter.get("patient_id")].append(encounter)
+    legacy_observations: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for observation in observations_list:
+        legacy_observations[observation.get("patient_id")].append(observation)
+
+    for patient in patients:
+        if isinstance(patient, LifecyclePatient):
+            first_encounter = _hl7_encounter_dict(patient.encounters[0]) if patient.encounters else None
+            patient_observations = [_hl7_observation_dict(obs) for obs in patient.observations]
+        else:
+            patient_encounters = legacy_encounters.get(patient.patient_id)
+            first_encounter = patient_encounters[0] if patient_encounters else None
+            patient_observations = legacy_observations.get(patient.patient_id, [])
+
+        yield patient.patient_id, "ADT", formatter.create_adt_message(patient, first_encounter, "A04")
+        if patient_observations:
+            yield patient.patient_id, "ORU", formatter.create_oru_message(patient, patient_observations)
+
+
+HL7_DEFAULT_VISIT_MINUTES = 30
+HL7_RESULT_TURNAROUND = timedelta(hours=2)
+
+
+class HL7Event(NamedTuple):
+    """One scheduled HL7 event; feeds are ordered on ``timestamp`` alone.
+
+    ADT events carry their ``encounter``. ORU events carry the lab order:
+    its ``panel`` (``None`` for a stand-alone test), the ``observations``
+    reported together and the specimen ``collected`` time, plus the
+    encounter the order was placed in when there is one.
+    """
+
+    timestamp: datetime
+    patient: Any
+    trigger: str
+    encounter: Optional[LifecycleEncounter] = None
+    panel: Optional[str] = None
+    observations: Tuple[LifecycleObservation, ...] = ()
+    collected: Optional[datetime] = None
+
+
+def _hl7_event_datetime(day: Any, clock: Optional[str] = None) -> Optional[datetime]:
+    """Combine a date (or ISO date string) with an ``HH:MM`` clock, defaulting to 08:00."""
+
+    if isinstance(day, str):
+        try:
+            day = date.fromisoformat(day[:10])
+        except ValueError:
+            return None
+    if not isinstance(day, date):
+        return None
+    try:
+        hour, minute = (int(part) for part in (clock or "").split(":")[:2])
+        return datetime(day.year, day.month, day.day, hour, minute)
+    except ValueError:
+        return datetime(day.year, day.month, day.day, 8, 0)
+
+
+def _hl7_encounter_window(encounter: LifecycleEncounter) -> Optional[Tuple[datetime, datetime]]:
+    metadata = encounter.metadata or {}
+    start = _hl7_event_datetime(encounter.start_date, metadata.get("time"))
+    if start is None:
+        return None
+    minutes = metadata.get("duration_minutes") or HL7_DEFAULT_VISIT_MINUTES
+    return start, start + timedelta(minutes=minutes)
+
+
+def iter_patient_hl7_events(
+    patient: Union[PatientRecord, LifecyclePatient],
+    encounters: Optional[Sequence[LifecycleEncounter]] = None,
+    observations: Optional[Sequence[LifecycleObservation]] = None,
+) -> Iterator[HL7Event]:
+    """Yield every HL7 event in a patient's history in chronological order.
+
+    Each dated encounter produces a registration (A04, or A01 for inpatient
+    stays) at its start, an A08 update midway and an A03 discharge at its
+    end. Lab results are grouped into one ORU^R01 per order, keyed by
+    encounter, collection time and panel, and released
+    ``HL7_RESULT_TURNAROUND`` after collection. ``encounters`` and
+    ``observations`` default to the lifecycle patient's own events. Only the
+    schedule is held; each order's observations are materialized as its event
+    is yielded.
+    """
+
+    encounters = patient.encounters if encounters is None else encounters
+    observations = patient.observations if observations is None else observations
+
+    schedule: List[Tuple[datetime, str, Any]] = []
+    visits: Dict[str, Tuple[datetime, LifecycleEncounter]] = {}
+    for encounter in encounters:
+        window = _hl7_encounter_window(encounter)
+        if window is None:
+            continue
+        start, end = window
+        visits[encounter.encounter_id] = (start, encounter)
+        admit = "A01" if (encounter.metadata or {}).get("encounter_class") == "inpatient" else "A04"
+        schedule.append((start, admit, encounter))
+        schedule.append((start + (end - start) / 2, "A08", encounter))
+        schedule.append((end, "A03", encounter))
+
+    orders: Dict[Tuple[Any, datetime, str], Tuple[Optional[str], List[int]]] = {}
+    for index, observation in enumerate(observations):
+        metadata = observation.metadata or {}
+        visit = visits.get(observation.encounter_id)
+        if observation.effective_datetime is not None:
+            collected = observation.effective_datetime.replace(tzinfo=None)
+        elif visit is not None:
+            collected = visit[0]
+        else:
+            collected = _hl7_event_datetime(metadata.get("date"))
+        if collected is None:
+            continue
+        panel = metadata.get("panel")
+        key = (observation.encounter_id, collected, panel or observation.observation_id)
+        orders.setdefault(key, (panel, []))[1].append(index)
+    for (encounter_id, collected, _), order in orders.items():
+        schedule.append((collected + HL7_RESULT_TURNAROUND, "R01", (encounter_id, collected, order)))
+
+    schedule.sort(key=lambda item: item[0])
+    for timestamp, trigger, payload in schedule:
+        if trigger != "R01":
+            yield HL7Event(timestamp, patient, trigger, payload)
+            continue
+        encounter_id, collected, (panel, indices) = payload
+        visit = visits.get(encounter_id)
+        yield HL7Event(
+            timestamp,
+            patient,
+            trigger,
+            visit[1] if visit else None,
+            panel,
+            tuple(observations[index] for index in indices),
+            collected,
+        )
+
+
+def _hl7_visit_dict(event: HL7Event) -> Dict[str, Any]:
+    encounter = event.encounter
+    start, end = _hl7_encounter_window(encounter)
+    visit = {**(encounter.metadata or {}), **_hl7_encounter_dict(encounter)}
+    visit["admit_datetime"] = start.strftime("%Y%m%d%H%M%S")
+    if event.trigger == "A03":
+        visit["discharge_datetime"] = end.strftime("%Y%m%d%H%M%S")
+    return visit
+
+
+def iter_hl7_event_feed(
+    patients: Iterable[Union[PatientRecord, LifecyclePatient]],
+    encounters_list: Iterable[Dict[str, Any]] = (),
+    observations_list: Iterable[Dict[str, Any]] = (),
+    formatter: Optional[HL7v2Formatter] = None,
+    control_id_prefix: str = "EVT",
+) -> Iterator[Tuple[str, str, str]]:
+    """Lazily yield ``(patient_id, message_type, message)`` for the full history of every patient.
+
+    Per-patient schedules from :func:`iter_patient_hl7_events` are merged on
+    event time with :func:`heapq.merge`, so the feed is chronological across
+    patients. The merge has to know every patient's earliest event before the
+    first message, so priming it converts legacy rows to lifecycle records and
+    builds every patient's schedule; messages (and each order's observations)
+    are then rendered only as the feed is consumed. MSH-10 numbers the feed in
+    order. Events at the same instant keep patient order.
+    """
+
+    formatter = formatter or HL7v2Formatter()
+    legacy_encounters: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for encounter in encounters_list:
+        legacy_encounters[encounter.get("patient_id")].append(encounter)
+    legacy_observations: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for observation in observations_list:
+        legacy_observations[observation.get("patient_id")].append(observation)
+
+    def _legacy_events(
+        patient: PatientRecord,
+        encounter_rows: List[Dict[str, Any]],
+        observation_rows: List[Dict[str, Any]],
+    ) -> Iterator[HL7Event]:
+        # Rows are converted when the merge first advances this patient, not while collecting streams.
+        yield from iter_patient_hl7_events(
+            patient,
+            [LifecycleEncounter.from_legacy(row) for row in encounter_rows],
+            [LifecycleObservation.from_legacy(row) for row in observation_rows],
+        )
+
+    streams = []
+    for patient in patients:
+        if isinstance(patient, LifecyclePatient):
+            streams.append(iter_patient_hl7_events(patient))
+        else:
+            streams.append(
+                _legacy_events(
+                    patient,
+                    legacy_encounters.pop(patient.patient_id, []),
+                    legacy_observations.pop(patient.patient_id, []),
+                )
+            )
+
+    for sequence, event in enumerate(heapq.merge(*streams, key=attrgetter("timestamp")), 1):
+        control_id = f"{control_id_prefix}{sequence:012d}"
+        patient_id = event.patient.patient_id
+        if event.trigger != "R01":
+            yield patient_id, "ADT", formatter.create_adt_message(
+                event.patient, _hl7_visit_dict(event), event.trigger, event.timestamp, control_id
+            )
+            continue
+        encounter_id = event.encounter.encounter_id if event.encounter else ""
+        order_name = f"{patient_id}/{encounter_id}/{event.collected.isoformat()}/{event.panel or event.observations[0].observation_id}"
+        yield patient_id, "ORU", formatter.create_panel_oru_message(
+            event.patient,
+            event.panel,
+            event.observations,
+            event.collected,
+            event.timestamp,
+            control_id,
+            ordering_provider=event.encounter.provider if event.encounter else None,
+            placer_order_number=uuid.uuid5(uuid.NAMESPACE_URL, order_name).hex[:16].upper(),
+        )
+
+
+class HL7StreamWriter:
+    """Append HL7 messages to per-type files as they are produced.
+
+    ADT and ORU messages go to ``<prefix>_adt.hl7`` and ``<prefix>_oru.hl7``
+    (newline separated) and every message is validated on the way through,
+    with results streamed into ``<prefix>_validation.json``. Files are only
+    created once their first message arrives, and nothing is held per message.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        filename_prefix: str = "hl7_messages",
+        validator: Optional[HL7MessageValidator] = None,
+    ):
+        self.output_dir = output_dir
+        self.filename_prefix = filename_prefix
+        self.validator = validator or HL7MessageValidator()
+        self.counts: Counter = Counter()
+        self.valid_count = 0
+        self._handles: Dict[str, Any] = {}
+
+    def _handle(self, suffix: str):
+        handle = self._handles.get(suffix)
+        if handle is None:
+            path = os.path.join(self.output_dir, f"{self.filename_prefix}_{suffix}")
+            handle = self._handles[suffix] = open(path, "w")
+        return handle
+
+    def write(self, patient_id: str, message_type: str, message: str) -> None:
+        message_handle = self._handle(f"{message_type.lower()}.hl7")
+        if self.counts[message_type]:
+            message_handle.write("\n")
+        message_handle.write(message)
+
+        validation = self.validator.validate_message_structure(message)
+        result = {
+            "patient_id": patient_id,
+            "message_type": message_type,
+            "valid": validation["valid"],
+            "errors": validation["errors"],
+            "warnings": validation["warnings"],
+        }
+        # Same layout as json.dump(results, indent=2), one entry at a time.
+        entry = "  " + json.dumps(result, indent=2).replace("\n", "\n  ")
+        validation_handle = self._handle("validation.json")
+        validation_handle.write(",\n" + entry if self.total else "[\n" + entry)
+
+        self.counts[message_type] += 1
+        self.valid_count += validation["valid"]
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def close(self) -> None:
+        if self.total:
+            self._handle("validation.json").write("\n]")
+        for handle in self._handles.values():
+            handle.close()
+        self._handles.clear()
+
+    def __enter__(self) -> "HL7StreamWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def _patient_conditions(formatter: FHIRFormatter, patient: Any) -> Iterable[Any]:
+    if not isinstance(patient, LifecyclePatient):
+        return
+    for condition in patient.conditions:
+        yield formatter.create_condition_resource(patient.patient_id, condition)
+
+
+def _patient_allergies(formatter: FHIRFormatter, patient: Any) -> Iterable[Any]:
+    if not isinstance(patient, LifecyclePatient):
+        return
+    for allergy in patient.allergies:
+        yield formatter.create_allergy_intolerance_resource(patient.patient_id, allergy)
+
+
+def _patient_medications(formatter: FHIRFormatter, patient: Any) -> Iterable[Any]:
+    if not isinstance(patient, LifecyclePatient):
+        return
+    for medication in patient.medications:
+        yield formatter.create_medication_statement_resource(patient.patient_id, medication)
+
+
+def _patient_immunizations(formatter: FHIRFormatter, patient: Any) -> Iterable[Any]:
+    if not isinstance(patient, LifecyclePatient):
+        return
+    for immunization in patient.immunizations:
+        yield formatter.create_immunization_resource(patient.patient_id, immunization)
+
+
+def _patient_care_plans(formatter: FHIRFormatter, patient: Any) -> Iterable[Any]:
+    if not isinstance(patient, LifecyclePatient):
+        return
+    for plan in patient.care_plans or patient.metadata.get("care_plan_details", []):
+        if isinstance(plan, str):
+            continue
+        yield formatter.create_care_plan_resource(patient.patient_id, plan)
+
+
+def _patient_observations(formatter: FHIRFormatter, patient: Any) -> Iterable[Any]:
+    if not isinstance(patient, LifecyclePatient):
+        return
+    for observation in patient.observations:
+        yield formatter.create_observation_resource(patient.patient_id, observation)
+
+
+def _patient_family_history(formatter: FHIRFormatter, patient: Any) -> Iterable[Any]:
+    if not isinstance(patient, LifecyclePatient):
+        return
+    for entry in patient.family_history:
+        yield formatter.create_family_history_resource(patient.patient_id, entry)
+
+
+# (resource type, progress label, builder) in bundle order.
+FHIR_RESOURCE_BUILDERS: Tuple[Tuple[str, str, Callable[[FHIRFormatter, Any], Iterable[Any]]], ...] = (
+    ("Patient", "Patient", lambda formatter, patient: (formatter.create_patient_resource(patient),)),
+    ("Condition", "Condition", _patient_conditions),
+    ("AllergyIntolerance", "Allergy", _patient_allergies),
+    ("MedicationStatement", "Medication", _patient_medications),
+    ("Immunization", "Immunization", _patient_immunizations),
+    ("CarePlan", "CarePlan", _patient_care_plans),
+    ("Observation", "Observation", _patient_observations),
+    ("FamilyMemberHistory", "FamilyHistory", _patient_family_history),
+)
+
+
+def iter_fhir_resources(
+    formatter: FHIRFormatter,
+    patients: Sequence[Union[PatientRecord, LifecyclePatient]],
+    progress: bool = True,
+) -> Iterable[Tuple[str, Any]]:
+    """Yield ``(resource_type, resource)`` pairs for every exportable FHIR resource.
+
+    Resources come out grouped by type in bundle order; their representation
+    is whatever ``formatter`` emits (dicts, or bytes for ``FHIRNDJSONFormatter``).
+    """
+
+    for resource_type, label, build in FHIR_RESOURCE_BUILDERS:
+        for patient in tqdm(patients, desc=f"Creating FHIR {label} resources", unit="patients", disable=not progress):
+            for resource in build(formatter, patient):
+                yield resource_type, resource
+
+
+def iter_patient_fhir_resources(
+    formatter: FHIRFormatter,
+    patient: Union[PatientRecord, LifecyclePatient],
+) -> Iterable[Tuple[str, Any]]:
+    """Yield ``(resource_type, resource)`` pairs for a single patient, Patient first."""
+
+    for resource_type, _, build in FHIR_RESOURCE_BUILDERS:
+        for resource in build(formatter, patient):
+            yield resource_type, resource
+
+
+FHIR_SOURCE_IDENTIFIER_SYSTEM = "https://synthetichealth.org/fhir/source-id"
+
+
+def _fhir_full_url(resource_type: str, resource_id: str) -> str:
+    """Stable ``urn:uuid`` for a generated resource, so reruns produce identical bundles."""
+
+    name = f"{FHIR_SOURCE_IDENTIFIER_SYSTEM}/{resource_type}/{resource_id}"
+    return f"urn:uuid:{uuid.uuid5(uuid.NAMESPACE_URL, name)}"
+
+
+def _rewrite_references(value: Any, full_urls: Dict[str, str]) -> Any:
+    """Return ``value`` with in-bundle references swapped for fullUrls.
+
+    Copy-on-write: untouched containers are returned as-is, so shared
+    template and coding fragments are never mutated.
+    """
+
+    if isinstance(value, dict):
+        rewritten: Optional[Dict[str, Any]] = None
+        for key, item in value.items():
+            if key == "reference" and isinstance(item, str):
+                replacement = full_urls.get(item, item)
+            else:
+                replacement = _rewrite_references(item, full_urls)
+            if replacement is not item:
+                if rewritten is None:
+                    rewritten = dict(value)
+                rewritten[key] = replacement
+        return value if rewritten is None else rewritten
+    if isinstance(value, list):
+        items = [_rewrite_references(item, full_urls) for item in value]
+        if any(new is not old for new, old in zip(items, value)):
+            return items
+    return value
+
+
+def build_transaction_bundle(
+    formatter: FHIRFormatter,
+    patients: Sequence[Union[PatientRecord, LifecyclePatient]],
+) -> Dict[str, Any]:
+    """Build one FHIR ``transaction`` Bundle holding every resource of ``patients``.
+
+    Each entry gets a ``urn:uuid`` fullUrl, and references between resources in
+    the bundle point at those fullUrls so the server resolves them on commit.
+    Entries are conditional creates keyed on a source identifier carrying the
+    generated id, which makes reloading the same bundle idempotent.
+    """
+
+    resources = [
+        (resource_type, resource)
+        for patient in patients
+        for resource_type, resource in iter_patient_fhir_resources(formatter, patient)
+    ]
+    full_urls = {
+        f"{resource_type}/{resource['id']}": _fhir_full_url(resource_type, resource["id"])
+        for resource_type, resource in resources
+    }
+
+    entries = []
+    for resource_type, resource in resources:
+        resource_id = resource["id"]
+        payload = dict(_rewrite_references(resource, full_urls))
+        del payload["id"]
+        payload["identifier"] = [
+            *payload.get("identifier", []),
+            {"system": FHIR_SOURCE_IDENTIFIER_SYSTEM, "value": resource_id},
+        ]
+        entries.append(
+            {
+                "fullUrl": full_urls[f"{resource_type}/{resource_id}"],
+                "resource": payload,
+                "request": {
+                    "method": "POST",
+                    "url": resource_type,
+                    "ifNoneExist": f"identifier={FHIR_SOURCE_IDENTIFIER_SYSTEM}|{resource_id}",
+                },
+            }
+        )
+    return {"resourceType": "Bundle", "type": "transaction", "entry": entries}
+
+
+def iter_transaction_bundles(
+    formatter: FHIRFormatter,
+    patients: Sequence[Union[PatientRecord, LifecyclePatient]],
+    patients_per_bundle: int = 1,
+) -> Iterable[Dict[str, Any]]:
+    """Yield transaction Bundles covering ``patients_per_bundle`` patients each."""
+
+    if patients_per_bundle < 1:
+        raise ValueError("patients_per_bundle must be at least 1")
+    for start in range(0, len(patients), patients_per_bundle):
+        yield build_transaction_bundle(formatter, patients[start:start + patients_per_bundle])
+
+
 def load_yaml_config(path):
     with open(path, 'r') as f:
         return yaml.safe_load(f)
@@ -3644,6 +4480,36 @@ def print_and_save_report(report, report_file=None):
             f.write(report)
         print(f"\nReport saved to {report_file}")
 
+@dataclass
+class _PatientDraft:
+    """Per-patient generation state carried between the cohort-wide batch steps of ``main``."""
+
+    record: PatientRecord
+    birth_date: date
+    patient_dict: Dict[str, Any]
+    module_result: ModuleExecutionResult
+    encounters: List[Dict[str, Any]] = field(default_factory=list)
+    timeline: Optional[EncounterTimeline] = None
+    conditions: List[Dict[str, Any]] = field(default_factory=list)
+    medications: List[Dict[str, Any]] = field(default_factory=list)
+    allergies: List[Dict[str, Any]] = field(default_factory=list)
+    procedures: List[Dict[str, Any]] = field(default_factory=list)
+    allergy_observations: List[Dict[str, Any]] = field(default_factory=list)
+    family_history_adjustments: Dict[str, float] = field(default_factory=dict)
+    immunizations: List[Dict[str, Any]] = field(default_factory=list)
+    observations: List[Dict[str, Any]] = field(default_factory=list)
+    care_plans: List[Dict[str, Any]] = field(default_factory=list)
+
+
+def _mllp_address(value: str) -> Tuple[str, int]:
+    """argparse ``type`` for ``--hl7-mllp``: parse ``HOST:PORT`` (an empty host means localhost)."""
+
+    host, separator, port = value.rpartition(":")
+    if not separator or not port.isdigit() or not 0 < int(port) < 65536:
+        raise argparse.ArgumentTypeError(f"expected HOST:PORT with a port between 1 and 65535, got {value!r}")
+    return host or "127.0.0.1", int(port)
+
+
 def main():
     parser = argparse.ArgumentParser(description="Synthetic Patient Data Generator")
     parser.add_argument("--num-records", type=int, default=1000, help="Number of patient records to generate")
@@ -3669,6 +4535,29 @@ def main():
         action="store_true",
         help="List available modules under the modules/ directory and exit",
     )
+    parser.add_argument(
+        "--module-cache-dir",
+        type=str,
+        default=None,
+        help="Directory for compiled module definitions reused across runs (defaults to $MODULE_CACHE_DIR)",
+    )
+    parser.add_argument(
+        "--module-profile-dir",
+        type=str,
+        default=None,
+        help="Profile module execution and write JSON/CSV/folded-stack reports to this directory",
+    )
+    parser.add_argument(
+        "--mortality-life-table",
+        type=str,
+        default=None,
+        help="CSV life table (age,sex,probability) overriding the built-in baseline mortality",
+    )
+    parser.add_argument(
+        "--columnar-observations",
+        action="store_true",
+        help="Keep lifecycle observations in a column store to reduce memory for large cohorts",
+    )
     parser.add_argument(
         "--vista-mode",
         choices=[VistaFormatter.LEGACY_MODE, VistaFormatter.FILEMAN_INTERNAL_MODE],
@@ -3676,7 +4565,46 @@ def main():
         help="Control VistA export encoding (default: fileman_internal)",
     )
     parser.add_argument("--skip-fhir", action="store_true", help="Skip FHIR bundle export")
+    parser.add_argument(
+        "--fhir-ndjson",
+        action="store_true",
+        help="Also write FHIR resources as per-type NDJSON files under fhir_ndjson/",
+    )
+    parser.add_argument(
+        "--fhir-transactions",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Also write FHIR transaction Bundles of N patients each under fhir_transactions/ (see tools/load_fhir_transactions.py)",
+    )
     parser.add_argument("--skip-hl7", action="store_true", help="Skip HL7 v2 message export")
+    parser.add_argument(
+        "--hl7-full-history",
+        action="store_true",
+        help=(
+            "Export every encounter (A04/A08/A03) and lab order (ORU^R01 per panel) as one "
+            "chronological feed instead of one ADT and one ORU per patient"
+        ),
+    )
+    parser.add_argument(
+        "--hl7-mllp",
+        type=_mllp_address,
+        default=None,
+        metavar="HOST:PORT",
+        help="Also send HL7 v2 messages over MLLP to this listener as they are generated",
+    )
+    parser.add_argument(
+        "--hl7-mllp-connections",
+        type=int,
+        default=4,
+        help="Concurrent MLLP connections used with --hl7-mllp (default: 4)",
+    )
+    parser.add_argument(
+        "--hl7-mllp-rate",
+        type=float,
+        default=None,
+        help="Cap the MLLP send rate in messages per second (default: unthrottled)",
+    )
     parser.add_argument("--skip-vista", action="store_true", help="Skip VistA MUMPS export")
     parser.add_argument("--skip-report", action="store_true", help="Skip textual summary report")
 
@@ -3722,7 +4650,20 @@ def main():
     if getattr(args, 'modules', None):
         module_names.extend(args.modules)
     module_names = [name for name in dict.fromkeys([m for m in module_names if m])]
-    module_engine = ModuleEngine(module_names) if module_names else None
+    module_cache_dir = args.module_cache_dir or config.get('module_cache_dir')
+    module_profile_dir = args.module_profile_dir or config.get('module_profile_dir')
+    module_engine = (
+        ModuleEngine(
+            module_names,
+            cache_dir=Path(module_cache_dir) if module_cache_dir else None,
+            lazy=True,
+            profile=bool(module_profile_dir),
+        )
+        if module_names
+        else None
+    )
+
+    mortality_life_table = args.mortality_life_table or config.get('mortality_life_table')
 
     def get_config(key, default=None):
         # CLI flag overrides config file
@@ -3773,6 +4714,7 @@ def main():
     orchestrator = LifecycleOrchestrator(
         scenario_name=active_scenario_name,
         scenario_details=scenario_metadata,
+        columnar_observations=args.columnar_observations,
     )
 
     profile_generator = partial(
@@ -3798,6 +4740,7 @@ def main():
         ))
 
     patients: List[PatientRecord] = []
+    birth_dates: List[date] = []
     for profile in profiles:
         record_kwargs = {**profile}
         birthdate = record_kwargs.pop("birthdate")
@@ -3813,6 +4756,7 @@ def main():
         patient.generate_vista_id()
         patient.generate_mrn()
         patients.append(patient)
+        birth_dates.append(birth_value)
 
     all_encounters = []
     all_conditions = []
@@ -3826,11 +4770,12 @@ def main():
     all_care_plans = []
     all_module_attributes = []
     lifecycle_patients: List[LifecyclePatient] = []
+    drafts: List[_PatientDraft] = []
 
     print("Generating related healthcare data...")
-    for patient in tqdm(patients, desc="Generating healthcare data", unit="patients"):
-        # Convert PatientRecord to dict for backward compatibility with existing functions
-        patient_dict = patient.to_dict()
+    for patient, birth_date in zip(patients, birth_dates):
+        # Working dictionary the legacy generators enrich in place; list fields stay native
+        patient_dict = patient.to_dict(encode_json=False)
         module_result = module_engine.execute(patient_dict) if module_engine else ModuleExecutionResult()
         replaced = module_result.replacements
 
@@ -3880,14 +4825,30 @@ def main():
             preassigned_conditions = _deduplicate(combined)
 
         patient_dict["preassigned_conditions"] = preassigned_conditions
-
-        family_history_entries, family_history_adjustments = generate_family_history(
-            patient_dict,
-            min_fam=0,
-            max_fam=4,
+        drafts.append(
+            _PatientDraft(
+                record=patient,
+                birth_date=birth_date,
+                patient_dict=patient_dict,
+                module_result=module_result,
+            )
         )
-        patient_dict["family_history_entries"] = family_history_entries
-        patient_dict["family_history_adjustments"] = family_history_adjustments
+
+    # Family history is sampled for the whole cohort at once; it stores the
+    # entries and risk adjustments on each patient dict for condition assignment.
+    family_history_by_patient = generate_family_history_batch(
+        [draft.patient_dict for draft in drafts],
+        min_fam=0,
+        max_fam=4,
+    )
+
+    for draft in tqdm(drafts, desc="Generating healthcare data", unit="patients"):
+        patient = draft.record
+        patient_dict = draft.patient_dict
+        module_result = draft.module_result
+        replaced = module_result.replacements
+        preassigned_conditions = patient_dict["preassigned_conditions"]
+        draft.family_history_adjustments = family_history_by_patient[patient.patient_id][1]
 
         encounters = []
         if "encounters" in replaced:
@@ -3901,6 +4862,7 @@ def main():
             if module_result.encounters:
                 encounters.extend(module_result.encounters)
         all_encounters.extend(encounters)
+        timeline = EncounterTimeline(encounters)
 
         conditions = []
         if "conditions" in replaced:
@@ -3922,7 +4884,7 @@ def main():
                 enc = random.choice(encounters) if encounters else None
                 cond["encounter_id"] = enc["encounter_id"] if enc else None
             if not cond.get("onset_date"):
-                enc = next((e for e in encounters if e.get("encounter_id") == cond.get("encounter_id")), None)
+                enc = timeline.get(cond.get("encounter_id"))
                 onset = enc["date"] if enc else patient_dict["birthdate"]
                 cond["onset_date"] = onset
         patient_dict["condition_profile"] = [c.get("name") for c in conditions]
@@ -3971,17 +4933,47 @@ def main():
         all_procedures.extend(procedures)
         patient_dict["procedures"] = procedures
 
-        immunizations: List[Dict[str, Any]] = []
+        draft.encounters = encounters
+        draft.timeline = timeline
+        draft.conditions = conditions
+        draft.medications = medications
+        draft.allergies = allergies
+        draft.procedures = procedures
+        draft.allergy_observations = pending_allergy_observations
+
+    # Immunization schedules and lab panels are drawn for the whole cohort at once.
+    scheduled = [draft for draft in drafts if "immunizations" not in draft.module_result.replacements]
+    immunizations_by_patient = generate_immunizations_batch(
+        [draft.patient_dict for draft in scheduled],
+        {draft.record.patient_id: draft.timeline for draft in scheduled},
+        allergies_by_patient={draft.record.patient_id: draft.allergies for draft in scheduled},
+        conditions_by_patient={draft.record.patient_id: draft.conditions for draft in scheduled},
+    )
+    observations_by_patient = generate_observations_batch(
+        [draft.patient_dict for draft in drafts],
+        {draft.record.patient_id: draft.encounters for draft in drafts},
+        {draft.record.patient_id: draft.conditions for draft in drafts},
+        {draft.record.patient_id: draft.medications for draft in drafts},
+    )
+
+    for draft in drafts:
+        patient = draft.record
+        patient_dict = draft.patient_dict
+        module_result = draft.module_result
+        replaced = module_result.replacements
+        encounters = draft.encounters
+        timeline = draft.timeline
+        conditions = draft.conditions
+        medications = draft.medications
+        allergies = draft.allergies
+        procedures = draft.procedures
+        pending_allergy_observations = draft.allergy_observations
+
         immunization_followups: List[Dict[str, Any]] = []
         if "immunizations" in replaced:
             immunizations = module_result.immunizations or []
         else:
-            immunizations, immunization_followups = generate_immunizations(
-                patient_dict,
-                encounters,
-                allergies=allergies,
-                conditions=conditions,
-            )
+            immunizations, immunization_followups = immunizations_by_patient[patient.patient_id]
             if module_result.immunizations:
                 immunizations.extend(module_result.immunizations)
 
@@ -3989,7 +4981,7 @@ def main():
         patient_dict["immunization_profile"] = [record.get("vaccine") for record in immunizations]
         patient_dict["immunizations"] = immunizations
 
-        observations = generate_observations(patient_dict, encounters, conditions, medications)
+        observations = observations_by_patient[patient.patient_id]
         if immunization_followups:
             observations.extend(immunization_followups)
         if module_result.observations:
@@ -4003,36 +4995,46 @@ def main():
             observations.extend(pending_allergy_observations)
         all_observations.extend(observations)
         patient_dict["observations"] = observations
-        care_plans = generate_care_plans(
-            patient_dict,
+        care_plan_index = CarePlanIndex.build(
+            timeline,
             conditions,
-            encounters,
             medications=medications,
             procedures=procedures,
             observations=observations,
             immunizations=immunizations,
         )
+        care_plans = generate_care_plans(
+            patient_dict,
+            conditions,
+            timeline,
+            index=care_plan_index,
+            export_shape=True,
+        )
         if module_result.care_plans:
+            module_plans = [flatten_care_plan_fields(plan) for plan in module_result.care_plans]
             if "care_plans" in replaced:
-                care_plans = module_result.care_plans
+                care_plans = module_plans
             else:
-                care_plans.extend(module_result.care_plans)
-        for plan in care_plans:
-            activities = plan.get("activities")
-            if isinstance(activities, list):
-                if all(isinstance(item, str) for item in activities):
-                    plan["activities"] = ", ".join(activities)
-                else:
-                    plan["activities"] = json.dumps(activities)
-            roles = plan.get("responsible_roles")
-            if isinstance(roles, list):
-                plan["responsible_roles"] = ", ".join(str(role) for role in roles)
-            linked = plan.get("linked_encounters")
-            if isinstance(linked, list):
-                plan["linked_encounters"] = ", ".join(str(item) for item in linked if item)
+                care_plans.extend(module_plans)
         all_care_plans.extend(care_plans)
         patient_dict["care_plan_details"] = care_plans
-        death = generate_death(patient_dict, conditions, family_history_entries)
+        draft.immunizations = immunizations
+        draft.observations = observations
+        draft.care_plans = care_plans
+
+    deaths_by_patient = generate_deaths_batch(
+        [draft.patient_dict for draft in drafts],
+        conditions_by_patient={draft.record.patient_id: draft.conditions for draft in drafts},
+        family_history_by_patient={
+            draft.record.patient_id: draft.patient_dict.get("family_history_entries", []) for draft in drafts
+        },
+        life_table=mortality_life_table,
+    )
+
+    for draft in drafts:
+        patient = draft.record
+        patient_dict = draft.patient_dict
+        death = deaths_by_patient[patient.patient_id]
         if death:
             all_deaths.append(death)
             patient_dict["deceased"] = True
@@ -4043,149 +5045,47 @@ def main():
         all_family_history.extend(family_history)
 
         # Persist advanced clinical metadata back onto the PatientRecord for downstream exports
-        patient.metadata['sdoh_risk_score'] = patient_dict.get('sdoh_risk_score', 0.0)
-        patient.metadata['sdoh_risk_factors'] = patient_dict.get('sdoh_risk_factors', [])
-        patient.metadata['community_deprivation_index'] = patient_dict.get('community_deprivation_index', 0.0)
-        patient.metadata['access_to_care_score'] = patient_dict.get('access_to_care_score', 0.0)
-        patient.metadata['transportation_access'] = patient_dict.get('transportation_access', '')
-        patient.metadata['language_access_barrier'] = patient_dict.get('language_access_barrier', False)
-        patient.metadata['social_support_score'] = patient_dict.get('social_support_score', 0.0)
-        patient.metadata['sdoh_care_gaps'] = patient_dict.get('sdoh_care_gaps', [])
-        patient.metadata['genetic_risk_score'] = patient_dict.get('genetic_risk_score', 0.0)
-        patient.metadata['genetic_markers'] = patient_dict.get('genetic_markers', [])
-        patient.metadata['precision_markers'] = patient_dict.get('precision_markers', [])
-        patient.metadata['comorbidity_profile'] = patient_dict.get('comorbidity_profile', [])
-        care_summary = patient_dict.get('care_plan_summary', {})
-        patient.metadata['care_plan_total'] = care_summary.get('total', 0)
-        patient.metadata['care_plan_completed'] = care_summary.get('completed', 0)
-        patient.metadata['care_plan_overdue'] = care_summary.get('overdue', 0)
-        patient.metadata['care_plan_scheduled'] = care_summary.get('scheduled', 0)
-        patient.metadata['care_plan_in_progress'] = care_summary.get('in_progress', 0)
-        patient.metadata['deceased'] = patient_dict.get('deceased', False)
-        patient.metadata['death_record'] = death
-        patient.metadata['family_history_entries'] = family_history
-        patient.metadata['family_history_adjustments'] = family_history_adjustments
-
-        # Refresh the dictionary snapshot so metadata changes are captured
-        patient_snapshot = patient.to_dict()
-        patient_snapshot["family_history_entries"] = family_history
-        if death:
-            patient_snapshot["death_record"] = death
-        if "module_attributes" in patient_dict:
-            patient_snapshot["module_attributes"] = patient_dict["module_attributes"]
+        patient.update_from_generation(
+            patient_dict,
+            death=death,
+            family_history=family_history,
+            family_history_adjustments=draft.family_history_adjustments,
+        )
+
+        # The lifecycle patient is the canonical record; export rows are derived from it later.
         lifecycle_patients.append(
-            orchestrator.build_patient(
-                patient_snapshot,
-                encounters=encounters,
-                conditions=conditions,
-                medications=medications,
-                immunizations=immunizations,
-                observations=observations,
-                allergies=allergies,
-                procedures=procedures,
+            orchestrator.build_from_record(
+                patient,
+                birth_date=draft.birth_date,
+                encounters=draft.encounters,
+                conditions=draft.conditions,
+                medications=draft.medications,
+                immunizations=draft.immunizations,
+                observations=draft.observations,
+                allergies=draft.allergies,
+                procedures=draft.procedures,
+                care_plans=draft.care_plans,
                 family_history=family_history,
                 death=death,
-                metadata={**patient.metadata, "care_plan_details": care_plans},
+                dates={**draft.timeline.dates, patient.birthdate: draft.birth_date},
             )
         )
-        # Restore patient_dict reference for downstream legacy operations
-        patient_dict = patient_snapshot
 
-    def ensure_lookup_entries(system: str, codes: Iterable[Optional[str]], loader) -> None:
-        existing = terminology_lookup.setdefault(system, {})
-        missing = {str(code) for code in codes if code and str(code) not in existing}
-        if not missing:
-            return
-        try:
-            entries = loader(terminology_root_override)
-        except Exception:
-            return
-        for entry in entries:
-            if entry.code in missing:
-                existing[entry.code] = entry
-        if existing:
-            terminology_lookup[system] = existing
-
-    ensure_lookup_entries(
-        "rxnorm",
-        (med.get("rxnorm_code") for med in all_medications),
-        load_rxnorm_medications,
-    )
-    ensure_lookup_entries(
-        "loinc",
-        (obs.get("loinc_code") for obs in all_observations),
-        load_loinc_labs,
-    )
+    if module_engine is not None and module_engine.profiler is not None:
+        profile_paths = module_engine.profiler.export(Path(module_profile_dir))
+        print(f"Module profile saved: {', '.join(str(path) for path in profile_paths.values())}")
 
-    def build_umls_source_index() -> Dict[Tuple[str, str], List[TerminologyEntry]]:
-        index: Dict[Tuple[str, str], List[TerminologyEntry]] = {}
-        for entry in terminology_lookup.get("umls", {}).values():
-            sab = entry.metadata.get("sab")
-            source_code = entry.metadata.get("code")
-            if not sab or not source_code:
-                continue
-            index.setdefault((sab.upper(), str(source_code)), []).append(entry)
-        return index
+    def ensure_lookup_entries(system: str, codes: Iterable[Optional[str]]) -> None:
+        existing = terminology_lookup.setdefault(system, {})
+        missing = sorted({str(code) for code in codes if code and str(code) not in existing})
+        if missing:
+            existing.update(terminology_service.get_many(system, missing))
 
-    umls_source_index = build_umls_source_index()
+    with TerminologyService(terminology_root_override) as terminology_service:
+        ensure_lookup_entries("rxnorm", (med.get("rxnorm_code") for med in all_medications))
+        ensure_lookup_entries("loinc", (obs.get("loinc_code") for obs in all_observations))
 
-    vsac_index: Dict[str, List[TerminologyEntry]] = {}
-    for entry in terminology_lookup.get("vsac", {}).values():
-        vsac_index.setdefault(entry.code, []).append(entry)
-
-    loinc_lookup = terminology_lookup.get("loinc", {})
-    rxnorm_lookup = terminology_lookup.get("rxnorm", {})
-
-    for record in all_observations:
-        code = record.get("loinc_code") or record.get("loinc")
-        if code:
-            entry = loinc_lookup.get(str(code))
-            if entry:
-                record.setdefault("loinc_display", entry.display)
-                if entry.metadata.get("ncbi_url"):
-                    record.setdefault("loinc_ncbi_url", entry.metadata["ncbi_url"])
-            vsac_entries = vsac_index.get(str(code), [])
-            oids = sorted(
-                {
-                    item.metadata.get("value_set_oid")
-                    for item in vsac_entries
-                    if item.metadata.get("value_set_oid")
-                }
-            )
-            if oids:
-                record["value_set_oids"] = ",".join(oids)
-                names = sorted(
-                    {
-                        item.metadata.get("value_set_name")
-                        for item in vsac_entries
-                        if item.metadata.get("value_set_name")
-                    }
-                )
-                if names:
-                    record["value_set_names"] = ",".join(names)
-
-    for record in all_medications:
-        code = record.get("rxnorm_code") or record.get("rxnorm")
-        if code:
-            entry = rxnorm_lookup.get(str(code))
-            if entry:
-                record.setdefault("rxnorm_display", entry.display)
-                if entry.metadata.get("ndc_example"):
-                    record.setdefault("ndc_example", entry.metadata.get("ndc_example"))
-            umls_entries = umls_source_index.get(("RXNORM", str(code)), [])
-            if umls_entries:
-                cuis = sorted({item.code for item in umls_entries if item.code})
-                semantic_types = sorted(
-                    {
-                        item.metadata.get("semantic_type")
-                        for item in umls_entries
-                        if item.metadata.get("semantic_type")
-                    }
-                )
-                if cuis:
-                    record["umls_cuis"] = ",".join(cuis)
-                if semantic_types:
-                    record["umls_semantic_types"] = ",".join(semantic_types)
+    enrichment_frames = build_enrichment_frames(terminology_lookup)
 
     def save(df, name):
         if output_csv:
@@ -4208,89 +5108,9 @@ def main():
         import json
 
         fhir_formatter = FHIRFormatter(terminology_lookup)
-        bundle_entries = []
-
-        # Add Patient resources
-        for patient in tqdm(patients_list, desc="Creating FHIR Patient resources", unit="patients"):
-            patient_resource = fhir_formatter.create_patient_resource(patient)
-            bundle_entries.append({"resource": patient_resource})
-
-        # Add Condition resources grouped by patient
-        for patient in tqdm(patients_list, desc="Creating FHIR Condition resources", unit="patients"):
-            if isinstance(patient, LifecyclePatient):
-                patient_conditions = patient.conditions
-            else:
-                patient_conditions = []
-
-            for condition in patient_conditions:
-                condition_resource = fhir_formatter.create_condition_resource(
-                    patient.patient_id, condition
-                )
-                bundle_entries.append({"resource": condition_resource})
-
-        # Add AllergyIntolerance resources
-        for patient in tqdm(patients_list, desc="Creating FHIR Allergy resources", unit="patients"):
-            if not isinstance(patient, LifecyclePatient):
-                continue
-            for allergy in patient.allergies:
-                allergy_resource = fhir_formatter.create_allergy_intolerance_resource(
-                    patient.patient_id, allergy
-                )
-                bundle_entries.append({"resource": allergy_resource})
-
-        # Add MedicationStatement resources
-        for patient in tqdm(patients_list, desc="Creating FHIR Medication resources", unit="patients"):
-            if not isinstance(patient, LifecyclePatient):
-                continue
-            for medication in patient.medications:
-                medication_resource = fhir_formatter.create_medication_statement_resource(
-                    patient.patient_id, medication
-                )
-                bundle_entries.append({"resource": medication_resource})
-
-        # Add Immunization resources
-        for patient in tqdm(patients_list, desc="Creating FHIR Immunization resources", unit="patients"):
-            if not isinstance(patient, LifecyclePatient):
-                continue
-            for immunization in patient.immunizations:
-                immunization_resource = fhir_formatter.create_immunization_resource(
-                    patient.patient_id, immunization
-                )
-                bundle_entries.append({"resource": immunization_resource})
-
-        for patient in tqdm(patients_list, desc="Creating FHIR CarePlan resources", unit="patients"):
-            if isinstance(patient, LifecyclePatient):
-                plan_records = patient.care_plans or patient.metadata.get("care_plan_details", [])
-            else:
-                plan_records = []
-            for plan in plan_records:
-                if isinstance(plan, str):
-                    continue
-                care_plan_resource = fhir_formatter.create_care_plan_resource(
-                    patient.patient_id if isinstance(patient, LifecyclePatient) else plan.get("patient_id", ""),
-                    plan,
-                )
-                bundle_entries.append({"resource": care_plan_resource})
-
-        # Add Observation resources when lifecycle data is available
-        for patient in tqdm(patients_list, desc="Creating FHIR Observation resources", unit="patients"):
-            if not isinstance(patient, LifecyclePatient):
-                continue
-            for observation in patient.observations:
-                observation_resource = fhir_formatter.create_observation_resource(
-                    patient.patient_id, observation
-                )
-                bundle_entries.append({"resource": observation_resource})
-
-        for patient in tqdm(patients_list, desc="Creating FHIR FamilyHistory resources", unit="patients"):
-            if not isinstance(patient, LifecyclePatient):
-                continue
-            for entry in patient.family_history:
-                family_history_resource = fhir_formatter.create_family_history_resource(
-                    patient.patient_id,
-                    entry,
-                )
-                bundle_entries.append({"resource": family_history_resource})
+        bundle_entries = [
+            {"resource": resource} for _, resource in iter_fhir_resources(fhir_formatter, patients_list)
+        ]
 
         # Create FHIR Bundle
         fhir_bundle = {
@@ -4305,6 +5125,57 @@ def main():
             json.dump(fhir_bundle, f, indent=2)
         
         print(f"FHIR Bundle saved: {filename} ({len(bundle_entries)} resources)")
+        coding_stats = fhir_formatter.coding_cache_stats()
+        print(
+            f"FHIR coding cache: {coding_stats['hits']} hits, {coding_stats['misses']} misses "
+            f"({coding_stats['hit_rate']:.1%} hit rate)"
+        )
+
+    def save_fhir_ndjson(patients_list, terminology_lookup, dirname="fhir_ndjson"):
+        """Stream FHIR resources to one NDJSON file per resource type (bulk-data layout)."""
+
+        ndjson_dir = os.path.join(output_dir, dirname)
+        os.makedirs(ndjson_dir, exist_ok=True)
+        fhir_formatter = FHIRNDJSONFormatter(terminology_lookup)
+        handles = {}
+        counts = Counter()
+        try:
+            for resource_type, line in iter_fhir_resources(fhir_formatter, patients_list):
+                handle = handles.get(resource_type)
+                if handle is None:
+                    handle = handles[resource_type] = open(
+                        os.path.join(ndjson_dir, f"{resource_type}.ndjson"), "wb"
+                    )
+                handle.write(line)
+                handle.write(b"\n")
+                counts[resource_type] += 1
+        finally:
+            for handle in handles.values():
+                handle.close()
+
+        print(f"FHIR NDJSON saved: {dirname}/ ({sum(counts.values())} resources in {len(counts)} files)")
+        return counts
+
+    def save_fhir_transactions(patients_list, terminology_lookup, patients_per_bundle, dirname="fhir_transactions"):
+        """Write transaction Bundles of ``patients_per_bundle`` patients, one JSON file each."""
+
+        transactions_dir = os.path.join(output_dir, dirname)
+        os.makedirs(transactions_dir, exist_ok=True)
+        fhir_formatter = FHIRFormatter(terminology_lookup)
+        bundles = iter_transaction_bundles(fhir_formatter, patients_list, patients_per_bundle)
+        bundle_count = 0
+        resource_count = 0
+        for index, bundle in enumerate(
+            tqdm(bundles, desc="Creating FHIR transaction bundles", unit="bundles"),
+            start=1,
+        ):
+            with open(os.path.join(transactions_dir, f"transaction_{index:06d}.json"), "wb") as handle:
+                handle.write(encode_resource(bundle))
+            bundle_count += 1
+            resource_count += len(bundle["entry"])
+
+        print(f"FHIR transaction bundles saved: {dirname}/ ({bundle_count} bundles, {resource_count} resources)")
+        return bundle_count
 
     def save_terminology_reference(terminology_lookup, output_directory, filename="terminology_reference.csv"):
         if not terminology_lookup:
@@ -4328,119 +5199,57 @@ def main():
         df.write_csv(os.path.join(output_directory, filename))
 
     def save_hl7_messages(patients_list, encounters_list, observations_list, filename_prefix="hl7_messages"):
-        """Save HL7 v2 messages (ADT and ORU)"""
-        hl7_formatter = HL7v2Formatter()
-        validator = HL7MessageValidator()
-
-        adt_messages = []
-        oru_messages = []
-        validation_results = []
-
-        def to_encounter_dict(encounter: LifecycleEncounter) -> Dict[str, Any]:
-            return {
-                "encounter_id": encounter.encounter_id,
-                "patient_id": encounter.patient_id,
-                "date": encounter.start_date.isoformat() if encounter.start_date else None,
-                "type": encounter.encounter_type,
-                "reason": encounter.reason,
-                "provider": encounter.provider,
-                "location": encounter.location,
-            }
-
-        def to_observation_dict(observation: LifecycleObservation) -> Dict[str, Any]:
-            return {
-                "observation_id": observation.observation_id,
-                "patient_id": observation.patient_id,
-                "type": observation.name,
-                "value": observation.value,
-                "unit": observation.unit,
-                "status": observation.status,
-                "interpretation": observation.interpretation,
-                "observation_date": observation.effective_datetime.isoformat()
-                if observation.effective_datetime
-                else None,
-            }
-
-        # Create ADT messages for each patient
-        for patient in tqdm(patients_list, desc="Creating HL7 ADT messages", unit="patients"):
-            if isinstance(patient, LifecyclePatient):
-                patient_encounters = [to_encounter_dict(enc) for enc in patient.encounters]
-            else:
-                patient_encounters = [
-                    enc for enc in encounters_list if enc.get('patient_id') == patient.patient_id
-                ]
+        """Stream HL7 v2 messages (ADT and ORU) to disk, optionally relaying them over MLLP."""
 
-            if patient_encounters:
-                encounter = patient_encounters[0]
-                adt_message = hl7_formatter.create_adt_message(patient, encounter, "A04")
-            else:
-                adt_message = hl7_formatter.create_adt_message(patient, None, "A04")
-
-            adt_messages.append(adt_message)
-
-            validation = validator.validate_message_structure(adt_message)
-            validation_results.append({
-                "patient_id": patient.patient_id,
-                "message_type": "ADT",
-                "valid": validation["valid"],
-                "errors": validation["errors"],
-                "warnings": validation["warnings"],
-            })
-
-        # Build fallback observation mapping for legacy payloads
-        fallback_obs_map: Dict[str, List[Dict[str, Any]]] = {}
-        for obs in observations_list:
-            patient_id = obs.get('patient_id')
-            fallback_obs_map.setdefault(patient_id, []).append(obs)
-
-        for patient in tqdm(patients_list, desc="Creating HL7 ORU messages", unit="patients"):
-            if isinstance(patient, LifecyclePatient):
-                patient_observations = [to_observation_dict(obs) for obs in patient.observations]
+        if args.hl7_full_history:
+            messages = iter_hl7_event_feed(
+                tqdm(patients_list, desc="Scheduling HL7 events", unit="patients"),
+                encounters_list,
+                observations_list,
+            )
+        else:
+            messages = iter_hl7_messages(
+                tqdm(patients_list, desc="Creating HL7 messages", unit="patients"),
+                encounters_list,
+                observations_list,
+            )
+        with HL7StreamWriter(output_dir, filename_prefix) as writer:
+            if args.hl7_mllp:
+                def _write_through():
+                    for patient_id, message_type, message in messages:
+                        writer.write(patient_id, message_type, message)
+                        yield message
+
+                host, port = args.hl7_mllp
+                try:
+                    mllp_result = send_messages(
+                        host,
+                        port,
+                        _write_through(),
+                        connections=args.hl7_mllp_connections,
+                        rate=args.hl7_mllp_rate,
+                    )
+                except ConnectionRefusedError as exc:
+                    raise SystemExit(f"HL7 MLLP: connection to {host}:{port} refused ({exc})") from exc
             else:
-                patient_observations = fallback_obs_map.get(patient.patient_id, [])
-
-            if not patient_observations:
-                continue
-
-            oru_message = hl7_formatter.create_oru_message(patient, patient_observations)
-            oru_messages.append(oru_message)
-
-            validation = validator.validate_message_structure(oru_message)
-            validation_results.append({
-                "patient_id": patient.patient_id,
-                "message_type": "ORU",
-                "valid": validation["valid"],
-                "errors": validation["errors"],
-                "warnings": validation["warnings"],
-            })
-        
-        # Save ADT messages
-        if adt_messages:
-            with open(os.path.join(output_dir, f"{filename_prefix}_adt.hl7"), 'w') as f:
-                f.write('\n'.join(adt_messages))
-            print(f"HL7 ADT messages saved: {filename_prefix}_adt.hl7 ({len(adt_messages)} messages)")
-        
-        # Save ORU messages  
-        if oru_messages:
-            with open(os.path.join(output_dir, f"{filename_prefix}_oru.hl7"), 'w') as f:
-                f.write('\n'.join(oru_messages))
-            print(f"HL7 ORU messages saved: {filename_prefix}_oru.hl7 ({len(oru_messages)} messages)")
-        
-        # Save validation results
-        if validation_results:
-            import json
-            with open(os.path.join(output_dir, f"{filename_prefix}_validation.json"), 'w') as f:
-                json.dump(validation_results, f, indent=2)
-            
-            # Print validation summary
-            valid_count = sum(1 for r in validation_results if r["valid"])
-            total_count = len(validation_results)
-            print(f"HL7 Validation: {valid_count}/{total_count} messages valid")
-
-    print("Converting patient records to dictionaries...")
-    patients_dict = [patient.to_dict() for patient in tqdm(patients, desc="Converting patients", unit="patients")]
+                mllp_result = None
+                for patient_id, message_type, message in messages:
+                    writer.write(patient_id, message_type, message)
+
+        for message_type in ("ADT", "ORU"):
+            if writer.counts[message_type]:
+                filename = f"{filename_prefix}_{message_type.lower()}.hl7"
+                print(f"HL7 {message_type} messages saved: {filename} ({writer.counts[message_type]} messages)")
+        if writer.total:
+            print(f"HL7 Validation: {writer.valid_count}/{writer.total} messages valid")
+        if mllp_result is not None:
+            print(
+                f"HL7 MLLP: {mllp_result.accepted}/{mllp_result.messages} accepted "
+                f"({mllp_result.rejected} NAK, {mllp_result.failed} failed, {mllp_result.retries} retries) "
+                f"at {mllp_result.messages_per_second:,.0f} msg/s over {args.hl7_mllp_connections} connections"
+            )
 
-    # Use the prepared patient dictionaries for legacy exports.
+    patients_dict = [patient.to_legacy_row() for patient in lifecycle_patients]
     print("Saving data files...")
     def _sanitize_frame(data: List[Dict[str, Any]]) -> pl.DataFrame:
         if not data:
@@ -4476,11 +5285,27 @@ def main():
         (_sanitize_frame(patients_dict), "patients"),
         (_sanitize_frame(all_encounters), "encounters"),
         (_sanitize_frame(all_conditions), "conditions"),
-        (_sanitize_frame(all_medications), "medications"),
+        (
+            enrich_event_frame(
+                _sanitize_frame(all_medications),
+                enrichment_frames["medications"],
+                ("rxnorm_code", "rxnorm"),
+                overwrite=("umls_cuis", "umls_semantic_types"),
+            ),
+            "medications",
+        ),
         (_sanitize_frame(all_allergies), "allergies"),
         (_sanitize_frame(all_procedures), "procedures"),
         (_sanitize_frame(all_immunizations), "immunizations"),
-        (_sanitize_frame(all_observations), "observations"),
+        (
+            enrich_event_frame(
+                _sanitize_frame(all_observations),
+                enrichment_frames["observations"],
+                ("loinc_code", "loinc"),
+                overwrite=("value_set_oids", "value_set_names"),
+            ),
+            "observations",
+        ),
     ]
     
     if all_module_attributes:
@@ -4508,6 +5333,10 @@ def main():
     else:
         print("Creating FHIR bundle...")
         save_fhir_bundle(lifecycle_patients, terminology_lookup, "fhir_bundle.json")
+        if args.fhir_ndjson:
+            save_fhir_ndjson(lifecycle_patients, terminology_lookup)
+        if args.fhir_transactions > 0:
+            save_fhir_transactions(lifecycle_patients, terminology_lookup, args.fhir_transactions)
         save_terminology_reference(terminology_lookup, output_dir)
     
     # Export HL7 v2 messages (Phase 2: ADT and ORU messages)
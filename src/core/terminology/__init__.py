@@ -13,6 +13,7 @@ from .loaders import (
     load_vsac_value_sets,
     search_by_term,
 )
+from .service import TerminologyService
 
 __all__ = [
     "TerminologyEntry",
@@ -26,4 +27,5 @@ __all__ = [
     "load_umls_concepts",
     "filter_by_code",
     "search_by_term",
+    "TerminologyService",
 ]
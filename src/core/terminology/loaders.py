@@ -82,6 +82,16 @@ def _resolve_path(relative_path: str | Path, root_override: Optional[str] = None
     return root / relative_path
 
 
+def superseded_by_csv(parquet_path: Path) -> bool:
+    """True when the CSV export next to ``parquet_path`` was written after it.
+
+    Importers can emit either format; a CSV re-export then wins over a stale Parquet file.
+    """
+
+    csv_path = parquet_path.with_suffix(".csv")
+    return csv_path.exists() and csv_path.stat().st_mtime > parquet_path.stat().st_mtime
+
+
 def _resolve_db_path(root_override: Optional[str]) -> Optional[Path]:
     if db_env := os.environ.get(TERMINOLOGY_DB_ENV):
         candidate = Path(db_env)
@@ -157,15 +167,21 @@ def _load_from_db(
         return None
     entries: List[TerminologyEntry] = []
     for row in records:
-        code = row.get(code_field)
-        display = row.get(display_field)
-        if not code or not display:
-            continue
-        metadata = {k: ("" if v is None else str(v)) for k, v in row.items() if k not in {code_field, display_field}}
-        entries.append(TerminologyEntry(code=str(code), display=str(display), metadata=metadata))
+        entry = _entry_from_row(row, code_field, display_field)
+        if entry is not None:
+            entries.append(entry)
     return entries if entries else None
 
 
+def _entry_from_row(row: Dict[str, Any], code_field: str, display_field: str) -> Optional[TerminologyEntry]:
+    code = row.get(code_field)
+    display = row.get(display_field)
+    if not code or not display:
+        return None
+    metadata = {k: ("" if v is None else str(v)) for k, v in row.items() if k not in {code_field, display_field}}
+    return TerminologyEntry(code=str(code), display=str(display), metadata=metadata)
+
+
 def _load_csv(path: Path, code_field: str, display_field: str) -> List[TerminologyEntry]:
     if not path.exists():
         raise FileNotFoundError(f"Terminology file not found: {path}")
@@ -265,15 +281,6 @@ def load_snomed_icd10_crosswalk(root: Optional[str] = None) -> Dict[str, List[Te
     if not path.exists():
         return {}
 
-    def _normalize_icd10(raw_code: str) -> str:
-        code = (raw_code or "").strip().upper()
-        if not code:
-            return ""
-        code = code.replace(".", "")
-        if len(code) > 3:
-            code = f"{code[:3]}.{code[3:]}"
-        return code
-
     crosswalk: Dict[str, List[TerminologyEntry]] = defaultdict(list)
     with path.open("r", encoding="utf-8") as handle:
         reader = csv.DictReader(handle)
@@ -285,13 +292,30 @@ def load_snomed_icd10_crosswalk(root: Optional[str] = None) -> Dict[str, List[Te
                 continue
             metadata = {k: v for k, v in row.items() if k not in {"snomed_id", "pt_name", "icd10_mapping"}}
             entry = TerminologyEntry(code=str(snomed_code), display=str(display), metadata=metadata)
-            for raw_code in icd10_mapping.replace(";", ",").split(","):
-                normalized = _normalize_icd10(raw_code)
-                if normalized:
-                    crosswalk[normalized].append(entry)
+            for normalized in split_icd10_mapping(icd10_mapping):
+                crosswalk[normalized].append(entry)
     return crosswalk
 
 
+def normalize_icd10_code(raw_code: str) -> str:
+    """Return ``raw_code`` upper-cased with the dot after the three-character category."""
+
+    code = (raw_code or "").strip().upper()
+    if not code:
+        return ""
+    code = code.replace(".", "")
+    if len(code) > 3:
+        code = f"{code[:3]}.{code[3:]}"
+    return code
+
+
+def split_icd10_mapping(value: str) -> List[str]:
+    """Split a ``;``/``,`` separated ``icd10_mapping`` cell into normalized codes."""
+
+    codes = (normalize_icd10_code(raw_code) for raw_code in (value or "").replace(";", ",").split(","))
+    return [code for code in codes if code]
+
+
 def load_rxnorm_medications(root: Optional[str] = None) -> List[TerminologyEntry]:
     db_entries = _load_from_db("rxnorm", "rxnorm_cui", "ingredient_name", root)
     if db_entries is not None:
@@ -1132,34 +1156,42 @@ def load_vsac_value_sets(root: Optional[str] = None) -> List[ValueSetMember]:
 
     members: List[ValueSetMember] = []
     for row in rows:
-        oid = (row.get("value_set_oid") or "").strip()
-        code = (row.get("code") or "").strip()
-        display = (row.get("display_name") or "").strip()
-        if not oid or not code or not display:
-            continue
-        member = ValueSetMember(
-            value_set_oid=oid,
-            value_set_name=(row.get("value_set_name") or "").strip(),
-            code=code,
-            display=display,
-            metadata={
-                key: (value if value is not None else "")
-                for key, value in row.items()
-                if key not in {"value_set_oid", "value_set_name", "code", "display_name"}
-            },
-        )
-        members.append(member)
+        member = _value_set_member_from_row(row)
+        if member is not None:
+            members.append(member)
     return members
 
 
+def _value_set_member_from_row(row: Dict[str, Any]) -> Optional[ValueSetMember]:
+    oid = (row.get("value_set_oid") or "").strip()
+    code = (row.get("code") or "").strip()
+    display = (row.get("display_name") or "").strip()
+    if not oid or not code or not display:
+        return None
+    return ValueSetMember(
+        value_set_oid=oid,
+        value_set_name=(row.get("value_set_name") or "").strip(),
+        code=code,
+        display=display,
+        metadata={
+            key: (value if value is not None else "")
+            for key, value in row.items()
+            if key not in {"value_set_oid", "value_set_name", "code", "display_name"}
+        },
+    )
+
+
 def load_umls_concepts(root: Optional[str] = None) -> List[UmlsConcept]:
-    """Load UMLS concept atoms from DuckDB or CSV files."""
+    """Load UMLS concept atoms from DuckDB, the normalized Parquet/CSV export or the seed CSV."""
 
     rows = _fetch_table_records("umls_concepts", root)
     if rows is None:
+        parquet_path = _resolve_path("umls/umls_concepts_full.parquet", root)
         normalized_path = _resolve_path("umls/umls_concepts_full.csv", root)
         seed_path = _resolve_path("umls/umls_concepts.csv", root)
-        if normalized_path.exists():
+        if parquet_path.exists() and not superseded_by_csv(parquet_path):
+            rows = pl.read_parquet(parquet_path).to_dicts()
+        elif normalized_path.exists():
             rows = _read_csv_rows(normalized_path)
         elif seed_path.exists():
             rows = _read_csv_rows(seed_path)
@@ -1168,31 +1200,33 @@ def load_umls_concepts(root: Optional[str] = None) -> List[UmlsConcept]:
 
     concepts: List[UmlsConcept] = []
     for row in rows:
-        cui = (row.get("cui") or "").strip()
-        preferred = (row.get("preferred_name") or "").strip()
-        sab = (row.get("sab") or "").strip()
-        code = (row.get("code") or "").strip()
-        tty = (row.get("tty") or "").strip()
-        if not cui or not preferred:
-            continue
-        concept = UmlsConcept(
-            cui=cui,
-            preferred_name=preferred,
-            semantic_type=(row.get("semantic_type") or "").strip(),
-            tui=(row.get("tui") or "").strip(),
-            sab=sab,
-            code=code,
-            tty=tty,
-            metadata={
-                key: (value if value is not None else "")
-                for key, value in row.items()
-                if key not in {"cui", "preferred_name", "semantic_type", "tui", "sab", "code", "tty"}
-            },
-        )
-        concepts.append(concept)
+        concept = _umls_concept_from_row(row)
+        if concept is not None:
+            concepts.append(concept)
     return concepts
 
 
+def _umls_concept_from_row(row: Dict[str, Any]) -> Optional[UmlsConcept]:
+    cui = (row.get("cui") or "").strip()
+    preferred = (row.get("preferred_name") or "").strip()
+    if not cui or not preferred:
+        return None
+    return UmlsConcept(
+        cui=cui,
+        preferred_name=preferred,
+        semantic_type=(row.get("semantic_type") or "").strip(),
+        tui=(row.get("tui") or "").strip(),
+        sab=(row.get("sab") or "").strip(),
+        code=(row.get("code") or "").strip(),
+        tty=(row.get("tty") or "").strip(),
+        metadata={
+            key: (value if value is not None else "")
+            for key, value in row.items()
+            if key not in {"cui", "preferred_name", "semantic_type", "tui", "sab", "code", "tty"}
+        },
+    )
+
+
 def filter_by_code(entries: Iterable[TerminologyEntry], codes: Iterable[str]) -> List[TerminologyEntry]:
     wanted = set(codes)
     return [entry for entry in entries if entry.code in wanted]
@@ -1211,6 +1245,8 @@ __all__ = [
     "load_loinc_labs",
     "load_snomed_conditions",
     "load_snomed_icd10_crosswalk",
+    "normalize_icd10_code",
+    "split_icd10_mapping",
     "load_rxnorm_medications",
     "load_vsac_value_sets",
     "load_umls_concepts",
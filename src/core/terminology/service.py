@@ -0,0 +1,418 @@
+"""Selective terminology queries backed by the DuckDB warehouse.
+
+The loaders in :mod:`.loaders` materialize whole vocabularies, which suits the
+import tools and scenario authoring. Generation and export only need the codes
+patients actually carry, so :class:`TerminologyService` looks them up in
+batches against the indexed warehouse tables built by
+``tools/build_terminology_db.py`` and keeps every answer (including misses) in
+an LRU cache. When no warehouse is available, or it lacks a table, the service
+falls back to the CSV loaders and indexes each vocabulary once.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+from .loaders import (
+    TerminologyEntry,
+    UmlsConcept,
+    ValueSetMember,
+    _entry_from_row,
+    _resolve_db_path,
+    _umls_concept_from_row,
+    _value_set_member_from_row,
+    duckdb,
+    load_icd10_conditions,
+    load_loinc_labs,
+    load_rxnorm_medications,
+    load_snomed_conditions,
+    load_snomed_icd10_crosswalk,
+    load_umls_concepts,
+    load_vsac_value_sets,
+    split_icd10_mapping,
+)
+
+DEFAULT_CACHE_SIZE = 65536
+
+# system -> (warehouse table, code column, display column)
+CODE_SYSTEMS: Dict[str, Tuple[str, str, str]] = {
+    "icd10": ("icd10", "code", "description"),
+    "loinc": ("loinc", "loinc_code", "long_common_name"),
+    "snomed": ("snomed", "snomed_id", "pt_name"),
+    "rxnorm": ("rxnorm", "rxnorm_cui", "ingredient_name"),
+}
+
+# UMLS source abbreviation (SAB) for each code system.
+UMLS_SOURCES: Dict[str, str] = {
+    "icd10": "ICD10CM",
+    "snomed": "SNOMEDCT_US",
+    "rxnorm": "RXNORM",
+    "loinc": "LNC",
+}
+
+UMLS_TABLE = "umls_concepts"
+VSAC_TABLE = "vsac_value_sets"
+
+_FALLBACK_LOADERS: Dict[str, Callable[[Optional[str]], List[TerminologyEntry]]] = {
+    "icd10": load_icd10_conditions,
+    "loinc": load_loinc_labs,
+    "snomed": load_snomed_conditions,
+    "rxnorm": load_rxnorm_medications,
+}
+
+
+class _LruCache:
+    """Bounded mapping that evicts the least recently used key."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def lookup(self, keys: Iterable[Hashable]) -> Tuple[Dict[Hashable, Any], List[Hashable]]:
+        """Split ``keys`` into cached ``{key: value}`` pairs and the keys still missing."""
+
+        found: Dict[Hashable, Any] = {}
+        missing: List[Hashable] = []
+        data = self._data
+        for key in keys:
+            if key in data:
+                data.move_to_end(key)
+                found[key] = data[key]
+            else:
+                missing.append(key)
+        self.hits += len(found)
+        self.misses += len(missing)
+        return found, missing
+
+    def store(self, key: Hashable, value: Any) -> None:
+        data = self._data
+        data[key] = value
+        data.move_to_end(key)
+        if len(data) > self.maxsize:
+            data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+def _unique_codes(codes: Iterable[Optional[object]]) -> List[str]:
+    return list(dict.fromkeys(str(code) for code in codes if code))
+
+
+class TerminologyService:
+    """Batched, cached lookups against the terminology warehouse.
+
+    Lookups resolve to the same objects the loaders produce: code systems
+    return :class:`TerminologyEntry`, UMLS queries return :class:`UmlsConcept`
+    and value set queries return :class:`ValueSetMember`. When a table holds
+    several rows for one code the last one wins, as it does for lookups built
+    from the full loaders.
+    """
+
+    def __init__(self, root: Optional[str] = None, *, cache_size: int = DEFAULT_CACHE_SIZE) -> None:
+        self.root = root
+        self.db_path = _resolve_db_path(root) if duckdb is not None else None
+        self._connection: Any = None
+        self._table_columns: Optional[Dict[str, Dict[str, str]]] = None
+        self._statements: Dict[Tuple[str, ...], str] = {}
+        self._cache = _LruCache(cache_size)
+        self._fallback: Dict[str, Any] = {}
+        self._seed_icd10_mappings: Optional[Dict[str, str]] = None
+
+    # -- lifecycle -----------------------------------------------------
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+        self._table_columns = None
+
+    def __enter__(self) -> "TerminologyService":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    @property
+    def cache_info(self) -> Dict[str, int]:
+        return {"hits": self._cache.hits, "misses": self._cache.misses, "size": len(self._cache)}
+
+    # -- warehouse access ----------------------------------------------
+    def _columns(self, table: str) -> Optional[Dict[str, str]]:
+        """Return ``{column: type}`` for a warehouse table, or ``None`` when it is unavailable."""
+
+        if self._table_columns is None:
+            self._table_columns = {}
+            if self.db_path is not None:
+                try:
+                    self._connection = duckdb.connect(str(self.db_path))
+                    rows = self._connection.execute(
+                        "SELECT table_name, column_name, data_type FROM information_schema.columns"
+                    ).fetchall()
+                except Exception:  # pragma: no cover - unreadable warehouse
+                    self.close()
+                    self._table_columns = {}
+                    return None
+                for table_name, column_name, data_type in rows:
+                    self._table_columns.setdefault(table_name, {})[column_name] = data_type
+        return self._table_columns.get(table)
+
+    def _statement(self, table: str, column: str, *filters: str) -> str:
+        """Build (once) the parameterized ``IN`` query for ``table.column``.
+
+        Parameters are bound as a ``VARCHAR[]`` and cast to the column type, so
+        integer-typed code columns still use their index.
+        """
+
+        key = (table, column, *filters)
+        statement = self._statements.get(key)
+        if statement is None:
+            column_type = self._table_columns[table][column]
+            where = [f'"{column}" IN (SELECT TRY_CAST(unnest(?::VARCHAR[]) AS {column_type}))', *filters]
+            statement = f"SELECT * FROM {table} WHERE {' AND '.join(where)} ORDER BY rowid"
+            self._statements[key] = statement
+        return statement
+
+    def _select(
+        self,
+        table: str,
+        column: str,
+        values: Sequence[str],
+        *filters: str,
+        params: Sequence[Any] = (),
+    ) -> List[Dict[str, str]]:
+        cursor = self._connection.execute(self._statement(table, column, *filters), [list(values), *params])
+        names = [description[0] for description in cursor.description]
+        return [
+            {name: ("" if value is None else str(value)) for name, value in zip(names, row)}
+            for row in cursor.fetchall()
+        ]
+
+    def _cached_batch(
+        self,
+        kind: str,
+        keys: Sequence[Hashable],
+        fetch: Callable[[List[Hashable]], Dict[Hashable, Any]],
+    ) -> Dict[Hashable, Any]:
+        """Resolve ``keys`` through the cache, fetching misses in one batch.
+
+        Keys the backend does not know are cached as ``None`` and left out of
+        the result, so repeated misses never reach the warehouse again.
+        """
+
+        found, missing = self._cache.lookup((kind, key) for key in keys)
+        result = {cache_key[1]: value for cache_key, value in found.items() if value is not None}
+        if missing:
+            fetched = fetch([cache_key[1] for cache_key in missing])
+            for cache_key in missing:
+                value = fetched.get(cache_key[1])
+                self._cache.store(cache_key, value)
+                if value is not None:
+                    result[cache_key[1]] = value
+        return {key: result[key] for key in keys if key in result}
+
+    # -- CSV fallback --------------------------------------------------
+    def _fallback_entries(self, system: str) -> List[TerminologyEntry]:
+        entries = self._fallback.get(system)
+        if entries is None:
+            try:
+                entries = _FALLBACK_LOADERS[system](self.root)
+            except FileNotFoundError:
+                entries = []
+            self._fallback[system] = entries
+        return entries
+
+    def _fallback_index(self, system: str) -> Dict[str, TerminologyEntry]:
+        key = f"{system}:index"
+        index = self._fallback.get(key)
+        if index is None:
+            index = {entry.code: entry for entry in self._fallback_entries(system)}
+            self._fallback[key] = index
+        return index
+
+    def _fallback_umls(self) -> List[UmlsConcept]:
+        concepts = self._fallback.get(UMLS_TABLE)
+        if concepts is None:
+            concepts = self._fallback[UMLS_TABLE] = load_umls_concepts(self.root)
+        return concepts
+
+    def _fallback_vsac(self) -> List[ValueSetMember]:
+        members = self._fallback.get(VSAC_TABLE)
+        if members is None:
+            members = self._fallback[VSAC_TABLE] = load_vsac_value_sets(self.root)
+        return members
+
+    # -- code systems --------------------------------------------------
+    def _system(self, system: str) -> Tuple[str, str, str]:
+        try:
+            return CODE_SYSTEMS[system]
+        except KeyError:
+            raise ValueError(f"Unknown terminology system '{system}'") from None
+
+    def _snomed_icd10_mapping(self, code: str) -> str:
+        if self._seed_icd10_mappings is None:
+            grouped: Dict[str, set] = defaultdict(set)
+            for icd10_code, concepts in load_snomed_icd10_crosswalk(self.root).items():
+                for concept in concepts:
+                    grouped[concept.code].add(icd10_code)
+            self._seed_icd10_mappings = {key: ";".join(sorted(value)) for key, value in grouped.items()}
+        return self._seed_icd10_mappings.get(code, "")
+
+    def _fetch_entries(self, system: str, codes: List[str]) -> Dict[str, TerminologyEntry]:
+        table, code_field, display_field = CODE_SYSTEMS[system]
+        if self._columns(table) is None:
+            index = self._fallback_index(system)
+            return {code: index[code] for code in codes if code in index}
+        entries: Dict[str, TerminologyEntry] = {}
+        for row in self._select(table, code_field, codes):
+            entry = _entry_from_row(row, code_field, display_field)
+            if entry is None:
+                continue
+            if system == "snomed" and not entry.metadata.get("icd10_mapping"):
+                mapping = self._snomed_icd10_mapping(entry.code)
+                if mapping:
+                    entry.metadata["icd10_mapping"] = mapping
+            entries[entry.code] = entry
+        return entries
+
+    def get_many(self, system: str, codes: Iterable[Optional[object]]) -> Dict[str, TerminologyEntry]:
+        """Return ``{code: entry}`` for the ``codes`` present in ``system``, in request order."""
+
+        self._system(system)
+        return self._cached_batch(system, _unique_codes(codes), lambda missing: self._fetch_entries(system, missing))
+
+    def get(self, system: str, code: Optional[object]) -> Optional[TerminologyEntry]:
+        return self.get_many(system, [code]).get(str(code)) if code else None
+
+    def search(self, system: str, prefix: str, limit: int = 25) -> List[TerminologyEntry]:
+        """Return entries whose code or display starts with ``prefix``, ignoring case."""
+
+        table, code_field, display_field = self._system(system)
+        prefix = (prefix or "").strip()
+        if not prefix or limit <= 0:
+            return []
+        lowered = prefix.lower()
+        if self._columns(table) is None:
+            matches = [
+                entry
+                for entry in self._fallback_index(system).values()
+                if entry.code.lower().startswith(lowered) or entry.display.lower().startswith(lowered)
+            ]
+            return sorted(matches, key=lambda entry: entry.code)[:limit]
+        key = (table, "search")
+        statement = self._statements.get(key)
+        if statement is None:
+            statement = (
+                f'SELECT * FROM {table} WHERE starts_with(lower(CAST("{code_field}" AS VARCHAR)), ?) '
+                f'OR starts_with(lower("{display_field}"), ?) ORDER BY CAST("{code_field}" AS VARCHAR) LIMIT ?'
+            )
+            self._statements[key] = statement
+        cursor = self._connection.execute(statement, [lowered, lowered, limit])
+        names = [description[0] for description in cursor.description]
+        entries = (
+            _entry_from_row(dict(zip(names, row)), code_field, display_field) for row in cursor.fetchall()
+        )
+        return [entry for entry in entries if entry is not None]
+
+    # -- UMLS ----------------------------------------------------------
+    def _fetch_concepts(self, cuis: List[str]) -> Dict[str, UmlsConcept]:
+        if self._columns(UMLS_TABLE) is None:
+            wanted = set(cuis)
+            rows: Iterable[UmlsConcept] = (concept for concept in self._fallback_umls() if concept.cui in wanted)
+        else:
+            rows = (_umls_concept_from_row(row) for row in self._select(UMLS_TABLE, "cui", cuis))
+        return {concept.cui: concept for concept in rows if concept is not None}
+
+    def concepts(self, cuis: Iterable[Optional[object]]) -> Dict[str, UmlsConcept]:
+        """Return ``{cui: concept}`` for the requested UMLS concept identifiers."""
+
+        return self._cached_batch("umls", _unique_codes(cuis), self._fetch_concepts)
+
+    def _fetch_umls_atoms(self, sab: str, codes: List[str]) -> Dict[str, List[UmlsConcept]]:
+        if self._columns(UMLS_TABLE) is None:
+            wanted = set(codes)
+            atoms: Iterable[Optional[UmlsConcept]] = (
+                concept
+                for concept in self._fallback_umls()
+                if concept.code in wanted and concept.sab.upper() == sab
+            )
+        else:
+            atoms = (
+                _umls_concept_from_row(row)
+                for row in self._select(UMLS_TABLE, "code", codes, "upper(sab) = ?", params=[sab])
+            )
+        grouped: Dict[str, List[UmlsConcept]] = defaultdict(list)
+        for concept in atoms:
+            if concept is not None and concept.code:
+                grouped[concept.code].append(concept)
+        return grouped
+
+    # -- crosswalks ----------------------------------------------------
+    def crosswalk(self, source: str, target: str, codes: Iterable[Optional[object]]) -> Dict[str, List[Any]]:
+        """Map ``codes`` from ``source`` to concepts of ``target``.
+
+        Supported pairs are ``snomed -> icd10`` (via the ``icd10_mapping``
+        column) and any code system to ``umls`` (via the concept's SAB/code).
+        """
+
+        requested = _unique_codes(codes)
+        if target == "umls" and source in UMLS_SOURCES:
+            sab = UMLS_SOURCES[source]
+            return self._cached_batch(
+                f"umls:{sab}", requested, lambda missing: self._fetch_umls_atoms(sab, missing)
+            )
+        if (source, target) == ("snomed", "icd10"):
+            mappings = {
+                code: split_icd10_mapping(entry.metadata.get("icd10_mapping", ""))
+                for code, entry in self.get_many("snomed", requested).items()
+            }
+            icd10 = self.get_many("icd10", (code for targets in mappings.values() for code in targets))
+            result: Dict[str, List[Any]] = {}
+            for code, targets in mappings.items():
+                matched = [icd10[target_code] for target_code in dict.fromkeys(targets) if target_code in icd10]
+                if matched:
+                    result[code] = matched
+            return result
+        raise ValueError(f"Unsupported terminology crosswalk '{source}' -> '{target}'")
+
+    # -- value sets ----------------------------------------------------
+    def _fetch_members(self, column: str, keys: List[str]) -> Dict[str, List[ValueSetMember]]:
+        if self._columns(VSAC_TABLE) is None:
+            wanted = set(keys)
+            members: Iterable[Optional[ValueSetMember]] = (
+                member for member in self._fallback_vsac() if getattr(member, column) in wanted
+            )
+        else:
+            members = (_value_set_member_from_row(row) for row in self._select(VSAC_TABLE, column, keys))
+        grouped: Dict[str, List[ValueSetMember]] = defaultdict(list)
+        for member in members:
+            if member is not None:
+                grouped[getattr(member, column)].append(member)
+        return grouped
+
+    def value_set_members(self, oids: Iterable[Optional[object]]) -> Dict[str, List[ValueSetMember]]:
+        """Return ``{value_set_oid: members}`` for the requested value sets."""
+
+        return self._cached_batch(
+            "vsac:oid", _unique_codes(oids), lambda missing: self._fetch_members("value_set_oid", missing)
+        )
+
+    def value_sets_for(self, codes: Iterable[Optional[object]]) -> Dict[str, List[ValueSetMember]]:
+        """Return ``{code: memberships}`` listing every value set each code belongs to."""
+
+        return self._cached_batch(
+            "vsac:code", _unique_codes(codes), lambda missing: self._fetch_members("code", missing)
+        )
+
+    def is_member(self, value_set_oid: str, code: Optional[object]) -> bool:
+        if not code:
+            return False
+        memberships = self.value_sets_for([code]).get(str(code), [])
+        return any(member.value_set_oid == value_set_oid for member in memberships)
+
+
+__all__ = ["CODE_SYSTEMS", "UMLS_SOURCES", "TerminologyService"]
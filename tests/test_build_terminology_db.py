@@ -74,3 +74,66 @@ def test_build_requires_force_when_database_exists(tmp_path: Path) -> None:
 
     with pytest.raises(SystemExit):
         build_database(root, output)
+
+
+def test_incremental_build_reloads_only_changed_tables(tmp_path: Path) -> None:
+    root = tmp_path / "terminology"
+    _seed_minimal_terminology(root)
+    output = root / "terminology.duckdb"
+
+    first = build_database(root, output, force=True)
+    assert set(first.values()) == {"rebuilt"}
+
+    unchanged = build_database(root, output, incremental=True)
+    assert set(unchanged.values()) == {"unchanged"}
+
+    _write_csv(
+        root / "vsac/vsac_value_sets.csv",
+        ["value_set_oid", "value_set_name", "code", "code_system", "display_name"],
+        [["2.16.840.1.113883.3.464.1003.103.12.1001", "Diabetes", "E11", "ICD10CM", "Type 2 diabetes"]],
+    )
+    updated = build_database(root, output, incremental=True)
+    assert updated["vsac_value_sets"] == "rebuilt"
+    assert {name for name, state in updated.items() if state == "rebuilt"} == {"vsac_value_sets"}
+
+    con = duckdb.connect(str(output))
+    try:
+        assert con.execute("SELECT COUNT(*) FROM vsac_value_sets").fetchone()[0] == 1
+        source, rows = con.execute(
+            "SELECT source_path, row_count FROM build_metadata WHERE table_name = 'vsac_value_sets'"
+        ).fetchone()
+        indexes = {row[0] for row in con.execute("SELECT index_name FROM duckdb_indexes()").fetchall()}
+    finally:
+        con.close()
+    assert source == "vsac/vsac_value_sets.csv"
+    assert rows == 1
+    assert {"idx_icd10_code", "idx_vsac_value_sets_code", "idx_rxnorm_ingredient_name"} <= indexes
+
+
+def test_build_projects_sources_in_sql_with_defaults(tmp_path: Path) -> None:
+    import polars as pl
+
+    root = tmp_path / "terminology"
+    _seed_minimal_terminology(root)
+    (root / "umls").mkdir(parents=True)
+    pl.DataFrame({"code": ["0012"], "cui": ["C0000001"], "preferred_name": ["Sample"]}).write_parquet(
+        root / "umls/umls_concepts_full.parquet"
+    )
+    output = root / "terminology.duckdb"
+
+    build_database(root, output, force=True)
+
+    con = duckdb.connect(str(output))
+    try:
+        rows = con.execute("SELECT * FROM umls_concepts").fetchall()
+        columns = [column[0] for column in con.description]
+        level = con.execute("SELECT level FROM icd10").fetchone()[0]
+        row_count = con.execute(
+            "SELECT row_count FROM build_metadata WHERE table_name = 'umls_concepts'"
+        ).fetchone()[0]
+    finally:
+        con.close()
+    assert columns[:3] == ["cui", "preferred_name", "semantic_type"]
+    assert rows == [("C0000001", "Sample", "", "", "", "0012", "", "", "")]
+    assert level == "0"
+    assert row_count == 1
@@ -1,8 +1,10 @@
+import json
 import random
 from collections import Counter
 from datetime import datetime, timedelta
 from unittest.mock import patch
 
+import numpy as np
 from faker import Faker
 
 from src.core.lifecycle.generation import clinical
@@ -879,3 +881,299 @@ def test_assign_conditions_respects_family_history_adjustments():
         assigned = clinical.assign_conditions(patient)
 
     assert "Heart Disease" in assigned
+
+
+def test_lab_panel_engine_matches_scalar_reference_ranges_and_flags():
+    engine = clinical.LabPanelEngine()
+    compiled = engine.compile("Complete_Blood_Count", 40, "male")
+    assert engine.compile("Complete_Blood_Count", 50, "male") is compiled
+    tests = clinical.COMPREHENSIVE_LAB_PANELS["Complete_Blood_Count"]["tests"]
+    assert compiled.reference_ranges == tuple(
+        clinical.get_reference_range_string(test, 40, "male") for test in tests
+    )
+
+    values = compiled.draw(np.random.default_rng(5), size=400)
+    assert values.shape == (400, len(tests))
+    statuses = compiled.interpret(values)
+    for row in range(0, 400, 37):
+        for idx, test in enumerate(tests):
+            value = float(values[row, idx])
+            expected = (
+                "critical"
+                if clinical.is_critical_value(value, test)
+                else "normal"
+                if clinical.is_normal_value(value, test, 40, "male")
+                else "abnormal"
+            )
+            assert statuses[row, idx] == expected
+    normal_share = (statuses == "normal").mean()
+    assert 0.8 < normal_share < 0.95
+
+
+def test_generate_lab_panels_batch_is_reproducible():
+    patients = []
+    for idx, (age, gender) in enumerate([(8, "female"), (40, "male"), (72, "female")]):
+        patient = base_patient()
+        patient.update({"patient_id": f"p{idx}", "age": age, "gender": gender})
+        patients.append(patient)
+    encounters = {p["patient_id"]: [{"encounter_id": f"e-{p['patient_id']}", "date": "2024-01-01"}] for p in patients}
+
+    seed_random(99)
+    first = clinical.generate_lab_panels_batch(patients, encounters, "Basic_Metabolic_Panel")
+    seed_random(99)
+    second = clinical.generate_lab_panels_batch(patients, encounters, "Basic_Metabolic_Panel")
+    strip = lambda obs: [{k: v for k, v in o.items() if k != "observation_id"} for o in obs]
+    for patient in patients:
+        pid = patient["patient_id"]
+        assert strip(first[pid]) == strip(second[pid])
+        assert {obs["encounter_id"] for obs in first[pid]} == {f"e-{pid}"}
+    elderly_egfr = next(obs for obs in first["p2"] if obs["type"] == "eGFR")
+    assert elderly_egfr["reference_range"].startswith("60-89")
+
+
+def test_generate_lab_panel_uses_stdlib_random_without_numpy_generator():
+    patient = base_patient()
+    encounters = [{"encounter_id": "e-1", "date": "2024-01-01"}]
+    with patch.object(clinical.np.random, "default_rng", side_effect=AssertionError("no Generator")):
+        seed_random(7)
+        first = clinical.generate_lab_panel(patient, encounters, "Lipid_Panel", 74, "female")
+        seed_random(7)
+        second = clinical.generate_lab_panel(patient, encounters, "Lipid_Panel", 74, "female")
+    assert [obs["value"] for obs in first] == [obs["value"] for obs in second]
+    for obs in first:
+        value = obs["value_numeric"]
+        test = next(t for t in clinical.COMPREHENSIVE_LAB_PANELS["Lipid_Panel"]["tests"] if t["name"] == obs["type"])
+        expected = (
+            "critical"
+            if clinical.is_critical_value(value, test)
+            else "normal"
+            if clinical.is_normal_value(value, test, 74, "female")
+            else "abnormal"
+        )
+        assert obs["status"] == expected
+
+
+def test_generate_observations_batch_groups_panels_per_patient():
+    patients = []
+    for idx, age in enumerate([25, 45, 80]):
+        patient = base_patient()
+        patient.update({"patient_id": f"p{idx}", "age": age})
+        patients.append(patient)
+    encounters = {p["patient_id"]: [{"encounter_id": f"e-{p['patient_id']}", "date": "2024-01-01"}] for p in patients}
+
+    seed_random(3)
+    results = clinical.generate_observations_batch(patients, encounters, min_obs=2, max_obs=2)
+    for patient in patients:
+        observations = results[patient["patient_id"]]
+        panel_rows = [obs for obs in observations if obs.get("panel")]
+        assert "Basic_Metabolic_Panel" in {obs["panel"] for obs in panel_rows}
+        assert len(observations) - len(panel_rows) == 2
+        assert {obs["encounter_id"] for obs in observations} == {f"e-{patient['patient_id']}"}
+
+
+def test_encounter_timeline_matches_linear_lookups():
+    encounters = [
+        {"encounter_id": "a", "date": "2024-03-10", "related_conditions": "Asthma, Hypertension"},
+        {"encounter_id": "b", "date": "2024-03-20", "related_conditions": ""},
+        {"encounter_id": "c", "date": "2024-03-10", "related_conditions": "asthma"},
+        {"encounter_id": "d", "date": "2024-03-30"},
+        {"encounter_id": "e", "date": None, "related_conditions": "Hypertension"},
+    ]
+    timeline = clinical.EncounterTimeline(encounters)
+
+    def linear(target):
+        best, best_delta = None, None
+        for enc in encounters:
+            enc_date = clinical._safe_parse_date(enc.get("date"))
+            if enc_date and (best_delta is None or abs((enc_date - target).days) < best_delta):
+                best, best_delta = enc, abs((enc_date - target).days)
+        return best
+
+    start = datetime(2024, 2, 1).date()
+    for offset in range(90):
+        target = start + timedelta(days=offset)
+        assert timeline.nearest(target) is linear(target)
+        assert clinical._select_encounter_for_date(encounters, target) is linear(target)
+        assert clinical._select_encounter_for_date(timeline, target) is linear(target)
+
+    assert timeline.get("d") is encounters[3]
+    assert [enc["encounter_id"] for enc in timeline.for_condition("Asthma")] == ["a", "c"]
+    assert [enc["encounter_id"] for enc in timeline.for_condition("hypertension")] == ["a", "e"]
+    assert len(timeline) == 5 and list(timeline) == encounters
+
+
+def test_generate_care_plans_export_shape_flattens_fields():
+    seed_random(404)
+    patient = base_patient()
+    patient["age"] = 60
+    condition = {"name": "Diabetes", "condition_id": "cond-1", "onset_date": "2022-01-01", "condition_category": "endocrine"}
+    encounters = [
+        {"encounter_id": "enc-1", "date": "2022-02-01", "type": "Endocrinology Clinic", "related_conditions": "Diabetes"},
+    ]
+    index = clinical.CarePlanIndex.build(encounters, [condition])
+
+    structured = clinical.generate_care_plans(patient, [condition], encounters, index=index)
+    exported = clinical.generate_care_plans(patient, [condition], encounters, index=index, export_shape=True)
+
+    assert len(structured) == len(exported)
+    for plan, row in zip(structured, exported):
+        assert isinstance(plan["activities"], list)
+        assert row["activities"] == json.dumps(plan["activities"])
+        assert row["responsible_roles"] == ", ".join(plan["responsible_roles"])
+        assert row["linked_encounters"] == ", ".join(plan["linked_encounters"])
+
+
+def test_mortality_model_tables_and_life_table_override(tmp_path):
+    model = clinical.MortalityModel()
+    assert model.baseline_probability(70, "male") == clinical._baseline_mortality_probability(70, "male")
+    assert model.relative_risk[model.condition_index["Cancer"]] == 3.5
+    infant_table = model.cause_table(0, [])
+    assert infant_table.causes == tuple(clinical.DEATH_CAUSES_BY_AGE[(0, 1)])
+    assert model.cause_table(130, []).causes == tuple(clinical.DEATH_CAUSES_BY_AGE[(65, 120)])
+
+    life_table = tmp_path / "life_table.csv"
+    life_table.write_text("age,sex,probability\n70,female,0.5\n71,all,0.01\n", encoding="utf-8")
+    override = clinical.MortalityModel(life_table)
+    assert override.baseline_probability(70, "female") == 0.5
+    assert override.baseline_probability(70, "male") == model.baseline_probability(70, "male")
+    assert override.baseline_probability(71, "male") == 0.01
+
+
+def test_generate_deaths_batch_assigns_causes():
+    patients = []
+    for idx in range(200):
+        patient = base_patient()
+        patient.update({"patient_id": f"p{idx}", "age": 90, "birthdate": "1934-01-01"})
+        patients.append(patient)
+    conditions = {"p0": [{"name": "Cancer"}]}
+
+    seed_random(12)
+    results = clinical.generate_deaths_batch(patients, conditions_by_patient=conditions)
+
+    deaths = [record for record in results.values() if record]
+    assert set(results) == {p["patient_id"] for p in patients}
+    assert 0 < len(deaths) < len(patients)
+    for record in deaths:
+        assert record["primary_cause_code"]
+        assert 1 <= record["age_at_death"] <= 90
+
+
+def test_generate_deaths_batch_uses_explicit_life_table(tmp_path):
+    patients = []
+    for idx in range(200):
+        patient = base_patient()
+        patient.update({"patient_id": f"p{idx}", "age": 30, "birthdate": "1994-01-01", "sdoh_risk_score": 0.0})
+        patient.update({"smoking_status": "Never", "alcohol_use": "None"})
+        patients.append(patient)
+    life_table = tmp_path / "life_table.csv"
+    life_table.write_text("age,sex,probability\n30,all,0.9\n", encoding="utf-8")
+
+    seed_random(4)
+    default = clinical.generate_deaths_batch(patients)
+    seed_random(4)
+    overridden = clinical.generate_deaths_batch(patients, life_table=life_table)
+
+    assert sum(1 for record in default.values() if record) < 20
+    assert sum(1 for record in overridden.values() if record) > 150
+
+
+def test_family_history_tables_match_profile_probabilities():
+    tables = clinical.get_family_history_tables()
+    for age in (5, 30, 45, 62, 90):
+        for gender in ("female", "male", "other"):
+            patient = base_patient()
+            patient.update(
+                {
+                    "age": age,
+                    "gender": gender,
+                    "smoking_status": "Current",
+                    "alcohol_use": "Heavy",
+                    "community_deprivation_index": 0.6,
+                }
+            )
+            expected = [clinical._family_history_probability(item.profile, patient) for item in tables.profiles]
+            assert np.allclose(tables.probabilities(patient), expected)
+
+
+def test_generate_family_history_batch_respects_bounds():
+    patients = []
+    for idx in range(100):
+        patient = base_patient()
+        patient.update({"patient_id": f"p{idx}", "age": 55})
+        patients.append(patient)
+
+    seed_random(21)
+    results = clinical.generate_family_history_batch(patients, min_fam=1, max_fam=3)
+
+    assert set(results) == {p["patient_id"] for p in patients}
+    for patient in patients:
+        entries, adjustments = results[patient["patient_id"]]
+        assert 1 <= len(entries) <= 3
+        assert patient["family_history_entries"] is entries
+        assert all(0 < value <= 0.3 for value in adjustments.values())
+
+
+def test_allergy_engine_caches_resolved_followup_templates():
+    engine = clinical.get_allergy_engine()
+    allergy = {"substance": "Peanut", "category": "food", "severity": "severe"}
+    template = engine.followup_template(allergy)
+    assert engine.followup_template(dict(allergy)) is template
+    keys = [action.key for action in template.actions]
+    assert keys[:2] == ["cetirizine", "epinephrine_autoinjector"]
+    assert {"serum_tryptase", "peanut_specific_ige", "oral_food_challenge"}.issubset(keys)
+    assert template.summary.startswith("medications:cetirizine,epinephrine_autoinjector")
+
+
+def test_plan_allergy_followups_instantiates_templates_per_patient():
+    patient = base_patient()
+    encounters = [{"encounter_id": "enc-1", "date": "2023-03-01"}]
+    allergies = [
+        {"substance": "Peanut", "category": "food", "severity": "severe", "followup_summary": "risk: high"},
+        {"substance": "Peanut Oil", "category": "food", "severity": "severe"},
+    ]
+
+    seed_random(3)
+    followups = clinical.plan_allergy_followups(patient, encounters, allergies)
+
+    names = [record["name"] for record in followups["medications"]]
+    assert sorted(names) == sorted(set(names))
+    for record in followups["medications"] + followups["procedures"] + followups["observations"]:
+        assert record["patient_id"] == patient["patient_id"]
+        assert record["encounter_id"] == "enc-1"
+    assert allergies[0]["followup_summary"].startswith("risk: high | medications:")
+
+
+def test_treatment_index_masks_and_resolved_plans():
+    index = clinical.get_treatment_index()
+    pregnancy = index.contraindication_mask(["Pregnancy", "Unlisted"])
+    assert pregnancy == index.contraindication_bits["Pregnancy"]
+    assert index.medication_mask("Lisinopril") & pregnancy
+    assert not index.medication_mask("Amlodipine") & pregnancy
+
+    plan = index.plan_for({"name": "Chronic obstructive pulmonary disease"})
+    assert plan is not None and plan.guideline == "COPD"
+    assert index.plan_for({"name": "Unmapped finding", "condition_category": "oncology"}).guideline == "Cancer"
+    first_line = index.plans["Hypertension"].steps[0]
+    assert [candidate.name for candidate in first_line.safe_candidates(pregnancy)] == [
+        "Amlodipine",
+        "Hydrochlorothiazide",
+    ]
+    assert first_line.candidates[0].template is clinical.get_medication_template("Lisinopril")
+
+
+def test_prescribing_skips_contraindicated_candidates():
+    patient = base_patient()
+    encounters = [{"encounter_id": "enc-1", "date": "2023-01-01"}]
+    for seed in range(25):
+        seed_random(seed)
+        diabetes = clinical.prescribe_evidence_based_medication(
+            patient, {"name": "Diabetes"}, encounters, ["eGFR_less_than_30"]
+        )
+        assert diabetes and "Metformin" not in {med["name"] for med in diabetes}
+        assert diabetes[0]["therapy_category"] == "second_line"
+
+        hypertension = clinical.prescribe_evidence_based_medication(
+            patient, {"name": "Hypertension"}, encounters, ["Pregnancy"]
+        )
+        assert "Lisinopril" not in {med["name"] for med in hypertension}
+        assert len(hypertension) <= 3
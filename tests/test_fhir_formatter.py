@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import json
 from datetime import datetime
 
+import polars as pl
+
 import sys
 from pathlib import Path
 
@@ -17,10 +20,13 @@ add_project_root()
 from src.core.lifecycle.models import MedicationOrder, Observation
 from src.core.synthetic_patient_generator import (
     FHIRFormatter,
+    FHIRNDJSONFormatter,
     TerminologyEntry,
     ValueSetMember,
     UmlsConcept,
+    build_enrichment_frames,
     build_terminology_lookup,
+    enrich_event_frame,
 )
 
 
@@ -64,6 +70,88 @@ def test_build_terminology_lookup_with_vsac_and_umls():
     assert any(entry.code == "C0020538" for entry in lookup["umls"].values())
 
 
+
+def test_enrichment_frames_join_once_per_code():
+    lookup = build_terminology_lookup(
+        {
+            "loinc": [
+                TerminologyEntry("2951-2", "Sodium", {"ncbi_url": "https://example.org/loinc/2951-2"}),
+                TerminologyEntry("718-7", "Hemoglobin", {}),
+            ],
+            "vsac": {
+                "1.2.3": [ValueSetMember("1.2.3", "Electrolytes", "2951-2", "Sodium", {})],
+                "1.2.4": [ValueSetMember("1.2.4", "Basic Panel", "2951-2", "Sodium", {})],
+            },
+            "rxnorm": [TerminologyEntry("6809", "Metformin", {"ndc_example": ""})],
+            "umls": [
+                UmlsConcept("C0025598", "Metformin", "Organic Chemical", "T109", "RXNORM", "6809", "IN", {}),
+                UmlsConcept("C0000001", "Metformin product", "Pharmacologic Substance", "T121", "RXNORM", "6809", "IN", {}),
+            ],
+        }
+    )
+    frames = build_enrichment_frames(lookup)
+    assert frames["observations"].height == 2
+
+    observations = enrich_event_frame(
+        pl.DataFrame(
+            {
+                "loinc_code": ["2951-2", "718-7", "0000-0", None],
+                "value": [1, 2, 3, 4],
+                "interpretation": ["N", None, None, None],
+                "extra": [None, None, None, "x"],
+            }
+        ),
+        frames["observations"],
+        ("loinc_code", "loinc"),
+        overwrite=("value_set_oids", "value_set_names"),
+    )
+    assert observations.columns == [
+        "loinc_code",
+        "value",
+        "interpretation",
+        "extra",
+        "loinc_display",
+        "loinc_ncbi_url",
+        "value_set_oids",
+        "value_set_names",
+    ]
+    assert observations["value"].to_list() == [1, 2, 3, 4]
+    assert observations["loinc_display"].to_list() == ["Sodium", "Hemoglobin", None, None]
+    assert observations["value_set_oids"].to_list() == ["1.2.3,1.2.4", None, None, None]
+    assert observations["value_set_names"][0] == "Basic Panel,Electrolytes"
+
+    medications = enrich_event_frame(
+        pl.DataFrame({"rxnorm_code": ["6809", "Atorvastatin"], "rxnorm_display": [None, "Lipitor"]}),
+        frames["medications"],
+        ("rxnorm_code", "rxnorm"),
+    )
+    assert medications["rxnorm_display"].to_list() == ["Metformin", "Lipitor"]
+    assert medications["umls_cuis"].to_list() == ["C0000001,C0025598", None]
+    assert medications["umls_semantic_types"][0] == "Organic Chemical,Pharmacologic Substance"
+    assert "ndc_example" not in medications.columns
+
+def test_enriched_event_csv_keeps_the_unenriched_header_order(tmp_path):
+    lookup = build_terminology_lookup({"rxnorm": [TerminologyEntry("6809", "Metformin", {"ndc_example": "0001"})]})
+    rows = [
+        {"medication_id": "m1", "name": "Metformin", "rxnorm_code": "6809", "status": "active"},
+        {"medication_id": "m2", "name": "Amoxicillin", "rxnorm_code": "723", "status": "completed",
+         "duration_days": 10},
+    ]
+    baseline_csv = tmp_path / "baseline_medications.csv"
+    pl.DataFrame(rows).write_csv(baseline_csv)
+    enriched_csv = tmp_path / "medications.csv"
+    enrich_event_frame(
+        pl.DataFrame(rows),
+        build_enrichment_frames(lookup)["medications"],
+        ("rxnorm_code", "rxnorm"),
+        overwrite=("umls_cuis", "umls_semantic_types"),
+    ).write_csv(enriched_csv)
+
+    baseline_header = baseline_csv.read_text(encoding="utf-8").splitlines()[0].split(",")
+    enriched_header = enriched_csv.read_text(encoding="utf-8").splitlines()[0].split(",")
+    assert enriched_header == baseline_header + ["rxnorm_display", "ndc_example"]
+
+
 def test_build_coding_adds_umls_extension():
     icd_entry = TerminologyEntry(
         code="I10",
@@ -94,6 +182,22 @@ def test_build_coding_adds_umls_extension():
     assert nested["cui"]["valueCode"] == "C0020538"
 
 
+
+def test_build_coding_reuses_cached_fragments():
+    icd_entry = TerminologyEntry(code="I10", display="Hypertension", metadata={"ncbi_url": "https://example.org/I10"})
+    formatter = FHIRFormatter(build_terminology_lookup({"icd10": [icd_entry]}))
+
+    first = formatter._build_coding("http://hl7.org/fhir/sid/icd-10-cm", "I10", "Hypertension")
+    second = formatter._build_coding("http://hl7.org/fhir/sid/icd-10-cm", "I10", "Hypertension")
+    other_display = formatter._build_coding("http://hl7.org/fhir/sid/icd-10-cm", "I10", "High blood pressure")
+
+    assert second is first
+    assert first["extension"] == [{"url": "https://www.ncbi.nlm.nih.gov/", "valueUri": "https://example.org/I10"}]
+    assert other_display["display"] == "High blood pressure"
+    stats = formatter.coding_cache_stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 2, 2)
+    assert stats["hit_rate"] == 1 / 3
+
 def test_observation_resource_includes_vsac_extension():
     loinc_entry = TerminologyEntry(
         code="2951-2",
@@ -206,3 +310,53 @@ def test_allergy_resource_includes_risk_extension():
     assert reaction["severity"] == "severe"
     assert reaction.get("onset") == "2025-01-01"
     assert resource.get("note") and "epinephrine_autoinjector" in resource["note"][0]["text"]
+
+
+def test_ndjson_formatter_matches_templated_dict_resources():
+    rxnorm_entry = TerminologyEntry(code="12345", display="Sample RxNorm Drug", metadata={})
+    lookup = build_terminology_lookup({"rxnorm": [rxnorm_entry]})
+    formatter = FHIRFormatter(lookup)
+    ndjson_formatter = FHIRNDJSONFormatter(lookup)
+
+    medication = MedicationOrder(
+        medication_id="med-1",
+        patient_id="patient-1",
+        name="Sample RxNorm Drug",
+        start_date=datetime(2025, 1, 2).date(),
+        end_date=None,
+        rxnorm_code="12345",
+        ndc_code=None,
+        therapeutic_class="analgesic",
+        indication="Pain",
+        metadata={"dosage": "1 tablet daily"},
+    )
+    condition = {"condition_id": "cond-1", "name": "Hypertension", "onset_date": "2024-03-01"}
+    care_plan = {"care_plan_id": "cp-1", "condition": "Hypertension", "status": "completed"}
+
+    first = formatter.create_condition_resource("patient-1", condition)
+    second = formatter.create_condition_resource("patient-2", dict(condition, condition_category="chronic_disease"))
+    assert list(first)[:7] == [
+        "resourceType",
+        "id",
+        "subject",
+        "code",
+        "clinicalStatus",
+        "verificationStatus",
+        "onsetDateTime",
+    ]
+    assert first["verificationStatus"] is second["verificationStatus"]
+    assert second["category"][0]["text"] == "Chronic Disease"
+    assert "text" not in first["category"][0]
+
+    pairs = [
+        ("create_medication_statement_resource", medication),
+        ("create_condition_resource", condition),
+        ("create_care_plan_resource", care_plan),
+    ]
+    for method, record in pairs:
+        resource = getattr(formatter, method)("patient-1", record)
+        line = getattr(ndjson_formatter, method)("patient-1", record)
+        assert isinstance(line, bytes)
+        assert line == json.dumps(resource, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        assert list(json.loads(line)) == list(resource)
+
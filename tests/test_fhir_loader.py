@@ -0,0 +1,154 @@
+"""Transaction bundle export and the concurrent loader against a local stub server."""
+from __future__ import annotations
+
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from src.core.fhir_loader import load_bundles
+from src.core.lifecycle.models import Patient
+from src.core.synthetic_patient_generator import (
+    FHIR_SOURCE_IDENTIFIER_SYSTEM,
+    FHIRFormatter,
+    iter_transaction_bundles,
+)
+
+
+def _patient(index: int) -> Patient:
+    patient_id = f"patient-{index}"
+    return Patient.from_legacy(
+        {
+            "patient_id": patient_id,
+            "first_name": "Ada",
+            "last_name": f"Lovelace{index}",
+            "birthdate": "1980-02-03",
+            "gender": "female",
+            "mrn": f"MRN{index}",
+        },
+        encounters=[],
+        conditions=[
+            {"condition_id": f"{patient_id}-c", "name": "Hypertension", "status": "active", "onset_date": "2020-01-01"}
+        ],
+        medications=[
+            {"medication_id": f"{patient_id}-m", "name": "Lisinopril", "rxnorm_code": "617314", "start_date": "2020-01-02"}
+        ],
+        immunizations=[],
+        observations=[],
+        allergies=[],
+        procedures=[],
+        metadata={
+            "care_plan_details": [
+                {"care_plan_id": f"{patient_id}-cp", "condition": "Hypertension", "condition_id": f"{patient_id}-c"}
+            ]
+        },
+    )
+
+
+class _StubFHIRServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, fail_first: int = 0):
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.fail_first = fail_first
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.bundles = []
+        self.client_ports = set()
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.client_ports.add(self.client_address[1])
+            failing = server.requests <= server.fail_first
+            if not failing:
+                server.bundles.append(json.loads(body))
+        if failing:
+            self._reply(503, b'{"resourceType":"OperationOutcome"}', {"Retry-After": "0"})
+        else:
+            self._reply(200, b'{"resourceType":"Bundle","type":"transaction-response"}')
+
+    def _reply(self, status: int, payload: bytes, headers=None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/fhir+json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def stub_server(request):
+    server = _StubFHIRServer(fail_first=getattr(request, "param", 0))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_transaction_bundles_use_urn_uuid_references_and_conditional_creates():
+    patients = [_patient(index) for index in range(3)]
+    bundles = list(iter_transaction_bundles(FHIRFormatter(), patients, patients_per_bundle=2))
+
+    assert [len(bundle["entry"]) for bundle in bundles] == [8, 4]
+    bundle = bundles[0]
+    assert bundle["type"] == "transaction"
+    full_urls = {entry["fullUrl"] for entry in bundle["entry"]}
+    assert all(url.startswith("urn:uuid:") for url in full_urls) and len(full_urls) == 8
+
+    patient_entry, condition_entry = bundle["entry"][:2]
+    assert patient_entry["request"] == {
+        "method": "POST",
+        "url": "Patient",
+        "ifNoneExist": f"identifier={FHIR_SOURCE_IDENTIFIER_SYSTEM}|patient-0",
+    }
+    assert "id" not in patient_entry["resource"]
+    assert patient_entry["resource"]["identifier"][-1]["value"] == "patient-0"
+    assert condition_entry["resource"]["subject"] == {"reference": patient_entry["fullUrl"]}
+    care_plan = next(entry for entry in bundle["entry"] if entry["resource"]["resourceType"] == "CarePlan")
+    assert care_plan["resource"]["addresses"][0]["reference"] == condition_entry["fullUrl"]
+
+    rebuilt = next(iter_transaction_bundles(FHIRFormatter(), patients, patients_per_bundle=2))
+    assert [entry["fullUrl"] for entry in rebuilt["entry"]] == [entry["fullUrl"] for entry in bundle["entry"]]
+
+
+@pytest.mark.parametrize("stub_server", [3], indirect=True)
+def test_loader_posts_bundles_over_pooled_connections_with_retries(stub_server):
+    bundles = list(iter_transaction_bundles(FHIRFormatter(), [_patient(index) for index in range(10)]))
+    endpoint = f"http://127.0.0.1:{stub_server.server_address[1]}/fhir"
+
+    result = load_bundles(endpoint, bundles, concurrency=3, max_retries=2, backoff=0.01)
+
+    assert (result.bundles, result.succeeded, result.failed, result.retries) == (10, 10, 0, 3)
+    assert result.resources == 40
+    assert result.connections_opened <= 3
+    assert len(stub_server.client_ports) <= 3
+    received = sorted(bundle["entry"][0]["resource"]["name"][0]["family"] for bundle in stub_server.bundles)
+    assert received == sorted(f"Lovelace{index}" for index in range(10))
+
+
+@pytest.mark.parametrize("stub_server", [100], indirect=True)
+def test_loader_reports_bundles_that_exhaust_retries(stub_server):
+    endpoint = f"http://127.0.0.1:{stub_server.server_address[1]}/fhir"
+    bundles = [{"resourceType": "Bundle", "type": "transaction", "entry": []}] * 2
+
+    result = load_bundles(endpoint, bundles, concurrency=2, max_retries=1, backoff=0.01)
+
+    assert (result.succeeded, result.failed, result.retries) == (0, 2, 2)
+    assert all(error.startswith("HTTP 503") for error in result.errors)
@@ -0,0 +1,175 @@
+"""Streaming HL7 v2 export and the MLLP sender against a local listener."""
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from src.core.lifecycle.records import PatientRecord
+from src.core.mllp import MLLPSender, build_ack, serve_ack_listener
+from src.core.synthetic_patient_generator import HL7StreamWriter, iter_hl7_event_feed, iter_hl7_messages
+
+
+def _legacy_patients():
+    return [
+        PatientRecord(patient_id=f"p{index}", mrn=f"MRN{index}", first_name="Ada", last_name=f"Test{index}",
+                      gender="female", birthdate="1980-01-01")
+        for index in range(3)
+    ]
+
+
+def test_stream_writer_groups_legacy_events_in_one_pass(tmp_path: Path):
+    encounters = [
+        {"patient_id": "p1", "encounter_id": "e1", "date": "2024-01-02", "type": "Outpatient", "reason": "Checkup"},
+        {"patient_id": "p0", "encounter_id": "e0", "date": "2024-01-01", "type": "Emergency", "reason": "Fall"},
+        {"patient_id": "p1", "encounter_id": "e2", "date": "2024-02-02", "type": "Inpatient", "reason": "Later"},
+    ]
+    observations = [
+        {"patient_id": "p1", "type": "Glucose", "value": "98"},
+        {"patient_id": "p2", "type": "Hemoglobin", "value": "13.5"},
+    ]
+
+    messages = list(iter_hl7_messages(_legacy_patients(), encounters, observations))
+    assert [(patient_id, kind) for patient_id, kind, _ in messages] == [
+        ("p0", "ADT"), ("p1", "ADT"), ("p1", "ORU"), ("p2", "ADT"), ("p2", "ORU"),
+    ]
+    assert "20240102" in messages[1][2] and "20240202" not in messages[1][2]
+
+    with HL7StreamWriter(str(tmp_path), "feed") as writer:
+        for item in messages:
+            writer.write(*item)
+
+    assert writer.counts == {"ADT": 3, "ORU": 2}
+    adt_text = (tmp_path / "feed_adt.hl7").read_bytes().decode()
+    assert adt_text == "\n".join(message for _, kind, message in messages if kind == "ADT")
+    validation_text = (tmp_path / "feed_validation.json").read_text()
+    results = json.loads(validation_text)
+    assert validation_text == json.dumps(results, indent=2)
+    assert [result["message_type"] for result in results] == ["ADT", "ADT", "ORU", "ADT", "ORU"]
+    assert writer.valid_count == sum(result["valid"] for result in results)
+
+
+def test_event_feed_merges_full_histories_in_time_order():
+    encounters = [
+        {"patient_id": "p1", "encounter_id": "e1", "date": "2024-01-02", "type": "Outpatient",
+         "provider": "Dr. Ortiz", "time": "09:00", "duration_minutes": 40},
+        {"patient_id": "p0", "encounter_id": "e0", "date": "2024-01-02", "type": "Inpatient",
+         "time": "08:30", "duration_minutes": 120, "encounter_class": "inpatient"},
+        {"patient_id": "p1", "encounter_id": "e2", "date": "2024-02-02", "type": "Outpatient"},
+    ]
+    observations = [
+        {"patient_id": "p1", "encounter_id": "e1", "observation_id": "o1", "type": "Sodium", "value": "140",
+         "value_numeric": 140.0, "units": "mmol/L", "loinc_code": "2951-2", "status": "normal",
+         "panel": "Basic_Metabolic_Panel", "reference_range": "135-145 mmol/L"},
+        {"patient_id": "p1", "encounter_id": "e1", "observation_id": "o2", "type": "Hemoglobin", "value": "9.1",
+         "value_numeric": 9.1, "units": "g/dL", "loinc_code": "718-7", "status": "critical",
+         "panel": "Complete_Blood_Count"},
+        {"patient_id": "p1", "encounter_id": "e1", "observation_id": "o3", "type": "Potassium", "value": "5.9",
+         "value_numeric": 5.9, "units": "mmol/L", "loinc_code": "2823-3", "status": "abnormal",
+         "panel": "Basic_Metabolic_Panel"},
+        {"patient_id": "p0", "observation_id": "o4", "type": "Glucose", "value": "98", "date": "2024-01-01"},
+    ]
+
+    feed = list(iter_hl7_event_feed(_legacy_patients(), encounters, observations))
+    headers = [message.split("\r")[0].split("|") for _, _, message in feed]
+    assert [(patient_id, header[8]) for (patient_id, _, _), header in zip(feed, headers)] == [
+        ("p0", "ORU^R01"),
+        ("p0", "ADT^A01"), ("p1", "ADT^A04"), ("p1", "ADT^A08"), ("p0", "ADT^A08"), ("p1", "ADT^A03"),
+        ("p0", "ADT^A03"), ("p1", "ORU^R01"), ("p1", "ORU^R01"),
+        ("p1", "ADT^A04"), ("p1", "ADT^A08"), ("p1", "ADT^A03"),
+    ]
+    timestamps = [header[6] for header in headers]
+    assert timestamps == sorted(timestamps)
+    assert timestamps[:3] == ["20240101100000", "20240102083000", "20240102090000"]
+    assert [header[9] for header in headers] == [f"EVT{n:012d}" for n in range(1, 13)]
+
+    discharge = feed[5][2].split("\r")[-1].split("|")
+    assert discharge[44:46] == ["20240102090000", "20240102094000"]
+
+    metabolic = feed[7][2].split("\r")
+    obr = metabolic[2].split("|")
+    assert obr[4] == "51990-0^Basic metabolic panel - Blood^LN"
+    assert (obr[7], obr[16], obr[22], obr[25]) == ("20240102090000", "ORTIZ^", "20240102110000", "F")
+    assert [segment.split("|")[3] for segment in metabolic[3:]] == ["2951-2^Sodium^LN", "2823-3^Potassium^LN"]
+    assert [segment.split("|")[8] for segment in metabolic[3:]] == ["N", "A"]
+    assert [segment.split("|")[7] for segment in metabolic[3:]] == ["135-145 mmol/L", ""]
+    assert "58410-2^CBC panel" in feed[8][2] and "|AA|" in feed[8][2]
+    assert "OBR|1|" in feed[0][2] and "^Glucose^LN" in feed[0][2].split("\r")[2]
+
+
+def test_mllp_sender_acknowledges_retries_and_reports_naks():
+    messages = [message for _, _, message in iter_hl7_messages(_legacy_patients() * 4)]
+    dropped = []
+
+    def respond(message: str):
+        if not dropped:
+            dropped.append(message)
+            return None  # drop the first connection unacknowledged
+        if "Test2" in message:
+            return build_ack(message, "AE", "Unknown patient")
+        return build_ack(message)
+
+    async def scenario():
+        server = await serve_ack_listener(respond=respond)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            sender = MLLPSender("127.0.0.1", port, connections=3, backoff=0.01, timeout=5)
+            return await sender.send(iter(messages))
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    result = asyncio.run(scenario())
+
+    assert result.messages == 12
+    assert (result.accepted, result.rejected, result.failed) == (8, 4, 0)
+    assert result.retries == 1
+    assert result.connections_opened == 4
+    assert all(": AE Unknown patient" in error for error in result.errors)
+
+
+def test_mllp_sender_does_not_resend_on_mismatched_ack():
+    messages = [message for _, _, message in iter_hl7_messages(_legacy_patients())]
+    received = []
+
+    def respond(message: str):
+        received.append(message)
+        return build_ack(message).replace("MSA|AA|", "MSA|AA|X")
+
+    async def scenario():
+        server = await serve_ack_listener(respond=respond)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            sender = MLLPSender("127.0.0.1", port, connections=2, backoff=0.01, timeout=5)
+            return await sender.send(iter(messages))
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    result = asyncio.run(scenario())
+
+    assert (result.accepted, result.failed, result.retries) == (0, len(messages), 0)
+    assert sorted(received) == sorted(messages)
+
+
+def test_mllp_sender_fails_fast_when_connection_is_refused():
+    import socket
+
+    import pytest
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+
+    def feed():
+        for _, _, message in iter_hl7_messages(_legacy_patients() * 50):
+            yield message
+
+    sender = MLLPSender("127.0.0.1", port, connections=2, backoff=5, timeout=5)
+    with pytest.raises(ConnectionRefusedError):
+        asyncio.run(sender.send(feed()))
+    assert sender.result.retries == 0
+    assert sender.result.messages < 150
@@ -121,3 +121,34 @@ def test_generate_immunizations_produces_titer_followup_when_probability_hit():
 def test_immunization_catalog_has_rxnorm_codes():
     missing = [entry["display"] for entry in IMMUNIZATIONS if not entry.get("rxnorm")]
     assert not missing, f"Immunization entries missing RxNorm codes: {missing}"
+
+
+def test_immunization_schedule_indexes_series_by_age_and_allergy_mask():
+    schedule = clinical.get_immunization_schedule()
+    infant = {compiled.definition["series_id"] for compiled in schedule.series_for_age(2)}
+    assert {"hepB_primary", "dtap_child", "pcv_child"} <= infant
+    assert "zoster_senior" not in infant
+    senior = {compiled.definition["series_id"] for compiled in schedule.series_for_age(61 * 12)}
+    assert "zoster_senior" in senior and "dtap_child" not in senior
+
+    hep_b = next(c for c in schedule.series_for_age(2) if c.definition["series_id"] == "hepB_primary")
+    yeast_mask = schedule.allergy_mask([{"substance": "Baker's yeast", "category": "food"}])
+    assert not hep_b.admits(yeast_mask, set(), set())
+    assert hep_b.admits(schedule.allergy_mask([]), set(), set())
+
+
+def test_generate_immunizations_batch_covers_cohorts():
+    seed_random(5)
+    patients = [build_patient(f"cohort-{idx}", age_years=age) for idx, age in enumerate([1, 1, 2, 70])]
+    encounters = {p["patient_id"]: sample_encounters(p["patient_id"], p["birthdate"]) for p in patients}
+    allergies = {"cohort-1": [{"substance": "Yeast", "category": "food"}]}
+
+    results = clinical.generate_immunizations_batch(patients, encounters, allergies_by_patient=allergies)
+
+    assert set(results) == {p["patient_id"] for p in patients}
+    assert not any(r["series_id"] == "hepB_primary" for r in results["cohort-1"][0])
+    assert any(r["series_id"] == "zoster_senior" for r in results["cohort-3"][0])
+    for immunizations, _ in results.values():
+        seen = {(r["series_id"], r["dose_number"]) for r in immunizations}
+        assert len(seen) == len(immunizations)
+        assert [r["date"] for r in immunizations] == sorted(r["date"] for r in immunizations)
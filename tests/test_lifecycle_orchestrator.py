@@ -37,3 +37,46 @@ def test_orchestrator_builds_patient_with_metadata():
     assert patient.metadata["scenario_details"]["description"] == "Balanced demographic distribution"
     assert patient.care_plan.total == 2
 
+
+
+def test_orchestrator_columnar_observations_match_row_objects():
+    observations = [
+        {
+            "observation_id": "obs-1",
+            "patient_id": "123",
+            "type": "Hemoglobin A1c",
+            "value": "7.1",
+            "unit": "%",
+            "status": "abnormal",
+            "observation_date": "2024-03-01",
+            "loinc_code": "4548-4",
+        },
+        {
+            "observation_id": "obs-2",
+            "patient_id": "123",
+            "type": "Heart rate",
+            "value": "72",
+            "unit": "/min",
+            "observation_date": "2024-03-01T09:30:00",
+        },
+    ]
+    kwargs = dict(
+        encounters=[],
+        conditions=[],
+        medications=[],
+        immunizations=[],
+        observations=observations,
+        allergies=[],
+        procedures=[],
+    )
+
+    rows = LifecycleOrchestrator().build_patient(minimal_patient_dict(), **kwargs)
+    columnar = LifecycleOrchestrator(columnar_observations=True).build_patient(minimal_patient_dict(), **kwargs)
+
+    assert not hasattr(rows.observations[0], "__dict__")
+    assert columnar.observations == rows.observations
+    assert columnar.observations[-1].effective_datetime == datetime(2024, 3, 1, 9, 30)
+    assert columnar.observations.column("loinc_code") == ["4548-4", None]
+    assert rows.observations[1].metadata == {}
+    assert columnar.to_serializable_dict() == rows.to_serializable_dict()
+    assert type(rows.to_serializable_dict()["observations"][1]["metadata"]) is dict
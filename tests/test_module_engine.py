@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import pickle
 import random
 import sys
 from pathlib import Path
@@ -13,6 +14,7 @@ if root_str not in sys.path:
     sys.path.insert(0, root_str)
 
 from src.core.lifecycle.modules import ModuleEngine, ModuleValidationError
+from src.core.lifecycle.modules import engine as engine_module
 
 
 def run_module(
@@ -184,7 +186,8 @@ def test_heart_failure_module_generates_gdmt():
     assert any(obs["loinc_code"] == "33914-3" for obs in result.observations)
 
 
-def test_module_validation_rejects_invalid_decisions(tmp_path):
+@pytest.mark.parametrize("lazy", [False, True])
+def test_module_validation_rejects_invalid_decisions(tmp_path, lazy):
     invalid_module = tmp_path / "invalid_module.yaml"
     invalid_module.write_text(
         """
@@ -206,8 +209,29 @@ states:
 """
     )
 
+    if not lazy:
+        with pytest.raises(ModuleValidationError):
+            ModuleEngine(["invalid_module"], modules_root=tmp_path)
+        return
+    # Lazy engines only check the header up front; the states fail on first use.
+    engine = ModuleEngine(["invalid_module"], modules_root=tmp_path, lazy=True)
     with pytest.raises(ModuleValidationError):
-        ModuleEngine(["invalid_module"], modules_root=tmp_path)
+        engine.execute({"patient_id": "invalid-1", "age": 40, "gender": "female"})
+
+
+def test_lazy_engine_rejects_malformed_header_at_construction(tmp_path):
+    (tmp_path / "headless_module.yaml").write_text(
+        """
+description: Module without a name
+categories: []
+states:
+  start:
+    type: start
+"""
+    )
+
+    with pytest.raises(ModuleValidationError):
+        ModuleEngine(["headless_module"], modules_root=tmp_path, lazy=True)
 
 
 def test_call_submodule_merges_outputs_and_attributes(tmp_path):
@@ -654,3 +678,317 @@ states:
 
     encounters = result.encounters
     assert encounters[0].get("end_date") is not None
+
+
+def test_module_cache_reuses_compiled_definitions(tmp_path: Path):
+    modules_root = tmp_path / "modules"
+    modules_root.mkdir()
+    cache_dir = tmp_path / "cache"
+    module_path = modules_root / "cached_module.yaml"
+    module_path.write_text(
+        textwrap.dedent(
+            """
+            name: cached_module
+            description: Module used to exercise the compiled cache
+            categories:
+              encounters: replace
+            states:
+              start:
+                type: start
+                transitions:
+                  - to: visit
+              visit:
+                type: encounter
+                encounter_type: "Cached Visit"
+                transitions:
+                  - to: end
+              end:
+                type: terminal
+            """
+        ),
+        encoding="utf-8",
+    )
+
+    first = ModuleEngine(["cached_module"], modules_root=modules_root, cache_dir=cache_dir)
+    assert first.module_cache.misses == 1
+    assert list(cache_dir.glob("cached_module.*.pickle"))
+
+    second = ModuleEngine(["cached_module"], modules_root=modules_root, cache_dir=cache_dir)
+    assert second.module_cache.hits == 1
+    assert second.categories_replaced() == {"encounters"}
+    patient = {
+        "patient_id": "cache-1",
+        "birthdate": "1980-01-01",
+        "age": 44,
+        "gender": "female",
+    }
+    result = second.execute(patient)
+    assert [enc["type"] for enc in result.encounters] == ["Cached Visit"]
+
+    # Editing the YAML changes the cache key and forces a fresh compile.
+    module_path.write_text(
+        module_path.read_text(encoding="utf-8").replace("Cached Visit", "Edited Visit"),
+        encoding="utf-8",
+    )
+    third = ModuleEngine(["cached_module"], modules_root=modules_root, cache_dir=cache_dir)
+    assert third.module_cache.misses == 1
+    assert [enc["type"] for enc in third.execute(patient).encounters] == ["Edited Visit"]
+
+    # A damaged entry is validated on load and rebuilt from the YAML.
+    for entry in cache_dir.glob("cached_module.*.pickle"):
+        payload = pickle.loads(entry.read_bytes())
+        payload["definition"].states.pop("start")
+        entry.write_bytes(pickle.dumps(payload))
+    fourth = ModuleEngine(["cached_module"], modules_root=modules_root, cache_dir=cache_dir, lazy=True)
+    assert [enc["type"] for enc in fourth.execute(patient).encounters] == ["Edited Visit"]
+    assert "start" in fourth.definition_cache["cached_module"].states
+
+
+def test_lazy_engine_loads_only_eligible_modules(monkeypatch):
+    parsed = []
+    safe_load = engine_module.yaml.safe_load
+
+    def spy_safe_load(stream):
+        payload = safe_load(stream)
+        if isinstance(payload, dict) and "states" in payload:
+            parsed.append(payload["name"])
+        return payload
+
+    monkeypatch.setattr(engine_module.yaml, "safe_load", spy_safe_load)
+    monkeypatch.delenv("MODULE_CACHE_DIR", raising=False)
+    engine = ModuleEngine(
+        ["pediatric_well_child_care", "geriatric_polypharmacy"],
+        lazy=True,
+    )
+    assert engine.primary_definitions == []
+    assert parsed == []
+    assert engine.module_index["geriatric_polypharmacy"].guardrails["min_age"] == 65
+    assert "encounters" in engine.module_index["pediatric_well_child_care"].categories
+
+    child = {
+        "patient_id": "lazy-1",
+        "birthdate": "2018-06-01",
+        "age": 6,
+        "gender": "male",
+    }
+    assert engine.eligible_modules(child) == ("pediatric_well_child_care",)
+    random.seed(1)
+    engine.execute(child)
+
+    loaded = {definition.name for definition in engine.primary_definitions}
+    assert loaded == {"pediatric_well_child_care"}
+    assert parsed == ["pediatric_well_child_care"]
+
+
+def test_module_index_is_read_only():
+    engine = ModuleEngine(["prenatal_care_management"], lazy=True)
+    metadata = engine.module_index["prenatal_care_management"]
+    assert metadata.guardrails["allowed_genders"] == frozenset({"female"})
+    with pytest.raises(TypeError):
+        metadata.guardrails["min_age"] = 0
+    assert not engine.definition_cache
+
+
+def test_module_profiler_records_states_loop_guard_and_exports(tmp_path: Path):
+    (tmp_path / "looping_module.yaml").write_text(
+        textwrap.dedent(
+            """
+            name: looping_module
+            description: Cycles between two states until the loop guard stops it
+            categories: {}
+            states:
+              start:
+                type: start
+                transitions:
+                  - to: ping
+              ping:
+                type: set_attribute
+                attribute: side
+                value: ping
+                transitions:
+                  - to: pong
+              pong:
+                type: delay
+                duration_days: 1
+                transitions:
+                  - to: ping
+            """
+        ),
+        encoding="utf-8",
+    )
+    engine = ModuleEngine(["looping_module"], modules_root=tmp_path, profile=True)
+    patient = {
+        "patient_id": "prof-1",
+        "birthdate": "1980-01-01",
+        "age": 44,
+        "gender": "male",
+    }
+    engine.execute(patient)
+
+    profiler = engine.profiler
+    module_profile = profiler.modules["looping_module"]
+    assert module_profile.runs == 1
+    assert module_profile.loop_guard_hits == 1
+    assert module_profile.max_call_depth == 1
+    assert profiler.states[("looping_module", "delay")].visits == 100
+
+    paths = profiler.export(tmp_path / "profile")
+    assert {path.suffix for path in paths.values()} == {".json", ".csv", ".folded"}
+    folded = paths["folded"].read_text(encoding="utf-8").splitlines()
+    assert any(line.startswith("looping_module;ping[set_attribute] ") for line in folded)
+
+
+def test_module_engine_without_profile_has_no_profiler():
+    engine = ModuleEngine(["asthma_v2"])
+    assert engine.profiler is None
+
+
+def _strip_ids(result):
+    id_fields = {
+        "encounter_id",
+        "condition_id",
+        "medication_id",
+        "observation_id",
+        "procedure_id",
+        "immunization_id",
+        "care_plan_id",
+    }
+    return {
+        category: [
+            {key: value for key, value in entry.items() if key not in id_fields}
+            for entry in getattr(result, category)
+        ]
+        for category in ("encounters", "conditions", "medications", "observations", "care_plans")
+    }
+
+
+def test_memoized_submodule_replay_matches_interpretation():
+    memoized = ModuleEngine(["type2_diabetes_management"])
+    interpreted = ModuleEngine(["type2_diabetes_management"], memoize_submodules=False)
+
+    for index in range(10):
+        patient = {
+            "patient_id": f"memo-{index}",
+            "birthdate": "1972-03-04",
+            "age": 52,
+            "gender": "female",
+        }
+        random.seed(index)
+        replayed = memoized.execute(patient)
+        random.seed(index)
+        expected = interpreted.execute(patient)
+
+        assert _strip_ids(replayed) == _strip_ids(expected)
+        encounter_ids = {enc["encounter_id"] for enc in replayed.encounters}
+        attached = [med for med in replayed.medications if med["encounter_id"]]
+        assert all(med["encounter_id"] in encounter_ids for med in attached)
+
+    assert memoized.segment_replays > 0
+    assert interpreted.segment_replays == 0
+    assert len(memoized.segment_templates) == 1
+
+
+def test_probabilistic_submodule_is_not_memoized(tmp_path: Path):
+    (tmp_path / "coin_flip.yaml").write_text(
+        textwrap.dedent(
+            """
+            name: coin_flip
+            description: Probabilistic submodule
+            categories: {}
+            states:
+              start:
+                type: start
+                transitions:
+                  - to: flip
+              flip:
+                type: decision
+                transitions:
+                  - to: heads
+                    probability: 0.5
+                  - to: end
+                    probability: 0.5
+              heads:
+                type: encounter
+                encounter_type: "Heads Visit"
+                transitions:
+                  - to: end
+              end:
+                type: terminal
+            """
+        ),
+        encoding="utf-8",
+    )
+    (tmp_path / "caller.yaml").write_text(
+        textwrap.dedent(
+            """
+            name: caller
+            description: Calls the probabilistic submodule
+            categories: {}
+            states:
+              start:
+                type: start
+                transitions:
+                  - to: call
+              call:
+                type: call_submodule
+                module: coin_flip
+                transitions:
+                  - to: end
+              end:
+                type: terminal
+            """
+        ),
+        encoding="utf-8",
+    )
+    engine = ModuleEngine(["caller"], modules_root=tmp_path)
+    patient = {"patient_id": "flip-1", "birthdate": "1990-01-01", "age": 34, "gender": "male"}
+    for seed in range(5):
+        random.seed(seed)
+        engine.execute(patient)
+
+    assert engine.segment_templates == {}
+    assert engine.segment_replays == 0
+
+
+def test_probabilistic_transitions_reuse_alias_tables(tmp_path: Path):
+    (tmp_path / "weighted.yaml").write_text(
+        textwrap.dedent(
+            """
+            name: weighted
+            description: Weighted branch
+            categories: {}
+            states:
+              start:
+                type: start
+                transitions:
+                  - to: rare
+                    probability: 0.1
+                  - to: common
+                    probability: 0.9
+              rare:
+                type: encounter
+                encounter_type: "Rare Visit"
+                transitions:
+                  - to: end
+              common:
+                type: encounter
+                encounter_type: "Common Visit"
+                transitions:
+                  - to: end
+              end:
+                type: terminal
+            """
+        ),
+        encoding="utf-8",
+    )
+    engine = ModuleEngine(["weighted"], modules_root=tmp_path)
+    patient = {"patient_id": "w-1", "birthdate": "1990-01-01", "age": 34, "gender": "male"}
+    random.seed(3)
+    visit_types = [
+        encounter["type"]
+        for _ in range(400)
+        for encounter in engine.execute(patient).encounters
+    ]
+
+    assert len(engine._transition_tables) == 1
+    assert 0 < visit_types.count("Rare Visit") < visit_types.count("Common Visit")
@@ -91,3 +91,60 @@ def test_patient_record_metadata_defaults():
     assert patient.metadata["source_system"] == "synthetic"
     assert patient.metadata["generation_status"] == "pending"
     assert "migration_status" not in patient.metadata
+
+
+def test_patient_record_update_from_generation_feeds_single_export_row():
+    patient = PatientRecord(first_name="Ana", birthdate="1980-05-01")
+    working = patient.to_dict(encode_json=False)
+    assert working["genetic_markers"] == []
+
+    working["genetic_markers"] = [{"gene": "BRCA1"}]
+    working["sdoh_risk_score"] = 0.4
+    working["care_plan_summary"] = {"total": 3, "completed": 1, "in_progress": 2}
+    death = {"death_date": "2020-01-01", "primary_cause_description": "Stroke"}
+    patient.update_from_generation(working, death=death, family_history=[{"condition": "Asthma"}])
+
+    assert patient.metadata["care_plan_in_progress"] == 2
+    assert patient.metadata["family_history_adjustments"] == {}
+    patient.metadata["sdoh_care_gaps"].append("transport")
+    assert PatientRecord().to_dict()["sdoh_care_gaps"] == "[]"
+
+    row = patient.to_dict()
+    assert row["genetic_markers"] == '[{"gene": "BRCA1"}]'
+    assert row["sdoh_risk_score"] == 0.4
+    assert row["care_plan_total"] == 3
+    assert row["death_primary_cause"] == "Stroke"
+
+
+def test_patient_from_record_uses_typed_dates_and_exports_record_row(monkeypatch):
+    from src.core.lifecycle import models
+
+    record = PatientRecord(first_name="Ana", birthdate="1980-05-01")
+    record.update_from_generation(
+        {"sdoh_risk_score": 0.2, "care_plan_summary": {"total": 1, "completed": 1}},
+        death=None,
+        family_history=[],
+    )
+    encounter = {"encounter_id": "e1", "patient_id": record.patient_id, "date": "2020-03-04"}
+
+    def fail_parse(value):
+        raise AssertionError(f"date {value!r} parsed again")
+
+    monkeypatch.setattr(models, "_parse_date", fail_parse)
+    patient = models.Patient.from_record(
+        record,
+        birth_date=date(1980, 5, 1),
+        encounters=[encounter],
+        conditions=[],
+        medications=[],
+        immunizations=[],
+        observations=[],
+        allergies=[],
+        procedures=[],
+        care_plans=[],
+        dates={"2020-03-04": date(2020, 3, 4)},
+    )
+
+    assert patient.birth_date == date(1980, 5, 1)
+    assert patient.encounters[0].start_date == date(2020, 3, 4)
+    assert patient.to_legacy_row() == record.to_dict()
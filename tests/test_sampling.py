@@ -0,0 +1,38 @@
+import random
+from collections import Counter
+
+import pytest
+
+from src.core.lifecycle.generation.sampling import AliasTable, alias_table, sample_from_dist, weighted_choice
+
+
+def test_alias_table_matches_weights():
+    table = AliasTable(["a", "b", "c", "never"], [1.0, 2.0, 7.0, 0.0])
+    rng = random.Random(7)
+    counts = Counter(table.draw(rng) for _ in range(50000))
+    assert counts["never"] == 0
+    assert counts["c"] / 50000 == pytest.approx(0.7, abs=0.02)
+    assert counts["a"] / 50000 == pytest.approx(0.1, abs=0.02)
+
+
+def test_alias_table_rejects_empty_or_zero_weights():
+    with pytest.raises(ValueError):
+        AliasTable([], [])
+    with pytest.raises(ValueError):
+        AliasTable(["a"], [0.0])
+
+
+def test_sample_from_dist_reuses_tables_and_follows_seed():
+    dist = {"Never": 0.6, "Former": 0.3, "Current": 0.1}
+    assert alias_table(dist) is alias_table(dict(dist))
+
+    random.seed(11)
+    first = [sample_from_dist(dist) for _ in range(20)]
+    random.seed(11)
+    assert [sample_from_dist(dist) for _ in range(20)] == first
+
+
+def test_weighted_choice_accepts_pairs_and_weighted_mappings():
+    assert weighted_choice([("only", 1.0), ("zero", 0.0)]) == "only"
+    options = [{"name": "x", "weight": 0.0}, {"name": "y", "weight": 2.0}]
+    assert weighted_choice(options)["name"] == "y"
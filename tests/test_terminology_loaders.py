@@ -233,3 +233,28 @@ def test_load_umls_concepts_from_csv(monkeypatch, tmp_path: Path):
     assert concepts[0].cui == "C12345"
     assert concepts[0].sab == "RXNORM"
     assert concepts[0].metadata["aui"] == "A12345"
+
+
+def test_load_umls_concepts_skips_parquet_older_than_csv(monkeypatch, tmp_path: Path):
+    import polars as pl
+
+    base = tmp_path / "terminology"
+    umls_dir = base / "umls"
+    umls_dir.mkdir(parents=True)
+
+    header = "cui,preferred_name,semantic_type,tui,sab,code,tty,aui,source_atom_name\n"
+    parquet_path = umls_dir / "umls_concepts_full.parquet"
+    pl.read_csv(
+        (header + "C00001,Stale Concept,Disease,T047,RXNORM,1,PT,A1,Stale Concept\n").encode(),
+        schema_overrides={"code": pl.Utf8},
+    ).write_parquet(parquet_path)
+    normalized = umls_dir / "umls_concepts_full.csv"
+    normalized.write_text(header + "C00002,Fresh Concept,Disease,T047,RXNORM,2,PT,A2,Fresh Concept\n", encoding="utf-8")
+    stale = normalized.stat().st_mtime - 60
+    os.utime(parquet_path, (stale, stale))
+
+    monkeypatch.setenv("TERMINOLOGY_ROOT", str(base))
+    assert [concept.cui for concept in load_umls_concepts()] == ["C00002"]
+
+    os.utime(normalized, (stale - 60, stale - 60))
+    assert [concept.cui for concept in load_umls_concepts()] == ["C00001"]
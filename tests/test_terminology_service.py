@@ -0,0 +1,118 @@
+"""Tests for the warehouse-backed terminology service."""
+from __future__ import annotations
+
+import csv
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from src.core.terminology import TerminologyService
+from tools.build_terminology_db import build_database
+
+
+def _write_csv(path: Path, header: list[str], rows: list[list[str]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def _seed_terminology(root: Path) -> None:
+    _write_csv(
+        root / "icd10/icd10_conditions.csv",
+        ["code", "description", "chapter", "ncbi_url"],
+        [
+            ["E11.9", "Type 2 diabetes mellitus without complications", "Endocrine", "https://ncbi.example/E11.9"],
+            ["I10", "Essential (primary) hypertension", "Circulatory", "https://ncbi.example/I10"],
+        ],
+    )
+    _write_csv(
+        root / "loinc/loinc_labs.csv",
+        ["loinc_code", "long_common_name", "component", "property", "system", "ncbi_url"],
+        [["4548-4", "Hemoglobin A1c/Hemoglobin.total in Blood", "Hemoglobin A1c", "MFr", "Bld", ""]],
+    )
+    _write_csv(
+        root / "snomed/snomed_conditions.csv",
+        ["snomed_id", "pt_name", "icd10_mapping", "ncbi_url"],
+        [
+            ["44054006", "Diabetes mellitus type 2", "E119", ""],
+            ["38341003", "Hypertensive disorder", "I10;I15.0", ""],
+        ],
+    )
+    _write_csv(
+        root / "rxnorm/rxnorm_medications.csv",
+        ["rxnorm_cui", "tty", "ingredient_name", "ndc_example", "ncbi_url"],
+        [
+            ["6809", "IN", "Metformin", "", ""],
+            ["860975", "SCD", "Metformin hydrochloride 500 MG Oral Tablet", "00093-1047-01", ""],
+        ],
+    )
+    _write_csv(
+        root / "vsac/vsac_value_sets.csv",
+        ["value_set_oid", "value_set_name", "code", "code_system", "display_name"],
+        [
+            ["2.16.1", "Diabetes Labs", "4548-4", "LOINC", "Hemoglobin A1c"],
+            ["2.16.2", "Glycemic Control", "4548-4", "LOINC", "Hemoglobin A1c"],
+        ],
+    )
+    _write_csv(
+        root / "umls/umls_concepts.csv",
+        ["cui", "preferred_name", "semantic_type", "tui", "sab", "code", "tty"],
+        [
+            ["C0025598", "Metformin", "Organic Chemical", "T109", "RXNORM", "6809", "IN"],
+            ["C0020538", "Hypertension", "Disease or Syndrome", "T047", "ICD10CM", "I10", "PT"],
+        ],
+    )
+
+
+@pytest.fixture(params=["duckdb", "csv"])
+def service(request, tmp_path: Path, monkeypatch):
+    root = tmp_path / "terminology"
+    _seed_terminology(root)
+    monkeypatch.delenv("TERMINOLOGY_DB_PATH", raising=False)
+    if request.param == "duckdb":
+        build_database(root, root / "terminology.duckdb", force=True)
+    with TerminologyService(str(root)) as svc:
+        assert (svc.db_path is not None) == (request.param == "duckdb")
+        yield svc
+
+
+def test_get_many_returns_requested_codes_and_caches_misses(service: TerminologyService) -> None:
+    entries = service.get_many("rxnorm", ["860975", "999", "6809", "860975"])
+
+    assert list(entries) == ["860975", "6809"]
+    assert entries["860975"].metadata["ndc_example"] == "00093-1047-01"
+    assert service.get("loinc", "4548-4").display.startswith("Hemoglobin A1c")
+
+    misses = service.cache_info["misses"]
+    assert service.get_many("rxnorm", ["999", "6809"]).keys() == {"6809"}
+    assert service.cache_info["misses"] == misses
+
+
+def test_search_matches_code_and_display_prefixes(service: TerminologyService) -> None:
+    assert [entry.code for entry in service.search("icd10", "e11")] == ["E11.9"]
+    assert [entry.code for entry in service.search("rxnorm", "metformin")] == ["6809", "860975"]
+    with pytest.raises(ValueError):
+        service.search("cpt", "99")
+
+
+def test_crosswalks_and_value_sets(service: TerminologyService) -> None:
+    icd10 = service.crosswalk("snomed", "icd10", ["44054006", "38341003"])
+    assert [entry.code for entry in icd10["44054006"]] == ["E11.9"]
+    assert [entry.code for entry in icd10["38341003"]] == ["I10"]
+
+    umls = service.crosswalk("rxnorm", "umls", ["6809", "860975"])
+    assert [concept.cui for concept in umls["6809"]] == ["C0025598"]
+    assert "860975" not in umls
+    with pytest.raises(ValueError):
+        service.crosswalk("icd10", "rxnorm", ["I10"])
+
+    memberships = service.value_sets_for(["4548-4"])["4548-4"]
+    assert sorted(member.value_set_oid for member in memberships) == ["2.16.1", "2.16.2"]
+    assert service.is_member("2.16.2", "4548-4")
+    assert not service.is_member("2.16.2", "2951-2")
+    assert service.concepts(["C0020538"])["C0020538"].code == "I10"
@@ -28,3 +28,18 @@ def test_normalize_icd10_generates_expected_columns(tmp_path):
         row = next(reader)
     assert row["code"] == "A00"
     assert row["description"].startswith("Cholera")
+
+
+def test_normalize_icd10_keeps_existing_output_when_nothing_parsed(tmp_path):
+    import pytest
+
+    raw_path = tmp_path / "icd10cm-order-empty.txt"
+    raw_path.write_text("short\n", encoding="utf-8")
+    output_path = tmp_path / "icd10_full.csv"
+    output_path.write_text("code,description\nA00,Cholera\n", encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        import_icd10.normalize_icd10(raw_path, output_path)
+
+    assert output_path.read_text(encoding="utf-8") == "code,description\nA00,Cholera\n"
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["icd10_full.csv", "icd10cm-order-empty.txt"]
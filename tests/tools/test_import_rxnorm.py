@@ -24,3 +24,35 @@ def test_normalize_rxnorm_filters_preferred_terms(tmp_path):
     lines = output_path.read_text(encoding="utf-8").splitlines()
     assert lines[0].startswith("rxnorm_cui,tty,ingredient_name")
     assert "Sample RxNorm Drug" in lines[1]
+
+
+def test_normalize_rxnorm_keeps_rows_with_empty_trailing_fields(tmp_path):
+    raw_path = tmp_path / "RXNCONSO.RRF"
+    raw_path.write_text(
+        "12345|ENG|P|L1|PF|S1|Y|A1||||RXNORM|IN|12345|Metformin|0|N||\n"
+        "67890|ENG|P|L2|PF|S2|Y|A2||||RXNORM|SCD|67890|Suppressed Drug|0|Y|4096|\n"
+        "11111|ENG|P|L3|PF|S3|Y|A3||||MMSL|IN|11111|Other Source|0|N||\n",
+        encoding="utf-8",
+    )
+    output_path = tmp_path / "rxnorm_full.csv"
+
+    import_rxnorm.normalize_rxnorm(raw_path, output_path)
+
+    lines = output_path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 2
+    assert lines[1].startswith("12345,IN,Metformin,12345,RXNORM,")
+
+
+def test_normalize_rxnorm_keeps_existing_output_when_nothing_parsed(tmp_path):
+    import pytest
+
+    raw_path = tmp_path / "RXNCONSO.RRF"
+    raw_path.write_text("11111|ENG|P|L3|PF|S3|Y|A3||||MMSL|IN|11111|Other Source|0|N||\n", encoding="utf-8")
+    output_path = tmp_path / "rxnorm_full.csv"
+    output_path.write_text("rxnorm_cui,tty\n12345,IN\n", encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        import_rxnorm.normalize_rxnorm(raw_path, output_path)
+
+    assert output_path.read_text(encoding="utf-8") == "rxnorm_cui,tty\n12345,IN\n"
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["RXNCONSO.RRF", "rxnorm_full.csv"]
@@ -15,27 +15,77 @@ add_project_root()
 from tools import import_umls
 
 
-def test_iter_umls_rows_streams_single_archive(tmp_path):
+def test_write_umls_concepts_filters_single_archive(tmp_path):
+    import polars as pl
+
     raw_dir = tmp_path / "raw"
     raw_dir.mkdir()
     archive_path = raw_dir / "sample.nlm"
     create_umls_archive(archive_path)
 
-    rows = list(
-        import_umls.iter_umls_rows(
-            raw_dir,
-            languages=["ENG"],
-            sab_whitelist=["RXNORM"],
-        )
+    output = tmp_path / "umls_concepts_full.csv"
+    written = import_umls.write_umls_concepts(
+        raw_dir,
+        output,
+        languages=["ENG"],
+        sab_whitelist=["RXNORM"],
     )
-    assert len(rows) == 1
-    row = rows[0]
-    assert row.cui == "C0000005"
-    assert row.preferred_name == "Sample Preferred Term"
-    assert row.semantic_type == "Disease or Syndrome"
-    assert row.tui == "T047"
-    assert row.sab == "RXNORM"
-    assert row.code == "12345"
-    assert row.tty == "IN"
-    assert row.aui == "A0000005"
-    assert row.source_atom_name == "Sample Preferred Term"
+    rows = pl.read_csv(output, infer_schema_length=0).to_dicts()
+    assert written == 1
+    assert rows == [
+        {
+            "cui": "C0000005",
+            "preferred_name": "Sample Preferred Term",
+            "semantic_type": "Disease or Syndrome",
+            "tui": "T047",
+            "sab": "RXNORM",
+            "code": "12345",
+            "tty": "IN",
+            "aui": "A0000005",
+            "source_atom_name": "Sample Preferred Term",
+        }
+    ]
+
+
+def test_write_umls_concepts_resolves_preferred_names_across_members(tmp_path):
+    import gzip
+    import zipfile
+    from io import BytesIO
+
+    import polars as pl
+
+    def gzip_bytes(content: str) -> bytes:
+        buffer = BytesIO()
+        with gzip.GzipFile(fileobj=buffer, mode="wb") as handle:
+            handle.write(content.encode("utf-8"))
+        return buffer.getvalue()
+
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    with zipfile.ZipFile(raw_dir / "release.nlm", "w") as archive:
+        archive.writestr(
+            "2025AA/META/MRCONSO.RRF.aa.gz",
+            gzip_bytes(
+                "C0000010|ENG|S|L1|VO|S1|N|A1||||MSH|PT|D1|Synonym Name|0|N|0|\n"
+                "C0000010|ENG|S|L1|VO|S1|N|A2||||MSH|PT|D2|Suppressed Atom|0|O|0|\n"
+            ),
+        )
+        archive.writestr(
+            "2025AA/META/MRCONSO.RRF.ab.gz",
+            gzip_bytes("C0000010|ENG|P|L2|PF|S2|Y|A3||||SNOMEDCT_US|PT|22298006|Preferred Name|0|N|0|\n"),
+        )
+        archive.writestr(
+            "2025AA/META/MRSTY.RRF.gz",
+            gzip_bytes("C0000010|T047||Disease or Syndrome|AT1|0|\nC0000010|T191||Neoplastic Process|AT2|0|\n"),
+        )
+
+    output = tmp_path / "umls_concepts_full.parquet"
+    written = import_umls.write_umls_concepts(raw_dir, output, languages=["ENG"])
+
+    frame = pl.read_parquet(output)
+    assert written == 2
+    assert frame.columns == import_umls.OUTPUT_COLUMNS
+    assert frame["aui"].to_list() == ["A1", "A3"]
+    assert set(frame["preferred_name"]) == {"Preferred Name"}
+    assert frame["semantic_type"][0] == "Disease or Syndrome; Neoplastic Process"
+    assert frame["tui"][0] == "T047; T191"
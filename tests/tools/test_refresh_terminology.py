@@ -57,4 +57,4 @@ def test_refresh_terminology_normalizes_available_sources(tmp_path):
     assert (root / "snomed/snomed_full.csv").exists()
     assert (root / "rxnorm/rxnorm_full.csv").exists()
     assert (root / "vsac/vsac_value_sets_full.csv").exists()
-    assert (root / "umls/umls_concepts_full.csv").exists()
+    assert (root / "umls/umls_concepts_full.parquet").exists()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""Benchmark FHIR resource builders on a deterministic synthetic cohort.
+
+The cohort is assembled directly from the terminology catalogs (no lifecycle
+simulation), so timings isolate resource construction. Three paths are
+measured over the same patients:
+
+* ``dict``   -- ``FHIRFormatter`` building resource dicts (bundle export)
+* ``json``   -- the same dicts serialized one by one with ``json.dumps``
+* ``ndjson`` -- ``FHIRNDJSONFormatter`` encoding templates straight to bytes
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.core.lifecycle.models import Patient  # noqa: E402
+from src.core.synthetic_patient_generator import (  # noqa: E402
+    FHIRFormatter,
+    FHIRNDJSONFormatter,
+    TERMINOLOGY_MAPPINGS,
+    iter_fhir_resources,
+)
+from src.core.terminology_catalogs import ALLERGENS, IMMUNIZATIONS, LAB_CODES, MEDICATIONS  # noqa: E402
+
+
+def build_cohort(num_patients: int, seed: int = 0) -> List[Patient]:
+    """Return ``num_patients`` lifecycle patients with catalog-coded clinical events."""
+
+    rng = random.Random(seed)
+    condition_names = sorted(TERMINOLOGY_MAPPINGS["conditions"])
+    labs = sorted(LAB_CODES.items())
+    start = date(2015, 1, 1)
+    cohort: List[Patient] = []
+    for index in range(num_patients):
+        patient_id = f"bench-{index:06d}"
+
+        def _day() -> str:
+            return (start + timedelta(days=rng.randrange(3650))).isoformat()
+
+        conditions = [
+            {
+                "condition_id": f"{patient_id}-c{n}",
+                "name": name,
+                "status": rng.choice(["active", "resolved"]),
+                "onset_date": _day(),
+                "condition_category": "chronic_disease",
+            }
+            for n, name in enumerate(rng.sample(condition_names, 4))
+        ]
+        medications = [
+            {
+                "medication_id": f"{patient_id}-m{n}",
+                "name": med["display"],
+                "rxnorm_code": med["rxnorm"],
+                "therapeutic_class": med["therapeutic_class"],
+                "start_date": _day(),
+                "end_date": _day() if rng.random() < 0.5 else None,
+                "indication": conditions[0]["name"],
+                "dosage": "1 tablet daily",
+                "route": "oral",
+            }
+            for n, med in enumerate(rng.sample(MEDICATIONS, 5))
+        ]
+        immunizations = [
+            {
+                "immunization_id": f"{patient_id}-i{n}",
+                "name": vaccine["display"],
+                "cvx_code": vaccine["cvx"],
+                "rxnorm_code": vaccine["rxnorm"],
+                "date": _day(),
+                "lot_number": f"LOT{rng.randrange(10**6):06d}",
+            }
+            for n, vaccine in enumerate(rng.sample(IMMUNIZATIONS, 4))
+        ]
+        observations = [
+            {
+                "observation_id": f"{patient_id}-o{n}",
+                "type": name,
+                "value": f"{rng.uniform(1, 200):.1f}",
+                "value_numeric": round(rng.uniform(1, 200), 1),
+                "unit": "mg/dL",
+                "status": "final",
+                "observation_date": f"{_day()}T08:30:00",
+                "interpretation": rng.choice(["N", "H", "L"]),
+                "loinc_code": lab["loinc"],
+            }
+            for n, (name, lab) in enumerate(rng.choice(labs) for _ in range(40))
+        ]
+        allergen = rng.choice(ALLERGENS)
+        allergies = [
+            {
+                "allergy_id": f"{patient_id}-a0",
+                "substance": allergen["display"],
+                "category": allergen["category"],
+                "rxnorm_code": allergen["rxnorm"],
+                "snomed_code": allergen["snomed"],
+                "reaction": "Hives",
+                "severity": "moderate",
+                "recorded_date": _day(),
+            }
+        ]
+        cohort.append(
+            Patient.from_legacy(
+                {
+                    "patient_id": patient_id,
+                    "first_name": f"Given{index}",
+                    "last_name": f"Family{index}",
+                    "birthdate": (date(1940, 1, 1) + timedelta(days=rng.randrange(25000))).isoformat(),
+                    "gender": rng.choice(["male", "female"]),
+                    "mrn": f"MRN{index:08d}",
+                    "ssn": f"{rng.randrange(10**9):09d}",
+                    "phone": "555-0100",
+                    "address": f"{index} Main St",
+                    "city": "Springfield",
+                    "state": "IL",
+                    "zip": "62701",
+                    "country": "US",
+                },
+                encounters=[],
+                conditions=conditions,
+                medications=medications,
+                immunizations=immunizations,
+                observations=observations,
+                allergies=allergies,
+                procedures=[],
+            )
+        )
+    return cohort
+
+
+def _run_dict(cohort: List[Patient]) -> int:
+    return sum(1 for _ in iter_fhir_resources(FHIRFormatter(), cohort, progress=False))
+
+
+def _run_json(cohort: List[Patient]) -> int:
+    count = 0
+    for _, resource in iter_fhir_resources(FHIRFormatter(), cohort, progress=False):
+        json.dumps(resource, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        count += 1
+    return count
+
+
+def _run_ndjson(cohort: List[Patient]) -> int:
+    return sum(1 for _ in iter_fhir_resources(FHIRNDJSONFormatter(), cohort, progress=False))
+
+
+BUILDERS: Dict[str, Callable[[List[Patient]], int]] = {
+    "dict": _run_dict,
+    "json": _run_json,
+    "ndjson": _run_ndjson,
+}
+
+
+def benchmark(num_patients: int, repeats: int, seed: int) -> Dict[str, Any]:
+    cohort = build_cohort(num_patients, seed)
+    results: Dict[str, Any] = {"num_patients": num_patients, "repeats": repeats, "builders": {}}
+    for name, run in BUILDERS.items():
+        best = float("inf")
+        resources = 0
+        for _ in range(repeats):
+            started = time.perf_counter()
+            resources = run(cohort)
+            best = min(best, time.perf_counter() - started)
+        results["builders"][name] = {
+            "resources": resources,
+            "best_seconds": round(best, 4),
+            "resources_per_second": round(resources / best, 1) if best > 0 else 0.0,
+        }
+    return results
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=2000, help="Cohort size (default: 2000)")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per builder; the best time is reported")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic cohort")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] | None = None) -> int:
+    args = parse_args(argv if argv is not None else sys.argv[1:])
+    results = benchmark(args.patients, args.repeats, args.seed)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(f"FHIR builder benchmark: {args.patients} patients, best of {args.repeats}")
+    for name, stats in results["builders"].items():
+        print(
+            f"  {name:<7} {stats['resources']:>8} resources  {stats['best_seconds']:>8.3f}s  "
+            f"{stats['resources_per_second']:>12,.0f} resources/s"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
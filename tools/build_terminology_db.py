@@ -14,39 +14,112 @@ the seed CSVs when necessary. Resulting tables are:
     - rxnorm (medication concepts)
     - vsac_value_sets (VSAC membership + metadata; empty when no exports)
     - umls_concepts (UMLS CUIs with preferred terms; empty when no exports)
+
+UMLS concepts are read from ``umls_concepts_full.parquet`` when the importer
+produced one, unless a ``umls_concepts_full.csv`` export was written after it.
+
+Every build records, per table, the source file it was loaded from and that
+file's size, mtime and SHA-256 in a ``build_metadata`` table. With
+``--incremental`` an existing warehouse is updated in place: only tables whose
+source fingerprint (or :data:`WAREHOUSE_FORMAT_VERSION`) changed are reloaded,
+so a new VSAC drop no longer rebuilds ICD-10, SNOMED, RxNorm and UMLS. Each
+table is created straight from its source file with DuckDB's ``read_csv`` or
+``read_parquet`` and the column projection done in SQL (nothing is read into
+Python), and each table gets indexes on its code and display columns.
 """
 from __future__ import annotations
 
 import argparse
-import os
+import hashlib
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 
 import duckdb
-import pandas as pd
-import polars as pl
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.core.terminology.loaders import superseded_by_csv
 
 DEFAULT_ROOT = Path("data/terminology")
 DEFAULT_DB_PATH = DEFAULT_ROOT / "terminology.duckdb"
 
+# Bump when a loader's output shape changes so incremental builds reload every table.
+WAREHOUSE_FORMAT_VERSION = 1
+METADATA_TABLE = "build_metadata"
+
+# Candidate source files per table, relative to the terminology root, in priority order.
+TABLE_SOURCES: Dict[str, Tuple[str, ...]] = {
+    "icd10": ("icd10/icd10_full.csv", "icd10/icd10_conditions.csv"),
+    "loinc": ("loinc/loinc_full.csv", "loinc/loinc_labs.csv"),
+    "snomed": ("snomed/snomed_full.csv", "snomed/snomed_conditions.csv"),
+    "rxnorm": ("rxnorm/rxnorm_full.csv", "rxnorm/rxnorm_medications.csv"),
+    "vsac_value_sets": ("vsac/vsac_value_sets_full.csv", "vsac/vsac_value_sets.csv"),
+    "umls_concepts": (
+        "umls/umls_concepts_full.parquet",
+        "umls/umls_concepts_full.csv",
+        "umls/umls_concepts.csv",
+    ),
+}
+
+# Columns indexed for code lookups and display searches.
+TABLE_INDEXES: Dict[str, Tuple[str, ...]] = {
+    "icd10": ("code", "description"),
+    "loinc": ("loinc_code", "long_common_name"),
+    "snomed": ("snomed_id", "pt_name"),
+    "rxnorm": ("rxnorm_cui", "ingredient_name"),
+    "vsac_value_sets": ("value_set_oid", "code", "display_name"),
+    "umls_concepts": ("cui", "code", "preferred_name"),
+}
+
+
+# Mirror Polars' CSV inference: integers, floats and booleans, everything else VARCHAR.
+_CSV_TYPE_CANDIDATES = "['BOOLEAN', 'BIGINT', 'DOUBLE', 'VARCHAR']"
+
+
+def _sql_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _relation(path: Path, types: Optional[Dict[str, str]] = None) -> str:
+    """DuckDB table function scanning ``path`` in place (Parquet or headered CSV)."""
 
-def _ensure_columns(frame: pl.DataFrame, required: Dict[str, str]) -> pl.DataFrame:
-    columns = frame.columns
-    for name, default in required.items():
-        if name not in columns:
-            frame = frame.with_columns(pl.lit(default).alias(name))
-    return frame.select(list(required.keys()))
+    if path.suffix == ".parquet":
+        return f"read_parquet({_sql_literal(str(path))})"
+    options = f"header = true, auto_type_candidates = {_CSV_TYPE_CANDIDATES}"
+    if types:
+        pairs = ", ".join(f"{_sql_literal(name)}: {_sql_literal(kind)}" for name, kind in types.items())
+        options += f", types = {{{pairs}}}"
+    return f"read_csv({_sql_literal(str(path))}, {options})"
 
 
-def _empty_frame(required: Dict[str, str]) -> pl.DataFrame:
-    return pl.DataFrame({name: pl.Series(name, [], dtype=pl.Utf8) for name in required})
+def _source_columns(con: "duckdb.DuckDBPyConnection", relation: str) -> List[str]:
+    return [column[0] for column in con.execute(f"SELECT * FROM {relation} LIMIT 0").description]
 
 
-def load_icd10(root: Path) -> pl.DataFrame:
-    normalized = root / "icd10/icd10_full.csv"
-    seed = root / "icd10/icd10_conditions.csv"
+def _project(con: "duckdb.DuckDBPyConnection", relation: str, required: Dict[str, str]) -> str:
+    """Select ``required`` columns from ``relation``, filling absent ones with their default."""
+
+    present = set(_source_columns(con, relation))
+    columns = [
+        f'"{name}"' if name in present else f'{_sql_literal(default)} AS "{name}"'
+        for name, default in required.items()
+    ]
+    return f"SELECT {', '.join(columns)} FROM {relation}"
+
+
+def _empty_select(required: Dict[str, str]) -> str:
+    columns = ", ".join(f'CAST(NULL AS VARCHAR) AS "{name}"' for name in required)
+    return f"SELECT {columns} WHERE false"
+
+
+def load_icd10(con: "duckdb.DuckDBPyConnection", root: Path) -> str:
+    normalized, seed = (root / path for path in TABLE_SOURCES["icd10"])
     if normalized.exists():
-        df = pl.read_csv(normalized)
         required = {
             "code": "",
             "description": "",
@@ -56,31 +129,16 @@ def load_icd10(root: Path) -> pl.DataFrame:
             "chapter": "",
             "ncbi_url": "",
         }
-        df = _ensure_columns(df, required)
-    else:
-        df = pl.read_csv(seed)
-        df = df.with_columns(
-            pl.lit("0").alias("level"),
-            pl.lit("").alias("short_description"),
-            pl.col("description").alias("order"),
-        )
-        df = df.select(
-            pl.col("code"),
-            pl.col("description"),
-            pl.col("description").alias("short_description"),
-            pl.col("level"),
-            pl.col("order"),
-            pl.col("chapter"),
-            pl.col("ncbi_url"),
-        )
-    return df
+        return _project(con, _relation(normalized), required)
+    return (
+        'SELECT code, description, description AS short_description, \'0\' AS level, description AS "order", '
+        f"chapter, ncbi_url FROM {_relation(seed)}"
+    )
 
 
-def load_loinc(root: Path) -> pl.DataFrame:
-    normalized = root / "loinc/loinc_full.csv"
-    seed = root / "loinc/loinc_labs.csv"
+def load_loinc(con: "duckdb.DuckDBPyConnection", root: Path) -> str:
+    normalized, seed = (root / path for path in TABLE_SOURCES["loinc"])
     if normalized.exists():
-        df = pl.read_csv(normalized)
         required = {
             "loinc_code": "",
             "long_common_name": "",
@@ -90,27 +148,16 @@ def load_loinc(root: Path) -> pl.DataFrame:
             "loinc_class": "",
             "ncbi_url": "",
         }
-        df = _ensure_columns(df, required)
-    else:
-        df = pl.read_csv(seed)
-        df = df.with_columns(pl.lit("").alias("loinc_class"))
-        df = df.select(
-            "loinc_code",
-            "long_common_name",
-            "component",
-            "property",
-            "system",
-            "loinc_class",
-            "ncbi_url",
-        )
-    return df
+        return _project(con, _relation(normalized), required)
+    return (
+        "SELECT loinc_code, long_common_name, component, property, system, '' AS loinc_class, ncbi_url "
+        f"FROM {_relation(seed)}"
+    )
 
 
-def load_snomed(root: Path) -> pl.DataFrame:
-    normalized = root / "snomed/snomed_full.csv"
-    seed = root / "snomed/snomed_conditions.csv"
+def load_snomed(con: "duckdb.DuckDBPyConnection", root: Path) -> str:
+    normalized, seed = (root / path for path in TABLE_SOURCES["snomed"])
     if normalized.exists():
-        df = pl.read_csv(normalized)
         required = {
             "snomed_id": "",
             "pt_name": "",
@@ -118,25 +165,16 @@ def load_snomed(root: Path) -> pl.DataFrame:
             "icd10_mapping": "",
             "ncbi_url": "",
         }
-        df = _ensure_columns(df, required)
-    else:
-        df = pl.read_csv(seed)
-        df = df.with_columns(pl.lit("").alias("definition_status_id"))
-        df = df.select(
-            "snomed_id",
-            "pt_name",
-            "definition_status_id",
-            "icd10_mapping",
-            "ncbi_url",
-        )
-    return df
+        return _project(con, _relation(normalized), required)
+    return (
+        "SELECT snomed_id, pt_name, '' AS definition_status_id, icd10_mapping, ncbi_url "
+        f"FROM {_relation(seed)}"
+    )
 
 
-def load_rxnorm(root: Path) -> pl.DataFrame:
-    normalized = root / "rxnorm/rxnorm_full.csv"
-    seed = root / "rxnorm/rxnorm_medications.csv"
+def load_rxnorm(con: "duckdb.DuckDBPyConnection", root: Path) -> str:
+    normalized, seed = (root / path for path in TABLE_SOURCES["rxnorm"])
     if normalized.exists():
-        df = pl.read_csv(normalized)
         required = {
             "rxnorm_cui": "",
             "tty": "",
@@ -146,28 +184,15 @@ def load_rxnorm(root: Path) -> pl.DataFrame:
             "ndc_example": "",
             "ncbi_url": "",
         }
-        df = _ensure_columns(df, required)
-    else:
-        df = pl.read_csv(seed)
-        df = df.with_columns(
-            pl.lit("").alias("source_code"),
-            pl.lit("RXNORM").alias("sab"),
-        )
-        df = df.select(
-            "rxnorm_cui",
-            "tty",
-            "ingredient_name",
-            "source_code",
-            "sab",
-            "ndc_example",
-            "ncbi_url",
-        )
-    return df
+        return _project(con, _relation(normalized), required)
+    return (
+        "SELECT rxnorm_cui, tty, ingredient_name, '' AS source_code, 'RXNORM' AS sab, ndc_example, ncbi_url "
+        f"FROM {_relation(seed)}"
+    )
 
 
-def load_vsac_value_sets(root: Path) -> pl.DataFrame:
-    normalized = root / "vsac/vsac_value_sets_full.csv"
-    seed = root / "vsac/vsac_value_sets.csv"
+def load_vsac_value_sets(con: "duckdb.DuckDBPyConnection", root: Path) -> str:
+    normalized, seed = (root / path for path in TABLE_SOURCES["vsac_value_sets"])
     required = {
         "value_set_oid": "",
         "value_set_name": "",
@@ -180,19 +205,13 @@ def load_vsac_value_sets(root: Path) -> pl.DataFrame:
         "code_system_version": "",
         "display_name": "",
     }
-    csv_kwargs = {"dtypes": {"code": pl.Utf8}}
-    if normalized.exists():
-        df = pl.read_csv(normalized, **csv_kwargs)
-        return _ensure_columns(df, required)
-    if seed.exists():
-        df = pl.read_csv(seed, **csv_kwargs)
-        return _ensure_columns(df, required)
-    return _empty_frame(required)
+    for path in (normalized, seed):
+        if path.exists():
+            return _project(con, _relation(path, {"code": "VARCHAR"}), required)
+    return _empty_select(required)
 
 
-def load_umls_concepts(root: Path) -> pl.DataFrame:
-    normalized = root / "umls/umls_concepts_full.csv"
-    seed = root / "umls/umls_concepts.csv"
+def load_umls_concepts(con: "duckdb.DuckDBPyConnection", root: Path) -> str:
     required = {
         "cui": "",
         "preferred_name": "",
@@ -204,13 +223,10 @@ def load_umls_concepts(root: Path) -> pl.DataFrame:
         "aui": "",
         "source_atom_name": "",
     }
-    if normalized.exists():
-        df = pl.read_csv(normalized)
-        return _ensure_columns(df, required)
-    if seed.exists():
-        df = pl.read_csv(seed)
-        return _ensure_columns(df, required)
-    return _empty_frame(required)
+    source = resolve_source(root, "umls_concepts")
+    if source is None:
+        return _empty_select(required)
+    return _project(con, _relation(source), required)
 
 
 LOADERS = {
@@ -223,27 +239,183 @@ LOADERS = {
 }
 
 
-def build_database(root: Path, output: Path, *, force: bool = False) -> None:
-    tables = {name: loader(root) for name, loader in LOADERS.items()}
+@dataclass(frozen=True)
+class SourceFingerprint:
+    """Identity of the file a table was loaded from."""
+
+    path: str
+    size: int
+    mtime_ns: int
+    sha256: str
+
+    @property
+    def key(self) -> str:
+        return f"v{WAREHOUSE_FORMAT_VERSION}:{self.path}:{self.sha256}"
+
+
+def _file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def resolve_source(root: Path, table: str) -> Optional[Path]:
+    """Return the highest-priority existing source file for ``table``."""
+
+    for relative in TABLE_SOURCES[table]:
+        candidate = root / relative
+        if not candidate.exists():
+            continue
+        if candidate.suffix == ".parquet" and superseded_by_csv(candidate):
+            continue
+        return candidate
+    return None
+
+
+def fingerprint_source(
+    root: Path,
+    table: str,
+    previous: Optional[SourceFingerprint] = None,
+) -> SourceFingerprint:
+    """Fingerprint the source of ``table``, reusing ``previous``'s hash when size and mtime match."""
+
+    source = resolve_source(root, table)
+    if source is None:
+        return SourceFingerprint(path="", size=0, mtime_ns=0, sha256="")
+    stat = source.stat()
+    relative = source.relative_to(root).as_posix()
+    if (
+        previous is not None
+        and previous.path == relative
+        and previous.size == stat.st_size
+        and previous.mtime_ns == stat.st_mtime_ns
+    ):
+        return previous
+    return SourceFingerprint(relative, stat.st_size, stat.st_mtime_ns, _file_digest(source))
+
+
+def _ensure_metadata_table(con: "duckdb.DuckDBPyConnection") -> None:
+    con.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {METADATA_TABLE} (
+            table_name VARCHAR PRIMARY KEY,
+            source_path VARCHAR,
+            source_size BIGINT,
+            source_mtime_ns BIGINT,
+            source_sha256 VARCHAR,
+            format_version INTEGER,
+            row_count BIGINT,
+            built_at TIMESTAMP
+        )
+        """
+    )
+
+
+def read_build_metadata(con: "duckdb.DuckDBPyConnection") -> Dict[str, Tuple[SourceFingerprint, int]]:
+    """Return ``{table: (fingerprint, format_version)}`` recorded by previous builds."""
+
+    _ensure_metadata_table(con)
+    rows = con.execute(
+        f"SELECT table_name, source_path, source_size, source_mtime_ns, source_sha256, format_version "
+        f"FROM {METADATA_TABLE}"
+    ).fetchall()
+    return {
+        name: (SourceFingerprint(path or "", size or 0, mtime or 0, sha or ""), version)
+        for name, path, size, mtime, sha, version in rows
+    }
+
+
+def _load_table(con: "duckdb.DuckDBPyConnection", name: str, query: str) -> int:
+    """Create ``name`` from ``query`` (which scans the source file in place); return its row count."""
+
+    # Dropping the table drops its indexes too, so they are recreated below.
+    con.execute(f"DROP TABLE IF EXISTS {name}")
+    con.execute(f"CREATE TABLE {name} AS {query}")
+    columns = set(_source_columns(con, name))
+    for column in TABLE_INDEXES.get(name, ()):
+        if column in columns:
+            con.execute(f'CREATE INDEX idx_{name}_{column} ON {name}("{column}")')
+    return con.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+
+
+def _table_exists(con: "duckdb.DuckDBPyConnection", name: str) -> bool:
+    return bool(
+        con.execute(
+            "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?",
+            [name],
+        ).fetchone()[0]
+    )
+
+
+def build_database(
+    root: Path,
+    output: Path,
+    *,
+    force: bool = False,
+    incremental: bool = False,
+) -> Dict[str, str]:
+    """Build (or incrementally update) the warehouse; return ``{table: "rebuilt" | "unchanged"}``."""
+
     if output.exists():
-        if not force:
+        if force:
+            output.unlink()
+        elif not incremental:
             raise SystemExit(
-                f"{output} already exists. Re-run with --force to overwrite the current warehouse."
+                f"{output} already exists. Re-run with --force to overwrite the current warehouse "
+                "or --incremental to update changed tables only."
             )
-        output.unlink()
     output.parent.mkdir(parents=True, exist_ok=True)
 
+    status: Dict[str, str] = {}
     con = duckdb.connect(str(output))
     try:
-        for name, frame in tables.items():
-            pandas_df = pd.DataFrame(frame.to_dict(as_series=False))
-            con.register(name, pandas_df)
-            con.execute(f"CREATE TABLE {name} AS SELECT * FROM {name}")
-            con.unregister(name)
-        con.commit()
+        previous = read_build_metadata(con)
+        for name, loader in LOADERS.items():
+            recorded, version = previous.get(name, (None, None))
+            fingerprint = fingerprint_source(root, name, recorded)
+            if (
+                recorded is not None
+                and version == WAREHOUSE_FORMAT_VERSION
+                and fingerprint.key == recorded.key
+                and _table_exists(con, name)
+            ):
+                if fingerprint.mtime_ns != recorded.mtime_ns:
+                    con.execute(
+                        f"UPDATE {METADATA_TABLE} SET source_mtime_ns = ? WHERE table_name = ?",
+                        [fingerprint.mtime_ns, name],
+                    )
+                status[name] = "unchanged"
+                continue
+
+            con.begin()
+            try:
+                row_count = _load_table(con, name, loader(con, root))
+                con.execute(
+                    f"INSERT OR REPLACE INTO {METADATA_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        name,
+                        fingerprint.path,
+                        fingerprint.size,
+                        fingerprint.mtime_ns,
+                        fingerprint.sha256,
+                        WAREHOUSE_FORMAT_VERSION,
+                        row_count,
+                        datetime.now(timezone.utc).replace(tzinfo=None),
+                    ],
+                )
+                con.commit()
+            except BaseException:
+                con.rollback()
+                raise
+            status[name] = "rebuilt"
     finally:
         con.close()
-    print(f"DuckDB terminology warehouse saved to {output}")
+
+    rebuilt = [name for name, state in status.items() if state == "rebuilt"]
+    print(f"DuckDB terminology warehouse saved to {output} (rebuilt: {', '.join(rebuilt) or 'none'})")
+    return status
 
 
 def parse_args() -> argparse.Namespace:
@@ -255,12 +427,17 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Overwrite the existing DuckDB file when it already exists",
     )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Update an existing warehouse in place, reloading only tables whose sources changed",
+    )
     return parser.parse_args()
 
 
 def main() -> None:
     args = parse_args()
-    build_database(args.root, args.output, force=args.force)
+    build_database(args.root, args.output, force=args.force, incremental=args.incremental)
 
 
 if __name__ == "__main__":
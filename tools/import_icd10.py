@@ -7,13 +7,16 @@ Usage (run inside the project virtualenv):
 
 The script expects the fixed-width order file published by CDC/NCHS and
 produces a CSV containing the ICD code, long and short descriptions, hierarchy
-level, and a direct link to the CDC ICD-10-CM lookup tool.
+level, and a direct link to the CDC ICD-10-CM lookup tool. The file is scanned
+lazily and streamed to a staging file that replaces the output only when rows
+were parsed, so memory stays flat for full releases.
 """
 from __future__ import annotations
 
 import argparse
+import os
+import tempfile
 from pathlib import Path
-from typing import List
 
 import polars as pl
 
@@ -21,42 +24,75 @@ DEFAULT_RAW_PATH = Path("data/terminology/icd10/raw/icd10cm-order-2026.txt")
 DEFAULT_OUTPUT_PATH = Path("data/terminology/icd10/icd10_full.csv")
 
 
-def _parse_line(line: str) -> dict:
-    order = line[0:5]
-    code = line[6:13].strip()
-    level = line[13:16].strip()
-    short_desc = line[16:76].strip()
-    long_desc = line[76:].strip()
-    return {
-        "order": order,
-        "code": code,
-        "level": level,
-        "short_description": short_desc,
-        "description": long_desc or short_desc,
-        "chapter": "",  # reserved for future enrichment
-        "ncbi_url": f"https://icd10cmtool.cdc.gov/?fy=2026&code={code}",
-    }
+# Fixed-width layout of the order file: (column, start, width); ``None`` runs to end of line.
+ORDER_FILE_LAYOUT = (
+    ("order", 0, 5),
+    ("code", 6, 7),
+    ("level", 13, 3),
+    ("short_description", 16, 60),
+    ("long_description", 76, None),
+)
+
+
+def scan_order_file(raw_path: Path) -> pl.LazyFrame:
+    """Lazily slice the fixed-width order file into its columns.
+
+    Lines are read as a single raw column (the unit separator never occurs in
+    the file) and cut with vectorized string slices, so nothing is
+    materialized per line in Python.
+    """
+
+    lines = pl.scan_csv(
+        raw_path,
+        has_header=False,
+        separator="\x1f",
+        quote_char=None,
+        schema={"line": pl.Utf8},
+    ).filter(pl.col("line").str.len_chars() >= 10)
+
+    columns = []
+    for name, start, width in ORDER_FILE_LAYOUT:
+        value = pl.col("line").str.slice(start, width)
+        columns.append((value if name == "order" else value.str.strip_chars()).alias(name))
+    return lines.select(columns)
+
+
+def icd10_frame(raw_path: Path) -> pl.LazyFrame:
+    return (
+        scan_order_file(raw_path)
+        .filter(pl.col("code") != "")
+        .select(
+            "order",
+            "code",
+            "level",
+            "short_description",
+            pl.when(pl.col("long_description") != "")
+            .then(pl.col("long_description"))
+            .otherwise(pl.col("short_description"))
+            .alias("description"),
+            pl.lit("").alias("chapter"),  # reserved for future enrichment
+            pl.concat_str([pl.lit("https://icd10cmtool.cdc.gov/?fy=2026&code="), pl.col("code")]).alias("ncbi_url"),
+        )
+    )
 
 
 def normalize_icd10(raw_path: Path, output_path: Path) -> None:
     if not raw_path.exists():
         raise FileNotFoundError(f"ICD-10 order file not found: {raw_path}")
 
-    records: List[dict] = []
-    with raw_path.open("r", encoding="utf-8") as handle:
-        for line in handle:
-            line = line.rstrip("\n")
-            if not line or len(line) < 10:
-                continue
-            parsed = _parse_line(line)
-            if parsed["code"]:
-                records.append(parsed)
-
-    if not records:
-        raise ValueError("No ICD-10 records parsed from order file")
-
-    df = pl.DataFrame(records)
-    df.write_csv(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    # Sink next to the destination and swap it in only once rows were parsed,
+    # so a bad order file never clobbers an existing normalized table.
+    fd, staged_name = tempfile.mkstemp(prefix=f".{output_path.stem}-", suffix=".csv", dir=output_path.parent)
+    os.close(fd)
+    staged = Path(staged_name)
+    try:
+        icd10_frame(raw_path).sink_csv(staged)
+        if pl.scan_csv(staged).select(pl.len()).collect().item() == 0:
+            raise ValueError("No ICD-10 records parsed from order file")
+        os.replace(staged, output_path)
+    finally:
+        staged.unlink(missing_ok=True)
     print(f"Wrote normalized ICD-10 table: {output_path}")
 
 
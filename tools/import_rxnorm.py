@@ -8,13 +8,15 @@ Usage (run inside the project virtualenv):
 The script parses the RXNCONSO table, filters to active RxNorm terms, and
 emits a CSV containing the RxCUI, term type (TTY), ingredient/description, and
 an RxNav lookup URL. The loader will automatically prefer this file when it
-exists.
+exists. RXNCONSO is scanned lazily with only the filtered, projected rows
+streamed to a staging file that replaces the output once rows were written.
 """
 from __future__ import annotations
 
 import argparse
+import os
+import tempfile
 from pathlib import Path
-from typing import Iterable, List
 
 import polars as pl
 
@@ -45,35 +47,32 @@ RXNCONSO_COLUMNS = [
 PREFERRED_TTYS = {"SCD", "SBD", "GPCK", "BPCK", "IN", "PIN", "MIN"}
 
 
-def _parse_rxnconso(path: Path) -> List[dict]:
-    records: List[dict] = []
-    with path.open("r", encoding="utf-8") as handle:
-        for line in handle:
-            line = line.rstrip("\n")
-            if not line:
-                continue
-            parts = line.rstrip("|").split("|")
-            if len(parts) < len(RXNCONSO_COLUMNS):
-                continue
-            row = dict(zip(RXNCONSO_COLUMNS, parts))
-            records.append(row)
-    return records
-
-
-def normalize_rxnorm(rxnconso_path: Path, output_path: Path) -> None:
-    if not rxnconso_path.exists():
-        raise FileNotFoundError(f"RXNCONSO file not found: {rxnconso_path}")
+def scan_rxnconso(path: Path) -> pl.LazyFrame:
+    """Lazily scan RXNCONSO.RRF as all-string columns; absent fields become ``""``."""
+
+    # Rows end with a trailing delimiter, which surfaces as one extra empty column.
+    schema = {column: pl.Utf8 for column in RXNCONSO_COLUMNS}
+    schema["_trailing"] = pl.Utf8
+    return (
+        pl.scan_csv(
+            path,
+            separator="|",
+            has_header=False,
+            quote_char=None,
+            schema=schema,
+            truncate_ragged_lines=True,
+        )
+        .select(RXNCONSO_COLUMNS)
+        .with_columns(pl.all().fill_null(""))
+    )
 
-    rows = _parse_rxnconso(rxnconso_path)
-    df = pl.DataFrame(rows)
 
-    df = df.filter(
+def rxnorm_frame(rxnconso_path: Path) -> pl.LazyFrame:
+    return scan_rxnconso(rxnconso_path).filter(
         (pl.col("SAB") == "RXNORM") &
         (pl.col("SUPPRESS") != "Y") &
         (pl.col("TTY").is_in(list(PREFERRED_TTYS)))
-    )
-
-    df = df.select(
+    ).select(
         pl.col("RXCUI").alias("rxnorm_cui"),
         pl.col("TTY").alias("tty"),
         pl.col("STR").alias("ingredient_name"),
@@ -83,8 +82,24 @@ def normalize_rxnorm(rxnconso_path: Path, output_path: Path) -> None:
         pl.concat_str([pl.lit("https://rxnav.nlm.nih.gov/REST/rxcui/"), pl.col("RXCUI")]).alias("ncbi_url"),
     )
 
+
+def normalize_rxnorm(rxnconso_path: Path, output_path: Path) -> None:
+    if not rxnconso_path.exists():
+        raise FileNotFoundError(f"RXNCONSO file not found: {rxnconso_path}")
+
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    df.write_csv(output_path)
+    # Sink next to the destination and swap it in only once rows were parsed,
+    # so a failed or partial run never clobbers an existing normalized table.
+    fd, staged_name = tempfile.mkstemp(prefix=f".{output_path.stem}-", suffix=".csv", dir=output_path.parent)
+    os.close(fd)
+    staged = Path(staged_name)
+    try:
+        rxnorm_frame(rxnconso_path).sink_csv(staged)
+        if pl.scan_csv(staged).select(pl.len()).collect().item() == 0:
+            raise ValueError("No RxNorm records parsed from RXNCONSO")
+        os.replace(staged, output_path)
+    finally:
+        staged.unlink(missing_ok=True)
     print(f"Wrote normalized RxNorm table: {output_path}")
 
 
@@ -1,29 +1,36 @@
-"""Normalize UMLS Metathesaurus exports into a loader-friendly CSV.
+"""Normalize UMLS Metathesaurus exports into a loader-friendly Parquet table.
 
 Usage (run inside the project virtualenv):
     python3 tools/import_umls.py \
         --raw-dir data/terminology/umls/raw \
-        --output data/terminology/umls/umls_concepts_full.csv
+        --output data/terminology/umls/umls_concepts_full.parquet
 
-The script streams the official UMLS release archives (``*.nlm`` containers)
-to build a flattened table covering each concept atom alongside its preferred
+The script reads the official UMLS release archives (``*.nlm`` containers) to
+build a flattened table covering each concept atom alongside its preferred
 concept name and semantic type metadata. Only a minimal subset of the release
 is read (``MRCONSO`` and ``MRSTY``) so the process can execute on laptops
 without unpacking the entire distribution.
+
+Each gzipped archive member is decompressed exactly once, in parallel, into a
+scratch directory. The RRF files are then scanned lazily with Polars' native
+multi-threaded CSV reader. Preferred names and semantic types are resolved with
+group-bys and joins, and the result is streamed straight to Parquet (or CSV
+when ``--output`` ends in ``.csv``).
 """
 from __future__ import annotations
 
 import argparse
-import csv
 import gzip
-import io
-from collections import defaultdict
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from typing import Iterator, List, Optional, Sequence, Tuple
 
-import unicodedata
-import zipfile
+import polars as pl
 
 MRCONSO_COLUMNS = [
     "CUI",
@@ -64,30 +71,12 @@ DEFAULT_LANGUAGES = ("ENG",)
 SUPPRESS_EXCLUDE = {"O", "E"}
 
 
-@dataclass
-class UmlsRow:
-    cui: str
-    preferred_name: str
-    semantic_type: str
-    tui: str
-    sab: str
-    code: str
-    tty: str
-    aui: str
-    source_atom_name: str
-
-    def as_list(self) -> List[str]:
-        return [
-            self.cui,
-            self.preferred_name,
-            self.semantic_type,
-            self.tui,
-            self.sab,
-            self.code,
-            self.tty,
-            self.aui,
-            self.source_atom_name,
-        ]
+@dataclass(frozen=True)
+class StagedRelease:
+    """Decompressed ``MRCONSO``/``MRSTY`` segments ready to be scanned."""
+
+    mrconso: Tuple[Path, ...]
+    mrsty: Tuple[Path, ...]
 
 
 def _collect_archive_members(raw_dir: Path, base_name: str) -> List[Tuple[Path, str]]:
@@ -105,145 +94,168 @@ def _collect_archive_members(raw_dir: Path, base_name: str) -> List[Tuple[Path,
     return members
 
 
-def _iter_rrf_lines(raw_dir: Path, base_name: str) -> Iterator[str]:
-    members = _collect_archive_members(raw_dir, base_name)
-    if not members:
-        raise FileNotFoundError(
-            f"Could not locate {base_name}*.gz inside {raw_dir}. Ensure the official UMLS archives are staged."
-        )
+def _decompress_member(archive_path: Path, member: str, target: Path) -> Path:
+    with zipfile.ZipFile(archive_path) as archive:
+        with archive.open(member) as compressed, gzip.GzipFile(fileobj=compressed) as gz:
+            with target.open("wb") as handle:
+                shutil.copyfileobj(gz, handle, 1 << 20)
+    return target
 
-    for archive_path, member in members:
-        with zipfile.ZipFile(archive_path) as archive:
-            with archive.open(member) as compressed:
-                with gzip.GzipFile(fileobj=compressed) as gz:
-                    with io.TextIOWrapper(gz, encoding="utf-8", errors="ignore") as handle:
-                        for line in handle:
-                            yield line.rstrip("\n")
-
-
-def _parse_rrf_line(line: str, columns: Sequence[str]) -> Dict[str, str]:
-    # RRF rows terminate with a trailing delimiter; drop the final empty column
-    parts = line.split("|")
-    if parts and parts[-1] == "":
-        parts.pop()
-    if len(parts) < len(columns):
-        parts.extend([""] * (len(columns) - len(parts)))
-    return {column: parts[idx] for idx, column in enumerate(columns)}
-
-
-def load_semantic_types(raw_dir: Path) -> Dict[str, Tuple[str, str]]:
-    sty_map: Dict[str, List[str]] = defaultdict(list)
-    tui_map: Dict[str, List[str]] = defaultdict(list)
-
-    for line in _iter_rrf_lines(raw_dir, "MRSTY.RRF"):
-        record = _parse_rrf_line(line, MRSTY_COLUMNS)
-        cui = record.get("CUI", "").strip()
-        if not cui:
-            continue
-        tui = record.get("TUI", "").strip()
-        sty = record.get("STY", "").strip()
-        if tui and tui not in tui_map[cui]:
-            tui_map[cui].append(tui)
-        if sty and sty not in sty_map[cui]:
-            sty_map[cui].append(sty)
-
-    semantic_types: Dict[str, Tuple[str, str]] = {}
-    for cui in sty_map.keys() | tui_map.keys():
-        sty_value = "; ".join(sty_map.get(cui, []))
-        tui_value = "; ".join(tui_map.get(cui, []))
-        semantic_types[cui] = (sty_value, tui_value)
-    return semantic_types
-
-
-def _preferred_score(record: Dict[str, str]) -> int:
-    score = 0
-    if record.get("LAT") == "ENG":
-        score += 8
-    if record.get("TS") == "P":
-        score += 4
-    if record.get("STT") in {"PF", "P"}:
-        score += 2
-    if record.get("ISPREF") == "Y":
-        score += 1
-    return score
-
-
-def compute_preferred_names(raw_dir: Path, languages: Sequence[str]) -> Dict[str, str]:
-    preferred: Dict[str, Tuple[int, str]] = {}
-
-    for line in _iter_rrf_lines(raw_dir, "MRCONSO.RRF"):
-        record = _parse_rrf_line(line, MRCONSO_COLUMNS)
-        cui = record.get("CUI", "").strip()
-        if not cui:
-            continue
-        if languages and record.get("LAT") not in languages:
-            continue
-
-        candidate = unicodedata.normalize("NFKC", record.get("STR", "")).strip()
-        if not candidate:
-            continue
-
-        score = _preferred_score(record)
-        current = preferred.get(cui)
-        if current is None or score > current[0]:
-            preferred[cui] = (score, candidate)
-    return {cui: value for cui, (score, value) in preferred.items()}
-
-
-def iter_umls_rows(
+
+@contextmanager
+def stage_release(
     raw_dir: Path,
     *,
+    work_dir: Optional[Path] = None,
+    workers: Optional[int] = None,
+) -> Iterator[StagedRelease]:
+    """Decompress every MRCONSO/MRSTY member once, in parallel, into a scratch directory."""
+
+    jobs: List[Tuple[str, Path, str]] = []
+    for base_name in ("MRCONSO.RRF", "MRSTY.RRF"):
+        members = _collect_archive_members(raw_dir, base_name)
+        if not members:
+            raise FileNotFoundError(
+                f"Could not locate {base_name}*.gz inside {raw_dir}. Ensure the official UMLS archives are staged."
+            )
+        jobs.extend((base_name, archive_path, member) for archive_path, member in members)
+
+    with tempfile.TemporaryDirectory(prefix="umls-", dir=work_dir) as scratch:
+        scratch_dir = Path(scratch)
+
+        def _stage(indexed: Tuple[int, Tuple[str, Path, str]]) -> Tuple[str, Path]:
+            index, (base_name, archive_path, member) = indexed
+            return base_name, _decompress_member(archive_path, member, scratch_dir / f"{index:05d}.rrf")
+
+        # zlib releases the GIL, so members inflate concurrently on threads.
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            staged = list(pool.map(_stage, enumerate(jobs)))
+        yield StagedRelease(
+            mrconso=tuple(path for base_name, path in staged if base_name == "MRCONSO.RRF"),
+            mrsty=tuple(path for base_name, path in staged if base_name == "MRSTY.RRF"),
+        )
+
+
+def scan_rrf(paths: Sequence[Path], columns: Sequence[str]) -> pl.LazyFrame:
+    """Lazily scan pipe-delimited RRF files as all-string columns (missing fields become ``""``)."""
+
+    # RRF rows terminate with a trailing delimiter, which surfaces as one extra empty column.
+    schema = {column: pl.Utf8 for column in columns}
+    schema["_trailing"] = pl.Utf8
+    return (
+        pl.scan_csv(
+            [str(path) for path in paths],
+            separator="|",
+            has_header=False,
+            quote_char=None,
+            schema=schema,
+            encoding="utf8-lossy",
+            truncate_ragged_lines=True,
+        )
+        .select(list(columns))
+        .with_columns(pl.all().fill_null(""))
+    )
+
+
+def _nfkc(expr: pl.Expr) -> pl.Expr:
+    return expr.str.normalize("NFKC")
+
+
+def semantic_types_frame(mrsty: pl.LazyFrame) -> pl.LazyFrame:
+    """Collapse MRSTY rows to one ``(semantic_type, tui)`` pair per CUI, first-seen order."""
+
+    def _joined(column: str) -> pl.Expr:
+        values = pl.col(column).str.strip_chars()
+        return values.filter(values != "").unique(maintain_order=True).str.join("; ")
+
+    return (
+        mrsty.with_columns(pl.col("CUI").str.strip_chars())
+        .filter(pl.col("CUI") != "")
+        .group_by("CUI")
+        .agg(_joined("STY").alias("semantic_type"), _joined("TUI").alias("tui"))
+    )
+
+
+def preferred_names_frame(mrconso: pl.LazyFrame, languages: Sequence[str]) -> pl.LazyFrame:
+    """Pick the best-ranked atom name per CUI; ties keep the first atom in release order."""
+
+    score = (
+        pl.when(pl.col("LAT") == "ENG").then(8).otherwise(0)
+        + pl.when(pl.col("TS") == "P").then(4).otherwise(0)
+        + pl.when(pl.col("STT").is_in(["PF", "P"])).then(2).otherwise(0)
+        + pl.when(pl.col("ISPREF") == "Y").then(1).otherwise(0)
+    )
+    frame = mrconso.with_columns(pl.col("CUI").str.strip_chars())
+    if languages:
+        frame = frame.filter(pl.col("LAT").is_in(list(languages)))
+    return (
+        frame.select(
+            "CUI",
+            _nfkc(pl.col("STR")).str.strip_chars().alias("preferred_name"),
+            score.alias("score"),
+        )
+        .filter((pl.col("CUI") != "") & (pl.col("preferred_name") != ""))
+        .group_by("CUI")
+        .agg(pl.col("preferred_name").sort_by("score", descending=True, maintain_order=True).first())
+    )
+
+
+def umls_concepts_frame(
+    release: StagedRelease,
+    *,
     languages: Sequence[str],
     sab_whitelist: Optional[Sequence[str]] = None,
-) -> Iterator[UmlsRow]:
-    sem_types = load_semantic_types(raw_dir)
-    preferred = compute_preferred_names(raw_dir, languages)
-
-    sab_filter = {sab.upper() for sab in sab_whitelist} if sab_whitelist else None
-
-    for line in _iter_rrf_lines(raw_dir, "MRCONSO.RRF"):
-        record = _parse_rrf_line(line, MRCONSO_COLUMNS)
-
-        cui = record.get("CUI", "").strip()
-        if not cui:
-            continue
-        if record.get("SUPPRESS") in SUPPRESS_EXCLUDE:
-            continue
-        if languages and record.get("LAT") not in languages:
-            continue
-
-        sab = record.get("SAB", "").strip()
-        if sab_filter and sab.upper() not in sab_filter:
-            continue
-
-        semantic_type, tui = sem_types.get(cui, ("", ""))
-        preferred_name = preferred.get(cui, "")
-        if not preferred_name:
-            preferred_name = unicodedata.normalize("NFKC", record.get("STR", "")).strip()
-
-        yield UmlsRow(
-            cui=cui,
-            preferred_name=preferred_name,
-            semantic_type=semantic_type,
-            tui=tui,
-            sab=sab,
-            code=record.get("CODE", "").strip(),
-            tty=record.get("TTY", "").strip(),
-            aui=record.get("AUI", "").strip(),
-            source_atom_name=unicodedata.normalize("NFKC", record.get("STR", "").strip()),
+) -> pl.LazyFrame:
+    """Build the lazy query producing :data:`OUTPUT_COLUMNS` for a staged release."""
+
+    mrconso = scan_rrf(release.mrconso, MRCONSO_COLUMNS)
+    mrsty = scan_rrf(release.mrsty, MRSTY_COLUMNS)
+
+    atoms = mrconso.with_columns(
+        pl.col("CUI").str.strip_chars(),
+        pl.col("SAB").str.strip_chars(),
+    ).filter((pl.col("CUI") != "") & ~pl.col("SUPPRESS").is_in(list(SUPPRESS_EXCLUDE)))
+    if languages:
+        atoms = atoms.filter(pl.col("LAT").is_in(list(languages)))
+    if sab_whitelist:
+        atoms = atoms.filter(pl.col("SAB").str.to_uppercase().is_in([sab.upper() for sab in sab_whitelist]))
+
+    return (
+        atoms.join(preferred_names_frame(mrconso, languages), on="CUI", how="left", maintain_order="left")
+        .join(semantic_types_frame(mrsty), on="CUI", how="left", maintain_order="left")
+        .select(
+            pl.col("CUI").alias("cui"),
+            pl.coalesce(pl.col("preferred_name"), _nfkc(pl.col("STR")).str.strip_chars()).alias("preferred_name"),
+            pl.col("semantic_type").fill_null(""),
+            pl.col("tui").fill_null(""),
+            pl.col("SAB").alias("sab"),
+            pl.col("CODE").str.strip_chars().alias("code"),
+            pl.col("TTY").str.strip_chars().alias("tty"),
+            pl.col("AUI").str.strip_chars().alias("aui"),
+            _nfkc(pl.col("STR").str.strip_chars()).alias("source_atom_name"),
         )
+    )
 
 
-def write_rows(rows: Iterable[UmlsRow], output_path: Path) -> bool:
+def write_umls_concepts(
+    raw_dir: Path,
+    output_path: Path,
+    *,
+    languages: Sequence[str],
+    sab_whitelist: Optional[Sequence[str]] = None,
+    work_dir: Optional[Path] = None,
+    workers: Optional[int] = None,
+) -> int:
+    """Stream normalized concept atoms to Parquet (or CSV for ``.csv`` paths); return the row count."""
+
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    with output_path.open("w", newline="", encoding="utf-8") as handle:
-        writer = csv.writer(handle)
-        writer.writerow(OUTPUT_COLUMNS)
-        wrote_any = False
-        for row in rows:
-            writer.writerow(row.as_list())
-            wrote_any = True
-    return wrote_any
+    with stage_release(raw_dir, work_dir=work_dir, workers=workers) as release:
+        frame = umls_concepts_frame(release, languages=languages, sab_whitelist=sab_whitelist)
+        if output_path.suffix.lower() == ".csv":
+            frame.sink_csv(output_path)
+            return pl.scan_csv(output_path).select(pl.len()).collect().item()
+        frame.sink_parquet(output_path)
+    return pl.scan_parquet(output_path).select(pl.len()).collect().item()
 
 
 def parse_args() -> argparse.Namespace:
@@ -257,8 +269,8 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--output",
         type=Path,
-        default=Path("data/terminology/umls/umls_concepts_full.csv"),
-        help="Destination for the flattened CSV",
+        default=Path("data/terminology/umls/umls_concepts_full.parquet"),
+        help="Destination for the flattened table (Parquet, or CSV when the path ends in .csv)",
     )
     parser.add_argument(
         "--languages",
@@ -271,6 +283,18 @@ def parse_args() -> argparse.Namespace:
         nargs="*",
         help="Optional list of source abbreviations (SAB) to retain. If omitted all SABs are included.",
     )
+    parser.add_argument(
+        "--work-dir",
+        type=Path,
+        default=None,
+        help="Scratch directory for decompressed RRF segments (defaults to the system temp dir)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Parallel decompression workers (defaults to the executor's CPU-based default)",
+    )
     return parser.parse_args()
 
 
@@ -280,18 +304,18 @@ def main() -> None:
     if languages:
         languages = [lang.upper() for lang in languages]
 
-    wrote = write_rows(
-        iter_umls_rows(
-            args.raw_dir,
-            languages=languages,
-            sab_whitelist=args.sab,
-        ),
+    written = write_umls_concepts(
+        args.raw_dir,
         args.output,
+        languages=languages,
+        sab_whitelist=args.sab,
+        work_dir=args.work_dir,
+        workers=args.workers,
     )
-    if not wrote:
+    if not written:
         raise SystemExit("No UMLS rows written. Check the raw directory or adjust language / SAB filters.")
 
-    print(f"Wrote normalized UMLS concepts: {args.output}")
+    print(f"Wrote {written} normalized UMLS concepts: {args.output}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Load generated FHIR transaction Bundles into a FHIR server.
+
+Reads the ``transaction_*.json`` files written by
+``synthetic_patient_generator --fhir-transactions N`` and POSTs them to the
+server base URL with a pool of keep-alive connections, then reports
+end-to-end throughput.
+
+Example::
+
+    python tools/load_fhir_transactions.py output/fhir_transactions \
+        --endpoint http://localhost:8080/fhir --concurrency 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Iterable, Iterator, List
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.core.fhir_loader import load_bundles  # noqa: E402
+
+
+def iter_bundle_files(paths: Iterable[Path]) -> Iterator[Path]:
+    for path in paths:
+        if path.is_dir():
+            yield from sorted(path.glob("transaction_*.json"))
+        else:
+            yield path
+
+
+def read_bundles(paths: Iterable[Path]) -> Iterator[bytes]:
+    for path in iter_bundle_files(paths):
+        yield path.read_bytes()
+
+
+def parse_header(value: str) -> tuple[str, str]:
+    name, sep, header_value = value.partition(":")
+    if not sep or not name.strip():
+        raise argparse.ArgumentTypeError(f"Expected 'Name: value', got {value!r}")
+    return name.strip(), header_value.strip()
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", type=Path, help="Bundle files or directories of transaction_*.json")
+    parser.add_argument("--endpoint", required=True, help="FHIR base URL, e.g. http://localhost:8080/fhir")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent connections (default: 4)")
+    parser.add_argument("--retries", type=int, default=3, help="Retries per bundle on transient errors (default: 3)")
+    parser.add_argument("--backoff", type=float, default=0.5, help="Initial retry backoff in seconds (default: 0.5)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds (default: 60)")
+    parser.add_argument(
+        "--header",
+        action="append",
+        type=parse_header,
+        default=[],
+        help="Extra request header, e.g. 'Authorization: Bearer ...' (repeatable)",
+    )
+    parser.add_argument("--json", action="store_true", help="Print the load summary as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] | None = None) -> int:
+    args = parse_args(argv if argv is not None else sys.argv[1:])
+    result = load_bundles(
+        args.endpoint,
+        read_bundles(args.paths),
+        concurrency=args.concurrency,
+        max_retries=args.retries,
+        backoff=args.backoff,
+        timeout=args.timeout,
+        headers=dict(args.header),
+    )
+    summary = {
+        "bundles": result.bundles,
+        "succeeded": result.succeeded,
+        "failed": result.failed,
+        "resources": result.resources,
+        "retries": result.retries,
+        "connections_opened": result.connections_opened,
+        "elapsed_seconds": round(result.elapsed_seconds, 3),
+        "bundles_per_second": round(result.bundles_per_second, 2),
+        "resources_per_second": round(result.resources_per_second, 1),
+        "errors": result.errors[:10],
+    }
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print(
+            f"Loaded {result.succeeded}/{result.bundles} bundles ({result.resources} resources) "
+            f"in {result.elapsed_seconds:.2f}s: {result.bundles_per_second:,.1f} bundles/s, "
+            f"{result.resources_per_second:,.0f} resources/s, {result.retries} retries"
+        )
+        for error in summary["errors"]:
+            print(f"  error: {error}")
+    return 0 if result.failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
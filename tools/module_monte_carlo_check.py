@@ -25,6 +25,7 @@ import polars as pl
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_OUTPUT = PROJECT_ROOT / "output" / "monte_carlo_validation"
+DEFAULT_MODULE_CACHE = PROJECT_ROOT / "output" / "module_cache"
 
 
 def run_generator(
@@ -36,6 +37,7 @@ def run_generator(
     iteration: int,
     output_dir: Path,
     extra_args: Optional[List[str]] = None,
+    module_cache_dir: Optional[Path] = DEFAULT_MODULE_CACHE,
 ) -> Path:
     run_dir = output_dir / f"run_{iteration:03d}"
     run_dir.mkdir(parents=True, exist_ok=True)
@@ -57,6 +59,10 @@ def run_generator(
         cmd.extend(["--module", module])
     if seed is not None:
         cmd.extend(["--seed", str(seed + iteration)])
+    if module_cache_dir is not None:
+        # Share compiled module definitions across iterations so each subprocess
+        # skips YAML parsing, parameter resolution and validation.
+        cmd.extend(["--module-cache-dir", str(module_cache_dir)])
     if extra_args:
         cmd.extend(extra_args)
 
@@ -138,6 +144,12 @@ def main() -> int:
     parser.add_argument("--output-root", type=Path, default=DEFAULT_OUTPUT)
     parser.add_argument("--required-loinc", action="append", default=None)
     parser.add_argument("--required-icd10", action="append", default=None)
+    parser.add_argument(
+        "--module-cache-dir",
+        type=Path,
+        default=DEFAULT_MODULE_CACHE,
+        help="Directory for compiled module definitions shared across iterations",
+    )
     parser.add_argument("--max-med-std", type=float, default=0.25, help="Allowable coefficient of variation for medications" )
     parser.add_argument("--skip-fhir", action="store_true", help="Skip FHIR bundle export during generation")
     parser.add_argument("--skip-hl7", action="store_true", help="Skip HL7 export during generation")
@@ -172,6 +184,7 @@ def main() -> int:
                 iteration=i,
                 output_dir=args.output_root,
                 extra_args=extra_args,
+                module_cache_dir=args.module_cache_dir,
             )
             run_dirs.append(run_dir)
 
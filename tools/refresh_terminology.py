@@ -37,6 +37,7 @@ def refresh_terminology(
     rebuild_db: bool = False,
     output_db: Optional[Path] = None,
     force: bool = False,
+    incremental: bool = False,
     umls_languages: Optional[Sequence[str]] = None,
     umls_sab: Optional[Sequence[str]] = None,
 ) -> Dict[str, str]:
@@ -104,16 +105,14 @@ def refresh_terminology(
     umls_raw = umls_root / "raw"
     umls_archives = sorted(umls_raw.glob("*.nlm"))
     if umls_archives:
-        output = umls_root / "umls_concepts_full.csv"
+        output = umls_root / "umls_concepts_full.parquet"
         languages = umls_languages or ["ENG"]
         sab_whitelist = umls_sab
-        wrote = import_umls.write_rows(
-            import_umls.iter_umls_rows(
-                umls_raw,
-                languages=languages,
-                sab_whitelist=sab_whitelist,
-            ),
+        wrote = import_umls.write_umls_concepts(
+            umls_raw,
             output,
+            languages=languages,
+            sab_whitelist=sab_whitelist,
         )
         summary["umls"] = "normalized" if wrote else "skipped (no concepts parsed)"
     else:
@@ -123,8 +122,9 @@ def refresh_terminology(
         from tools.build_terminology_db import build_database
 
         db_path = output_db or (root / "terminology.duckdb")
-        build_database(root, db_path, force=force)
-        summary["duckdb"] = f"rebuilt ({db_path})"
+        tables = build_database(root, db_path, force=force, incremental=incremental)
+        rebuilt = sorted(name for name, state in tables.items() if state == "rebuilt")
+        summary["duckdb"] = f"rebuilt {', '.join(rebuilt) or 'nothing'} ({db_path})"
 
     return summary
 
@@ -147,6 +147,11 @@ def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
         action="store_true",
         help="Overwrite the DuckDB warehouse when rebuilding",
     )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Update the existing DuckDB warehouse, reloading only tables whose sources changed",
+    )
     parser.add_argument(
         "--umls-languages",
         nargs="*",
@@ -167,6 +172,7 @@ def main(argv: Optional[Sequence[str]] = None) -> None:
         rebuild_db=args.rebuild_db,
         output_db=args.output_db,
         force=args.force,
+        incremental=args.incremental,
         umls_languages=args.umls_languages,
         umls_sab=args.umls_sab,
     )